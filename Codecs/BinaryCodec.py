@@ -3,6 +3,7 @@ from obsub import event
 from threading import Thread, Condition
 import struct
 from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Ensemble.DatasetRegistry import DatasetRegistry
 from rti_python.Ensemble.BeamVelocity import BeamVelocity
 from rti_python.Ensemble.InstrumentVelocity import InstrumentVelocity
 from rti_python.Ensemble.EarthVelocity import EarthVelocity
@@ -16,6 +17,7 @@ from rti_python.Ensemble.BottomTrack import BottomTrack
 from rti_python.Ensemble.NmeaData import NmeaData
 from rti_python.Ensemble.RangeTracking import RangeTracking
 from rti_python.Ensemble.SystemSetup import SystemSetup
+from rti_python.Ensemble.LazyEnsemble import LazyEnsemble
 import binascii
 
 # Buffer to hold the incoming data
@@ -38,18 +40,25 @@ class BinaryCodec:
 
      AddDataThread will buffer the data.
      ProcessDataThread will decode the buffer.
+
+     Set is_lazy to pass LazyEnsemble objects to the subscribers.
+     The datasets are only decoded when they are accessed.
     """
 
-    def __init__(self):
+    # Start of an ensemble
+    DELIMITER = b'\x80' * 16
+
+    def __init__(self, is_lazy=False):
         """
         Start the two threads.
+        :param is_lazy: TRUE = Decode the datasets on first access.
         """
         # Start the Add Data Thread
         self.add_data_thread = AddDataThread()
         self.add_data_thread.start()
 
         # Start the Processing Data Thread
-        self.process_data_thread = ProcessDataThread()
+        self.process_data_thread = ProcessDataThread(is_lazy)
         self.process_data_thread.ensemble_event += self.receive_ens
         self.process_data_thread.start()
 
@@ -148,6 +157,55 @@ class BinaryCodec:
 
         return False
 
+    @staticmethod
+    def find_ensembles(buff, is_end=False):
+        """
+        Find the good ensembles in the buffer.  The ensemble size in the header
+        is used to find the end of each ensemble and bad data is skipped.
+        An ensemble not complete at the end of the buffer is left in the buffer,
+        unless it is the end of the data.
+        :param buff: Buffer of the ensemble data.
+        :param is_end: TRUE if no more data will be added to the buffer.
+        :return: List of the buffer offset and the binary data of each ensemble, and
+        the number of bytes scanned.  The bytes after it are the start of an ensemble not complete.
+        """
+        ensembles = []
+        pos = 0
+
+        while True:
+            start = buff.find(BinaryCodec.DELIMITER, pos)
+            if start < 0:
+                # Keep a partial delimiter at the end
+                return ensembles, max(len(buff) - (len(BinaryCodec.DELIMITER) - 1), pos)
+
+            # Wait for the complete header
+            if len(buff) - start < Ensemble.HeaderSize:
+                return ensembles, start
+
+            # Check the ensemble number and payload size with their inverse.
+            # Extra 0x80 bytes before the delimiter give a shifted header that can pass one check.
+            ens_num, ens_num_inv, payload_size, payload_size_inv = struct.unpack_from("<IIII", buff, start + 16)
+            if ens_num ^ ens_num_inv != 0xFFFFFFFF or payload_size ^ payload_size_inv != 0xFFFFFFFF:
+                pos = start + 1
+                continue
+
+            # Wait for the complete ensemble
+            end = start + Ensemble.HeaderSize + payload_size + Ensemble.ChecksumSize
+            if end > len(buff):
+                if not is_end:
+                    return ensembles, start
+
+                # Incomplete ensemble at the end of the data
+                pos = start + 1
+                continue
+
+            ens_bin = bytes(buff[start:end])
+            if BinaryCodec.verify_ens_data(ens_bin):
+                ensembles.append((start, ens_bin))
+                pos = end
+            else:
+                pos = start + 1
+
     @staticmethod
     def decode_data_sets(ens):
         """
@@ -158,39 +216,24 @@ class BinaryCodec:
         :param ens: Ensemble data.  Decode the dataset.
         :return: Return the decoded ensemble.
         """
-        #print(ens)
-        packetPointer = Ensemble().HeaderSize
-        type = 0
-        numElements = 0
-        elementMultiplier = 0
-        imag = 0
-        nameLen = 0
-        name = ""
-        dataSetSize = 0
+        packetPointer = Ensemble.HeaderSize
         ens_len = len(ens)
 
         # Create the ensemble
         ensemble = Ensemble()
 
-        # Add the raw data to the ensemble
-        #ensemble.AddRawData(ens)
-
         try:
 
             # Decode the ensemble datasets
-            for x in range(Ensemble().MaxNumDataSets):
+            for x in range(Ensemble.MaxNumDataSets):
                 # Check if we are at the end of the payload
                 if packetPointer >= ens_len - Ensemble.ChecksumSize - Ensemble.HeaderSize:
                     break
 
                 try:
                     # Get the dataset info
-                    ds_type = Ensemble.GetInt32(packetPointer + (Ensemble.BytesInInt32 * 0), Ensemble().BytesInInt32, ens)
-                    num_elements = Ensemble.GetInt32(packetPointer + (Ensemble.BytesInInt32 * 1), Ensemble().BytesInInt32, ens)
-                    element_multiplier = Ensemble.GetInt32(packetPointer + (Ensemble.BytesInInt32 * 2), Ensemble().BytesInInt32, ens)
-                    image = Ensemble.GetInt32(packetPointer + (Ensemble.BytesInInt32 * 3), Ensemble().BytesInInt32, ens)
-                    name_len = Ensemble.GetInt32(packetPointer + (Ensemble.BytesInInt32 * 4), Ensemble().BytesInInt32, ens)
-                    name = str(ens[packetPointer+(Ensemble.BytesInInt32 * 5):packetPointer+(Ensemble.BytesInInt32 * 5)+8], 'UTF-8')
+                    ds_type, num_elements, element_multiplier, image, name_len, name = DatasetRegistry.HEADER.unpack_from(ens, packetPointer)
+                    name = str(name, 'UTF-8')
                 except Exception as e:
                     logging.warning("Bad Ensemble header" + str(e))
                     break
@@ -198,106 +241,80 @@ class BinaryCodec:
                 # Calculate the dataset size
                 data_set_size = Ensemble.GetDataSetSize(ds_type, name_len, num_elements, element_multiplier)
 
-                # Beam Velocity
-                if "E000001" in name:
-                    logging.debug(name)
-                    bv = BeamVelocity(num_elements, element_multiplier)
-                    bv.decode(ens[packetPointer:packetPointer+data_set_size])
-                    ensemble.AddBeamVelocity(bv)
-
-                # Instrument Velocity
-                if "E000002" in name:
+                # Find the dataset type
+                ds_info = DatasetRegistry.get(name)
+                if ds_info:
                     logging.debug(name)
-                    iv = InstrumentVelocity(num_elements, element_multiplier)
-                    iv.decode(ens[packetPointer:packetPointer+data_set_size])
-                    ensemble.AddInstrumentVelocity(iv)
+                    attr_name, ds_class = ds_info
+                    ds = ds_class(num_elements, element_multiplier)
+                    ds.decode(ens[packetPointer:packetPointer+data_set_size])
+                    ensemble.AddDataSet(attr_name, ds)
 
-                # Earth Velocity
-                if "E000003" in name:
-                    logging.debug(name)
-                    ev = EarthVelocity(num_elements, element_multiplier)
-                    ev.decode(ens[packetPointer:packetPointer+data_set_size])
-                    ensemble.AddEarthVelocity(ev)
+                # Move to the next dataset
+                packetPointer += data_set_size
 
-                # Amplitude
-                if "E000004" in name:
-                    logging.debug(name)
-                    amp = Amplitude(num_elements, element_multiplier)
-                    amp.decode(ens[packetPointer:packetPointer+data_set_size])
-                    ensemble.AddAmplitude(amp)
+        except Exception as e:
+            logging.warning("Error decoding the ensemble.  " + str(e))
+            return None
 
-                # Correlation
-                if "E000005" in name:
-                    logging.debug(name)
-                    corr = Correlation(num_elements, element_multiplier)
-                    corr.decode(ens[packetPointer:packetPointer+data_set_size])
-                    ensemble.AddCorrelation(corr)
+        return ensemble
 
-                # Good Beam
-                if "E000006" in name:
-                    logging.debug(name)
-                    gb = GoodBeam(num_elements, element_multiplier)
-                    gb.decode(ens[packetPointer:packetPointer+data_set_size])
-                    ensemble.AddGoodBeam(gb)
+    @staticmethod
+    def index_data_sets(ens):
+        """
+        Find the location of all the datasets in the ensemble
+        without decoding them.
 
-                # Good Earth
-                if "E000007" in name:
-                    logging.debug(name)
-                    ge = GoodEarth(num_elements, element_multiplier)
-                    ge.decode(ens[packetPointer:packetPointer+data_set_size])
-                    ensemble.AddGoodEarth(ge)
+        Use verify_ens_data if you are using this
+        as a static method to verify the data is correct.
+        :param ens: Ensemble data.
+        :return: Dictionary of dataset ID to (start, size, num_elements, element_multiplier).
+        """
+        packetPointer = Ensemble.HeaderSize
+        ens_len = len(ens)
+        dataset_table = {}
 
-                # Ensemble Data
-                if "E000008" in name:
-                    logging.debug(name)
-                    ed = EnsembleData(num_elements, element_multiplier)
-                    ed.decode(ens[packetPointer:packetPointer+data_set_size])
-                    ensemble.AddEnsembleData(ed)
+        for x in range(Ensemble.MaxNumDataSets):
+            # Check if we are at the end of the payload
+            if packetPointer >= ens_len - Ensemble.ChecksumSize - Ensemble.HeaderSize:
+                break
 
-                # Ancillary Data
-                if "E000009" in name:
-                    logging.debug(name)
-                    ad = AncillaryData(num_elements, element_multiplier)
-                    ad.decode(ens[packetPointer:packetPointer+data_set_size])
-                    ensemble.AddAncillaryData(ad)
+            try:
+                # Get the dataset info
+                ds_type, num_elements, element_multiplier, image, name_len, name = DatasetRegistry.HEADER.unpack_from(ens, packetPointer)
+                name = str(name, 'UTF-8')
+            except Exception as e:
+                logging.warning("Bad Ensemble header" + str(e))
+                break
 
-                # Bottom Track
-                if "E000010" in name:
-                    logging.debug(name)
-                    bt = BottomTrack(num_elements, element_multiplier)
-                    bt.decode(ens[packetPointer:packetPointer + data_set_size])
-                    ensemble.AddBottomTrack(bt)
+            # Calculate the dataset size
+            data_set_size = Ensemble.GetDataSetSize(ds_type, name_len, num_elements, element_multiplier)
 
-                # NMEA data
-                if "E000011" in name:
-                    logging.debug(name)
-                    nd = NmeaData(num_elements, element_multiplier)
-                    nd.decode(ens[packetPointer:packetPointer + data_set_size])
-                    ensemble.AddNmeaData(nd)
+            dataset_table[name[0:7]] = (packetPointer, data_set_size, num_elements, element_multiplier)
 
-                # System Setup
-                if "E000014" in name:
-                    logging.debug(name)
-                    ss = SystemSetup(num_elements, element_multiplier)
-                    ss.decode(ens[packetPointer:packetPointer + data_set_size])
-                    ensemble.AddSystemSetup(ss)
+            # Move to the next dataset
+            packetPointer += data_set_size
 
-                # Range Tracking
-                if "E000015" in name:
-                    logging.debug(name)
-                    rt = RangeTracking(num_elements, element_multiplier)
-                    rt.decode(ens[packetPointer:packetPointer + data_set_size])
-                    ensemble.AddRangeTracking(rt)
+        return dataset_table
 
-                # Move to the next dataset
-                packetPointer += data_set_size
+    @staticmethod
+    def decode_data_sets_lazy(ens):
+        """
+        Create a LazyEnsemble from the ensemble data.  Only the
+        location of the datasets is decoded.  Each dataset is decoded
+        when it is first accessed.
 
+        Use verify_ens_data if you are using this
+        as a static method to verify the data is correct.
+        :param ens: Ensemble data.
+        :return: Return the LazyEnsemble.
+        """
+        try:
+            return LazyEnsemble(ens, BinaryCodec.index_data_sets(ens))
         except Exception as e:
             logging.warning("Error decoding the ensemble.  " + str(e))
             return None
 
-        return ensemble
-
 
 class AddDataThread(Thread):
     """
@@ -380,16 +397,18 @@ class ProcessDataThread(Thread):
     subscribers of the event "ensemble_event".
     """
 
-    def __init__(self):
+    def __init__(self, is_lazy=False):
         """
         Initialize this object as a thread.
+        :param is_lazy: TRUE = Decode the datasets on first access.
         """
         Thread.__init__(self)
         self.name = "Binary Codec Process Data Thread"
         self.alive = True
+        self.is_lazy = is_lazy
         self.MAX_TIMEOUT = 5
         self.timeout = 0
-        self.DELIMITER = b'\x80' * 16
+        self.DELIMITER = BinaryCodec.DELIMITER
 
     def shutdown(self):
         """
@@ -443,7 +462,10 @@ class ProcessDataThread(Thread):
         # This will check that all the data is there and the checksum is good
         if BinaryCodec.verify_ens_data(ens_bin):
             # Decode the ens binary data
-            ens = BinaryCodec.decode_data_sets(ens_bin)
+            if self.is_lazy:
+                ens = BinaryCodec.decode_data_sets_lazy(ens_bin)
+            else:
+                ens = BinaryCodec.decode_data_sets(ens_bin)
 
             # Pass the ensemble
             if ens:
@@ -1,5 +1,11 @@
+import time
+import json
+import select
 import socket
+import struct
 import datetime
+from collections import OrderedDict, deque
+from threading import Thread
 
 import logging
 
@@ -39,12 +45,364 @@ class ProjectInfo:
         self.DateCreated = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
         self.DateModified = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
 
+
+class UdpFrame:
+    """
+    Header to send an ensemble in one or more UDP datagrams.
+
+    An ensemble is usually larger than one datagram, so it is split into
+    fragments.  Each fragment has a header with the sequence number of the
+    ensemble, the size of the ensemble and the location of the fragment.
+    The receiver can then put the fragments back together in any order and
+    detect lost or reordered ensembles by the sequence number.
+    """
+
+    MAGIC = b"RTIU"
+    HEADER = struct.Struct("<4sIIIHH")          # Magic, Sequence, Ensemble Size, Offset, Fragment Index, Fragment Count
+    MAX_PAYLOAD = 1400                          # Fits in a 1500 byte Ethernet MTU
+    MAX_ENSEMBLE_SIZE = 16 * 1024 * 1024        # Larger sizes are a bad header
+
+    @staticmethod
+    def fragment(ens_bin, seq, max_payload=MAX_PAYLOAD):
+        """
+        Split the ensemble into datagrams.
+        :param ens_bin: Ensemble binary data.
+        :param seq: Sequence number of the ensemble.
+        :param max_payload: Maximum number of ensemble bytes in a datagram.
+        :return: List of datagrams.
+        """
+        ens_bin = memoryview(ens_bin)
+        total = len(ens_bin)
+        count = max((total + max_payload - 1) // max_payload, 1)
+
+        datagrams = []
+        for index in range(count):
+            offset = index * max_payload
+            header = UdpFrame.HEADER.pack(UdpFrame.MAGIC, seq & 0xFFFFFFFF, total, offset, index, count)
+            datagrams.append(header + ens_bin[offset:offset + max_payload])
+
+        return datagrams
+
+
+class UdpIngestMetrics:
+    """
+    Receive metrics of the UDP ingestion.
+    """
+
+    def __init__(self):
+        self.packets = 0                    # Datagrams received
+        self.bytes = 0                      # Bytes received
+        self.ensembles = 0                  # Complete ensembles passed to the decoder
+        self.lost = 0                       # Ensembles missing in the sequence
+        self.reordered = 0                  # Ensembles received after a later ensemble
+        self.duplicates = 0                 # Datagrams received again
+        self.incomplete = 0                 # Ensembles dropped with missing fragments
+        self.bad = 0                        # Datagrams with a bad header
+        self.unframed = 0                   # Datagrams without a UdpFrame header
+        self.wakeups = 0                    # Times the socket was drained
+        self.max_batch = 0                  # Most datagrams drained in one wakeup
+        self.packets_per_sec = 0.0          # Throughput over the last few seconds
+        self.bytes_per_sec = 0.0
+        self.reassembly_avg_ms = 0.0        # Time from the first to the last fragment
+        self.reassembly_max_ms = 0.0
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+class UdpReassembler:
+    """
+    Put the UdpFrame fragments back together into ensembles.
+
+    Each fragment is copied once, from the receive buffer into the buffer of
+    its ensemble.  An ensemble in a single datagram is not copied, the view of
+    the receive buffer is passed to the callback.  So the view is only valid
+    during the callback.  Use bytes(view) to keep the data.
+
+    The sequence number is tracked for each sender.  A gap in the sequence is
+    counted as lost.  If the missing ensemble arrives later, it is counted as
+    reordered instead.  Ensembles not complete within the timeout are dropped.
+    """
+
+    RESTART_WINDOW = 1 << 16                # Sequence this far behind means the sender restarted
+    MAX_MISSING = 1024                      # Missing sequence numbers remembered for each sender
+
+    def __init__(self, callback, stream_callback=None, timeout=1.0, max_pending=64, metrics=None):
+        """
+        :param callback: Function called with a memoryview of each complete ensemble.
+        :param stream_callback: Function called with the bytes of datagrams without a UdpFrame header.  None to drop them.
+        :param timeout: Seconds to wait for all the fragments of an ensemble.
+        :param max_pending: Maximum number of ensembles waiting for fragments.
+        :param metrics: UdpIngestMetrics to update.
+        """
+        self.callback = callback
+        self.stream_callback = stream_callback
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.metrics = metrics if metrics is not None else UdpIngestMetrics()
+
+        self._pending = OrderedDict()       # (Sender, Seq) to [buffer, received flags, remaining, first time]
+        self._senders = {}                  # Sender to [highest seq, missing seqs]
+        self._latency_total = 0.0
+
+    def feed(self, view, sender=None, now=None):
+        """
+        Process a datagram.
+        :param view: memoryview of the datagram.
+        :param sender: Address of the sender.
+        :param now: Receive time.  Default is time.monotonic().
+        """
+        if now is None:
+            now = time.monotonic()
+
+        self.metrics.packets += 1
+        self.metrics.bytes += len(view)
+
+        header_size = UdpFrame.HEADER.size
+        if len(view) < header_size or view[:4] != UdpFrame.MAGIC:
+            self.metrics.unframed += 1
+            if self.stream_callback is not None:
+                self.stream_callback(bytes(view))
+            return
+
+        magic, seq, total, offset, index, count = UdpFrame.HEADER.unpack_from(view)
+        payload = view[header_size:]
+        if total == 0 or total > UdpFrame.MAX_ENSEMBLE_SIZE or index >= count or offset + len(payload) > total:
+            self.metrics.bad += 1
+            return
+
+        key = (sender, seq)
+        item = self._pending.get(key)
+        if item is None:
+            # First fragment of the ensemble
+            if not self._track(sender, seq):
+                self.metrics.duplicates += 1
+                return
+
+            if count == 1:
+                if len(payload) != total:
+                    self.metrics.bad += 1
+                    return
+                self._deliver(payload, 0.0)
+                return
+
+            if len(self._pending) >= self.max_pending:
+                self._pending.popitem(last=False)
+                self.metrics.incomplete += 1
+
+            item = [bytearray(total), bytearray(count), count, now]
+            self._pending[key] = item
+        elif len(item[0]) != total or len(item[1]) != count:
+            self.metrics.bad += 1
+            return
+
+        buf, received, remaining, first_time = item
+        if received[index]:
+            self.metrics.duplicates += 1
+            return
+
+        buf[offset:offset + len(payload)] = payload
+        received[index] = 1
+        item[2] = remaining - 1
+
+        if item[2] == 0:
+            del self._pending[key]
+            self._deliver(memoryview(buf), now - first_time)
+
+    def expire(self, now=None):
+        """
+        Drop the ensembles waiting longer than the timeout.
+        :param now: Current time.  Default is time.monotonic().
+        """
+        if now is None:
+            now = time.monotonic()
+
+        while self._pending:
+            key, item = next(iter(self._pending.items()))
+            if now - item[3] < self.timeout:
+                break
+            del self._pending[key]
+            self.metrics.incomplete += 1
+
+    @property
+    def pending(self):
+        """
+        Number of ensembles waiting for fragments.
+        """
+        return len(self._pending)
+
+    def _track(self, sender, seq):
+        """
+        Update the sequence tracking of the sender.
+        :param sender: Address of the sender.
+        :param seq: Sequence number of the ensemble.
+        :return: False if the ensemble was already received.
+        """
+        state = self._senders.get(sender)
+        if state is None or seq + self.RESTART_WINDOW < state[0]:
+            # New sender or the sender restarted
+            self._senders[sender] = [seq, set()]
+            return True
+
+        highest, missing = state
+        if seq > highest:
+            gap = seq - highest - 1
+            if gap:
+                self.metrics.lost += gap
+                missing.update(range(max(highest + 1, seq - self.MAX_MISSING), seq))
+                while len(missing) > self.MAX_MISSING:
+                    missing.remove(min(missing))
+            state[0] = seq
+            return True
+
+        if seq in missing:
+            missing.remove(seq)
+            self.metrics.lost -= 1
+            self.metrics.reordered += 1
+            return True
+
+        return False
+
+    def _deliver(self, view, latency):
+        """
+        Pass the complete ensemble to the callback.
+        :param view: memoryview of the ensemble.
+        :param latency: Seconds from the first to the last fragment.
+        """
+        self.metrics.ensembles += 1
+        self._latency_total += latency
+        self.metrics.reassembly_avg_ms = self._latency_total * 1000.0 / self.metrics.ensembles
+        self.metrics.reassembly_max_ms = max(self.metrics.reassembly_max_ms, latency * 1000.0)
+
+        try:
+            self.callback(view)
+        except Exception as err:
+            logging.error("Error processing UDP ensemble. " + str(err))
+
+
+class UdpIngestThread(Thread):
+    """
+    Receive the ensembles from a UDP port.
+
+    Each wakeup drains all the waiting datagrams into preallocated receive
+    buffers with recvfrom_into(), then passes them to the UdpReassembler.
+    No memory is allocated to receive a datagram.
+    """
+
+    def __init__(self, callback, port, host="0.0.0.0", stream_callback=None,
+                 num_buffers=64, buffer_size=65536, rcvbuf=4 * 1024 * 1024, timeout=1.0):
+        """
+        :param callback: Function called with a memoryview of each complete ensemble.
+        :param port: UDP port to listen on.  0 to pick a free port.
+        :param host: Address to listen on.
+        :param stream_callback: Function called with the bytes of datagrams without a UdpFrame header.
+        :param num_buffers: Maximum number of datagrams drained in one wakeup.
+        :param buffer_size: Size of each receive buffer.  Largest datagram.
+        :param rcvbuf: Socket receive buffer size.  Holds the datagrams while an ensemble is decoded.
+        :param timeout: Seconds to wait for all the fragments of an ensemble.
+        """
+        Thread.__init__(self, name="UdpIngestThread", daemon=True)
+        self.alive = True
+        self.metrics = UdpIngestMetrics()
+        self.reassembler = UdpReassembler(callback, stream_callback, timeout, metrics=self.metrics)
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        except OSError as err:
+            logging.warning("UDP receive buffer size not set. " + str(err))
+        self.socket.bind((host, port))
+        self.socket.setblocking(False)
+        self.port = self.socket.getsockname()[1]
+
+        # One block of memory for all the receive buffers
+        self._memory = bytearray(num_buffers * buffer_size)
+        view = memoryview(self._memory)
+        self._buffers = [view[index * buffer_size:(index + 1) * buffer_size] for index in range(num_buffers)]
+        self._history = deque()
+
+    def shutdown(self):
+        """
+        Stop the thread and close the socket.
+        :return:
+        """
+        self.alive = False
+        if self.is_alive():
+            self.join()
+        self.socket.close()
+
+    def get_metrics(self):
+        """
+        :return: Dictionary of the UdpIngestMetrics.
+        """
+        return self.metrics.to_dict()
+
+    def run(self):
+        """
+        Wait for datagrams, drain the socket and process the datagrams.
+        :return:
+        """
+        received = [None] * len(self._buffers)
+
+        while self.alive:
+            try:
+                readable, _, _ = select.select([self.socket], [], [], 0.1)
+            except (OSError, ValueError):
+                break
+
+            now = time.monotonic()
+            if readable:
+                # Drain the socket before processing, so the kernel buffer does not overflow
+                count = 0
+                for buf in self._buffers:
+                    try:
+                        nbytes, sender = self.socket.recvfrom_into(buf)
+                    except (BlockingIOError, InterruptedError):
+                        break
+                    except OSError as err:
+                        logging.error("Error receiving UDP data. " + str(err))
+                        break
+                    received[count] = (nbytes, sender)
+                    count += 1
+
+                self.metrics.wakeups += 1
+                self.metrics.max_batch = max(self.metrics.max_batch, count)
+
+                for index in range(count):
+                    nbytes, sender = received[index]
+                    self.reassembler.feed(self._buffers[index][:nbytes], sender, now)
+
+            self.reassembler.expire(now)
+            self._update_throughput(now)
+
+    def _update_throughput(self, now, window=5.0):
+        """
+        Calculate the throughput over the window.
+        :param now: Current time.
+        :param window: Time window in seconds.
+        """
+        self._history.append((now, self.metrics.packets, self.metrics.bytes))
+        while len(self._history) > 1 and now - self._history[0][0] > window:
+            self._history.popleft()
+
+        first_time, first_packets, first_bytes = self._history[0]
+        span = max(now - first_time, 1.0)
+        self.metrics.packets_per_sec = (self.metrics.packets - first_packets) / span
+        self.metrics.bytes_per_sec = (self.metrics.bytes - first_bytes) / span
+
+
 class BinaryCodecUdp(BinaryCodec):
     """
     Decode RoweTech ADCP Binary data.
     """
 
-    def __init__(self, udp_port):
+    def __init__(self, udp_port, spooler=None, listen_port=None, listen_ip="0.0.0.0"):
+        """
+        :param udp_port: UDP port to stream the JSON data.
+        :param spooler: TelemetrySpooler to store and forward the ensembles.  None to not forward.
+        :param listen_port: UDP port to receive the ensembles from a network ADCP.  None to not listen.
+        :param listen_ip: Address to receive the ensembles on.
+        """
         super().__init__()
         # Set meta data
         self.Meta = EnsembleMetaData()
@@ -59,26 +417,75 @@ class BinaryCodecUdp(BinaryCodec):
         self.udp_ip = '127.0.0.1'                                       # UDP IP (Localhost)
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)  # UDP Socket
 
+        # Ensembles are spooled to disk and sent in the background, so a bad link does not block decoding
+        self.spooler = spooler
+
+        # Receive the ensembles in UdpFrame datagrams.  Datagrams without the header are raw binary data.
+        self.ingest = None
+        if listen_port is not None:
+            self.ingest = UdpIngestThread(self.receive_datagram_ens, listen_port, listen_ip, stream_callback=self.add)
+            self.ingest.start()
+            logging.info("Binary codec - UDP Listen Port: " + str(self.ingest.port))
+
     def shutdown(self):
         """
-        Do nothing
+        Stop receiving and close the spooler.  The ensembles not sent stay in the spool.
+        :return:
+        """
+        if self.ingest is not None:
+            self.ingest.shutdown()
+
+        if self.spooler is not None:
+            self.spooler.close()
+
+    def get_ingest_metrics(self):
+        """
+        :return: Dictionary of the UdpIngestMetrics.  Empty if not listening.
+        """
+        if self.ingest is None:
+            return {}
+        return self.ingest.get_metrics()
+
+    def receive_ens(self, sender, ens):
+        """
+        Event handler for ProcessDataThread to receive the latest ensembles.
+        :param sender: Not Used
+        :param ens: Ensemble data
+        :return:
+        """
+        self.process_ens(ens)
+
+    def receive_datagram_ens(self, ens_bin):
+        """
+        Decode a complete ensemble received by the UdpIngestThread.
+        The ensemble is decoded from the receive buffer without a copy.
+        :param ens_bin: memoryview of the ensemble binary data.
         :return:
         """
-        pass
+        if BinaryCodec.verify_ens_data(ens_bin):
+            ens = BinaryCodec.decode_data_sets(ens_bin)
+            if ens:
+                self.process_ens(ens)
 
     def process_ens(self, ensemble):
         # Pass to event handler
         self.ensemble_event(ensemble)
 
+        if self.spooler is not None:
+            try:
+                self.spooler.put(ensemble)
+            except Exception as err:
+                logging.error("Error spooling ensemble data. " + str(err))
+
         try:
             # Stream data
             self.stream_data(ensemble)
 
             logging.debug("Stream ensemble data")
         except ConnectionRefusedError as err:
-            logging.error("Error streaming ensemble data", err)
+            logging.error("Error streaming ensemble data. " + str(err))
         except Exception as err:
-            logging.error("Error streaming ensemble data", err)
+            logging.error("Error streaming ensemble data. " + str(err))
 
     def stream_data(self, ens):
         """
@@ -104,84 +511,42 @@ class BinaryCodecUdp(BinaryCodec):
                                               minute=ens.EnsembleData.Minute,
                                               second=ens.EnsembleData.Second,
                                               microsecond=round(ens.EnsembleData.HSec*10000)).strftime("%Y-%m-%d %H:%M:%S.%f")
-
-                # Stream the data
-                ens.EnsembleData.DateTime = date_time
             else:
                 logging.error("BAD Date and Time: " + str(ensemble_number))
 
-            ens.EnsembleData.Meta = self.Meta
-            self.send_udp(Ensemble().toJSON(ens.EnsembleData).encode())
-
-        if ens.IsBeamVelocity:
-            ens.Wt.EnsembleNumber = ensemble_number
-            ens.Wt.SerialNumber = serial_number
-            ens.Wt.DateTime = date_time
-            ens.Wt.Meta = self.Meta
-            self.send_udp(Ensemble().toJSON(ens.Wt).encode())
-
-        if ens.IsInstrumentVelocity:
-            ens.InstrumentVelocity.EnsembleNumber = ensemble_number
-            ens.InstrumentVelocity.SerialNumber = serial_number
-            ens.InstrumentVelocity.DateTime = date_time
-            ens.InstrumentVelocity.Meta = self.Meta
-            self.send_udp(Ensemble().toJSON(ens.InstrumentVelocity).encode())
-
-        if ens.IsEarthVelocity:
-            ens.EarthVelocity.EnsembleNumber = ensemble_number
-            ens.EarthVelocity.SerialNumber = serial_number
-            ens.EarthVelocity.DateTime = date_time
-            ens.EarthVelocity.Meta = self.Meta
-            self.send_udp(Ensemble().toJSON(ens.EarthVelocity).encode())
-
-        if ens.IsAmplitude:
-            ens.Amplitude.EnsembleNumber = ensemble_number
-            ens.Amplitude.SerialNumber = serial_number
-            ens.Amplitude.DateTime = date_time
-            ens.Amplitude.Meta = self.Meta
-            self.send_udp(Ensemble().toJSON(ens.Amplitude).encode())
-
-        if ens.IsCorrelation:
-            ens.Correlation.EnsembleNumber = ensemble_number
-            ens.Correlation.SerialNumber = serial_number
-            ens.Correlation.DateTime = date_time
-            ens.Correlation.Meta = self.Meta
-            self.send_udp(Ensemble().toJSON(ens.Correlation).encode())
-
-        if ens.IsGoodBeam:
-            ens.GoodBeam.EnsembleNumber = ensemble_number
-            ens.GoodBeam.SerialNumber = serial_number
-            ens.GoodBeam.DateTime = date_time
-            ens.GoodBeam.Meta = self.Meta
-            self.send_udp(Ensemble().toJSON(ens.GoodBeam).encode())
-
-        if ens.IsGoodEarth:
-            ens.GoodEarth.EnsembleNumber = ensemble_number
-            ens.GoodEarth.SerialNumber = serial_number
-            ens.GoodEarth.DateTime = date_time
-            ens.GoodEarth.Meta = self.Meta
-            self.send_udp(Ensemble().toJSON(ens.GoodEarth).encode())
-
-        if ens.IsAncillaryData:
-            ens.AncillaryData.EnsembleNumber = ensemble_number
-            ens.AncillaryData.SerialNumber = serial_number
-            ens.AncillaryData.DateTime = date_time
-            ens.AncillaryData.Meta = self.Meta
-            self.send_udp(Ensemble().toJSON(ens.AncillaryData).encode())
-
-        if ens.IsBottomTrack:
-            ens.BottomTrack.EnsembleNumber = ensemble_number
-            ens.BottomTrack.SerialNumber = serial_number
-            ens.BottomTrack.DateTime = date_time
-            ens.BottomTrack.Meta = self.Meta
-            self.send_udp(Ensemble().toJSON(ens.BottomTrack).encode())
-
-        if ens.IsRangeTracking:
-            ens.RangeTracking.EnsembleNumber = ensemble_number
-            ens.RangeTracking.SerialNumber = serial_number
-            ens.RangeTracking.DateTime = date_time
-            ens.RangeTracking.Meta = self.Meta
-            self.send_udp(Ensemble().toJSON(ens.RangeTracking).encode())
+        # Stream each dataset
+        datasets = [(ens.IsEnsembleData, ens.EnsembleData),
+                    (ens.IsBeamVelocity, ens.BeamVelocity),
+                    (ens.IsInstrumentVelocity, ens.InstrumentVelocity),
+                    (ens.IsEarthVelocity, ens.EarthVelocity),
+                    (ens.IsAmplitude, ens.Amplitude),
+                    (ens.IsCorrelation, ens.Correlation),
+                    (ens.IsGoodBeam, ens.GoodBeam),
+                    (ens.IsGoodEarth, ens.GoodEarth),
+                    (ens.IsAncillaryData, ens.AncillaryData),
+                    (ens.IsBottomTrack, ens.BottomTrack),
+                    (ens.IsRangeTracking, ens.RangeTracking)]
+        for is_avail, ds in datasets:
+            if is_avail:
+                self.send_udp(self.dataset_to_json(ds, ensemble_number, serial_number, date_time))
+
+    def dataset_to_json(self, ds, ensemble_number, serial_number, date_time):
+        """
+        Convert the dataset to a JSON string with the ensemble number, serial number,
+        date and time and meta data.  The dataset is not changed.
+        :param ds: Dataset to convert.
+        :param ensemble_number: Ensemble number.
+        :param serial_number: Serial number.
+        :param date_time: Date and time string.
+        :return: JSON string as bytes with a newline at the end.
+        """
+        json_obj = Ensemble.to_json_obj(ds)
+        json_obj["EnsembleNumber"] = ensemble_number
+        json_obj["SerialNumber"] = serial_number
+        json_obj["DateTime"] = date_time
+        json_obj["Meta"] = self.Meta
+
+        return (json.dumps(json_obj, default=Ensemble.to_json_obj) + "\n").encode()
 
     def send_udp(self, data):
         """
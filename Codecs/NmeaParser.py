@@ -0,0 +1,465 @@
+import logging
+import datetime
+import numpy as np
+from functools import reduce
+from operator import xor
+
+try:
+    import pynmea2
+except ImportError:
+    pynmea2 = None
+
+# Knots to m/s
+KNOTS_TO_M_S = 0.514444444444444
+
+
+class NmeaSentence:
+    """
+    Parsed NMEA sentence.
+    The fields are kept as strings.  str() gives the original sentence.
+    """
+
+    def __init__(self, sentence: str, talker: str, sentence_type: str, data: list):
+        """
+        Initialize the sentence.
+        :param sentence: Original NMEA sentence.
+        :param talker: Talker ID.  Ex: GP
+        :param sentence_type: Sentence type.  Ex: GGA
+        :param data: List of fields after the address field.
+        """
+        self.sentence = sentence
+        self.talker = talker
+        self.sentence_type = sentence_type
+        self.data = data
+
+    def field(self, index: int) -> str:
+        """
+        Get the field as a string.
+        :param index: Index of the field after the address field.
+        :return: Field string or an empty string if the field does not exist.
+        """
+        if index < len(self.data):
+            return self.data[index]
+        return ""
+
+    def __str__(self):
+        return self.sentence
+
+    def __repr__(self):
+        return "<" + type(self).__name__ + " " + self.sentence + ">"
+
+
+class GgaSentence(NmeaSentence):
+    """
+    GGA Global Positioning System Fix Data.
+    The attribute names match pynmea2.  Like pynmea2, the position is 0.0
+    when there is no fix.
+    """
+
+    def __init__(self, sentence: str, talker: str, sentence_type: str, data: list):
+        NmeaSentence.__init__(self, sentence, talker, sentence_type, data)
+        self.timestamp = NmeaParser.to_time(self.field(0))
+        self.latitude = NmeaParser.to_degrees(self.field(1), self.field(2), 0.0)
+        self.longitude = NmeaParser.to_degrees(self.field(3), self.field(4), 0.0)
+        self.gps_qual = NmeaParser.to_int(self.field(5))
+        self.num_sats = NmeaParser.to_int(self.field(6))
+        self.horizontal_dil = NmeaParser.to_float(self.field(7))
+        self.altitude = NmeaParser.to_float(self.field(8))
+        self.geo_sep = NmeaParser.to_float(self.field(10))
+        self.age_gps_data = NmeaParser.to_float(self.field(12))
+
+
+class VtgSentence(NmeaSentence):
+    """
+    VTG Track Made Good and Ground Speed.
+    The attribute names match pynmea2.
+    """
+
+    def __init__(self, sentence: str, talker: str, sentence_type: str, data: list):
+        NmeaSentence.__init__(self, sentence, talker, sentence_type, data)
+        self.true_track = NmeaParser.to_float(self.field(0))
+        self.mag_track = NmeaParser.to_float(self.field(2))
+        self.spd_over_grnd_kts = NmeaParser.to_float(self.field(4))
+        self.spd_over_grnd_kmph = NmeaParser.to_float(self.field(6))
+        self.faa_mode = self.field(8)
+
+
+class HdtSentence(NmeaSentence):
+    """
+    HDT True Heading.
+    The attribute names match pynmea2.
+    """
+
+    def __init__(self, sentence: str, talker: str, sentence_type: str, data: list):
+        NmeaSentence.__init__(self, sentence, talker, sentence_type, data)
+        self.heading = NmeaParser.to_float(self.field(0))
+
+
+class RmcSentence(NmeaSentence):
+    """
+    RMC Recommended Minimum Specific GPS Data.
+    The attribute names match pynmea2.  Like pynmea2, the position is 0.0
+    when there is no fix.
+    """
+
+    def __init__(self, sentence: str, talker: str, sentence_type: str, data: list):
+        NmeaSentence.__init__(self, sentence, talker, sentence_type, data)
+        self.timestamp = NmeaParser.to_time(self.field(0))
+        self.status = self.field(1)
+        self.latitude = NmeaParser.to_degrees(self.field(2), self.field(3), 0.0)
+        self.longitude = NmeaParser.to_degrees(self.field(4), self.field(5), 0.0)
+        self.spd_over_grnd = NmeaParser.to_float(self.field(6))
+        self.true_course = NmeaParser.to_float(self.field(7))
+        self.datestamp = NmeaParser.to_date(self.field(8))
+
+
+class DbtSentence(NmeaSentence):
+    """
+    DBT Depth Below Transducer.
+    The attribute names match pynmea2.
+    """
+
+    def __init__(self, sentence: str, talker: str, sentence_type: str, data: list):
+        NmeaSentence.__init__(self, sentence, talker, sentence_type, data)
+        self.depth_feet = NmeaParser.to_float(self.field(0))
+        self.depth_meters = NmeaParser.to_float(self.field(2))
+        self.depth_fathoms = NmeaParser.to_float(self.field(4))
+
+
+class NmeaColumns:
+    """
+    NMEA values for many ensembles.
+    Each value is an array with a value for each ensemble.
+    The last sentence of each type in the ensemble is used.
+    NaN is used when the value is not available.
+    """
+
+    def __init__(self, num_ens: int):
+        # GGA
+        self.gga_utc = np.full(num_ens, np.nan)             # Seconds since midnight UTC
+        self.latitude = np.full(num_ens, np.nan)            # Degrees, South is negative
+        self.longitude = np.full(num_ens, np.nan)           # Degrees, West is negative
+        self.gps_qual = np.full(num_ens, np.nan)
+        self.num_sats = np.full(num_ens, np.nan)
+        self.hdop = np.full(num_ens, np.nan)
+        self.altitude = np.full(num_ens, np.nan)
+
+        # VTG
+        self.course_true = np.full(num_ens, np.nan)         # Degrees
+        self.course_mag = np.full(num_ens, np.nan)          # Degrees
+        self.speed_knots = np.full(num_ens, np.nan)
+        self.speed_m_s = np.full(num_ens, np.nan)
+
+        # HDT
+        self.heading = np.full(num_ens, np.nan)             # Degrees
+
+        # RMC
+        self.rmc_utc = np.full(num_ens, np.nan)             # Seconds since midnight UTC
+        self.rmc_speed_knots = np.full(num_ens, np.nan)
+        self.rmc_course_true = np.full(num_ens, np.nan)
+
+        # DBT
+        self.depth_m = np.full(num_ens, np.nan)             # Meters
+
+        # Ensemble number of each row when parsed from a file
+        self.ensemble_num = np.zeros(num_ens, dtype=int)
+
+    @property
+    def num_ens(self) -> int:
+        return len(self.latitude)
+
+
+class NmeaParser:
+    """
+    Lightweight NMEA parser.
+
+    GGA, VTG, HDT, RMC and DBT sentences are parsed directly into floats.
+    Any other sentence type is parsed with pynmea2 if it is installed.
+
+    msg = NmeaParser.parse("$GPHDT,244.39,T*17")
+    msg.heading                 # 244.39
+
+    Parse the NMEA data of all the ensembles into arrays:
+    columns = NmeaParser.parse_batch([ens1_nmea_str, ens2_nmea_str])
+    columns.latitude            # Array with a latitude for each ensemble
+    """
+
+    # Sentence types parsed by this parser
+    SENTENCE_TYPES = {"GGA": GgaSentence,
+                      "VTG": VtgSentence,
+                      "HDT": HdtSentence,
+                      "RMC": RmcSentence,
+                      "DBT": DbtSentence}
+
+    @staticmethod
+    def parse(sentence: str):
+        """
+        Parse the NMEA sentence.  The checksum is verified if it is given.
+        :param sentence: NMEA sentence.
+        :return: Parsed sentence or None if the sentence is bad.
+        """
+        result = NmeaParser.split(sentence)
+        if result is None:
+            return None
+
+        sentence, talker, sentence_type, data = result
+        sentence_class = NmeaParser.SENTENCE_TYPES.get(sentence_type)
+        if sentence_class:
+            return sentence_class(sentence, talker, sentence_type, data)
+
+        # Unknown sentence type
+        if pynmea2:
+            try:
+                return pynmea2.parse(sentence)
+            except Exception as e:
+                logging.debug("Error parsing NMEA sentence with pynmea2.  " + str(e))
+
+        return NmeaSentence(sentence, talker, sentence_type, data)
+
+    @staticmethod
+    def split(sentence: str):
+        """
+        Verify the sentence and split it into fields.
+        :param sentence: NMEA sentence.
+        :return: (sentence, talker, sentence type, fields) or None if the sentence is bad.
+        """
+        sentence = sentence.strip()
+        start = sentence.find("$")
+        if start < 0:
+            return None
+        sentence = sentence[start:]
+
+        # Verify the checksum if it is given
+        star = sentence.find("*")
+        if star >= 0:
+            if not NmeaParser.is_checksum_good(sentence[1:star], sentence[star + 1:]):
+                return None
+            body = sentence[1:star]
+        else:
+            body = sentence[1:]
+
+        fields = body.split(",")
+        address = fields[0]
+        if len(address) < 3:
+            return None
+
+        # Proprietary sentences do not have a talker ID
+        if address[0] == "P":
+            talker = "P"
+            sentence_type = address[1:]
+        else:
+            talker = address[:-3]
+            sentence_type = address[-3:]
+
+        return sentence, talker, sentence_type, fields[1:]
+
+    @staticmethod
+    def is_checksum_good(data: str, checksum: str) -> bool:
+        """
+        Verify the NMEA checksum.
+        :param data: Sentence between $ and *.
+        :param checksum: Checksum hex string after *.
+        :return: TRUE if the checksum matches.
+        """
+        try:
+            return reduce(xor, data.encode("ascii", "ignore"), 0) == int(checksum[0:2], 16)
+        except ValueError:
+            return False
+
+    @staticmethod
+    def parse_batch(nmea_list: list) -> NmeaColumns:
+        """
+        Parse the NMEA data of many ensembles into columns.
+        Only the numeric values are extracted, no sentence objects are created.
+        :param nmea_list: List with the NMEA string of each ensemble.  Sentences are separated by white space.
+        :return: NMEA columns.
+        """
+        columns = NmeaColumns(len(nmea_list))
+        to_float = NmeaParser.to_float_nan
+
+        for index, nmea_str in enumerate(nmea_list):
+            if not nmea_str:
+                continue
+
+            # Keep the last sentence of each type
+            last = {}
+            for sentence in nmea_str.split():
+                result = NmeaParser.split(sentence)
+                if result and result[2] in NmeaParser.SENTENCE_TYPES:
+                    last[result[2]] = result[3]
+
+            data = last.get("GGA")
+            if data and len(data) >= 9:
+                columns.gga_utc[index] = NmeaParser.to_seconds(data[0])
+                columns.latitude[index] = NmeaParser.to_degrees_nan(data[1], data[2])
+                columns.longitude[index] = NmeaParser.to_degrees_nan(data[3], data[4])
+                columns.gps_qual[index] = to_float(data[5])
+                columns.num_sats[index] = to_float(data[6])
+                columns.hdop[index] = to_float(data[7])
+                columns.altitude[index] = to_float(data[8])
+
+            data = last.get("VTG")
+            if data and len(data) >= 5:
+                columns.course_true[index] = to_float(data[0])
+                columns.course_mag[index] = to_float(data[2])
+                columns.speed_knots[index] = to_float(data[4])
+
+            data = last.get("HDT")
+            if data:
+                columns.heading[index] = to_float(data[0])
+
+            data = last.get("RMC")
+            if data and len(data) >= 8:
+                columns.rmc_utc[index] = NmeaParser.to_seconds(data[0])
+                columns.rmc_speed_knots[index] = to_float(data[6])
+                columns.rmc_course_true[index] = to_float(data[7])
+
+            data = last.get("DBT")
+            if data and len(data) >= 3:
+                columns.depth_m[index] = to_float(data[2])
+
+        columns.speed_m_s = columns.speed_knots * KNOTS_TO_M_S
+
+        return columns
+
+    @staticmethod
+    def parse_file(ens_file_path: str) -> NmeaColumns:
+        """
+        Parse the NMEA data of all the ensembles in the file into columns.
+        The NMEA dataset is read from the raw ensemble data, so the
+        dataset objects are not created.  Ensembles without NMEA data have NaN values.
+        :param ens_file_path: Ensemble file path.
+        :return: NMEA columns with a row for each ensemble.
+        """
+        # Imported here because the Ensemble datasets use this parser
+        from rti_python.Ensemble.Ensemble import Ensemble
+        from rti_python.Utilities.read_binary_file import ReadBinaryFile
+
+        nmea_list = []
+        ens_nums = []
+
+        def ens_rcv(sender, ens):
+            nmea_str = ""
+            raw = ens.raw_dataset("NmeaData")
+            if raw is not None:
+                nmea_str = str(bytes(raw[Ensemble.GetBaseDataSize(8):]), "UTF-8", "ignore")
+            elif ens.IsNmeaData:
+                nmea_str = "\n".join(ens.NmeaData.nmea_sentences)
+            nmea_list.append(nmea_str)
+            ens_nums.append(ens.EnsembleData.EnsembleNumber if ens.IsEnsembleData else 0)
+
+        reader = ReadBinaryFile(is_lazy=True)
+        reader.ensemble_event += ens_rcv
+        reader.playback(ens_file_path)
+
+        columns = NmeaParser.parse_batch(nmea_list)
+        columns.ensemble_num[:] = ens_nums
+
+        return columns
+
+    @staticmethod
+    def to_float(value: str):
+        """
+        Convert the field to a float.
+        :param value: Field string.
+        :return: Float value or None if the field is empty or bad.
+        """
+        try:
+            return float(value)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def to_float_nan(value: str) -> float:
+        """
+        Convert the field to a float.
+        :param value: Field string.
+        :return: Float value or NaN if the field is empty or bad.
+        """
+        try:
+            return float(value)
+        except ValueError:
+            return np.nan
+
+    @staticmethod
+    def to_int(value: str):
+        """
+        Convert the field to an int.
+        :param value: Field string.
+        :return: Int value or None if the field is empty or bad.
+        """
+        try:
+            return int(value)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def to_degrees(value: str, direction: str, default=None):
+        """
+        Convert the NMEA ddmm.mmmm or dddmm.mmmm position to degrees.
+        :param value: Position field.
+        :param direction: N, S, E or W.
+        :param default: Value returned if the field is empty or bad.
+        :return: Degrees, South and West are negative.  Default if the field is empty or bad.
+        """
+        try:
+            position = float(value)
+        except ValueError:
+            return default
+
+        degrees = int(position // 100)
+        degrees += (position - degrees * 100) / 60.0
+        if direction == "S" or direction == "W":
+            return -degrees
+        return degrees
+
+    @staticmethod
+    def to_degrees_nan(value: str, direction: str) -> float:
+        """
+        Convert the NMEA position to degrees.
+        :param value: Position field.
+        :param direction: N, S, E or W.
+        :return: Degrees, South and West are negative.  NaN if the field is empty or bad.
+        """
+        degrees = NmeaParser.to_degrees(value, direction)
+        if degrees is None:
+            return np.nan
+        return degrees
+
+    @staticmethod
+    def to_time(value: str):
+        """
+        Convert the NMEA hhmmss.ss time.
+        :param value: Time field.
+        :return: UTC time or None if the field is empty or bad.
+        """
+        try:
+            microsecond = int(round(float(value[6:]) * 1e6)) if len(value) > 6 else 0
+            return datetime.time(int(value[0:2]), int(value[2:4]), int(value[4:6]), min(microsecond, 999999),
+                                 tzinfo=datetime.timezone.utc)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def to_seconds(value: str) -> float:
+        """
+        Convert the NMEA hhmmss.ss time to seconds since midnight.
+        :param value: Time field.
+        :return: Seconds or NaN if the field is empty or bad.
+        """
+        try:
+            return int(value[0:2]) * 3600.0 + int(value[2:4]) * 60.0 + float(value[4:])
+        except ValueError:
+            return np.nan
+
+    @staticmethod
+    def to_date(value: str):
+        """
+        Convert the NMEA ddmmyy date.
+        :param value: Date field.
+        :return: Date or None if the field is empty or bad.
+        """
+        try:
+            return datetime.datetime.strptime(value, "%d%m%y").date()
+        except ValueError:
+            return None
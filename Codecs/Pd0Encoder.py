@@ -0,0 +1,680 @@
+import struct
+import logging
+import numpy as np
+from rti_python.Ensemble.Ensemble import Ensemble
+
+
+class Pd0Encoder:
+    """
+    Convert RTB ensembles to PD0 ensembles.
+
+    The ensembles are converted in batches.  Ensembles with the same
+    layout (number of bins, coordinate transform and data types) are
+    stacked into 3D arrays, so the beam reordering, unit scaling and bad
+    value substitution is done with array operations for the whole batch.
+    The PD0 ensembles of a group are packed into one preallocated buffer
+    and the checksums are calculated for all the ensembles at once.
+
+    encoder = Pd0Encoder()
+    pd0_list = encoder.encode_batch(ens_list)       # List of PD0 ensembles
+    pd0_bytes = encoder.encode(ens)                 # Single PD0 ensemble
+    """
+
+    # PD0 bad values
+    BAD_VELOCITY = -32768
+    BAD_RANGE = -32768
+
+    # PD0 always has 4 beams in the profile and bottom track data types
+    # A vertical beam is given in beam 0 and the remaining beams are bad
+    NUM_BEAMS = 4
+
+    # PD0 number of cells is a single byte
+    MAX_CELLS = 255
+
+    # Coordinate Transforms, index is the value in the Fixed Leader
+    BEAM = "BEAM"
+    INST = "INST"
+    SHIP = "SHIP"
+    EARTH = "EARTH"
+    COORD_TRANSFORMS = (BEAM, INST, SHIP, EARTH)
+
+    # RTB BEAM 0,1,2,3 = PD0 BEAM 3,2,0,1
+    PD0_BEAM_ORDER = [2, 3, 1, 0]
+
+    # RTB XYZ 0,1,2,3 = PD0 XYZ 1,0,-2,3
+    PD0_XYZ_ORDER = [1, 0, 2, 3]
+    PD0_XYZ_SIGN = np.array([1, 1, -1, 1])
+
+    # System Frequencies in the Fixed Leader (kHz), index is the value in the System Configuration
+    SYSTEM_FREQS = np.array([75, 150, 300, 600, 1200, 2400])
+
+    # Data Type IDs
+    FIXED_LEADER_ID = 0x0000
+    VARIABLE_LEADER_ID = 0x0080
+    VELOCITY_ID = 0x0100
+    CORRELATION_ID = 0x0200
+    INTENSITY_ID = 0x0300
+    PERCENT_GOOD_ID = 0x0400
+    BOTTOM_TRACK_ID = 0x0600
+
+    # Header ID and Data Source ID
+    HEADER_ID = 0x7F
+
+    # ID, CPU Version, System Config, Simulated, Lag, Beams, Cells, Pings, Cell Length, Blank, Mode,
+    # Low Corr Threshold, Code Reps, PG Min, Error Vel Max, TPP, Coord Transform, Heading Alignment, Heading Bias,
+    # Sensor Source, Sensor Avail, Bin 1 Distance, Xmit Pulse Length, Ref Layer, False Target, Spare, Transmit Lag,
+    # CPU Serial, Bandwidth, Power, Base Freq Index, Serial Number, Beam Angle
+    FIXED_LEADER = struct.Struct("<H8BHHH4BH4BhhBBHH4BH8sHBB4sB")
+
+    # ID, Ensemble Number, Date and Time, Ensemble Number MSB, BIT, Speed of Sound, Depth, Heading, Pitch, Roll,
+    # Salinity, Temperature, MPT, Std Dev, ADC, Error Status, Spare, Pressure, Pressure Variance, Spare, RTC
+    VARIABLE_LEADER = struct.Struct("<HH8BHHHHhhHh6B8B4B2xIIx8B")
+
+    # ID, Pings, Delay, Corr Min, Amp Min, PG Min, Mode, Error Vel Max, Reserved
+    BOTTOM_TRACK_LEADER = struct.Struct("<HHH4BH4x")
+
+    # Location of the beam values in the Bottom Track data type
+    BT_RANGE_LSB = 16
+    BT_VEL = 24
+    BT_CORR = 32
+    BT_AMP = 36
+    BT_PGOOD = 40
+    BT_RANGE_MSB = 77
+    BOTTOM_TRACK_SIZE = 85
+
+    CHECKSUM_SIZE = 2
+
+    def __init__(self, coord_transform=None):
+        """
+        Create the encoder.
+        :param coord_transform: Coordinate transform of the PD0 velocity data.  BEAM, INST or EARTH.
+        Default is None to use Earth, then Instrument, then Beam velocity which ever is available.
+        """
+        self.coord_transform = coord_transform
+
+    def encode(self, ens):
+        """
+        Convert a single ensemble to PD0.
+        :param ens: RTB Ensemble.
+        :return: PD0 ensemble bytes or None if the ensemble could not be converted.
+        """
+        result = self.encode_batch([ens])
+        return bytes(result[0]) if result[0] is not None else None
+
+    def encode_batch(self, ens_list):
+        """
+        Convert a batch of ensembles to PD0.
+        The ensembles are grouped by layout and each group is converted with array operations.
+        :param ens_list: List of RTB ensembles.
+        :return: List of PD0 ensembles as memoryviews, in the same order as the ensembles.  None if an ensemble could not be converted.
+        """
+        result = [None] * len(ens_list)
+
+        # Group the ensembles with the same layout
+        # Layout: List of ensemble index
+        groups = {}
+        for index, ens in enumerate(ens_list):
+            layout = self.get_layout(ens)
+            if layout is None:
+                continue
+            groups.setdefault(layout, []).append(index)
+
+        for layout, indexes in groups.items():
+            try:
+                group_buff = self.encode_group(layout, [ens_list[index] for index in indexes])
+                for index, pd0_ens in zip(indexes, group_buff):
+                    result[index] = pd0_ens
+            except Exception as e:
+                logging.error("Error converting ensembles to PD0.  " + str(e))
+
+        return result
+
+    def get_layout(self, ens):
+        """
+        Get the PD0 layout of the ensemble.  Ensembles with the same layout
+        are converted together.
+        :param ens: RTB Ensemble.
+        :return: (Number of cells, Coordinate Transform, Correlation, Intensity, Percent Good, Bottom Track, Vertical Beam) or None if the ensemble can not be converted.
+        """
+        if not ens.IsEnsembleData:
+            logging.debug("PD0 requires Ensemble Data")
+            return None
+
+        xform = self.get_coord_transform(ens)
+        vel_ds = self.get_velocity_ds(ens, xform)
+
+        num_cells = 0
+        if vel_ds is not None:
+            num_cells = vel_ds.num_elements
+        if num_cells > Pd0Encoder.MAX_CELLS:
+            logging.warning("PD0 is limited to " + str(Pd0Encoder.MAX_CELLS) + " cells.  Ensemble truncated.")
+            num_cells = Pd0Encoder.MAX_CELLS
+
+        good_ds = ens.GoodEarth if xform == Pd0Encoder.EARTH else ens.GoodBeam
+
+        return (num_cells,
+                xform,
+                vel_ds is not None and ens.IsCorrelation,
+                vel_ds is not None and ens.IsAmplitude,
+                vel_ds is not None and good_ds is not None,
+                ens.IsBottomTrack,
+                vel_ds is not None and vel_ds.element_multiplier == 1)
+
+    def get_coord_transform(self, ens):
+        """
+        Get the coordinate transform for the velocity data.
+        :param ens: RTB Ensemble.
+        :return: Coordinate transform or None if no velocity data is available.
+        """
+        if self.coord_transform is not None:
+            return self.coord_transform
+
+        if ens.IsEarthVelocity:
+            return Pd0Encoder.EARTH
+        if ens.IsInstrumentVelocity:
+            return Pd0Encoder.INST
+        if ens.IsBeamVelocity:
+            return Pd0Encoder.BEAM
+
+        return None
+
+    @staticmethod
+    def get_velocity_ds(ens, xform):
+        """
+        Get the velocity dataset for the coordinate transform.
+        :param ens: RTB Ensemble.
+        :param xform: Coordinate transform.
+        :return: Velocity dataset or None if not available.
+        """
+        if xform == Pd0Encoder.EARTH and ens.IsEarthVelocity:
+            return ens.EarthVelocity
+        if xform == Pd0Encoder.INST and ens.IsInstrumentVelocity:
+            return ens.InstrumentVelocity
+        if xform == Pd0Encoder.BEAM and ens.IsBeamVelocity:
+            return ens.BeamVelocity
+
+        return None
+
+    def encode_group(self, layout, ens_list):
+        """
+        Convert the ensembles with the same layout to PD0.
+        :param layout: Layout of the ensembles.
+        :param ens_list: List of RTB ensembles.
+        :return: List of memoryviews of each PD0 ensemble in the group buffer.
+        """
+        num_cells, xform, is_corr, is_amp, is_pgood, is_bt, is_vertical = layout
+        num_ens = len(ens_list)
+        num_values = num_cells * Pd0Encoder.NUM_BEAMS
+
+        # Size of each data type
+        sizes = [Pd0Encoder.FIXED_LEADER.size, Pd0Encoder.VARIABLE_LEADER.size]
+        if num_cells > 0:
+            sizes.append(2 + num_values * 2)
+        if is_corr:
+            sizes.append(2 + num_values)
+        if is_amp:
+            sizes.append(2 + num_values)
+        if is_pgood:
+            sizes.append(2 + num_values)
+        if is_bt:
+            sizes.append(Pd0Encoder.BOTTOM_TRACK_SIZE)
+
+        # Location of each data type
+        header_size = 6 + 2 * len(sizes)
+        offsets = list(np.cumsum([header_size] + sizes[:-1]))
+        ens_size = header_size + sum(sizes) + Pd0Encoder.CHECKSUM_SIZE
+
+        # Preallocate the buffer for all the ensembles in the group
+        buff = bytearray(num_ens * ens_size)
+        buff_arr = np.frombuffer(buff, dtype=np.uint8).reshape(num_ens, ens_size)
+
+        # Header is the same for all the ensembles
+        header = struct.pack("<BBHBB{0}H".format(len(offsets)),
+                             Pd0Encoder.HEADER_ID,
+                             Pd0Encoder.HEADER_ID,
+                             ens_size - Pd0Encoder.CHECKSUM_SIZE,
+                             0,
+                             len(offsets),
+                             *offsets)
+        buff_arr[:, :header_size] = np.frombuffer(header, dtype=np.uint8)
+
+        # Leaders
+        offsets = iter(offsets)
+        fixed_offset = next(offsets)
+        variable_offset = next(offsets)
+        for index, ens in enumerate(ens_list):
+            ens_start = index * ens_size
+            self.pack_fixed_leader(buff, ens_start + fixed_offset, ens, num_cells, xform)
+            self.pack_variable_leader(buff, ens_start + variable_offset, ens)
+
+        # Profile data
+        if num_cells > 0:
+            vel = Pd0Encoder.stack_profile([self.get_velocity_ds(ens, xform).Velocities for ens in ens_list], num_cells, Ensemble.BadVelocity)
+            Pd0Encoder.pack_data_type(buff_arr, next(offsets), Pd0Encoder.VELOCITY_ID, Pd0Encoder.velocity_mm_per_sec(vel, xform, is_vertical).astype("<i2"))
+        if is_corr:
+            corr = Pd0Encoder.stack_profile([ens.Correlation.Correlation for ens in ens_list], num_cells, 0.0)
+            num_repeats = [ens.SystemSetup.WpRepeatN if ens.IsSystemSetup else 0 for ens in ens_list]
+            Pd0Encoder.pack_data_type(buff_arr, next(offsets), Pd0Encoder.CORRELATION_ID, Pd0Encoder.correlation_counts(corr, num_repeats, is_vertical=is_vertical))
+        if is_amp:
+            amp = Pd0Encoder.stack_profile([ens.Amplitude.Amplitude for ens in ens_list], num_cells, 0.0)
+            Pd0Encoder.pack_data_type(buff_arr, next(offsets), Pd0Encoder.INTENSITY_ID, Pd0Encoder.amplitude_counts(amp, is_vertical=is_vertical))
+        if is_pgood:
+            # Earth data uses Good Earth, otherwise Good Beam
+            good_xform = Pd0Encoder.EARTH if xform == Pd0Encoder.EARTH else Pd0Encoder.BEAM
+            if good_xform == Pd0Encoder.EARTH:
+                good = Pd0Encoder.stack_profile([ens.GoodEarth.GoodEarth for ens in ens_list], num_cells, 0.0)
+            else:
+                good = Pd0Encoder.stack_profile([ens.GoodBeam.GoodBeam for ens in ens_list], num_cells, 0.0)
+            pings = [ens.EnsembleData.ActualPingCount for ens in ens_list]
+            Pd0Encoder.pack_data_type(buff_arr, next(offsets), Pd0Encoder.PERCENT_GOOD_ID, Pd0Encoder.percent_good(good, pings, good_xform, is_vertical))
+
+        # Bottom Track
+        if is_bt:
+            self.pack_bottom_track(buff, buff_arr, next(offsets), ens_size, ens_list, xform)
+
+        # Checksum of all the ensembles
+        checksums = buff_arr[:, :-Pd0Encoder.CHECKSUM_SIZE].sum(axis=1, dtype=np.uint32) & 0xFFFF
+        buff_arr[:, -Pd0Encoder.CHECKSUM_SIZE:] = checksums.astype("<u2").view(np.uint8).reshape(num_ens, Pd0Encoder.CHECKSUM_SIZE)
+
+        buff_view = memoryview(buff)
+        return [buff_view[index * ens_size:(index + 1) * ens_size] for index in range(num_ens)]
+
+    @staticmethod
+    def stack_profile(arrays, num_cells, fill_value):
+        """
+        Stack the profile data of the ensembles into a 3D array.
+        Each profile is truncated to the number of cells and padded to 4 beams.
+        :param arrays: List of 2D [bin][beam] arrays.
+        :param num_cells: Number of cells.
+        :param fill_value: Value for the missing beams.
+        :return: 3D [ens][bin][beam] array.
+        """
+        result = np.full((len(arrays), num_cells, Pd0Encoder.NUM_BEAMS), fill_value, dtype=np.float64)
+        for index, arr in enumerate(arrays):
+            arr = np.asarray(arr, dtype=np.float64)
+            if arr.ndim != 2:
+                continue
+            num_beams = min(arr.shape[1], Pd0Encoder.NUM_BEAMS)
+            result[index, :min(arr.shape[0], num_cells), :num_beams] = arr[:num_cells, :num_beams]
+
+        return result
+
+    @staticmethod
+    def reorder_beams(arr, xform, is_vertical=False):
+        """
+        Reorder the beams from RTB to PD0.
+        RTB BEAM 0,1,2,3 = PD0 BEAM 3,2,0,1
+        RTB XYZ 0,1,2,3 = PD0 XYZ 1,0,2,3
+        Earth data is in the same order.
+        A vertical beam stays in beam 0.
+        :param arr: Array with the beams in the last axis.
+        :param xform: Coordinate transform.
+        :param is_vertical: Vertical beam data.
+        :return: Reordered array.
+        """
+        if is_vertical:
+            return arr
+        if xform == Pd0Encoder.BEAM:
+            return arr[..., Pd0Encoder.PD0_BEAM_ORDER]
+        if xform == Pd0Encoder.INST:
+            return arr[..., Pd0Encoder.PD0_XYZ_ORDER]
+
+        return arr
+
+    @staticmethod
+    def is_bad_velocity(vel):
+        """
+        Check for RTB bad velocity values.
+        :param vel: Numpy array of velocities.
+        :return: Boolean array, True if bad velocity.
+        """
+        return np.isnan(vel) | Ensemble.is_bad_velocity_array(vel)
+
+    @staticmethod
+    def velocity_mm_per_sec(vel, xform, is_vertical=False):
+        """
+        Convert the velocities from m/s to mm/s.
+        Bad velocities are set to the PD0 bad velocity.
+        The beams are reordered to match PD0 and the Instrument Z axis is inverted.
+        A vertical beam stays in beam 0.
+        :param vel: Numpy array of velocities in m/s.  Beams in the last axis.
+        :param xform: Coordinate transform.
+        :param is_vertical: Vertical beam data.
+        :return: Int32 array of velocities in mm/s.
+        """
+        bad = Pd0Encoder.is_bad_velocity(vel)
+        mm_per_sec = np.clip(np.rint(np.where(bad, 0.0, vel) * 1000.0), -32767, 32767)
+        if xform == Pd0Encoder.INST and not is_vertical:
+            mm_per_sec = mm_per_sec[..., Pd0Encoder.PD0_XYZ_ORDER] * Pd0Encoder.PD0_XYZ_SIGN
+            bad = bad[..., Pd0Encoder.PD0_XYZ_ORDER]
+        else:
+            mm_per_sec = Pd0Encoder.reorder_beams(mm_per_sec, xform, is_vertical)
+            bad = Pd0Encoder.reorder_beams(bad, xform, is_vertical)
+
+        return np.where(bad, Pd0Encoder.BAD_VELOCITY, mm_per_sec).astype(np.int32)
+
+    @staticmethod
+    def counts(values):
+        """
+        Round and limit the values to a PD0 count.
+        :param values: Numpy array of values.
+        :return: Uint8 array of counts.
+        """
+        return np.clip(np.rint(np.nan_to_num(values)), 0, 255).astype(np.uint8)
+
+    @staticmethod
+    def amplitude_counts(amp, xform=BEAM, is_vertical=False):
+        """
+        Convert the Amplitude to Counts.
+        0.5dB per count.
+        :param amp: Numpy array of amplitude in dB.  Beams in the last axis.
+        :param xform: Coordinate transform.  Used to reorder the beams.
+        :param is_vertical: Vertical beam data.  The beam is not reordered.
+        :return: Uint8 array of counts.
+        """
+        return Pd0Encoder.reorder_beams(Pd0Encoder.counts(amp * 2.0), xform, is_vertical)
+
+    @staticmethod
+    def correlation_counts(corr, num_repeats, xform=BEAM, is_vertical=False):
+        """
+        Convert the Correlation from percentage to counts.
+        With code repeats: counts = corr * 128 / ((repeats - 1) / repeats)
+        Otherwise 100% = 255 counts.
+        A vertical beam is always 100% = 255 counts, like Correlation.pd0_counts().
+        :param corr: Numpy array of correlation. [ens][bin][beam] or [bin][beam]
+        :param num_repeats: Number of code repeats for each ensemble or a single value.
+        :param xform: Coordinate transform.  Used to reorder the beams.
+        :param is_vertical: Vertical beam data.  The beam is not reordered.
+        :return: Uint8 array of counts.
+        """
+        if is_vertical:
+            return Pd0Encoder.counts(corr * 255.0)
+
+        num_repeats = np.asarray(num_repeats, dtype=np.float64)
+        repeats = (num_repeats - 1.0) / np.where(num_repeats == 0, 1.0, num_repeats)
+        scale = np.where(repeats > 0, 128.0 / np.where(repeats > 0, repeats, 1.0), 255.0)
+
+        # Scale for each ensemble
+        scale = scale.reshape(scale.shape + (1,) * (corr.ndim - scale.ndim))
+
+        return Pd0Encoder.reorder_beams(Pd0Encoder.counts(corr * scale), xform)
+
+    @staticmethod
+    def percent_good(good, pings, xform=BEAM, is_vertical=False):
+        """
+        Convert the number of good pings to percent good.
+        :param good: Numpy array of good ping counts. [ens][bin][beam] or [bin][beam]
+        :param pings: Number of pings for each ensemble or a single value.
+        :param xform: Coordinate transform.  Used to reorder the beams.
+        :param is_vertical: Vertical beam data.  The beam is not reordered.
+        :return: Uint8 array of percent good.
+        """
+        pings = np.asarray(pings, dtype=np.float64)
+        scale = 100.0 / np.where(pings > 0, pings, 1.0)
+
+        # Scale for each ensemble
+        scale = scale.reshape(scale.shape + (1,) * (good.ndim - scale.ndim))
+
+        return Pd0Encoder.reorder_beams(Pd0Encoder.counts(good * scale), xform, is_vertical)
+
+    @staticmethod
+    def pack_data_type(buff_arr, offset, data_type_id, values):
+        """
+        Pack the profile data type for all the ensembles in the group.
+        :param buff_arr: Uint8 [ens][byte] view of the group buffer.
+        :param offset: Location of the data type in the ensemble.
+        :param data_type_id: Data Type ID.
+        :param values: [ens][bin][beam] array with the PD0 type.
+        """
+        num_ens = buff_arr.shape[0]
+        raw = np.ascontiguousarray(values).view(np.uint8).reshape(num_ens, -1)
+        buff_arr[:, offset:offset + 2] = np.frombuffer(struct.pack("<H", data_type_id), dtype=np.uint8)
+        buff_arr[:, offset + 2:offset + 2 + raw.shape[1]] = raw
+
+    @staticmethod
+    def system_freq_index(freq_hz):
+        """
+        Get the PD0 System Frequency index nearest to the frequency.
+        :param freq_hz: System frequency in Hz.
+        :return: Index of the frequency.
+        """
+        return int(np.argmin(np.abs(Pd0Encoder.SYSTEM_FREQS - (freq_hz / 1000.0))))
+
+    @staticmethod
+    def to_byte(value):
+        """
+        Limit the value to a single unsigned byte.
+        :param value: Value.
+        :return: Integer 0 - 255.
+        """
+        return int(min(max(round(value), 0), 255))
+
+    @staticmethod
+    def to_ushort(value):
+        """
+        Limit the value to an unsigned short.
+        :param value: Value.
+        :return: Integer 0 - 65535.
+        """
+        return int(min(max(round(value), 0), 65535))
+
+    @staticmethod
+    def to_short(value):
+        """
+        Limit the value to a signed short.
+        :param value: Value.
+        :return: Integer -32768 - 32767.
+        """
+        return int(min(max(round(value), -32768), 32767))
+
+    def pack_fixed_leader(self, buff, offset, ens, num_cells, xform):
+        """
+        Pack the Fixed Leader.
+        :param buff: Group buffer.
+        :param offset: Location of the Fixed Leader in the buffer.
+        :param ens: RTB Ensemble.
+        :param num_cells: Number of cells.
+        :param xform: Coordinate transform.
+        """
+        ens_data = ens.EnsembleData
+        anc = ens.AncillaryData if ens.IsAncillaryData else None
+
+        # System Configuration
+        # LSB: Bit 7 Up facing, Bit 6 Head attached, Bit 3 Convex, Bit 2-0 Frequency
+        # MSB: Bit 7-4 Beam Config (4 Beam Janus), Bit 2-0 Beam Angle (20 degrees)
+        freq_index = 0
+        if ens.IsSystemSetup:
+            freq_index = self.system_freq_index(ens.SystemSetup.WpSystemFreqHz)
+        sys_config_lsb = freq_index | 0x08 | 0x40
+        if anc is not None and anc.is_upward_facing():
+            sys_config_lsb |= 0x80
+        sys_config_msb = (4 << 4) | 0x01
+
+        # Coordinate Transform
+        # Bit 4-3 Transform, Bit 2 Tilts Used
+        coord_xform = 0
+        if xform in Pd0Encoder.COORD_TRANSFORMS:
+            coord_xform = Pd0Encoder.COORD_TRANSFORMS.index(xform) << 3
+        if xform == Pd0Encoder.EARTH:
+            coord_xform |= 0x04
+
+        # Bin sizes in cm
+        # The RTB first bin range is the center of the first bin
+        bin_size = anc.BinSize if anc is not None else 0.0
+        first_bin = anc.FirstBinRange if anc is not None else 0.0
+        blank = max(first_bin - bin_size / 2.0, 0.0)
+
+        code_reps = ens.SystemSetup.WpRepeatN if ens.IsSystemSetup else 0
+
+        Pd0Encoder.FIXED_LEADER.pack_into(buff, offset,
+                                          Pd0Encoder.FIXED_LEADER_ID,
+                                          self.to_byte(ens_data.SysFirmwareMajor),
+                                          self.to_byte(ens_data.SysFirmwareMinor),
+                                          sys_config_lsb,
+                                          sys_config_msb,
+                                          0,                                            # Real Data
+                                          0,                                            # Lag Length
+                                          self.to_byte(ens_data.NumBeams),
+                                          num_cells,
+                                          self.to_ushort(ens_data.ActualPingCount),
+                                          self.to_ushort(bin_size * 100.0),
+                                          self.to_ushort(blank * 100.0),
+                                          1,                                            # Profiling Mode
+                                          0,                                            # Low Corr Threshold
+                                          self.to_byte(code_reps),
+                                          0,                                            # Percent Good Minimum
+                                          0,                                            # Error Velocity Maximum
+                                          0, 0, 0,                                      # Time Between Ping Groups
+                                          coord_xform,
+                                          0,                                            # Heading Alignment
+                                          0,                                            # Heading Bias
+                                          0,                                            # Sensor Source
+                                          0,                                            # Sensors Available
+                                          self.to_ushort(first_bin * 100.0),
+                                          self.to_ushort(bin_size * 100.0),             # Xmit Pulse Length
+                                          1,                                            # Ref Layer Start
+                                          5,                                            # Ref Layer End
+                                          255,                                          # False Target Threshold
+                                          0,                                            # Spare
+                                          0,                                            # Transmit Lag Distance
+                                          bytes(8),                                     # CPU Board Serial Number
+                                          0,                                            # System Bandwidth
+                                          255,                                          # System Power
+                                          0,                                            # Base Frequency Index
+                                          bytes(4),                                     # Serial Number
+                                          20)                                           # Beam Angle
+
+    def pack_variable_leader(self, buff, offset, ens):
+        """
+        Pack the Variable Leader.
+        :param buff: Group buffer.
+        :param offset: Location of the Variable Leader in the buffer.
+        :param ens: RTB Ensemble.
+        """
+        ens_data = ens.EnsembleData
+
+        heading = pitch = roll = salinity = water_temp = pressure = xdcr_depth = sos = 0.0
+        if ens.IsAncillaryData:
+            anc = ens.AncillaryData
+            heading = anc.Heading
+            pitch = anc.Pitch
+            roll = anc.Roll
+            salinity = anc.Salinity
+            water_temp = anc.WaterTemp
+            pressure = anc.Pressure
+            xdcr_depth = anc.TransducerDepth
+            sos = anc.SpeedOfSound
+
+        ens_num = int(ens_data.EnsembleNumber)
+        date_time = (self.to_byte(ens_data.Year % 100),
+                     self.to_byte(ens_data.Month),
+                     self.to_byte(ens_data.Day),
+                     self.to_byte(ens_data.Hour),
+                     self.to_byte(ens_data.Minute),
+                     self.to_byte(ens_data.Second),
+                     self.to_byte(ens_data.HSec))
+
+        Pd0Encoder.VARIABLE_LEADER.pack_into(buff, offset,
+                                             Pd0Encoder.VARIABLE_LEADER_ID,
+                                             ens_num & 0xFFFF,
+                                             *date_time,
+                                             (ens_num >> 16) & 0xFF,
+                                             0,                                         # BIT Result
+                                             self.to_ushort(sos),                       # m/s
+                                             self.to_ushort(xdcr_depth * 10.0),         # Decimeters
+                                             self.to_ushort((heading % 360.0) * 100.0), # Hundredths of a degree
+                                             self.to_short(pitch * 100.0),
+                                             self.to_short(roll * 100.0),
+                                             self.to_ushort(salinity),                  # ppt
+                                             self.to_short(water_temp * 100.0),         # Hundredths of a degree C
+                                             0, 0, 0,                                   # MPT
+                                             0, 0, 0,                                   # Heading, Pitch and Roll Std Dev
+                                             0, 0, 0, 0, 0, 0, 0, 0,                    # ADC Channels
+                                             0, 0, 0, 0,                                # Error Status Word
+                                             int(min(max(round(pressure / 10.0), 0), 0xFFFFFFFF)),   # Decapascals
+                                             0,                                         # Pressure Variance
+                                             self.to_byte(ens_data.Year // 100),
+                                             *date_time)
+
+    def pack_bottom_track(self, buff, buff_arr, offset, ens_size, ens_list, xform):
+        """
+        Pack the Bottom Track data type for all the ensembles in the group.
+        :param buff: Group buffer.
+        :param buff_arr: Uint8 [ens][byte] view of the group buffer.
+        :param offset: Location of the Bottom Track in the ensemble.
+        :param ens_size: Size of each PD0 ensemble.
+        :param ens_list: List of RTB ensembles.
+        :param xform: Coordinate transform.
+        """
+        num_ens = len(ens_list)
+
+        # Stack the beam values of all the ensembles
+        bt_list = [ens.BottomTrack for ens in ens_list]
+        bt_range = Pd0Encoder.stack_beams([bt.Range for bt in bt_list], Ensemble.BadVelocity)
+        bt_corr = Pd0Encoder.stack_beams([bt.Correlation for bt in bt_list], 0.0)
+        bt_amp = Pd0Encoder.stack_beams([bt.Amplitude for bt in bt_list], 0.0)
+        pings = [bt.ActualPingCount for bt in bt_list]
+        if xform == Pd0Encoder.EARTH:
+            bt_vel = Pd0Encoder.stack_beams([bt.EarthVelocity for bt in bt_list], Ensemble.BadVelocity)
+            bt_good = Pd0Encoder.stack_beams([bt.EarthGood for bt in bt_list], 0.0)
+        elif xform == Pd0Encoder.INST:
+            bt_vel = Pd0Encoder.stack_beams([bt.InstrumentVelocity for bt in bt_list], Ensemble.BadVelocity)
+            bt_good = Pd0Encoder.stack_beams([bt.InstrumentGood for bt in bt_list], 0.0)
+        else:
+            bt_vel = Pd0Encoder.stack_beams([bt.BeamVelocity for bt in bt_list], Ensemble.BadVelocity)
+            bt_good = Pd0Encoder.stack_beams([bt.BeamGood for bt in bt_list], 0.0)
+
+        # PD0 Bottom Track velocity has the opposite sign in all the coordinate transforms
+        bt_vel = np.where(Pd0Encoder.is_bad_velocity(bt_vel), bt_vel, bt_vel * -1.0)
+
+        # Range in cm, 24 bit value split in LSB and MSB
+        bad_range = Pd0Encoder.is_bad_velocity(bt_range)
+        range_cm = np.clip(np.rint(np.where(bad_range, 0.0, bt_range) * 100.0), 0, 0xFFFFFF).astype(np.int64)
+        range_lsb = Pd0Encoder.reorder_beams(np.where(bad_range, Pd0Encoder.BAD_RANGE & 0xFFFF, range_cm & 0xFFFF), Pd0Encoder.BEAM).astype("<u2")
+        range_msb = Pd0Encoder.reorder_beams(np.where(bad_range, 0, range_cm >> 16), Pd0Encoder.BEAM).astype(np.uint8)
+
+        # Leader
+        for index, bt in enumerate(bt_list):
+            Pd0Encoder.BOTTOM_TRACK_LEADER.pack_into(buff, index * ens_size + offset,
+                                                     Pd0Encoder.BOTTOM_TRACK_ID,
+                                                     self.to_ushort(bt.ActualPingCount),
+                                                     0,                                 # Delay before reacquire
+                                                     0,                                 # Corr Mag Min
+                                                     0,                                 # Eval Amp Min
+                                                     0,                                 # Percent Good Min
+                                                     5,                                 # Mode
+                                                     0)                                 # Error Vel Max
+
+        # Beam values
+        Pd0Encoder.pack_beams(buff_arr, offset + Pd0Encoder.BT_RANGE_LSB, range_lsb)
+        Pd0Encoder.pack_beams(buff_arr, offset + Pd0Encoder.BT_VEL, Pd0Encoder.velocity_mm_per_sec(bt_vel, xform).astype("<i2"))
+        Pd0Encoder.pack_beams(buff_arr, offset + Pd0Encoder.BT_CORR, Pd0Encoder.reorder_beams(Pd0Encoder.counts(bt_corr * 255.0), Pd0Encoder.BEAM))
+        Pd0Encoder.pack_beams(buff_arr, offset + Pd0Encoder.BT_AMP, Pd0Encoder.amplitude_counts(bt_amp))
+        Pd0Encoder.pack_beams(buff_arr, offset + Pd0Encoder.BT_PGOOD, Pd0Encoder.percent_good(bt_good, pings, xform))
+        Pd0Encoder.pack_beams(buff_arr, offset + Pd0Encoder.BT_RANGE_MSB, range_msb)
+
+    @staticmethod
+    def stack_beams(values, fill_value):
+        """
+        Stack the Bottom Track beam values of the ensembles into a 2D array padded to 4 beams.
+        :param values: List of beam value lists.
+        :param fill_value: Value for the missing beams.
+        :return: 2D [ens][beam] array.
+        """
+        result = np.full((len(values), Pd0Encoder.NUM_BEAMS), fill_value, dtype=np.float64)
+        for index, beams in enumerate(values):
+            beams = np.asarray(beams, dtype=np.float64).ravel()[:Pd0Encoder.NUM_BEAMS]
+            result[index, :len(beams)] = beams
+
+        return result
+
+    @staticmethod
+    def pack_beams(buff_arr, offset, values):
+        """
+        Pack the beam values for all the ensembles in the group.
+        :param buff_arr: Uint8 [ens][byte] view of the group buffer.
+        :param offset: Location of the values in the ensemble.
+        :param values: [ens][beam] array with the PD0 type.
+        """
+        raw = np.ascontiguousarray(values).view(np.uint8).reshape(buff_arr.shape[0], -1)
+        buff_arr[:, offset:offset + raw.shape[1]] = raw
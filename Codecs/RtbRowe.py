@@ -1,9 +1,10 @@
 import os
-import re
 import logging
 import numpy as np
 import struct
 import binascii
+from functools import reduce
+from operator import xor
 
 
 class RtbRowe(object):
@@ -689,6 +690,34 @@ class RtbRowe(object):
             logging.debug("Error creating a float from bytes. " + str(e))
             return 0.0
 
+    @staticmethod
+    def get_float_array(start: int, count: int, ens: list):
+        """
+        Convert the bytes given into a numpy array of floats with one read.
+        If the buffer does not contain all the values, the missing values are 0.0.
+        :param start: Start location.
+        :param count: Number of floats to read.
+        :param ens: Buffer containing the bytearray data.
+        :return: Numpy float array of the data in the buffer.
+        """
+        values = np.zeros(count, dtype=float)
+        try:
+            available = min(count, max(0, (len(ens) - start) // RtbRowe.BYTES_IN_FLOAT))
+            values[:available] = np.frombuffer(bytes(ens[start:start + available * RtbRowe.BYTES_IN_FLOAT]), dtype="<f4")
+        except Exception as e:
+            logging.debug("Error creating a float array from bytes. " + str(e))
+
+        return values
+
+    @staticmethod
+    def is_bad_velocity_array(vel: np.array):
+        """
+        Check if the velocities given are good or bad.
+        :param vel: Numpy array of velocity values to check.
+        :return: Boolean array, True if Bad Velocity.
+        """
+        return (vel >= RtbRowe.BAD_VEL) | np.isclose(vel, RtbRowe.BAD_VEL, rtol=1e-06, atol=0.0)
+
     @staticmethod
     def nans(num_ens: int):
         """
@@ -1728,6 +1757,13 @@ class BT:
     """
     Bottom Tracking used to measure the depth and vessel speed (Speed over Ground).
     """
+
+    NUM_VALUES = 14                             # Values before the beam values
+    NUM_BEAM_VALUES = 15                        # Number of values for each beam
+    PD0_BEAM_ORDER = [2, 3, 1, 0]               # RTB BEAM 0,1,2,3 = PD0 BEAM 3,2,0,1
+    PD0_XYZ_ORDER = [1, 0, 2, 3]                # RTB BEAM 0,1,2,3 = PD0 XYZ order 1,0,-2,3
+    PD0_XYZ_SIGN = np.array([1, 1, -1, 1])      # Invert the Z axis
+
     def __init__(self, pd0_format: bool = False):
         """
         Set the flag if using PD0 format data.
@@ -1770,426 +1806,104 @@ class BT:
         # Get the number of beams
         self.num_beams = int(RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 12, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
 
+        # Read all the values at once
+        # 14 values, then 15 values for each beam
+        values = RtbRowe.get_float_array(packet_pointer, BT.NUM_VALUES + (BT.NUM_BEAM_VALUES * self.num_beams), ens_bytes)
+
         # Get the ping count
         # Value stored in Cfg but needed for conversion to PD0
-        bt_actual_ping_count = RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 13, RtbRowe.BYTES_IN_FLOAT, ens_bytes)
+        bt_actual_ping_count = values[13]
+
+        # Each row is a value type, each column is a beam
+        beam_values = values[BT.NUM_VALUES:].reshape(BT.NUM_BEAM_VALUES, self.num_beams)
+        depth = beam_values[0]
+        snr = beam_values[1]
+        amp = beam_values[2]
+        corr = beam_values[3]
+        beam_vel = beam_values[4]
+        beam_good = beam_values[5]
+        instr_vel = beam_values[6]
+        instr_good = beam_values[7]
+        earth_vel = beam_values[8]
+        earth_good = beam_values[9]
+
+        # Check for bad velocity and convert
+        beam_vel = np.where(RtbRowe.is_bad_velocity_array(beam_vel), np.nan, beam_vel)
+        instr_vel = np.where(RtbRowe.is_bad_velocity_array(instr_vel), np.nan, instr_vel)
+        earth_vel = np.where(RtbRowe.is_bad_velocity_array(earth_vel), np.nan, earth_vel)
 
-        # Initialize the array
-        snr = np.empty(shape=[self.num_beams], dtype=np.float)
-        depth = np.empty(shape=[self.num_beams], dtype=np.float)
-        amp = np.empty(shape=[self.num_beams], dtype=np.float)
-        corr = np.empty(shape=[self.num_beams], dtype=np.float)
-        beam_vel = np.empty(shape=[self.num_beams], dtype=np.float)
-        beam_good = np.empty(shape=[self.num_beams], dtype=np.int)
-        instr_vel = np.empty(shape=[self.num_beams], dtype=np.float)
-        instr_good = np.empty(shape=[self.num_beams], dtype=np.int)
-        earth_vel = np.empty(shape=[self.num_beams], dtype=np.float)
-        earth_good = np.empty(shape=[self.num_beams], dtype=np.int)
-        pulse_coh_snr = np.empty(shape=[self.num_beams], dtype=np.float)
-        pulse_coh_amp = np.empty(shape=[self.num_beams], dtype=np.float)
-        pulse_coh_vel = np.empty(shape=[self.num_beams], dtype=np.float)
-        pulse_coh_noise = np.empty(shape=[self.num_beams], dtype=np.float)
-        pulse_coh_corr = np.empty(shape=[self.num_beams], dtype=np.float)
-
-        index = 14
-        # Range Values
-        for beam in range(self.num_beams):
-            # Get the value
-            value = RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * index, RtbRowe.BYTES_IN_FLOAT, ens_bytes)
-
-            if not self.pd0_format:
-                # Store RTB data
-                depth[beam] = value
-            else:
-                # PD0 data
-                # Check for bad velocity and convert
-                if RtbRowe.is_bad_velocity(value):
-                    value = RtbRowe.PD0_BAD_VEL
-                else:
-                    # Convert from m to cm
-                    value = round(value * 100.0)
-
-                # Reorganize beams
+        if not self.pd0_format:
+            # Store RTB data
+            beam_good = beam_good.astype(int)
+            instr_good = instr_good.astype(int)
+            earth_good = earth_good.astype(int)
+        else:
+            # PD0 data
+            # Convert from m to cm
+            depth = np.where(RtbRowe.is_bad_velocity_array(depth), RtbRowe.PD0_BAD_VEL, np.round(depth * 100.0))
+
+            # Convert from db to counts (0.5 counts per dB)
+            snr = np.minimum(np.round(snr * 2.0), RtbRowe.PD0_BAD_AMP)
+            amp = np.minimum(np.round(amp * 2.0), RtbRowe.PD0_BAD_AMP)
+
+            # Convert from percentage to 0-255 counts
+            corr = np.minimum(np.round(corr * 255.0), RtbRowe.PD0_BAD_AMP)
+
+            # Convert from m/s to mm/s
+            # Also invert the direction
+            beam_vel = np.round(beam_vel * 1000.0 * -1)
+            instr_vel = np.round(instr_vel * 1000.0 * -1)
+            earth_vel = np.round(earth_vel * 1000.0 * -1)
+
+            # Convert from number of good pings to a percentage of good pings
+            beam_good = BT.pd0_percent_good(beam_good, bt_actual_ping_count)
+            instr_good = BT.pd0_percent_good(instr_good, bt_actual_ping_count)
+            earth_good = BT.pd0_percent_good(earth_good, bt_actual_ping_count)
+
+            # Reorganize beams
+            if self.num_beams == 4:
                 # RTB BEAM 0,1,2,3 = PD0 BEAM 3,2,0,1
-                if self.num_beams == 1:
-                    depth[0] = value
-                if beam == 0:
-                    depth[3] = value
-                elif beam == 1:
-                    depth[2] = value
-                elif beam == 2:
-                    depth[0] = value
-                elif beam == 3:
-                    depth[1] = value
-
-            # Increment for the next beam
-            index += 1
-
-        # Add the data to the list
-        self.depth.append(depth)
-
-        # SNR values
-        for beam in range(self.num_beams):
-            # Get the value
-            value = RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * index, RtbRowe.BYTES_IN_FLOAT, ens_bytes)
-
-            if not self.pd0_format:
-                # Store RTB data
-                snr[beam] = value
-            else:
-                # PD0 data
-                # Convert from db to counts (0.5 counts per dB)
-                value = round(value * 2.0)
-
-                # Check for bad value
-                if value > RtbRowe.PD0_BAD_AMP:
-                    value = RtbRowe.PD0_BAD_AMP
+                depth = depth[BT.PD0_BEAM_ORDER]
+                snr = snr[BT.PD0_BEAM_ORDER]
+                amp = amp[BT.PD0_BEAM_ORDER]
+                corr = corr[BT.PD0_BEAM_ORDER]
+                beam_vel = beam_vel[BT.PD0_BEAM_ORDER]
+                beam_good = beam_good[BT.PD0_BEAM_ORDER]
 
-                # Reorganize beams
-                # RTB BEAM 0,1,2,3 = PD0 BEAM 3,2,0,1
-                if self.num_beams == 1:
-                    snr[0] = value
-                elif beam == 0:
-                    snr[3] = value
-                elif beam == 1:
-                    snr[2] = value
-                elif beam == 2:
-                    snr[0] = value
-                elif beam == 3:
-                    snr[1] = value
-
-            # Increment for the next beam
-            index += 1
+                # RTB BEAM 0,1,2,3 = PD0 XYZ order 1,0,-2,3
+                instr_vel = instr_vel[BT.PD0_XYZ_ORDER] * BT.PD0_XYZ_SIGN
+                instr_good = instr_good[BT.PD0_XYZ_ORDER]
 
         # Add the data to the list
+        self.depth.append(depth)
         self.snr.append(snr)
-
-        # Amplitude values
-        for beam in range(self.num_beams):
-            # Get the value
-            value = RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * index, RtbRowe.BYTES_IN_FLOAT, ens_bytes)
-
-            if not self.pd0_format:
-                # Store RTB data
-                amp[beam] = value
-            else:
-                # PD0 data
-                # Convert from db to counts (0.5 counts per dB)
-                value = round(value * 2.0)
-
-                # Check for bad value
-                if value > RtbRowe.PD0_BAD_AMP:
-                    value = RtbRowe.PD0_BAD_AMP
-
-                # Reorganize beams
-                # RTB BEAM 0,1,2,3 = PD0 BEAM 3,2,0,1
-                if self.num_beams == 1:
-                    amp[0] = value
-                elif beam == 0:
-                    amp[3] = value
-                elif beam == 1:
-                    amp[2] = value
-                elif beam == 2:
-                    amp[0] = value
-                elif beam == 3:
-                    amp[1] = value
-
-            # Increment for the next beam
-            index += 1
-
-        # Add the data to the list
         self.amp.append(amp)
-
-        # Correlation values
-        for beam in range(self.num_beams):
-            # Get the value
-            value = RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * index, RtbRowe.BYTES_IN_FLOAT, ens_bytes)
-
-            if not self.pd0_format:
-                # Store RTB data
-                corr[beam] = value
-            else:
-                # PD0 data
-                # Convert from percentage to 0-255 counts
-                value = round(value * 255.0)
-
-                # Check for bad value
-                if value > RtbRowe.PD0_BAD_AMP:
-                    value = RtbRowe.PD0_BAD_AMP
-
-                # Reorganize beams
-                # RTB BEAM 0,1,2,3 = PD0 BEAM 3,2,0,1
-                if self.num_beams == 1:             # Vertical beam
-                    corr[0] = value
-                elif beam == 0:                     # RTB Beam 0 - PD0 Beam 3
-                    corr[3] = value
-                elif beam == 1:                     # RTB Beam 1 - PD0 Beam 2
-                    corr[2] = value
-                elif beam == 2:                     # RTB Beam 2 - PD0 Beam 0
-                    corr[0] = value
-                elif beam == 3:                     # RTB Beam 3 - PD0 Beam 1
-                    corr[1] = value
-
-            # Increment for the next beam
-            index += 1
-
-        # Add the data to the list
         self.corr.append(corr)
-
-        # Beam Velocity values
-        for beam in range(self.num_beams):
-            # Get the value
-            value = RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * index, RtbRowe.BYTES_IN_FLOAT, ens_bytes)
-
-            # Check for bad velocity and convert
-            if RtbRowe.is_bad_velocity(value):
-                value = np.nan
-
-            if not self.pd0_format:
-                # Store RTB data
-                beam_vel[beam] = value
-            else:
-                # PD0 data
-                # Check for bad velocity and convert
-                if not np.isnan(value):
-                    # Convert from m/s to mm/s
-                    # Also invert the direction
-                    value = round(value * 1000.0 * -1)
-
-                # Reorganize beams
-                # RTB BEAM 0,1,2,3 = PD0 BEAM 3,2,0,1
-                if self.num_beams == 1:             # Vertical beam
-                    beam_vel[0] = value
-                elif beam == 0:                     # RTB Beam 0 - PD0 Beam 3
-                    beam_vel[3] = value
-                elif beam == 1:                     # RTB Beam 1 - PD0 Beam 2
-                    beam_vel[2] = value
-                elif beam == 2:                     # RTB Beam 2 - PD0 Beam 0
-                    beam_vel[0] = value
-                elif beam == 3:                     # RTB Beam 3 - PD0 Beam 1
-                    beam_vel[1] = value
-
-            # Increment for the next beam
-            index += 1
-
-        # Add the data to the list
         self.beam_vel.append(beam_vel)
-
-        # Beam Good Pings values
-        for beam in range(self.num_beams):
-            # Get the value
-            value = RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * index, RtbRowe.BYTES_IN_FLOAT, ens_bytes)
-
-            if not self.pd0_format:
-                # Store RTB data
-                beam_good[beam] = int(value)
-            else:
-                # PD0 data
-                # Check for bad velocity and convert
-                if RtbRowe.is_bad_velocity(value):
-                    value = RtbRowe.PD0_BAD_VEL
-                else:
-                    # Convert from number of good pings to a percentage of good pings
-                    value = round((value * 100.0) / bt_actual_ping_count)
-
-                # Reorganize beams
-                # RTB BEAM 0,1,2,3 = PD0 BEAM 3,2,0,1
-                if self.num_beams == 1:             # Vertical beam
-                    beam_good[0] = value
-                elif beam == 0:                     # RTB Beam 0 - PD0 Beam 3
-                    beam_good[3] = value
-                elif beam == 1:                     # RTB Beam 1 - PD0 Beam 2
-                    beam_good[2] = value
-                elif beam == 2:                     # RTB Beam 2 - PD0 Beam 0
-                    beam_good[0] = value
-                elif beam == 3:                     # RTB Beam 3 - PD0 Beam 1
-                    beam_good[1] = value
-
-            # Increment for the next beam
-            index += 1
-
-        # Add the data to the list
         self.beam_good.append(beam_good)
-
-        # Instrument Velocity values
-        for beam in range(self.num_beams):
-            # Get the value
-            value = RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * index, RtbRowe.BYTES_IN_FLOAT, ens_bytes)
-
-            # Check for bad velocity and convert
-            if RtbRowe.is_bad_velocity(value):
-                value = np.nan
-
-            if not self.pd0_format:
-                # Store RTB data
-                instr_vel[beam] = value
-            else:
-                # PD0 data
-                # Check for bad velocity and convert
-                if not np.isnan(value):
-                    # Convert from m/s to mm/s
-                    # Also invert the direction
-                    value = round(value * 1000.0 * -1)
-
-                # Reorganize beams
-                # RTB BEAM 0,1,2,3 = PD0 XYZ order 1,0,-2,3
-                if self.num_beams == 1:             # Vertical beam
-                    instr_vel[0] = value
-                elif beam == 0:                     # RTB Beam 0 - PD0 Beam 1
-                    instr_vel[1] = value
-                elif beam == 1:                     # RTB Beam 1 - PD0 Beam 0
-                    instr_vel[0] = value
-                elif beam == 2:                     # RTB Beam 2 - PD0 Beam -2
-                    instr_vel[2] = value * -1.0
-                elif beam == 3:                     # RTB Beam 3 - PD0 Beam 3
-                    instr_vel[3] = value
-
-            # Increment for the next beam
-            index += 1
-
-        # Add the data to the list
         self.instr_vel.append(instr_vel)
-
-        # Instrument Good Pings values
-        for beam in range(self.num_beams):
-            # Get the value
-            value = RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * index, RtbRowe.BYTES_IN_FLOAT, ens_bytes)
-
-            if not self.pd0_format:
-                # Store RTB data
-                instr_good[beam] = int(value)
-            else:
-                # PD0 data
-                # Check for bad velocity and convert
-                if RtbRowe.is_bad_velocity(value):
-                    value = RtbRowe.PD0_BAD_VEL
-                else:
-                    # Convert from number of good pings to a percentage of good pings
-                    value = round((value * 100.0) / bt_actual_ping_count)
-
-                # Reorganize beams
-                # RTB BEAM 0,1,2,3 = PD0 XYZ order 1,0,-2,3
-                if self.num_beams == 1:             # Vertical beam
-                    instr_good[0] = value
-                elif beam == 0:                     # RTB Beam 0 - PD0 Beam 1
-                    instr_good[1] = value
-                elif beam == 1:                     # RTB Beam 1 - PD0 Beam 0
-                    instr_good[0] = value
-                elif beam == 2:                     # RTB Beam 2 - PD0 Beam -2
-                    instr_good[2] = value
-                elif beam == 3:                     # RTB Beam 3 - PD0 Beam 3
-                    instr_good[3] = value
-
-            # Increment for the next beam
-            index += 1
-
-        # Add the data to the list
         self.instr_good.append(instr_good)
-
-        # Earth Velocity values
-        for beam in range(self.num_beams):
-            # Get the value
-            value = RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * index, RtbRowe.BYTES_IN_FLOAT, ens_bytes)
-
-            # Check for bad velocity and convert
-            if RtbRowe.is_bad_velocity(value):
-                value = np.nan
-
-            if not self.pd0_format:
-                # Store RTB data
-                earth_vel[beam] = value
-            else:
-                # PD0 data
-                # Check for bad velocity and convert
-                if not np.isnan(value):
-                    # Convert from m/s to mm/s
-                    # Also invert the direction
-                    value = round(value * 1000.0 * -1)
-
-                # Reorganize beams
-                # RTB BEAM 0,1,2,3 = PD0 BEAM 3,2,0,1
-                if self.num_beams == 1:             # Vertical beam
-                    earth_vel[0] = value
-                elif beam == 0:                     # RTB Beam 0 - PD0 Beam 0
-                    earth_vel[0] = value
-                elif beam == 1:                     # RTB Beam 1 - PD0 Beam 1
-                    earth_vel[1] = value
-                elif beam == 2:                     # RTB Beam 2 - PD0 Beam 2
-                    earth_vel[2] = value
-                elif beam == 3:                     # RTB Beam 3 - PD0 Beam 3
-                    earth_vel[3] = value
-
-            # Increment for the next beam
-            index += 1
-
-        # Add the data to the list
         self.earth_vel.append(earth_vel)
-
-        # Earth Good Pings values
-        for beam in range(self.num_beams):
-            # Get the value
-            value = RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * index, RtbRowe.BYTES_IN_FLOAT, ens_bytes)
-
-            if not self.pd0_format:
-                # Store RTB data
-                earth_good[beam] = int(value)
-            else:
-                # PD0 data
-                # Check for bad velocity and convert
-                if RtbRowe.is_bad_velocity(value):
-                    value = RtbRowe.PD0_BAD_VEL
-                else:
-                    # Convert from number of good pings to a percentage of good pings
-                    value = round((value * 100.0) / bt_actual_ping_count)
-
-                # Reorganize beams
-                # RTB BEAM 0,1,2,3 = PD0 XYZ order 0,1,2,3
-                if self.num_beams == 1:             # Vertical beam
-                    earth_good[0] = value
-                elif beam == 0:                     # RTB Beam 0 - PD0 Beam 0
-                    earth_good[0] = value
-                elif beam == 1:                     # RTB Beam 1 - PD0 Beam 1
-                    earth_good[1] = value
-                elif beam == 2:                     # RTB Beam 2 - PD0 Beam 2
-                    earth_good[2] = value
-                elif beam == 3:                     # RTB Beam 3 - PD0 Beam 3
-                    earth_good[3] = value
-
-            # Increment for the next beam
-            index += 1
-
-        # Add the data to the list
         self.earth_good.append(earth_good)
+        self.pulse_coh_snr.append(beam_values[10])
+        self.pulse_coh_amp.append(beam_values[11])
+        self.pulse_coh_vel.append(beam_values[12])
+        self.pulse_coh_noise.append(beam_values[13])
+        self.pulse_coh_corr.append(beam_values[14])
 
-        # Pulse Coherent SNR values
-        for beam in range(self.num_beams):
-            pulse_coh_snr[beam] = RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * index, RtbRowe.BYTES_IN_FLOAT, ens_bytes)
-            index += 1
-        self.pulse_coh_snr.append(pulse_coh_snr)
-
-        # Pulse Coherent Amplitude values
-        for beam in range(self.num_beams):
-            pulse_coh_amp[beam] = RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * index, RtbRowe.BYTES_IN_FLOAT, ens_bytes)
-            index += 1
-        self.pulse_coh_amp.append(pulse_coh_amp)
-
-        # Pulse Coherent Velocity values
-        for beam in range(self.num_beams):
-            pulse_coh_vel[beam] = RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * index, RtbRowe.BYTES_IN_FLOAT, ens_bytes)
-            index += 1
-        self.pulse_coh_vel.append(pulse_coh_vel)
-
-        # Pulse Coherent Noise values
-        for beam in range(self.num_beams):
-            pulse_coh_noise[beam] = RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * index, RtbRowe.BYTES_IN_FLOAT, ens_bytes)
-            index += 1
-        self.pulse_coh_noise.append(pulse_coh_noise)
+    @staticmethod
+    def pd0_percent_good(good: np.array, ping_count: float):
+        """
+        Convert the number of good pings to a percentage of good pings.
+        :param good: Numpy array of the number of good pings for each beam.
+        :param ping_count: Number of pings in the ensemble.
+        :return: Numpy int array of the percent good.  Bad values are PD0_BAD_VEL.
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            percent = np.round((good * 100.0) / ping_count)
+        percent = np.where(np.isfinite(percent), percent, 0)
 
-        # Pulse Coherent Correlation values
-        for beam in range(self.num_beams):
-            pulse_coh_corr[beam] = RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * index, RtbRowe.BYTES_IN_FLOAT, ens_bytes)
-            index += 1
-        self.pulse_coh_corr.append(pulse_coh_corr)
+        return np.where(RtbRowe.is_bad_velocity_array(good), RtbRowe.PD0_BAD_VEL, percent).astype(int)
 
     def empty_init(self, num_ens: int, num_beams: int = 4):
         """
@@ -2267,6 +1981,9 @@ class RT:
     When downward looking, values are used as an echo sounder using
     the profile ping.
     """
+
+    NUM_BEAM_VALUES = 8                         # Number of values for each beam
+
     def __init__(self, pd0_format: bool = False):
         """
         Set the flag if using PD0 format data.
@@ -2302,131 +2019,20 @@ class RT:
         # Get the number of beams
         self.num_beams = int(RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 0, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
 
-        # Initialize the array
-        snr = np.empty(shape=[self.num_beams], dtype=np.float)
-        depth = np.empty(shape=[self.num_beams], dtype=np.float)
-        pings = np.empty(shape=[self.num_beams], dtype=np.float)
-        amp = np.empty(shape=[self.num_beams], dtype=np.float)
-        corr = np.empty(shape=[self.num_beams], dtype=np.float)
-        beam_vel = np.empty(shape=[self.num_beams], dtype=np.float)
-        instr_vel = np.empty(shape=[self.num_beams], dtype=np.float)
-        earth_vel = np.empty(shape=[self.num_beams], dtype=np.float)
-
-        if self.num_beams == 4:
-            snr[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 1, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            snr[1] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 2, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            snr[2] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 3, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            snr[3] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 4, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-
-            depth[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 5, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            depth[1] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 6, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            depth[2] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 7, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            depth[3] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 8, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-
-            pings[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 9, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            pings[1] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 10, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            pings[2] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 11, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            pings[3] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 12, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-
-            amp[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 13, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            amp[1] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 14, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            amp[2] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 15, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            amp[3] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 16, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-
-            corr[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 17, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            corr[1] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 18, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            corr[2] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 19, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            corr[3] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 20, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-
-            beam_vel[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 21, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            beam_vel[1] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 22, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            beam_vel[2] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 23, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            beam_vel[3] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 24, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-
-            instr_vel[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 25, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            instr_vel[1] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 26, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            instr_vel[2] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 27, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            instr_vel[3] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 28, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-
-            earth_vel[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 29, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            earth_vel[1] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 30, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            earth_vel[2] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 31, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            earth_vel[3] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 32, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-        elif self.num_beams == 3:
-            snr[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 1, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            snr[1] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 2, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            snr[2] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 3, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-
-            depth[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 4, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            depth[1] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 5, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            depth[2] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 6, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-
-            pings[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 7, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            pings[1] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 8, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            pings[2] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 9, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-
-            amp[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 10, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            amp[1] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 11, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            amp[2] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 12, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-
-            corr[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 13, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            corr[1] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 14, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            corr[2] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 15, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-
-            beam_vel[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 16, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            beam_vel[1] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 17, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            beam_vel[2] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 18, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-
-            instr_vel[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 19, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            instr_vel[1] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 20, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            instr_vel[2] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 21, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-
-            earth_vel[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 22, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            earth_vel[1] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 23, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            earth_vel[2] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 24, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-        elif self.num_beams == 2:
-            snr[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 1, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            snr[1] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 2, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-
-            depth[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 3, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            depth[1] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 4, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-
-            pings[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 5, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            pings[1] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 6, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-
-            amp[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 7, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            amp[1] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 8, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-
-            corr[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 9, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            corr[1] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 10, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-
-            beam_vel[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 11, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            beam_vel[1] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 12, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-
-            instr_vel[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 13, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            instr_vel[1] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 14, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-
-            earth_vel[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 15, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            earth_vel[1] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 16, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-        elif self.num_beams == 1:
-            snr[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 1, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            depth[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 2, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            pings[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 3, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            amp[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 4, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            corr[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 5, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            beam_vel[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 6, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            instr_vel[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 7, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-            earth_vel[0] = (RtbRowe.get_float(packet_pointer + RtbRowe.BYTES_IN_FLOAT * 8, RtbRowe.BYTES_IN_FLOAT, ens_bytes))
-
-        # Add the data to the lis
-        self.snr.append(snr)
-        self.depth.append(depth)
-        self.pings.append(pings)
-        self.amp.append(amp)
-        self.corr.append(corr)
-        self.beam_vel.append(beam_vel)
-        self.instr_vel.append(instr_vel)
-        self.earth_vel.append(earth_vel)
+        # Read all the values at once
+        # Each row is a value type, each column is a beam
+        values = RtbRowe.get_float_array(packet_pointer + RtbRowe.BYTES_IN_FLOAT, RT.NUM_BEAM_VALUES * self.num_beams, ens_bytes)
+        beam_values = values.reshape(RT.NUM_BEAM_VALUES, self.num_beams)
+
+        # Add the data to the list
+        self.snr.append(beam_values[0])
+        self.depth.append(beam_values[1])
+        self.pings.append(beam_values[2])
+        self.amp.append(beam_values[3])
+        self.corr.append(beam_values[4])
+        self.beam_vel.append(beam_values[5])
+        self.instr_vel.append(beam_values[6])
+        self.earth_vel.append(beam_values[7])
 
 
 class Nmea:
@@ -2708,13 +2314,10 @@ class Nmea:
             checksum = int(checksum, 16)
 
             # Get the data from the string
-            nmea_data = re.sub("(\n|\r\n)", "", nmea_str[nmea_str.find("$") + 1:nmea_str.find("*")])
+            nmea_data = nmea_str[nmea_str.find("$") + 1:nmea_str.find("*")].replace("\r", "").replace("\n", "")
 
             # Calculate the checksum
-            calc_checksum = 0
-            for c in nmea_data:
-                calc_checksum ^= ord(c)
-            calc_checksum = calc_checksum & 0xFF
+            calc_checksum = reduce(xor, nmea_data.encode("ascii", "ignore"), 0)
 
             # Verify the checksum matches
             if calc_checksum == checksum:
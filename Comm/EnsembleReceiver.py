@@ -1,144 +1,463 @@
+import time
+import json
 import socket
+import struct
 import sys, getopt
-import json
-import abc
-from log import logger
-from Utilities.events import EventHandler
-from Comm.EnsembleJsonData import EnsembleJsonData
+import logging
+from collections import OrderedDict
+from rti_python.Utilities.events import EventHandler
+from rti_python.Comm.EnsembleJsonData import EnsembleJsonData
+from rti_python.Codecs.BinaryCodec import BinaryCodec
 
-import configparser
-settings = configparser.ConfigParser()
-settings._interpolation = configparser.ExtendedInterpolation()
-settings.read('settings.ini')
 
+class EnsembleFrame:
+    """
+    Length prefixed frame to send ensembles to the EnsembleReceiver.
 
-class EnsembleReceiver:
+    Each frame has a header with the type, the number of items and the
+    size of the payload, so the receiver never has to search for the end
+    of the data.
+
+    FRAME_BINARY: Payload is one or more RTB ensembles.  Each ensemble is prefixed with its length.
+    FRAME_JSON: Payload is a JSON array of datasets.  The ensembles in the frame are complete.
     """
-    Create a UDP reader class
+
+    MAGIC = b"RTIF"
+    HEADER = struct.Struct("<4sBxHI")           # Magic, Frame Type, Number of Items, Payload Size
+    LENGTH = struct.Struct("<I")                # Length of each RTB ensemble in a FRAME_BINARY payload
+    MAX_PAYLOAD = 64 * 1024 * 1024              # Larger sizes are a bad header
+
+    FRAME_BINARY = 1
+    FRAME_JSON = 2
+
+    @staticmethod
+    def encode_binary(ens_bins):
+        """
+        Create a frame with the RTB ensembles.
+        :param ens_bins: List of RTB ensemble binary data.
+        :return: Frame bytes.
+        """
+        payload = bytearray()
+        for ens_bin in ens_bins:
+            payload += EnsembleFrame.LENGTH.pack(len(ens_bin))
+            payload += ens_bin
+
+        return EnsembleFrame.HEADER.pack(EnsembleFrame.MAGIC, EnsembleFrame.FRAME_BINARY, len(ens_bins), len(payload)) + payload
+
+    @staticmethod
+    def encode_json(datasets):
+        """
+        Create a frame with the JSON datasets.  All the datasets of each
+        ensemble should be in the same frame.
+        :param datasets: List of JSON datasets.  Each is a dictionary with the EnsembleNumber, SerialNumber and Name.
+        :return: Frame bytes.
+        """
+        payload = json.dumps(datasets).encode()
+        return EnsembleFrame.HEADER.pack(EnsembleFrame.MAGIC, EnsembleFrame.FRAME_JSON, len(datasets), len(payload)) + payload
+
+    @staticmethod
+    def decode_header(data, offset=0):
+        """
+        Decode and check the frame header.
+        :param data: Frame data.
+        :param offset: Start of the header in data.
+        :return: Frame type, number of items and payload size.
+        """
+        magic, frame_type, count, size = EnsembleFrame.HEADER.unpack_from(data, offset)
+        if magic != EnsembleFrame.MAGIC:
+            raise ValueError("Not an ensemble frame")
+        if frame_type not in (EnsembleFrame.FRAME_BINARY, EnsembleFrame.FRAME_JSON):
+            raise ValueError("Unknown frame type " + str(frame_type))
+        if size > EnsembleFrame.MAX_PAYLOAD:
+            raise ValueError("Frame too large " + str(size))
+
+        return frame_type, count, size
+
+
+class EnsembleReceiverMetrics:
+    """
+    Receive metrics of the EnsembleReceiver.
     """
-    __metaclass__ = abc.ABCMeta
 
     def __init__(self):
-        #self.port = int(settings.get('SerialServerSection', 'JsonEnsUdpPort'))   # Default port
+        self.frames = 0                     # Frames and datagrams received
+        self.datasets = 0                   # JSON datasets received
+        self.ensembles = 0                  # Complete ensembles passed to the subscribers
+        self.batches = 0                    # Times the subscribers were called
+        self.missing = 0                    # Ensembles missing in the sequence of an instrument
+        self.timeouts = 0                   # JSON ensembles completed by the timeout
+        self.bad_frames = 0                 # Frames and ensembles that could not be decoded
+        self.connects = 0                   # Successful connections
+        self.link_errors = 0                # Failed connections and reads
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+class EnsembleReceiver:
+    """
+    Receive ensembles from a UDP port or a TCP server.
+
+    The data can be EnsembleFrame frames with RTB or JSON ensembles, or the
+    newline separated JSON datasets streamed by BinaryCodecUdp.  JSON datasets
+    are collected in a map keyed by the serial number and ensemble number.
+    An ensemble is complete at the end of its frame, when a later ensemble
+    from the same instrument arrives, or when the timeout expires.  So the
+    datasets of several instruments can be interleaved.
+
+    The complete ensembles are passed to the subscribers of EnsembleEvent in
+    a list.  The list is sent when it has batch_size ensembles or after
+    batch_timeout seconds.  A display can then redraw once for each batch.
+    The list contains EnsembleJsonData for the JSON data and Ensemble for the
+    RTB data.
+
+    If the connection is lost, the receiver reconnects with a backoff until
+    it is closed.
+
+    receiver = EnsembleReceiver()
+    receiver.EnsembleEvent += lambda sender, ens_list: display.update(ens_list)
+    receiver.connect_tcp("adcp-server", 55057)
+    """
+
+    def __init__(self, batch_size=10, batch_timeout=0.1, ensemble_timeout=2.0,
+                 min_backoff=0.5, max_backoff=30.0, buffer_size=65536):
+        """
+        :param batch_size: Maximum number of ensembles passed to the subscribers at once.
+        :param batch_timeout: Maximum seconds to hold a complete ensemble before passing it to the subscribers.
+        :param ensemble_timeout: Seconds to wait for the rest of the JSON datasets of an ensemble.
+        :param min_backoff: First wait in seconds before reconnecting.
+        :param max_backoff: Longest wait in seconds before reconnecting.
+        :param buffer_size: Size of the receive buffer.  Largest UDP datagram.
+        """
         self.socket = None
-        self.file_socket = None
+        self.port = None
         self.is_alive = False
-        self.adcp_data = EnsembleJsonData()
-        self.EnsembleEvent = EventHandler(self)     # Event to handle a JSON ensemble
+        self.EnsembleEvent = EventHandler(self)     # Event to handle a list of complete ensembles
+
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.ensemble_timeout = ensemble_timeout
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = min(batch_timeout, 0.1)
+        self.metrics = EnsembleReceiverMetrics()
 
-        self.prev_ens_num = 0
+        self._buffer = bytearray(buffer_size)
+        self._pending = OrderedDict()               # (Serial Number, Ensemble Number) to [EnsembleJsonData, first time]
+        self._batch = []
+        self._batch_time = 0.0
+        self._prev_ens_num = {}                     # Serial Number to the last ensemble number
 
     def connect(self, udp_port):
         """
-        Connect to the UDP port and begin reading data.
+        Receive from the UDP port until closed.
+        :param udp_port: UDP port to receive on.
         """
-        self.is_alive = True
         self.port = udp_port
-        logger.info("Ensemble Receiver: " + str(udp_port))
+        logging.info("Ensemble Receiver: " + str(udp_port))
+        self._run(self._open_udp, self._read_udp)
+
+    def connect_tcp(self, host, tcp_port):
+        """
+        Receive from the TCP server until closed.  Reconnect if the connection is lost.
+        :param host: Server address.
+        :param tcp_port: Server TCP port.
+        """
+        self.port = tcp_port
+        logging.info("Ensemble Receiver: " + host + ":" + str(tcp_port))
+        self._run(lambda: self._open_tcp(host, tcp_port), self._read_tcp)
 
-        self.reconnect(self.port)
-        self.read()
+    def close(self):
+        """
+        Stop receiving and close the socket.  The read loop stops within the poll interval.
+        """
+        self.is_alive = False
 
-    def reconnect(self, udp_port):
+    def get_metrics(self):
+        """
+        :return: Dictionary of the EnsembleReceiverMetrics.
+        """
+        return self.metrics.to_dict()
+
+    def process(self, json_data):
         """
-        Connect to the server.
+        Add a JSON dataset to its ensemble.
+        :param json_data: JSON dataset.
+        :return: JSON dataset.
+        """
+        self.metrics.datasets += 1
+        serial_number = json_data.get("SerialNumber", "")
+        ens_num = json_data["EnsembleNumber"]
+        key = (serial_number, ens_num)
+
+        item = self._pending.get(key)
+        if item is None:
+            # A later ensemble from the instrument completes the earlier ones
+            for pending_key in [k for k in self._pending if k[0] == serial_number and k[1] < ens_num]:
+                self._complete(pending_key)
+
+            adcp_data = EnsembleJsonData()
+            adcp_data.EnsembleNumber = ens_num
+            item = [adcp_data, time.monotonic()]
+            self._pending[key] = item
+
+        item[0].process(json_data)
+        return json_data
+
+    def process_frame(self, frame_type, payload):
+        """
+        Process the payload of an EnsembleFrame.
+        :param frame_type: EnsembleFrame.FRAME_BINARY or EnsembleFrame.FRAME_JSON.
+        :param payload: Frame payload.
+        """
+        self.metrics.frames += 1
+
+        if frame_type == EnsembleFrame.FRAME_JSON:
+            keys = OrderedDict()
+            for json_data in json.loads(bytes(payload)):
+                self.process(json_data)
+                keys[(json_data.get("SerialNumber", ""), json_data["EnsembleNumber"])] = True
+
+            # All the datasets of the ensembles are in the frame
+            for key in keys:
+                self._complete(key)
+            return
+
+        payload = memoryview(payload)
+        offset = 0
+        while offset + EnsembleFrame.LENGTH.size <= len(payload):
+            ens_len = EnsembleFrame.LENGTH.unpack_from(payload, offset)[0]
+            offset += EnsembleFrame.LENGTH.size
+            ens_bin = payload[offset:offset + ens_len]
+            offset += ens_len
+
+            ens = None
+            if BinaryCodec.verify_ens_data(ens_bin):
+                ens = BinaryCodec.decode_data_sets(ens_bin)
+
+            if ens is None:
+                self.metrics.bad_frames += 1
+                continue
+
+            if ens.IsEnsembleData:
+                self._check_missing(ens.EnsembleData.SerialNumber, ens.EnsembleData.EnsembleNumber)
+            self._add_to_batch(ens)
+
+    def process_datagram(self, view):
+        """
+        Process a UDP datagram.  It is an EnsembleFrame or newline separated JSON datasets.
+        :param view: Datagram data.
         """
         try:
-            self.is_alive = True
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)  # UDP
-            self.socket.settimeout(10)
-            self.socket.bind(('', udp_port))
-            self.file_socket = self.socket.makefile()   # Convert to file, to use ReadLine
-        except ConnectionRefusedError as err:
-            logger.error(err)
-            sys.exit(2)
+            if view[:4] == EnsembleFrame.MAGIC:
+                frame_type, count, size = EnsembleFrame.decode_header(view)
+                if EnsembleFrame.HEADER.size + size > len(view):
+                    raise ValueError("Incomplete frame")
+                self.process_frame(frame_type, view[EnsembleFrame.HEADER.size:EnsembleFrame.HEADER.size + size])
+                return
+
+            # Each dataset has a Newline added to the end to find the end of each dataset
+            self.metrics.frames += 1
+            for line in bytes(view).splitlines():
+                if line.strip():
+                    self.process(json.loads(line))
         except Exception as err:
-            print('Error Opening socket: ', err)
-            sys.exit(2)
+            self.metrics.bad_frames += 1
+            logging.error("Error receiving ensemble data. " + str(err))
 
-    def read(self):
+    def flush(self, now=None):
         """
-        Read data from the serial port
+        Complete the JSON ensembles waiting longer than the ensemble timeout.
+        Pass the batch to the subscribers if it is full or waiting longer than the batch timeout.
+        :param now: Current time.  Default is time.monotonic().
         """
-        while self.is_alive:
-            try:
-                # Get the JSON data
-                # Each dataset has a Newline added to the end to find the end of each dataset
-                response = self.file_socket.readline()
+        if now is None:
+            now = time.monotonic()
+
+        while self._pending:
+            key, item = next(iter(self._pending.items()))
+            if now - item[1] < self.ensemble_timeout:
+                break
+            self.metrics.timeouts += 1
+            self._complete(key)
 
-                # JSON data
-                json_response = json.loads(response)
+        if self._batch and (len(self._batch) >= self.batch_size or now - self._batch_time >= self.batch_timeout):
+            self._send_batch()
 
-                # Send the JSON data to the abstract class to process
-                # the JSON data.
-                self.process(json_response)
+    def _complete(self, key):
+        """
+        Move the JSON ensemble from the map to the batch.
+        :param key: (Serial Number, Ensemble Number)
+        """
+        item = self._pending.pop(key, None)
+        if item is None:
+            return
+
+        self._check_missing(key[0], key[1])
+        self._add_to_batch(item[0])
+
+    def _check_missing(self, serial_number, ens_num):
+        """
+        Check for missing ensembles from the instrument.
+        :param serial_number: Serial number of the instrument.
+        :param ens_num: Ensemble number.
+        """
+        prev_ens_num = self._prev_ens_num.get(serial_number, 0)
+        if prev_ens_num > 0 and ens_num > prev_ens_num + 1:
+            self.metrics.missing += ens_num - prev_ens_num - 1
+            logging.info("Missing Ens: " + str(ens_num - prev_ens_num - 1) + " prev: " + str(prev_ens_num) + " cur: " + str(ens_num))
 
-                # Check if disconnected
-                if len(response) == 0:
-                    logger.info("Disconnected")
+        if ens_num > prev_ens_num:
+            self._prev_ens_num[serial_number] = ens_num
 
-                    # Close the socket
-                    self.close()
+    def _add_to_batch(self, ens):
+        """
+        Add the complete ensemble to the batch.  Send the batch if it is full.
+        :param ens: Complete ensemble.
+        """
+        if not self._batch:
+            self._batch_time = time.monotonic()
+        self._batch.append(ens)
 
-                    # Reconnect to the server
-                    self.reconnect(self.port)
+        if len(self._batch) >= self.batch_size:
+            self._send_batch()
 
-                    # Try to read again
-                    self.read()
+    def _send_batch(self):
+        """
+        Pass the batch of ensembles to the subscribers.
+        """
+        batch = self._batch
+        self._batch = []
+        self.metrics.ensembles += len(batch)
+        self.metrics.batches += 1
+
+        try:
+            self.EnsembleEvent(batch)
+        except Exception as err:
+            logging.error("Error passing the ensembles to the subscribers. " + str(err))
+
+    def _run(self, open_func, read_func):
+        """
+        Open the socket and read until closed.  Reconnect with a backoff.
+        :param open_func: Function to open the socket.
+        :param read_func: Function to read until the connection is lost.
+        """
+        self.is_alive = True
+        backoff = self.min_backoff
+
+        while self.is_alive:
+            try:
+                self.socket = open_func()
+                self.metrics.connects += 1
+                backoff = self.min_backoff
+                read_func()
             except KeyboardInterrupt:
                 # Ctrl-C will stop the application
-                logger.info("Keyboard interrupt stopped app")
-                self.close()
-                break
+                logging.info("Keyboard interrupt stopped app")
+                self.is_alive = False
+            except (OSError, ValueError) as err:
+                self.metrics.link_errors += 1
+                logging.error("Ensemble Receiver connection lost. " + str(err))
+            finally:
+                if self.socket is not None:
+                    self.socket.close()
+                    self.socket = None
+
+            # Wait before reconnecting.  Check often to close quickly.
+            deadline = time.monotonic() + backoff
+            while self.is_alive and time.monotonic() < deadline:
+                self.flush()
+                time.sleep(min(self.poll_interval, max(deadline - time.monotonic(), 0.0)))
+            backoff = min(backoff * 2.0, self.max_backoff)
+
+        # Pass the remaining ensembles to the subscribers
+        for key in list(self._pending):
+            self._complete(key)
+        if self._batch:
+            self._send_batch()
+
+    def _open_udp(self):
+        """
+        :return: UDP socket bound to the port.
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.settimeout(self.poll_interval)
+        sock.bind(('', self.port))
+        return sock
+
+    def _open_tcp(self, host, tcp_port):
+        """
+        :return: TCP socket connected to the server.
+        """
+        sock = socket.create_connection((host, tcp_port), timeout=10.0)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.settimeout(self.poll_interval)
+        return sock
+
+    def _read_udp(self):
+        """
+        Read the datagrams into the receive buffer until closed.
+        """
+        view = memoryview(self._buffer)
+        while self.is_alive:
+            try:
+                nbytes = self.socket.recv_into(self._buffer)
             except socket.timeout:
-                # Do nothing
-                continue
-            except OSError as ex:
-                logger.error("Socket is timed out.", ex)
-                return
-            except Exception as ex:
-                logger.error("Error receiving ensemble data. ", ex)
-                print(str(ex))
-                return
+                nbytes = 0
 
-    def close(self):
+            if nbytes:
+                self.process_datagram(view[:nbytes])
+            self.flush()
+
+    def _read_tcp(self):
         """
-        Close the socket.
+        Read the frames from the TCP stream until closed or the connection is lost.
         """
-        self.is_alive = False
-        self.socket.close()
+        header = bytearray(EnsembleFrame.HEADER.size)
+        while self.is_alive:
+            if not self._recv_exact(header, first=True):
+                self.flush()
+                continue
 
-    @abc.abstractmethod
-    def process(self, json_data):
+            frame_type, count, size = EnsembleFrame.decode_header(header)
+            if size > len(self._buffer):
+                self._buffer = bytearray(size)
+            payload = memoryview(self._buffer)[:size]
+            self._recv_exact(payload)
+
+            # The whole frame was read, so the stream is still in sync
+            try:
+                self.process_frame(frame_type, payload)
+            except Exception as err:
+                self.metrics.bad_frames += 1
+                logging.error("Error receiving ensemble data. " + str(err))
+            self.flush()
+
+    def _recv_exact(self, buf, first=False):
         """
-        Process the JSON data.
-        :param json_data: JSON data.
-        """
-        # Check for a complete ensemble
-        # If the ensemble number matches, it means we are still accumulating
-        # the entire ensemble
-        if json_data["EnsembleNumber"] == self.adcp_data.EnsembleNumber:
-            # Add the JSON data to the ensemble data
-            self.adcp_data.process(json_data)
-        else:
-            # Send the completed ensemble to the event handler
-            # then create a new ensemble
-            self.EnsembleEvent(self.adcp_data)
-
-            # Create the new JSON ensemble
-            self.adcp_data = EnsembleJsonData()
-            self.adcp_data.EnsembleNumber = json_data["EnsembleNumber"]
-            self.adcp_data.process(json_data)
-
-            # Check for missing ensembles
-            if self.prev_ens_num > 0 and self.prev_ens_num + 1 != self.adcp_data.EnsembleNumber:
-                for msens in range((self.adcp_data.EnsembleNumber - 1) - self.prev_ens_num):
-                    logger.info("Missing Ens: " + str(self.prev_ens_num + msens + 1) + " prev: " + str(
-                        self.prev_ens_num) + " cur: " + str(self.adcp_data.EnsembleNumber))  # add 1 to msens because 0 based
-
-            self.prev_ens_num = self.adcp_data.EnsembleNumber
+        Read the exact number of bytes into the buffer.
+        :param buf: Buffer to fill.
+        :param first: True if a timeout before the first byte returns False.
+        :return: True if the buffer is filled.
+        """
+        view = memoryview(buf)
+        pos = 0
+        while pos < len(view):
+            try:
+                nbytes = self.socket.recv_into(view[pos:])
+            except socket.timeout:
+                if first and pos == 0:
+                    return False
+                if not self.is_alive:
+                    raise OSError("Closed while reading a frame")
+                continue
+
+            if nbytes == 0:
+                raise ConnectionError("Disconnected")
+            pos += nbytes
+
+        return True
 
-        return json_data
 
 if __name__ == '__main__':
     argv = sys.argv[1:]
@@ -155,8 +474,8 @@ if __name__ == '__main__':
         elif opt in ("-p", "--port"):
             port = int(arg)
 
-    # Read from TCP port
+    # Read from UDP port
     reader = EnsembleReceiver()
     reader.connect(port)
     reader.close()
-    logger.info("Socket Closed")
\ No newline at end of file
+    logging.info("Socket Closed")
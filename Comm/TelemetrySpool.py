@@ -0,0 +1,814 @@
+import os
+import time
+import zlib
+import bisect
+import socket
+import struct
+import logging
+import threading
+from collections import deque
+from rti_python.Ensemble.EnsembleSerializer import EnsembleSerializer
+
+
+class SpoolLog:
+    """
+    Durable append only log of records stored in segment files.
+
+    Each record is given a sequence number, starting at 1.  The records
+    are written to a segment file until the segment is full, then a new
+    segment is started.  The segment file name is the sequence number of
+    its first record.  The last acknowledged sequence number is saved in
+    the ack file.  A segment is deleted when all its records are acknowledged.
+
+    Record: Length, CRC32 and the data.  If the application stops while
+    writing a record, the incomplete record is removed when the log is opened.
+    """
+
+    # Record header: Length and CRC32 of the data
+    RECORD = struct.Struct("<II")
+
+    SEGMENT_EXT = ".spool"
+    ACK_FILE = "ack"
+
+    def __init__(self, directory: str, segment_size: int = 4 * 1024 * 1024, fsync: bool = False):
+        """
+        Open the log.  The records not acknowledged are kept.
+        :param directory: Folder for the segment files.
+        :param segment_size: Size of a segment file in bytes before a new segment is started.
+        :param fsync: Sync the files to the disk on every write.
+        """
+        self.directory = directory
+        self.segment_size = segment_size
+        self.fsync = fsync
+
+        self._lock = threading.Lock()
+        self._segments = []                         # First sequence number of each segment
+        self._write_file = None
+        self._next_seq = 1
+        self._acked = 0
+
+        # Read position to continue reading the next record
+        # (Sequence Number, Segment First Sequence Number, File Position)
+        self._cursor = None
+
+        os.makedirs(directory, exist_ok=True)
+        self._open()
+
+    def _open(self):
+        """
+        Find the segments, the last acknowledged record and the next sequence number.
+        """
+        ack_path = os.path.join(self.directory, SpoolLog.ACK_FILE)
+        if os.path.exists(ack_path):
+            try:
+                with open(ack_path, "r") as f:
+                    self._acked = int(f.read().strip() or 0)
+            except (OSError, ValueError) as e:
+                logging.error("Error reading the spool ack file.  " + str(e))
+
+        for file_name in os.listdir(self.directory):
+            if file_name.endswith(SpoolLog.SEGMENT_EXT):
+                try:
+                    self._segments.append(int(file_name[:-len(SpoolLog.SEGMENT_EXT)]))
+                except ValueError:
+                    logging.debug("Unknown file in spool: " + file_name)
+        self._segments.sort()
+
+        if not self._segments:
+            self._next_seq = self._acked + 1
+            return
+
+        # Remove an incomplete record at the end of the last segment
+        first_seq = self._segments[-1]
+        path = self._segment_path(first_seq)
+        count, end = 0, 0
+        with open(path, "rb") as f:
+            while True:
+                data = self._read_record(f)
+                if data is None:
+                    break
+                count += 1
+                end = f.tell()
+        if end != os.path.getsize(path):
+            logging.warning("Removing incomplete record at the end of " + path)
+            with open(path, "r+b") as f:
+                f.truncate(end)
+
+        self._next_seq = first_seq + count
+        if self._acked + 1 > self._next_seq:
+            # Ack is past the records, start a new segment so the sequence numbers match the files
+            self._next_seq = self._acked + 1
+        else:
+            self._write_file = open(path, "ab")
+
+    def _segment_path(self, first_seq):
+        return os.path.join(self.directory, str(first_seq).zfill(20) + SpoolLog.SEGMENT_EXT)
+
+    @staticmethod
+    def _read_record(f):
+        """
+        Read the next record from the file.
+        :param f: Segment file.
+        :return: Record data or None if there is no complete record.
+        """
+        header = f.read(SpoolLog.RECORD.size)
+        if len(header) < SpoolLog.RECORD.size:
+            return None
+
+        length, crc = SpoolLog.RECORD.unpack(header)
+        data = f.read(length)
+        if len(data) < length or zlib.crc32(data) != crc:
+            return None
+
+        return data
+
+    def append(self, data) -> int:
+        """
+        Append a record to the log.
+        :param data: Record data.
+        :return: Sequence number of the record.
+        """
+        with self._lock:
+            if self._write_file is None or self._write_file.tell() >= self.segment_size:
+                if self._write_file is not None:
+                    self._write_file.close()
+                self._segments.append(self._next_seq)
+                self._write_file = open(self._segment_path(self._next_seq), "ab")
+
+            self._write_file.write(SpoolLog.RECORD.pack(len(data), zlib.crc32(data)))
+            self._write_file.write(data)
+            self._write_file.flush()
+            if self.fsync:
+                os.fsync(self._write_file.fileno())
+
+            seq = self._next_seq
+            self._next_seq += 1
+            return seq
+
+    def read(self, seq: int, max_records: int = 100, max_bytes: int = 64 * 1024):
+        """
+        Read the records starting at the sequence number.
+        At least one record is returned if there are records, even if it is larger than max bytes.
+        :param seq: Sequence number of the first record.
+        :param max_records: Maximum number of records.
+        :param max_bytes: Maximum number of bytes of data.
+        :return: List of (Sequence Number, Data).
+        """
+        with self._lock:
+            seq = max(seq, self._acked + 1)
+            if seq >= self._next_seq or not self._segments:
+                return []
+
+            # Continue from the last read or find the segment with the record
+            if self._cursor is not None and self._cursor[0] == seq and self._cursor[1] >= self._segments[0]:
+                cur_seq, first_seq, pos = self._cursor
+            else:
+                index = bisect.bisect_right(self._segments, seq) - 1
+                if index < 0:
+                    return []
+                cur_seq, first_seq, pos = self._segments[index], self._segments[index], 0
+
+            records = []
+            size = 0
+            is_full = False
+            while cur_seq < self._next_seq and not is_full:
+                with open(self._segment_path(first_seq), "rb") as f:
+                    f.seek(pos)
+                    while cur_seq < self._next_seq:
+                        if len(records) >= max_records:
+                            is_full = True
+                            break
+                        record_pos = f.tell()
+                        data = SpoolLog._read_record(f)
+                        if data is None:
+                            break
+                        if cur_seq >= seq:
+                            if records and size + len(data) > max_bytes:
+                                f.seek(record_pos)
+                                is_full = True
+                                break
+                            records.append((cur_seq, data))
+                            size += len(data)
+                        cur_seq += 1
+                    pos = f.tell()
+
+                if is_full:
+                    break
+
+                # Next segment
+                index = bisect.bisect_right(self._segments, first_seq)
+                if index >= len(self._segments) or self._segments[index] != cur_seq:
+                    break
+                first_seq, pos = self._segments[index], 0
+
+            self._cursor = (cur_seq, first_seq, pos)
+            return records
+
+    def ack(self, seq: int):
+        """
+        Acknowledge all the records up to the sequence number.
+        The segments with only acknowledged records are deleted.
+        :param seq: Last sequence number received.
+        """
+        with self._lock:
+            seq = min(seq, self._next_seq - 1)
+            if seq <= self._acked:
+                return
+            self._acked = seq
+
+            # Write to a temp file and replace, so the ack file is never partially written
+            ack_path = os.path.join(self.directory, SpoolLog.ACK_FILE)
+            with open(ack_path + ".tmp", "w") as f:
+                f.write(str(seq))
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(ack_path + ".tmp", ack_path)
+
+            # The active segment is kept for writing
+            while len(self._segments) > 1 and self._segments[1] <= seq + 1:
+                try:
+                    os.remove(self._segment_path(self._segments[0]))
+                except OSError as e:
+                    logging.error("Error removing spool segment.  " + str(e))
+                removed = self._segments.pop(0)
+
+                # The next read finds the record in the remaining segments
+                if self._cursor is not None and self._cursor[1] == removed:
+                    self._cursor = None
+
+    @property
+    def acked(self) -> int:
+        return self._acked
+
+    @property
+    def next_seq(self) -> int:
+        return self._next_seq
+
+    @property
+    def depth(self) -> int:
+        """
+        Number of records not acknowledged.
+        """
+        return self._next_seq - 1 - self._acked
+
+    @property
+    def num_segments(self) -> int:
+        return len(self._segments)
+
+    def disk_size(self) -> int:
+        """
+        Size of all the segment files in bytes.
+        """
+        with self._lock:
+            return sum(os.path.getsize(self._segment_path(first_seq)) for first_seq in self._segments
+                       if os.path.exists(self._segment_path(first_seq)))
+
+    def close(self):
+        with self._lock:
+            if self._write_file is not None:
+                self._write_file.close()
+                self._write_file = None
+
+
+class SpoolTransport:
+    """
+    TCP link to the receiver.
+
+    Batch: Magic, Number of records and the first sequence number.
+    Then each record is the length and the data.  The records in a batch
+    have consecutive sequence numbers.
+
+    The receiver replies with an Ack: Magic and the last sequence number received.
+    """
+
+    BATCH = struct.Struct("<4sIQ")
+    BATCH_MAGIC = b"RTSB"
+    ACK = struct.Struct("<4sQ")
+    ACK_MAGIC = b"RTSA"
+    LENGTH = struct.Struct("<I")
+
+    def __init__(self, host: str, port: int, timeout: float = 10.0):
+        """
+        :param host: Receiver host.
+        :param port: Receiver TCP port.
+        :param timeout: Timeout in seconds to connect and wait for the Ack.
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.socket = None
+
+    @property
+    def is_connected(self) -> bool:
+        return self.socket is not None
+
+    def connect(self):
+        self.socket = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def close(self):
+        if self.socket is not None:
+            try:
+                self.socket.close()
+            except OSError:
+                pass
+            self.socket = None
+
+    def send_batch(self, first_seq: int, records) -> int:
+        """
+        Send the batch and wait for the Ack.
+        :param first_seq: Sequence number of the first record.
+        :param records: List of record data.
+        :return: Last sequence number the receiver acknowledged.
+        """
+        frame = bytearray(SpoolTransport.BATCH.pack(SpoolTransport.BATCH_MAGIC, len(records), first_seq))
+        for data in records:
+            frame += SpoolTransport.LENGTH.pack(len(data))
+            frame += data
+        self.socket.sendall(frame)
+
+        magic, seq = SpoolTransport.ACK.unpack(SpoolTransport.recv_exact(self.socket, SpoolTransport.ACK.size))
+        if magic != SpoolTransport.ACK_MAGIC:
+            raise ConnectionError("Bad Ack from the receiver")
+
+        return seq
+
+    @staticmethod
+    def recv_exact(sock, size):
+        """
+        Receive exactly the number of bytes.
+        :param sock: Socket.
+        :param size: Number of bytes.
+        :return: Bytes received.
+        """
+        buf = bytearray(size)
+        view = memoryview(buf)
+        received = 0
+        while received < size:
+            count = sock.recv_into(view[received:], size - received)
+            if count == 0:
+                raise ConnectionError("Connection closed")
+            received += count
+
+        return bytes(buf)
+
+
+class SpoolMetrics:
+    """
+    Send metrics of the spooler.
+    """
+
+    def __init__(self):
+        self.queued = 0                 # Records added to the spool
+        self.sent = 0                   # Records acknowledged by the receiver
+        self.sent_bytes = 0             # Bytes acknowledged by the receiver
+        self.batches = 0                # Batches acknowledged
+        self.resent = 0                 # Records sent again after the link failed
+        self.connects = 0               # Successful connections
+        self.link_errors = 0            # Failed connections and sends
+        self.stalls = 0                 # Batches the receiver did not acknowledge
+        self.throttled_time = 0.0       # Seconds waiting for the rate limit
+        self.queue_depth = 0            # Records not acknowledged
+        self.records_per_sec = 0.0      # Throughput over the last few seconds
+        self.bytes_per_sec = 0.0
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+class TelemetrySpooler:
+    """
+    Store and forward queue for sending ensembles over an unreliable link.
+
+    put() encodes the ensemble and appends it to the SpoolLog on the disk,
+    so the caller is never blocked by the link.  A background thread sends
+    the records in batches and removes them from the spool when the receiver
+    acknowledges them.  If the link fails, the thread reconnects with a
+    backoff and resends everything after the last acknowledged record.
+    If the receiver does not acknowledge a batch, the thread reconnects
+    and waits with the same backoff before sending it again.
+    Records are kept on disk while the application is stopped.
+
+    The send rate is limited with a token bucket, so the backlog after a
+    reconnect is not sent in one burst.
+
+    spooler = TelemetrySpooler(SpoolTransport("buoy-server", 55060), "/data/spool")
+    codec.ensemble_event += lambda sender, ens: spooler.put(ens)
+    """
+
+    def __init__(self,
+                 transport,
+                 directory: str,
+                 encoder=EnsembleSerializer.dumps,
+                 batch_size: int = 50,
+                 max_batch_bytes: int = 64 * 1024,
+                 rate_limit: float = None,
+                 segment_size: int = 4 * 1024 * 1024,
+                 min_backoff: float = 0.5,
+                 max_backoff: float = 30.0,
+                 fsync: bool = False,
+                 start: bool = True):
+        """
+        :param transport: Link to the receiver.  SpoolTransport or an object with the same methods.
+        :param directory: Folder for the spool files.
+        :param encoder: Function to encode the ensemble into bytes.  Default is EnsembleSerializer.dumps.
+        :param batch_size: Maximum number of records in a batch.
+        :param max_batch_bytes: Maximum size of a batch in bytes.
+        :param rate_limit: Maximum send rate in bytes per second.  None for no limit.
+        :param segment_size: Size of a spool segment file in bytes.
+        :param min_backoff: First wait in seconds before reconnecting.
+        :param max_backoff: Maximum wait in seconds before reconnecting.
+        :param fsync: Sync the spool files to the disk on every write.
+        :param start: Start the send thread.
+        """
+        self.transport = transport
+        self.encoder = encoder
+        self.batch_size = max(1, batch_size)
+        self.max_batch_bytes = max_batch_bytes
+        self.rate_limit = rate_limit
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+
+        self.spool = SpoolLog(directory, segment_size, fsync)
+        self.metrics = SpoolMetrics()
+        self.metrics.queue_depth = self.spool.depth
+
+        self._cond = threading.Condition()
+        self._stop = False
+        self._max_seq_sent = self.spool.acked
+
+        # Token bucket for the rate limit
+        self._tokens = float(max_batch_bytes)
+        self._token_time = time.monotonic()
+
+        # (Time, Records, Bytes) acknowledged to calculate the throughput
+        self._history = deque()
+
+        self._thread = None
+        if start:
+            self.start()
+
+    def start(self):
+        """
+        Start the thread to send the records.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._stop = False
+            self._thread = threading.Thread(target=self._run, name="TelemetrySpooler", daemon=True)
+            self._thread.start()
+
+    def put(self, ens) -> int:
+        """
+        Add the ensemble to the spool.
+        :param ens: Ensemble to send.
+        :return: Sequence number of the record.
+        """
+        return self.put_bytes(self.encoder(ens))
+
+    def put_bytes(self, data) -> int:
+        """
+        Add encoded data to the spool.
+        :param data: Data to send.
+        :return: Sequence number of the record.
+        """
+        seq = self.spool.append(bytes(data))
+        with self._cond:
+            self.metrics.queued += 1
+            self.metrics.queue_depth = self.spool.depth
+            self._cond.notify_all()
+
+        return seq
+
+    @property
+    def depth(self) -> int:
+        """
+        Number of records waiting to be acknowledged.
+        """
+        return self.spool.depth
+
+    def get_metrics(self):
+        """
+        Get the send metrics.
+        :return: Dictionary of the metrics.
+        """
+        with self._cond:
+            self.metrics.queue_depth = self.spool.depth
+            self._update_throughput(time.monotonic())
+            return self.metrics.to_dict()
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Wait for all the records in the spool to be acknowledged.
+        :param timeout: Maximum time to wait in seconds.  None to wait forever.
+        :return: TRUE if the spool is empty.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self.spool.depth > 0:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining if remaining is not None else 1.0)
+
+        return True
+
+    def close(self, timeout: float = 5.0):
+        """
+        Stop the send thread and close the spool.  Records not acknowledged
+        stay in the spool and are sent when the spooler is started again.
+        :param timeout: Maximum time to wait for the thread in seconds.
+        """
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+        self.transport.close()
+        self.spool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _wait(self, seconds):
+        """
+        Wait unless the spooler is stopped.
+        :return: TRUE if stopped.
+        """
+        with self._cond:
+            if not self._stop:
+                self._cond.wait(seconds)
+            return self._stop
+
+    def _run(self):
+        backoff = self.min_backoff
+        stall_backoff = self.min_backoff
+        next_seq = self.spool.acked + 1
+        while not self._stop:
+            # Connect to the receiver
+            if not self.transport.is_connected:
+                try:
+                    self.transport.connect()
+                    self.metrics.connects += 1
+                    backoff = self.min_backoff
+                    next_seq = self.spool.acked + 1
+                except OSError as e:
+                    self.metrics.link_errors += 1
+                    logging.debug("Telemetry link connect failed.  " + str(e))
+                    if self._wait(backoff):
+                        break
+                    backoff = min(backoff * 2.0, self.max_backoff)
+                    continue
+
+            try:
+                records = self.spool.read(next_seq, self.batch_size, self.max_batch_bytes)
+            except (OSError, ValueError) as e:
+                logging.error("Error reading the telemetry spool.  " + str(e))
+                if self._wait(backoff):
+                    break
+                backoff = min(backoff * 2.0, self.max_backoff)
+                continue
+
+            if not records:
+                # Wait for put() to add a record
+                with self._cond:
+                    if not self._stop and self.spool.next_seq <= next_seq:
+                        self._cond.wait(0.5)
+                continue
+
+            num_bytes = sum(len(data) for seq, data in records)
+            if self._throttle(num_bytes):
+                break
+
+            # Records sent before the link failed are sent again
+            first_seq = records[0][0]
+            last_seq = records[-1][0]
+            self.metrics.resent += max(0, min(self._max_seq_sent, last_seq) - first_seq + 1)
+            self._max_seq_sent = max(self._max_seq_sent, last_seq)
+
+            try:
+                acked = self.transport.send_batch(first_seq, [data for seq, data in records])
+            except (OSError, ValueError, struct.error) as e:
+                self.metrics.link_errors += 1
+                logging.warning("Telemetry link failed.  " + str(self.spool.depth) + " records spooled.  " + str(e))
+                self.transport.close()
+                continue
+
+            if acked < first_seq:
+                # Nothing in the batch was acknowledged.  Reconnect to start a new session with the receiver.
+                self.metrics.stalls += 1
+                logging.warning("Telemetry receiver did not acknowledge the batch.  Ack: " + str(acked) + " Batch: " + str(first_seq))
+                self.transport.close()
+                if self._wait(stall_backoff):
+                    break
+                stall_backoff = min(stall_backoff * 2.0, self.max_backoff)
+                continue
+            stall_backoff = self.min_backoff
+
+            prev_acked = self.spool.acked
+            self.spool.ack(acked)
+            next_seq = max(acked, prev_acked) + 1
+
+            now = time.monotonic()
+            with self._cond:
+                acked_records = [(seq, data) for seq, data in records if prev_acked < seq <= acked]
+                acked_bytes = sum(len(data) for seq, data in acked_records)
+                self.metrics.sent += len(acked_records)
+                self.metrics.sent_bytes += acked_bytes
+                self.metrics.batches += 1
+                self.metrics.queue_depth = self.spool.depth
+                self._history.append((now, len(acked_records), acked_bytes))
+                self._update_throughput(now)
+                self._cond.notify_all()
+
+    def _throttle(self, num_bytes):
+        """
+        Wait until the rate limit allows the bytes to be sent.
+        :param num_bytes: Number of bytes to send.
+        :return: TRUE if stopped while waiting.
+        """
+        if not self.rate_limit:
+            return False
+
+        # Allow a batch larger than the bucket after waiting for the bucket to fill
+        capacity = max(float(self.max_batch_bytes), self.rate_limit)
+        needed = min(float(num_bytes), capacity)
+        while True:
+            now = time.monotonic()
+            self._tokens = min(capacity, self._tokens + (now - self._token_time) * self.rate_limit)
+            self._token_time = now
+            if self._tokens >= needed:
+                self._tokens -= num_bytes
+                return False
+
+            wait = (needed - self._tokens) / self.rate_limit
+            self.metrics.throttled_time += wait
+            if self._wait(wait):
+                return True
+
+    def _update_throughput(self, now, window=5.0):
+        """
+        Calculate the throughput over the window.
+        :param now: Current time.
+        :param window: Time window in seconds.
+        """
+        while self._history and now - self._history[0][0] > window:
+            self._history.popleft()
+
+        if not self._history:
+            self.metrics.records_per_sec = 0.0
+            self.metrics.bytes_per_sec = 0.0
+            return
+
+        span = max(now - self._history[0][0], 1.0)
+        self.metrics.records_per_sec = sum(item[1] for item in self._history) / span
+        self.metrics.bytes_per_sec = sum(item[2] for item in self._history) / span
+
+
+class SpoolReceiver:
+    """
+    Receiver for the TelemetrySpooler.
+
+    Accepts the TCP connections, acknowledges each batch and passes each
+    record to the callback once, in order.  Records received again after
+    a reconnect are acknowledged but not passed to the callback.
+
+    The first batch of a connection can start after the last record
+    received, when the receiver was restarted or the records were
+    received by another receiver.  The receiver continues from that batch.
+
+    This can be run on the shore station, or locally to test the link.
+    drop_every closes the connection before acknowledging every Nth batch,
+    to test a flaky link.
+
+    receiver = SpoolReceiver(lambda seq, data: print(EnsembleSerializer.loads(data)))
+    receiver.start()
+    spooler = TelemetrySpooler(SpoolTransport("127.0.0.1", receiver.port), "spool")
+    """
+
+    def __init__(self, callback, host: str = "127.0.0.1", port: int = 0, drop_every: int = 0):
+        """
+        :param callback: Function called with (Sequence Number, Data) for each record.
+        :param host: Host to listen on.
+        :param port: Port to listen on.  0 to use any free port.
+        :param drop_every: Close the connection before acknowledging every Nth batch.  0 to never drop.
+        """
+        self.callback = callback
+        self.drop_every = drop_every
+        self.last_seq = 0                   # Last sequence number passed to the callback
+        self.batches = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.resyncs = 0                    # Connections started after the last sequence number
+
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((host, port))
+        self.server.listen(5)
+        self.port = self.server.getsockname()[1]
+
+        self._lock = threading.Lock()
+        self._is_alive = False
+        self._thread = None
+        self._conns = set()                 # Open connections
+
+    def start(self):
+        self._is_alive = True
+        self._thread = threading.Thread(target=self._accept, name="SpoolReceiver", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._is_alive = False
+        try:
+            self.server.close()
+        except OSError:
+            pass
+
+        # Drop the open connections, like a receiver that is stopped
+        with self._lock:
+            conns = list(self._conns)
+        for conn in conns:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+        if self._thread is not None:
+            self._thread.join(2.0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _accept(self):
+        while self._is_alive:
+            try:
+                conn, addr = self.server.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        is_first_batch = True
+        with self._lock:
+            self._conns.add(conn)
+        try:
+            with conn:
+                while self._is_alive:
+                    try:
+                        header = SpoolTransport.recv_exact(conn, SpoolTransport.BATCH.size)
+                    except ConnectionError:
+                        return
+
+                    magic, count, first_seq = SpoolTransport.BATCH.unpack(header)
+                    if magic != SpoolTransport.BATCH_MAGIC:
+                        logging.error("Bad telemetry batch")
+                        return
+
+                    records = []
+                    for index in range(count):
+                        length = SpoolTransport.LENGTH.unpack(SpoolTransport.recv_exact(conn, SpoolTransport.LENGTH.size))[0]
+                        records.append((first_seq + index, SpoolTransport.recv_exact(conn, length)))
+
+                    with self._lock:
+                        self.batches += 1
+                        if self.drop_every > 0 and self.batches % self.drop_every == 0:
+                            self.dropped += 1
+                            return
+
+                        # New session.  The sender has the records before the batch acknowledged.
+                        if is_first_batch and count > 0 and first_seq > self.last_seq + 1:
+                            logging.info("Telemetry receiver starting at " + str(first_seq) + ".  Last received: " + str(self.last_seq))
+                            self.resyncs += 1
+                            self.last_seq = first_seq - 1
+                        is_first_batch = False
+
+                        for seq, data in records:
+                            if seq <= self.last_seq:
+                                self.duplicates += 1
+                                continue
+                            if seq != self.last_seq + 1:
+                                # Records are missing, wait for the sender to resend them
+                                break
+                            try:
+                                self.callback(seq, data)
+                            except Exception as e:
+                                logging.error("Error processing telemetry record.  " + str(e))
+                            self.last_seq = seq
+
+                        acked = self.last_seq
+
+                    conn.sendall(SpoolTransport.ACK.pack(SpoolTransport.ACK_MAGIC, acked))
+        except OSError as e:
+            logging.debug("Telemetry receiver connection closed.  " + str(e))
+        finally:
+            with self._lock:
+                self._conns.discard(conn)
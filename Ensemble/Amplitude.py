@@ -1,5 +1,8 @@
 from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Ensemble.DatasetRegistry import DatasetRegistry
+from rti_python.Ensemble.ProfileArray import ProfileArrayProperty
 import logging
+import numpy as np
 
 
 class Amplitude:
@@ -8,6 +11,10 @@ class Amplitude:
     [Bin x Beam] data.
     """
 
+    __slots__ = ("ds_type", "num_elements", "element_multiplier", "image", "name_len", "Name", "_Amplitude")
+
+    Amplitude = ProfileArrayProperty(np.float32)
+
     def __init__(self, num_elements, element_multiplier):
         self.ds_type = 10
         self.num_elements = num_elements
@@ -15,20 +22,9 @@ class Amplitude:
         self.image = 0
         self.name_len = 8
         self.Name = "E000004\0"
-        self.Amplitude = []
-
-        #self.EnsembleNumber = ensemble_number
-        #self.SerialNumber = serial_number
-        #self.DateTime = date_time
-
         # Create enough entries for all the (bins x beams)
         # Initialize with bad values
-        for bins in range(num_elements):
-            bins = []
-            for beams in range(element_multiplier):
-                bins.append([Ensemble().BadVelocity])
-
-            self.Amplitude.append(bins)
+        self.Amplitude = np.full((num_elements, element_multiplier), Ensemble.BadVelocity)
 
     def decode(self, data):
         """
@@ -38,10 +34,7 @@ class Amplitude:
         """
         packet_pointer = Ensemble.GetBaseDataSize(self.name_len)
 
-        for beam in range(self.element_multiplier):
-            for bin_num in range(self.num_elements):
-                self.Amplitude[bin_num][beam] = Ensemble.GetFloat(packet_pointer, Ensemble().BytesInFloat, data)
-                packet_pointer += Ensemble().BytesInFloat
+        self.Amplitude = Ensemble.GetFloatArray(packet_pointer, self.num_elements, self.element_multiplier, data)
 
         logging.debug(self.Amplitude)
 
@@ -61,10 +54,7 @@ class Amplitude:
                                            self.Name)
 
         # Add the data
-        for beam in range(self.element_multiplier):
-            for bin_num in range(self.num_elements):
-                val = self.Amplitude[bin_num][beam]
-                result += Ensemble.float_to_bytes(val)
+        result += Ensemble.float_array_to_bytes(self.Amplitude)
 
         return result
 
@@ -151,3 +141,6 @@ class Amplitude:
             return [round(v * 2.0) for v in beam0]              # Convert to counts
 
         return None
+
+
+DatasetRegistry.register("E000004", "Amplitude", Amplitude)
@@ -1,4 +1,5 @@
 from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Ensemble.DatasetRegistry import DatasetRegistry, DatasetSchema
 import logging
 from pandas import DataFrame
 
@@ -9,6 +10,33 @@ class AncillaryData:
     Float values that give details about the ensemble.
     """
 
+    __slots__ = ("ds_type", "num_elements", "element_multiplier", "image", "name_len", "Name",
+                 "FirstBinRange", "BinSize", "FirstPingTime", "LastPingTime", "Heading", "Pitch", "Roll",
+                 "WaterTemp", "SystemTemp", "Salinity", "Pressure", "TransducerDepth", "SpeedOfSound",
+                 "RawMagFieldStrength", "RawMagFieldStrength2", "RawMagFieldStrength3", "PitchGravityVector",
+                 "RollGravityVector", "VerticalGravityVector")
+
+    # Layout of the data after the dataset header.  Newer firmware added the later groups.
+    SCHEMA = DatasetSchema([("FirstBinRange", "f"),
+                            ("BinSize", "f"),
+                            ("FirstPingTime", "f"),
+                            ("LastPingTime", "f"),
+                            ("Heading", "f"),
+                            ("Pitch", "f"),
+                            ("Roll", "f"),
+                            ("WaterTemp", "f"),
+                            ("SystemTemp", "f"),
+                            ("Salinity", "f"),
+                            ("Pressure", "f"),
+                            ("TransducerDepth", "f"),
+                            ("SpeedOfSound", "f")],
+                           [("RawMagFieldStrength", "f"),
+                            ("RawMagFieldStrength2", "f"),
+                            ("RawMagFieldStrength3", "f"),
+                            ("PitchGravityVector", "f"),
+                            ("RollGravityVector", "f"),
+                            ("VerticalGravityVector", "f")])
+
     def __init__(self, num_elements=19, element_multiplier=1):
         self.ds_type = 10                   # Float
         self.num_elements = num_elements
@@ -43,29 +71,7 @@ class AncillaryData:
         the values.
         :param data: Bytearray for the dataset.
         """
-        packet_pointer = Ensemble.GetBaseDataSize(self.name_len)
-
-        self.FirstBinRange = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 0, Ensemble().BytesInFloat, data)
-        self.BinSize = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 1, Ensemble().BytesInFloat, data)
-        self.FirstPingTime = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 2, Ensemble().BytesInFloat, data)
-        self.LastPingTime = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 3, Ensemble().BytesInFloat, data)
-        self.Heading = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 4, Ensemble().BytesInFloat, data)
-        self.Pitch = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 5, Ensemble().BytesInFloat, data)
-        self.Roll = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 6, Ensemble().BytesInFloat, data)
-        self.WaterTemp = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 7, Ensemble().BytesInFloat, data)
-        self.SystemTemp = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 8, Ensemble().BytesInFloat, data)
-        self.Salinity = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 9, Ensemble().BytesInFloat, data)
-        self.Pressure = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 10, Ensemble().BytesInFloat, data)
-        self.TransducerDepth = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 11, Ensemble().BytesInFloat, data)
-        self.SpeedOfSound = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 12, Ensemble().BytesInFloat, data)
-
-        if self.num_elements > 13:
-            self.RawMagFieldStrength = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 13, Ensemble().BytesInFloat, data)
-            self.RawMagFieldStrength2 = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 14, Ensemble().BytesInFloat, data)
-            self.RawMagFieldStrength3 = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 15, Ensemble().BytesInFloat, data)
-            self.PitchGravityVector = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 16, Ensemble().BytesInFloat, data)
-            self.RollGravityVector = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 17, Ensemble().BytesInFloat, data)
-            self.VerticalGravityVector = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 18, Ensemble().BytesInFloat, data)
+        AncillaryData.SCHEMA.decode(self, data, self.num_elements, Ensemble.GetBaseDataSize(self.name_len))
 
         logging.debug(self.FirstBinRange)
         logging.debug(self.BinSize)
@@ -91,25 +97,7 @@ class AncillaryData:
                                            self.Name)
 
         # Add the data
-        result += Ensemble.float_to_bytes(self.FirstBinRange)
-        result += Ensemble.float_to_bytes(self.BinSize)
-        result += Ensemble.float_to_bytes(self.FirstPingTime)
-        result += Ensemble.float_to_bytes(self.LastPingTime)
-        result += Ensemble.float_to_bytes(self.Heading)
-        result += Ensemble.float_to_bytes(self.Pitch)
-        result += Ensemble.float_to_bytes(self.Roll)
-        result += Ensemble.float_to_bytes(self.WaterTemp)
-        result += Ensemble.float_to_bytes(self.SystemTemp)
-        result += Ensemble.float_to_bytes(self.Salinity)
-        result += Ensemble.float_to_bytes(self.Pressure)
-        result += Ensemble.float_to_bytes(self.TransducerDepth)
-        result += Ensemble.float_to_bytes(self.SpeedOfSound)
-        result += Ensemble.float_to_bytes(self.RawMagFieldStrength)
-        result += Ensemble.float_to_bytes(self.RawMagFieldStrength2)
-        result += Ensemble.float_to_bytes(self.RawMagFieldStrength3)
-        result += Ensemble.float_to_bytes(self.PitchGravityVector)
-        result += Ensemble.float_to_bytes(self.RollGravityVector)
-        result += Ensemble.float_to_bytes(self.VerticalGravityVector)
+        result += AncillaryData.SCHEMA.encode(self)
 
         return result
 
@@ -184,3 +172,5 @@ class AncillaryData:
 
         return False
 
+
+DatasetRegistry.register("E000009", "AncillaryData", AncillaryData)
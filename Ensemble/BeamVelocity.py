@@ -1,5 +1,8 @@
 from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Ensemble.DatasetRegistry import DatasetRegistry
+from rti_python.Ensemble.ProfileArray import ProfileArrayProperty
 import logging
+import numpy as np
 
 
 class BeamVelocity:
@@ -8,6 +11,10 @@ class BeamVelocity:
     [Bin x Beam] data.
     """
 
+    __slots__ = ("ds_type", "num_elements", "element_multiplier", "image", "name_len", "Name", "_Velocities")
+
+    Velocities = ProfileArrayProperty(np.float32)
+
     def __init__(self, num_elements, element_multiplier):
         """
         Beam Velocity data.
@@ -20,15 +27,9 @@ class BeamVelocity:
         self.image = 0
         self.name_len = 8
         self.Name = "E000001\0"
-        self.Velocities = []
         # Create enough entries for all the (bins x beams)
         # Initialize with bad values
-        for bins in range(num_elements):
-            bins = []
-            for beams in range(element_multiplier):
-                bins.append([Ensemble().BadVelocity])
-
-            self.Velocities.append(bins)
+        self.Velocities = np.full((num_elements, element_multiplier), Ensemble.BadVelocity)
 
     def decode(self, data):
         """
@@ -38,10 +39,7 @@ class BeamVelocity:
         """
         packet_pointer = Ensemble.GetBaseDataSize(self.name_len)
 
-        for beam in range(self.element_multiplier):
-            for bin_num in range(self.num_elements):
-                self.Velocities[bin_num][beam] = Ensemble.GetFloat(packet_pointer, Ensemble().BytesInFloat, data)
-                packet_pointer += Ensemble().BytesInFloat
+        self.Velocities = Ensemble.GetFloatArray(packet_pointer, self.num_elements, self.element_multiplier, data)
 
         logging.debug(self.Velocities)
 
@@ -61,10 +59,7 @@ class BeamVelocity:
                                            self.Name)
 
         # Add the data
-        for beam in range(self.element_multiplier):
-            for bin_num in range(self.num_elements):
-                val = self.Velocities[bin_num][beam]
-                result += Ensemble.float_to_bytes(val)
+        result += Ensemble.float_array_to_bytes(self.Velocities)
 
         return result
 
@@ -128,3 +123,5 @@ class BeamVelocity:
 
         return pd0_vel_data
 
+
+DatasetRegistry.register("E000001", "BeamVelocity", BeamVelocity)
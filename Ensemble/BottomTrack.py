@@ -1,4 +1,5 @@
 from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Ensemble.DatasetRegistry import DatasetRegistry, DatasetSchema
 import logging
 from pandas import DataFrame
 
@@ -11,6 +12,37 @@ class BottomTrack:
 
     """
 
+    __slots__ = ("ds_type", "num_elements", "element_multiplier", "image", "name_len", "Name",
+                 "FirstPingTime", "LastPingTime", "Heading", "Pitch", "Roll", "WaterTemp", "SystemTemp",
+                 "Salinity", "Pressure", "TransducerDepth", "SpeedOfSound", "Status", "NumBeams",
+                 "ActualPingCount", "Range", "SNR", "Amplitude", "Correlation", "BeamVelocity", "BeamGood",
+                 "InstrumentVelocity", "InstrumentGood", "EarthVelocity", "EarthGood", "SNR_PulseCoherent",
+                 "Amp_PulseCoherent", "Vel_PulseCoherent", "Noise_PulseCoherent", "Corr_PulseCoherent")
+
+    # Layout of the values after the dataset header
+    SCHEMA = DatasetSchema([("FirstPingTime", "f"),
+                            ("LastPingTime", "f"),
+                            ("Heading", "f"),
+                            ("Pitch", "f"),
+                            ("Roll", "f"),
+                            ("WaterTemp", "f"),
+                            ("SystemTemp", "f"),
+                            ("Salinity", "f"),
+                            ("Pressure", "f"),
+                            ("TransducerDepth", "f"),
+                            ("SpeedOfSound", "f"),
+                            ("Status", "f"),
+                            ("NumBeams", "f"),
+                            ("ActualPingCount", "f")])
+
+    # Per beam values after the SCHEMA values.  Each value is a list with a value for each beam.
+    BEAM_FIELDS = ["Range", "SNR", "Amplitude", "Correlation", "BeamVelocity", "BeamGood",
+                   "InstrumentVelocity", "InstrumentGood", "EarthVelocity", "EarthGood"]
+
+    # Per beam values added in newer firmware
+    PULSE_COHERENT_FIELDS = ["SNR_PulseCoherent", "Amp_PulseCoherent", "Vel_PulseCoherent",
+                             "Noise_PulseCoherent", "Corr_PulseCoherent"]
+
     def __init__(self, num_elements=74, element_multiplier=1):
         """
         Initialize the object
@@ -74,101 +106,17 @@ class BottomTrack:
         the velocities.
         :param data: Bytearray for the dataset.
         """
-        packet_pointer = Ensemble.GetBaseDataSize(self.name_len)
-
-        self.FirstPingTime = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 0, Ensemble().BytesInFloat, data)
-        self.LastPingTime = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 1, Ensemble().BytesInFloat, data)
-        self.Heading = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 2, Ensemble().BytesInFloat, data)
-        self.Pitch = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 3, Ensemble().BytesInFloat, data)
-        self.Roll = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 4, Ensemble().BytesInFloat, data)
-        self.WaterTemp = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 5, Ensemble().BytesInFloat, data)
-        self.SystemTemp = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 6, Ensemble().BytesInFloat, data)
-        self.Salinity = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 7, Ensemble().BytesInFloat, data)
-        self.Pressure = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 8, Ensemble().BytesInFloat, data)
-        self.TransducerDepth = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 9, Ensemble().BytesInFloat, data)
-        self.SpeedOfSound = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 10, Ensemble().BytesInFloat, data)
-        self.Status = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 11, Ensemble().BytesInFloat, data)
-        self.NumBeams = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 12, Ensemble().BytesInFloat, data)
-        self.ActualPingCount = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 13, Ensemble().BytesInFloat, data)
-
-        index = 14
-        numBeam = int(self.NumBeams)
-        for beams in range(numBeam):
-            self.Range.append(Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * index, Ensemble().BytesInFloat, data))
-            index += 1
-
-        for beams in range(numBeam):
-            self.SNR.append(Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * index, Ensemble().BytesInFloat, data))
-            index += 1
-
-        for beams in range(numBeam):
-            self.Amplitude.append(Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * index, Ensemble().BytesInFloat, data))
-            index += 1
-
-        for beams in range(numBeam):
-            self.Correlation.append(Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * index, Ensemble().BytesInFloat, data))
-            index += 1
-
-        for beams in range(numBeam):
-            self.BeamVelocity.append(Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * index, Ensemble().BytesInFloat, data))
-            index += 1
-
-        for beams in range(numBeam):
-            self.BeamGood.append(Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * index, Ensemble().BytesInFloat, data))
-            index += 1
-
-        for beams in range(numBeam):
-            self.InstrumentVelocity.append(Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * index, Ensemble().BytesInFloat, data))
-            index += 1
-
-        for beams in range(numBeam):
-            self.InstrumentGood.append(Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * index, Ensemble().BytesInFloat, data))
-            index += 1
-
-        for beams in range(numBeam):
-            self.EarthVelocity.append(Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * index, Ensemble().BytesInFloat, data))
-            index += 1
-
-        for beams in range(numBeam):
-            self.EarthGood.append(Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * index, Ensemble().BytesInFloat, data))
-            index += 1
-
-        if self.num_elements > 54:
-            for beams in range(numBeam):
-                self.SNR_PulseCoherent.append(Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * index, Ensemble().BytesInFloat, data))
-                index += 1
-
-            for beams in range(numBeam):
-                self.Amp_PulseCoherent.append(Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * index, Ensemble().BytesInFloat, data))
-                index += 1
+        packet_pointer = BottomTrack.SCHEMA.decode(self, data, offset=Ensemble.GetBaseDataSize(self.name_len))
+        num_beams = int(self.NumBeams)
 
-            for beams in range(numBeam):
-                self.Vel_PulseCoherent.append(Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * index, Ensemble().BytesInFloat, data))
-                index += 1
+        packet_pointer = DatasetSchema.decode_beams(self, data, packet_pointer, BottomTrack.BEAM_FIELDS, num_beams)
 
-            for beams in range(numBeam):
-                self.Noise_PulseCoherent.append(Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * index, Ensemble().BytesInFloat, data))
-                index += 1
-
-            for beams in range(numBeam):
-                self.Corr_PulseCoherent.append(Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * index, Ensemble().BytesInFloat, data))
-                index += 1
+        if self.num_elements > 54:
+            DatasetSchema.decode_beams(self, data, packet_pointer, BottomTrack.PULSE_COHERENT_FIELDS, num_beams)
         else:
             # Fill in with 0.0
-            for beams in range(numBeam):
-                self.SNR_PulseCoherent.append(0.0)
-
-            for beams in range(numBeam):
-                self.Amp_PulseCoherent.append(0.0)
-
-            for beams in range(numBeam):
-                self.Vel_PulseCoherent.append(0.0)
-
-            for beams in range(numBeam):
-                self.Noise_PulseCoherent.append(0.0)
-
-            for beams in range(numBeam):
-                self.Corr_PulseCoherent.append(0.0)
+            for name in BottomTrack.PULSE_COHERENT_FIELDS:
+                setattr(self, name, [0.0] * num_beams)
 
         logging.debug(self.FirstPingTime)
         logging.debug(self.LastPingTime)
@@ -303,65 +251,8 @@ class BottomTrack:
                                            self.Name)
 
         # Add the data
-        result += Ensemble.float_to_bytes(self.FirstPingTime)
-        result += Ensemble.float_to_bytes(self.LastPingTime)
-        result += Ensemble.float_to_bytes(self.Heading)
-        result += Ensemble.float_to_bytes(self.Pitch)
-        result += Ensemble.float_to_bytes(self.Roll)
-        result += Ensemble.float_to_bytes(self.WaterTemp)
-        result += Ensemble.float_to_bytes(self.SystemTemp)
-        result += Ensemble.float_to_bytes(self.Salinity)
-        result += Ensemble.float_to_bytes(self.Pressure)
-        result += Ensemble.float_to_bytes(self.TransducerDepth)
-        result += Ensemble.float_to_bytes(self.SpeedOfSound)
-        result += Ensemble.float_to_bytes(self.Status)
-        result += Ensemble.float_to_bytes(self.NumBeams)
-        result += Ensemble.float_to_bytes(self.ActualPingCount)
-
-        for beam in range(len(self.Range)):
-            result += Ensemble.float_to_bytes(self.Range[beam])
-
-        for beam in range(len(self.SNR)):
-            result += Ensemble.float_to_bytes(self.SNR[beam])
-
-        for beam in range(len(self.Amplitude)):
-            result += Ensemble.float_to_bytes(self.Amplitude[beam])
-
-        for beam in range(len(self.Correlation)):
-            result += Ensemble.float_to_bytes(self.Correlation[beam])
-
-        for beam in range(len(self.BeamVelocity)):
-            result += Ensemble.float_to_bytes(self.BeamVelocity[beam])
-
-        for beam in range(len(self.BeamGood)):
-            result += Ensemble.float_to_bytes(self.BeamGood[beam])
-
-        for beam in range(len(self.InstrumentVelocity)):
-            result += Ensemble.float_to_bytes(self.InstrumentVelocity[beam])
-
-        for beam in range(len(self.InstrumentGood)):
-            result += Ensemble.float_to_bytes(self.InstrumentGood[beam])
-
-        for beam in range(len(self.EarthVelocity)):
-            result += Ensemble.float_to_bytes(self.EarthVelocity[beam])
-
-        for beam in range(len(self.EarthGood)):
-            result += Ensemble.float_to_bytes(self.EarthGood[beam])
-
-        for beam in range(len(self.SNR_PulseCoherent)):
-            result += Ensemble.float_to_bytes(self.SNR_PulseCoherent[beam])
-
-        for beam in range(len(self.Amp_PulseCoherent)):
-            result += Ensemble.float_to_bytes(self.Amp_PulseCoherent[beam])
-
-        for beam in range(len(self.Vel_PulseCoherent)):
-            result += Ensemble.float_to_bytes(self.Vel_PulseCoherent[beam])
-
-        for beam in range(len(self.Noise_PulseCoherent)):
-            result += Ensemble.float_to_bytes(self.Vel_PulseCoherent[beam])
-
-        for beam in range(len(self.Corr_PulseCoherent)):
-            result += Ensemble.float_to_bytes(self.Vel_PulseCoherent[beam])
+        result += BottomTrack.SCHEMA.encode(self)
+        result += DatasetSchema.encode_beams(self, BottomTrack.BEAM_FIELDS + BottomTrack.PULSE_COHERENT_FIELDS)
 
         return result
 
@@ -594,3 +485,6 @@ class BottomTrack:
             return round((self.BeamGood[0] * 100.0) / self.ActualPingCount)       # Convert to counts - PD0 3 - RTB 0
 
         return None
+
+
+DatasetRegistry.register("E000010", "BottomTrack", BottomTrack)
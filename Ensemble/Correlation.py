@@ -1,5 +1,8 @@
 from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Ensemble.DatasetRegistry import DatasetRegistry
+from rti_python.Ensemble.ProfileArray import ProfileArrayProperty
 import logging
+import numpy as np
 import pandas as pd
 
 
@@ -9,6 +12,10 @@ class Correlation:
     [Bin x Beam] data.
     """
 
+    __slots__ = ("ds_type", "num_elements", "element_multiplier", "image", "name_len", "Name", "_Correlation")
+
+    Correlation = ProfileArrayProperty(np.float32)
+
     def __init__(self, num_elements, element_multiplier):
         self.ds_type = 10
         self.num_elements = num_elements
@@ -16,15 +23,9 @@ class Correlation:
         self.image = 0
         self.name_len = 8
         self.Name = "E000005\0"
-        self.Correlation = []
         # Create enough entries for all the (bins x beams)
         # Initialize with bad values
-        for bins in range(num_elements):
-            bins = []
-            for beams in range(element_multiplier):
-                bins.append([Ensemble().BadVelocity])
-
-            self.Correlation.append(bins)
+        self.Correlation = np.full((num_elements, element_multiplier), Ensemble.BadVelocity)
 
     def decode(self, data):
         """
@@ -34,10 +35,7 @@ class Correlation:
         """
         packet_pointer = Ensemble.GetBaseDataSize(self.name_len)
 
-        for beam in range(self.element_multiplier):
-            for bin_num in range(self.num_elements):
-                self.Correlation[bin_num][beam] = Ensemble.GetFloat(packet_pointer, Ensemble().BytesInFloat, data)
-                packet_pointer += Ensemble().BytesInFloat
+        self.Correlation = Ensemble.GetFloatArray(packet_pointer, self.num_elements, self.element_multiplier, data)
 
         logging.debug(self.Correlation)
 
@@ -57,10 +55,7 @@ class Correlation:
                                            self.Name)
 
         # Add the data
-        for beam in range(self.element_multiplier):
-            for bin_num in range(self.num_elements):
-                val = self.Correlation[bin_num][beam]
-                result += Ensemble.float_to_bytes(val)
+        result += Ensemble.float_array_to_bytes(self.Correlation)
 
         return result
 
@@ -156,3 +151,6 @@ class Correlation:
             return [round((v * 128.0) / repeats) for v in beam0]                # Convert to counts
 
         return None
+
+
+DatasetRegistry.register("E000005", "Correlation", Correlation)
@@ -0,0 +1,224 @@
+import struct
+import logging
+
+
+class DatasetLayout:
+    """
+    Precompiled binary layout of a list of dataset fields.
+
+    Each field is an (attribute name, struct format) pair.  The struct is
+    compiled once, so all the fields are decoded or encoded with one call.
+    String fields ("s" format) are converted between bytes and str.
+    Padding fields ("x" format) have no attribute.
+    """
+
+    def __init__(self, fields):
+        """
+        Compile the layout.
+        :param fields: List of (attribute name, struct format) pairs.
+        """
+        self.struct = struct.Struct("<" + "".join(fmt for name, fmt in fields))
+
+        # Padding is not a value
+        value_fields = [(name, fmt) for name, fmt in fields if fmt[-1] != "x"]
+        self.fields = [name for name, fmt in value_fields]
+
+        # Fields that are stored as strings
+        self.str_fields = [i for i, (name, fmt) in enumerate(value_fields) if fmt[-1] == "s"]
+
+        # Number of 4 byte elements in the layout
+        self.num_elements = self.struct.size // 4
+
+    def unpack(self, ds, data, offset=0):
+        """
+        Decode all the fields in the layout and set them on the dataset.
+        If the data is too short, the missing bytes are read as 0.
+        :param ds: Dataset object to populate.
+        :param data: Buffer containing the dataset.
+        :param offset: Location of the first field in the buffer.
+        """
+        if len(data) - offset < self.struct.size:
+            logging.debug("Dataset too short for layout, missing fields set to 0")
+            data = bytes(data[offset:]) + bytes(self.struct.size - max(len(data) - offset, 0))
+            offset = 0
+
+        values = list(self.struct.unpack_from(data, offset))
+        for i in self.str_fields:
+            values[i] = str(values[i], "UTF-8")
+
+        for name, value in zip(self.fields, values):
+            setattr(ds, name, value)
+
+    def pack(self, ds):
+        """
+        Encode all the fields in the layout from the dataset.
+        :param ds: Dataset object.
+        :return: Bytes of the fields.
+        """
+        values = [getattr(ds, name) for name in self.fields]
+        for i in self.str_fields:
+            values[i] = values[i].encode("UTF-8")
+
+        return self.struct.pack(*values)
+
+
+class DatasetSchema:
+    """
+    Field schema of a fixed layout dataset.
+
+    Newer firmware appends fields to a dataset.  The schema is given
+    as groups of fields.  A group is only in the dataset if the number
+    of elements in the dataset header includes the group.  A layout is
+    precompiled for each group boundary.
+
+    EX:
+    schema = DatasetSchema([("FirstBinRange", "f"), ("BinSize", "f")],
+                           [("RawMagFieldStrength", "f")])
+    schema.decode(ds, data, 3)         # Decode all 3 fields
+    schema.decode(ds, data, 2)         # Older firmware, only decode the first 2 fields
+    """
+
+    # Number of floats: Precompiled struct for the per beam values
+    BEAM_STRUCTS = {}
+
+    def __init__(self, *groups):
+        """
+        Compile the layout for each group boundary.
+        :param groups: Lists of (attribute name, struct format) pairs.
+        """
+        self.layouts = []
+        fields = []
+        for group in groups:
+            fields = fields + list(group)
+            self.layouts.append(DatasetLayout(fields))
+
+    def layout(self, num_elements=None):
+        """
+        Get the layout for the number of elements in the dataset.
+        :param num_elements: Number of elements in the dataset header.  None for the complete layout.
+        :return: Layout to decode the dataset.
+        """
+        if num_elements is not None:
+            for layout in self.layouts:
+                if num_elements <= layout.num_elements:
+                    return layout
+
+        return self.layouts[-1]
+
+    def decode(self, ds, data, num_elements=None, offset=None):
+        """
+        Decode the fields of the dataset.
+        :param ds: Dataset object to populate.
+        :param data: Bytearray for the dataset.
+        :param num_elements: Number of elements in the dataset header.
+        :param offset: Location of the first field.  Default is after the dataset header.
+        :return: Location after the last field decoded.
+        """
+        if offset is None:
+            offset = DatasetRegistry.BASE_DATA_SIZE
+
+        layout = self.layout(num_elements)
+        layout.unpack(ds, data, offset)
+
+        return offset + layout.struct.size
+
+    def encode(self, ds):
+        """
+        Encode all the fields of the dataset.
+        :param ds: Dataset object.
+        :return: Bytes of the fields.
+        """
+        return self.layouts[-1].pack(ds)
+
+    @staticmethod
+    def beam_struct(num_values):
+        """
+        Get the precompiled struct for a number of float values.
+        :param num_values: Number of float values.
+        :return: Struct for the float values.
+        """
+        beam_struct = DatasetSchema.BEAM_STRUCTS.get(num_values)
+        if beam_struct is None:
+            beam_struct = struct.Struct("<{0}f".format(num_values))
+            DatasetSchema.BEAM_STRUCTS[num_values] = beam_struct
+
+        return beam_struct
+
+    @staticmethod
+    def decode_beams(ds, data, offset, fields, num_beams):
+        """
+        Decode per beam float values.  Each field is a list with a value for each beam.
+        The fields are stored one after the other.
+        :param ds: Dataset object to populate.
+        :param data: Bytearray for the dataset.
+        :param offset: Location of the first value.
+        :param fields: List of attribute names.
+        :param num_beams: Number of beams.
+        :return: Location after the last value.
+        """
+        beam_struct = DatasetSchema.beam_struct(len(fields) * num_beams)
+        end = offset + beam_struct.size
+        if len(data) - offset < beam_struct.size:
+            logging.debug("Dataset too short for beam values, missing values set to 0")
+            data = bytes(data[offset:]) + bytes(beam_struct.size - max(len(data) - offset, 0))
+            offset = 0
+
+        values = beam_struct.unpack_from(data, offset)
+        for index, name in enumerate(fields):
+            setattr(ds, name, list(values[index * num_beams:(index + 1) * num_beams]))
+
+        return end
+
+    @staticmethod
+    def encode_beams(ds, fields):
+        """
+        Encode per beam float values.
+        :param ds: Dataset object.
+        :param fields: List of attribute names.
+        :return: Bytes of the values.
+        """
+        values = []
+        for name in fields:
+            values.extend(getattr(ds, name))
+
+        return DatasetSchema.beam_struct(len(values)).pack(*values)
+
+
+class DatasetRegistry:
+    """
+    Registry of all the RTB dataset types.
+
+    The dataset ID is mapped to the name of the attribute in the Ensemble
+    and the dataset class.  The codecs use the registry to find the
+    dataset class, so a new dataset type only needs to be registered.
+
+    DatasetRegistry.register("E000008", "EnsembleData", EnsembleData)
+    """
+
+    # Dataset header: Type, Number of Elements, Element Multiplier, Image, Name Length and Name
+    HEADER = struct.Struct("<5i8s")
+
+    # Size of the dataset header with an 8 byte name
+    BASE_DATA_SIZE = HEADER.size
+
+    # Dataset ID: (Attribute Name, Dataset Class)
+    DATASETS = {}
+
+    @staticmethod
+    def register(ds_id, attr_name, ds_class):
+        """
+        Register a dataset type.
+        :param ds_id: Dataset ID.  Ex: "E000008"
+        :param attr_name: Name of the attribute in the Ensemble.  Ex: "EnsembleData"
+        :param ds_class: Dataset class.  Created with (num_elements, element_multiplier).
+        """
+        DatasetRegistry.DATASETS[ds_id[0:7]] = (attr_name, ds_class)
+
+    @staticmethod
+    def get(ds_id):
+        """
+        Get the attribute name and class for the dataset ID.
+        :param ds_id: Dataset ID.  Ex: "E000008"
+        :return: (Attribute Name, Dataset Class) or None if not registered.
+        """
+        return DatasetRegistry.DATASETS.get(ds_id[0:7])
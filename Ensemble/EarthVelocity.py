@@ -1,4 +1,6 @@
 from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Ensemble.DatasetRegistry import DatasetRegistry
+from rti_python.Ensemble.ProfileArray import ProfileArrayProperty
 import logging
 import math
 import numpy as np
@@ -11,6 +13,13 @@ class EarthVelocity:
     [Bin x Beam] data.
     """
 
+    __slots__ = ("ds_type", "num_elements", "element_multiplier", "image", "name_len", "Name", "_Velocities",
+                 "_Magnitude", "_Direction")
+
+    Velocities = ProfileArrayProperty(np.float32)
+    Magnitude = ProfileArrayProperty(np.float64)
+    Direction = ProfileArrayProperty(np.float64)
+
     def __init__(self, num_elements, element_multiplier):
         self.ds_type = 10
         self.num_elements = num_elements
@@ -18,20 +27,12 @@ class EarthVelocity:
         self.image = 0
         self.name_len = 8
         self.Name = "E000003\0"
-        self.Velocities = []
-        self.Magnitude = []
-        self.Direction = []
 
         # Create enough entries for all the (bins x beams)
         # Initialize with bad values
-        for bins in range(num_elements):
-            bins = []
-            for beams in range(element_multiplier):
-                bins.append(Ensemble.BadVelocity)
-
-            self.Velocities.append(bins)                    # Mark Vel Bad
-            self.Magnitude.append(Ensemble.BadVelocity)     # Mark Mag Bad
-            self.Direction.append(Ensemble.BadVelocity)     # Mark Dir Bad
+        self.Velocities = np.full((num_elements, element_multiplier), Ensemble.BadVelocity)     # Mark Vel Bad
+        self.Magnitude = np.full(num_elements, Ensemble.BadVelocity)                            # Mark Mag Bad
+        self.Direction = np.full(num_elements, Ensemble.BadVelocity)                            # Mark Dir Bad
 
     def decode(self, data):
         """
@@ -41,10 +42,7 @@ class EarthVelocity:
         """
         packet_pointer = Ensemble.GetBaseDataSize(self.name_len)
 
-        for beam in range(self.element_multiplier):
-            for bin_num in range(self.num_elements):
-                self.Velocities[bin_num][beam] = Ensemble.GetFloat(packet_pointer, Ensemble().BytesInFloat, data)
-                packet_pointer += Ensemble().BytesInFloat
+        self.Velocities = Ensemble.GetFloatArray(packet_pointer, self.num_elements, self.element_multiplier, data)
 
         # Generate Water Current Magnitude and Direction
         self.generate_velocity_vectors()
@@ -68,13 +66,7 @@ class EarthVelocity:
         :return:
         """
         # Remove the vessel speed
-        for bin_num in range(len(self.Velocities)):
-            if not Ensemble.is_bad_velocity(self.Velocities[bin_num][0]) and not Ensemble.is_bad_velocity(bt_east):
-                self.Velocities[bin_num][0] = self.Velocities[bin_num][0] + bt_east            # Remove vessel speed
-            if not Ensemble.is_bad_velocity(self.Velocities[bin_num][1]) and not Ensemble.is_bad_velocity(bt_north):
-                self.Velocities[bin_num][1] = self.Velocities[bin_num][1] + bt_north           # Remove vessel speed
-            if not Ensemble.is_bad_velocity(self.Velocities[bin_num][2]) and not Ensemble.is_bad_velocity(bt_vert):
-                self.Velocities[bin_num][2] = self.Velocities[bin_num][2] + bt_vert            # Remove vessel speed
+        self.Velocities = EarthVelocity.remove_vessel_speed_array(self.Velocities, bt_east, bt_north, bt_vert)
 
         # Generate the new vectors after removing the vessel speed
         self.generate_velocity_vectors()
@@ -114,6 +106,45 @@ class EarthVelocity:
         # Return Average Magnitude, Direction
         return avg_mag, avg_dir
 
+    @staticmethod
+    def remove_vessel_speed_array(earth_vel, bt_east=0.0, bt_north=0.0, bt_vert=0.0):
+        """
+        Remove the vessel speed from the Earth velocities.  The velocity is only
+        changed if the velocity and the bottom track velocity are both good.
+        The bad values are checked the same as Ensemble.is_bad_velocity().
+
+        This works on a single ensemble [bin][beam] or many ensembles [ens][bin][beam].
+        For many ensembles, give a bottom track value for each ensemble.
+
+        :param earth_vel: Earth Velocities[bin][beam] or [ens][bin][beam]
+        :param bt_east: Bottom Track East velocity.  A single value or a value for each ensemble.
+        :param bt_north: Bottom Track North velocity.  A single value or a value for each ensemble.
+        :param bt_vert: Bottom Track Vertical velocity.  A single value or a value for each ensemble.
+        :return: New array with the vessel speed removed.
+        """
+        earth_vel = np.array(earth_vel, dtype=np.float64)
+        if earth_vel.ndim < 2:
+            return earth_vel
+
+        for beam, bt_vel in enumerate((bt_east, bt_north, bt_vert)):
+            if beam >= earth_vel.shape[-1]:
+                break
+
+            vel = earth_vel[..., beam]
+
+            # Line up the bottom track value for each ensemble with the bins
+            bt_vel = np.asarray(bt_vel)
+            bt_bad = Ensemble.is_bad_velocity_array(bt_vel)
+            bt_vel = np.where(bt_bad, 0.0, bt_vel).astype(np.float64)
+            bt_vel = bt_vel.reshape(bt_vel.shape + (1,) * (vel.ndim - bt_vel.ndim))
+            bt_bad = bt_bad.reshape(bt_vel.shape)
+
+            # Remove vessel speed
+            good = ~Ensemble.is_bad_velocity_array(vel) & ~bt_bad
+            earth_vel[..., beam] = np.where(good, vel + bt_vel, vel)
+
+        return earth_vel
+
     @staticmethod
     def generate_vectors(earth_vel):
         """
@@ -124,16 +155,36 @@ class EarthVelocity:
         Call this again and set the self.Magnitude and self.Direction when Bottom Track Velocity is
         available.
 
-        :param earth_vel: Earth Velocities[bin][beam]
-        :return: [magnitude], [direction]  List with a value for each bin
-        """
-        mag = []
-        dir = []
+        This works on a single ensemble [bin][beam] or many ensembles [ens][bin][beam].
 
-        for bin_num in range(len(earth_vel)):
-            # Calculate the magnitude and direction
-            mag.append(Ensemble.calculate_magnitude(earth_vel[bin_num][0], earth_vel[bin_num][1], earth_vel[bin_num][2]))
-            dir.append(Ensemble.calculate_direction(earth_vel[bin_num][0], earth_vel[bin_num][1]))
+        :param earth_vel: Earth Velocities[bin][beam] or [ens][bin][beam]
+        :return: [magnitude], [direction]  Arrays with a value for each bin
+        """
+        earth_vel = np.asarray(earth_vel, dtype=np.float64)
+        if earth_vel.ndim < 2:
+            return np.zeros(0), np.zeros(0)
+
+        mag = np.full(earth_vel.shape[:-1], Ensemble.BadVelocity)
+        dir = np.full(earth_vel.shape[:-1], Ensemble.BadVelocity)
+        if earth_vel.shape[-1] < 3:
+            return mag, dir
+
+        east = earth_vel[..., 0]
+        north = earth_vel[..., 1]
+        vert = earth_vel[..., 2]
+        bad = Ensemble.is_bad_velocity_array(earth_vel[..., 0:3])
+
+        # Calculate the magnitude
+        mag_good = ~np.any(bad, axis=-1)
+        mag[mag_good] = np.sqrt((east * east) + (north * north) + (vert * vert))[mag_good]
+
+        # Calculate the direction
+        # The range is -180 to 180
+        # This moves it to 0 to 360
+        dir_good = ~(bad[..., 0] | bad[..., 1])
+        bin_dir = np.arctan2(east, north) * (180.0 / math.pi)
+        bin_dir = np.where(bin_dir < 0.0, 360.0 + bin_dir, bin_dir)
+        dir[dir_good] = bin_dir[dir_good]
 
         return mag, dir
 
@@ -153,10 +204,7 @@ class EarthVelocity:
                                            self.Name)
 
         # Add the data
-        for beam in range(self.element_multiplier):
-            for bin_num in range(self.num_elements):
-                val = self.Velocities[bin_num][beam]
-                result += Ensemble.float_to_bytes(val)
+        result += Ensemble.float_array_to_bytes(self.Velocities)
 
         return result
 
@@ -265,3 +313,6 @@ class EarthVelocity:
             return False
 
         return True
+
+
+DatasetRegistry.register("E000003", "EarthVelocity", EarthVelocity)
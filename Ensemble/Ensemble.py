@@ -7,6 +7,7 @@ import math
 import logging
 import pandas as pd
 import numpy as np
+from rti_python.Ensemble.ProfileArray import ProfileArrayProperty
 
 
 class Ensemble:
@@ -85,6 +86,23 @@ class Ensemble:
 
     CSV_DATETIME_FORMAT = "%m/%d/%Y %H:%M:%S.%f"
 
+    # Use slots to reduce the memory used when many ensembles are buffered
+    __slots__ = ("RawData",
+                 "IsBeamVelocity", "BeamVelocity",
+                 "IsInstrumentVelocity", "InstrumentVelocity",
+                 "IsEarthVelocity", "EarthVelocity",
+                 "IsAmplitude", "Amplitude",
+                 "IsCorrelation", "Correlation",
+                 "IsGoodBeam", "GoodBeam",
+                 "IsGoodEarth", "GoodEarth",
+                 "IsEnsembleData", "EnsembleData",
+                 "IsAncillaryData", "AncillaryData",
+                 "IsBottomTrack", "BottomTrack",
+                 "IsWavesInfo", "WavesInfo",
+                 "IsRangeTracking", "RangeTracking",
+                 "IsSystemSetup", "SystemSetup",
+                 "IsNmeaData", "NmeaData")
+
     def __init__(self):
         self.RawData = None
         self.IsBeamVelocity = False
@@ -240,6 +258,16 @@ class Ensemble:
         self.IsNmeaData = True
         self.NmeaData = ds
 
+    def AddDataSet(self, attr_name, ds):
+        """
+        Add a dataset object to the ensemble by its attribute name.
+        Set the flag that the dataset is added.
+        :param attr_name: Name of the dataset attribute.  Ex: "EarthVelocity"
+        :param ds: Dataset object.
+        """
+        setattr(self, "Is" + attr_name, True)
+        setattr(self, attr_name, ds)
+
     def encode(self):
         """
         Encode the ensemble to RTB format.
@@ -487,7 +515,7 @@ class Ensemble:
         # A counter to use to add entries to dict
         i = 0
 
-        if vel_array:
+        if vel_array is not None and len(vel_array) > 0:
             # Go through each bin and beam
             for bin_num in range(len(vel_array)):
                 for beam_num in range(len(vel_array[0])):
@@ -545,7 +573,7 @@ class Ensemble:
         # A counter to use to add entries to dict
         i = 0
 
-        if vel_array:
+        if vel_array is not None and len(vel_array) > 0:
             # Go through each bin and beam
             for bin_num in range(len(vel_array)):
                 # Get the bin depth
@@ -636,9 +664,40 @@ class Ensemble:
         :return: JSON string with indents.
         """
         if pretty is True:
-            return json.dumps(self, default=lambda o: o.__dict__, sort_keys=True, indent=4) + "\n"
+            return json.dumps(self, default=Ensemble.to_json_obj, sort_keys=True, indent=4) + "\n"
         else:
-            return json.dumps(self, default=lambda o: o.__dict__) + "\n"
+            return json.dumps(self, default=Ensemble.to_json_obj) + "\n"
+
+    @staticmethod
+    def to_json_obj(obj):
+        """
+        Convert the object to a value JSON can serialize.
+        NumPy arrays and values are converted to lists and values.
+        Objects are converted to a dictionary of their attributes,
+        including the attributes stored in __slots__.  Private attributes
+        starting with _ are not included.
+        :param obj: Object to convert.
+        :return: JSON serializable value.
+        """
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        if isinstance(obj, np.generic):
+            return obj.item()
+
+        result = {}
+        for cls in type(obj).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                # Arrays stored behind a ProfileArrayProperty use the property name
+                if name.startswith("_") and isinstance(getattr(cls, name[1:], None), ProfileArrayProperty):
+                    name = name[1:]
+                if not name.startswith("_") and hasattr(obj, name):
+                    result[name] = getattr(obj, name)
+
+        for name, value in getattr(obj, "__dict__", {}).items():
+            if not name.startswith("_"):
+                result[name] = value
+
+        return result
 
     @staticmethod
     def gen_csv_line(dt, data_type, ss_code, ss_config, bin_num, beam_num, blank, bin_size, value):
@@ -859,6 +918,64 @@ class Ensemble:
         """
         return struct.pack("f", value)
 
+    @staticmethod
+    def GetFloatArray(start, num_elements, element_multiplier, ens):
+        """
+        Convert the bytes given into a [bin][beam] array of floats.
+        The data in the buffer is stored beam by beam.
+        If the data can not be read, the array is filled with BadVelocity.
+        :param start: Start location.
+        :param num_elements: Number of bins.
+        :param element_multiplier: Number of beams.
+        :param ens: Buffer containing the bytearray data.
+        :return: NumPy float32 array [bin][beam].
+        """
+        try:
+            data = np.frombuffer(ens, dtype=np.float32, count=num_elements * element_multiplier, offset=start)
+            return data.reshape(element_multiplier, num_elements).T.copy()
+        except Exception as e:
+            logging.debug("Error creating a float array from bytes. " + str(e))
+            return np.full((num_elements, element_multiplier), Ensemble.BadVelocity, dtype=np.float32)
+
+    @staticmethod
+    def GetInt32Array(start, num_elements, element_multiplier, ens):
+        """
+        Convert the bytes given into a [bin][beam] array of Int32.
+        The data in the buffer is stored beam by beam.
+        If the data can not be read, the array is filled with 0.
+        :param start: Start location.
+        :param num_elements: Number of bins.
+        :param element_multiplier: Number of beams.
+        :param ens: Buffer containing the bytearray data.
+        :return: NumPy Int32 array [bin][beam].
+        """
+        try:
+            data = np.frombuffer(ens, dtype=np.int32, count=num_elements * element_multiplier, offset=start)
+            return data.reshape(element_multiplier, num_elements).T.copy()
+        except Exception as e:
+            logging.error("Error creating a Int32 array from bytes. " + str(e))
+            return np.zeros((num_elements, element_multiplier), dtype=np.int32)
+
+    @staticmethod
+    def float_array_to_bytes(values):
+        """
+        Convert the given [bin][beam] values to bytes.
+        The values are stored beam by beam.
+        :param values: [bin][beam] values to convert.
+        :return: Bytes representing the values.
+        """
+        return np.asarray(values, dtype=np.float32).T.tobytes()
+
+    @staticmethod
+    def int32_array_to_bytes(values):
+        """
+        Convert the given [bin][beam] values to bytes.
+        The values are stored beam by beam.
+        :param values: [bin][beam] values to convert.
+        :return: Bytes representing the values.
+        """
+        return np.asarray(values, dtype=np.int32).T.tobytes()
+
     @staticmethod
     def GetDataSetSize(ds_type, name_len, num_elements, element_multipler):
         """
@@ -888,7 +1005,7 @@ class Ensemble:
         :param name_len: Length of the name.
         :return: Dataset header size in bytes.
         """
-        return name_len + (Ensemble().BytesInInt32 * (Ensemble().NUM_DATASET_HEADER_ELEMENTS-1))
+        return name_len + (Ensemble.BytesInInt32 * (Ensemble.NUM_DATASET_HEADER_ELEMENTS-1))
 
     @staticmethod
     def ensembleSize(payloadSize):
@@ -950,4 +1067,21 @@ class Ensemble:
 
         return False
 
+    @staticmethod
+    def is_bad_velocity_array(vel, rel_tol=1e-06):
+        """
+        Check the velocities in the array for bad values.
+        This uses the same check as is_bad_velocity() for every value.
+        :param vel: Velocity array.  Any shape.  None values are bad.
+        :param rel_tol: Value within this of Bad Velocity is bad.
+        :return: Boolean array, TRUE if the velocity is bad.
+        """
+        vel = np.asarray(vel)
+        if vel.dtype == object:
+            # None is bad
+            is_none = np.equal(vel, None)
+            vel = np.where(is_none, Ensemble.BadVelocity, vel).astype(np.float64)
+
+        return np.abs(vel - Ensemble.BadVelocity) <= rel_tol * np.maximum(np.abs(vel), Ensemble.BadVelocity)
+
 
@@ -1,5 +1,5 @@
-import struct
 from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Ensemble.DatasetRegistry import DatasetRegistry, DatasetSchema
 import logging
 from datetime import datetime
 
@@ -10,6 +10,34 @@ class EnsembleData:
     Integer values that give details about the ensemble.
     """
 
+    __slots__ = ("ds_type", "num_elements", "element_multiplier", "image", "name_len", "Name",
+                 "EnsembleNumber", "NumBins", "NumBeams", "DesiredPingCount", "ActualPingCount",
+                 "SerialNumber", "SysFirmwareMajor", "SysFirmwareMinor", "SysFirmwareRevision",
+                 "SysFirmwareSubsystemCode", "SubsystemConfig", "Status", "Year", "Month", "Day", "Hour",
+                 "Minute", "Second", "HSec")
+
+    # Layout of the data after the dataset header
+    SCHEMA = DatasetSchema([("EnsembleNumber", "i"),
+                            ("NumBins", "i"),
+                            ("NumBeams", "i"),
+                            ("DesiredPingCount", "i"),
+                            ("ActualPingCount", "i"),
+                            ("Status", "i"),
+                            ("Year", "i"),
+                            ("Month", "i"),
+                            ("Day", "i"),
+                            ("Hour", "i"),
+                            ("Minute", "i"),
+                            ("Second", "i"),
+                            ("HSec", "i"),
+                            ("SerialNumber", "32s"),
+                            ("SysFirmwareRevision", "B"),
+                            ("SysFirmwareMinor", "B"),
+                            ("SysFirmwareMajor", "B"),
+                            ("SysFirmwareSubsystemCode", "1s"),
+                            ("", "3x"),
+                            ("SubsystemConfig", "B")])
+
     def __init__(self, num_elements=23, element_multiplier=1):
         self.ds_type = 20
         self.num_elements = num_elements
@@ -44,29 +72,7 @@ class EnsembleData:
         the values.
         :param data: Bytearray for the dataset.
         """
-        packet_pointer = Ensemble.GetBaseDataSize(self.name_len)
-
-        self.EnsembleNumber = Ensemble.GetInt32(packet_pointer + Ensemble().BytesInInt32 * 0, Ensemble().BytesInInt32, data)
-        self.NumBins = Ensemble.GetInt32(packet_pointer + Ensemble().BytesInInt32 * 1, Ensemble().BytesInInt32, data)
-        self.NumBeams = Ensemble.GetInt32(packet_pointer + Ensemble().BytesInInt32 * 2, Ensemble().BytesInInt32, data)
-        self.DesiredPingCount = Ensemble.GetInt32(packet_pointer + Ensemble().BytesInInt32 * 3, Ensemble().BytesInInt32, data)
-        self.ActualPingCount = Ensemble.GetInt32(packet_pointer + Ensemble().BytesInInt32 * 4, Ensemble().BytesInInt32, data)
-        self.Status = Ensemble.GetInt32(packet_pointer + Ensemble().BytesInInt32 * 5, Ensemble().BytesInInt32, data)
-        self.Year = Ensemble.GetInt32(packet_pointer + Ensemble().BytesInInt32 * 6, Ensemble().BytesInInt32, data)
-        self.Month = Ensemble.GetInt32(packet_pointer + Ensemble().BytesInInt32 * 7, Ensemble().BytesInInt32, data)
-        self.Day = Ensemble.GetInt32(packet_pointer + Ensemble().BytesInInt32 * 8, Ensemble().BytesInInt32, data)
-        self.Hour = Ensemble.GetInt32(packet_pointer + Ensemble().BytesInInt32 * 9, Ensemble().BytesInInt32, data)
-        self.Minute = Ensemble.GetInt32(packet_pointer + Ensemble().BytesInInt32 * 10, Ensemble().BytesInInt32, data)
-        self.Second = Ensemble.GetInt32(packet_pointer + Ensemble().BytesInInt32 * 11, Ensemble().BytesInInt32, data)
-        self.HSec = Ensemble.GetInt32(packet_pointer + Ensemble().BytesInInt32 * 12, Ensemble().BytesInInt32, data)
-
-        self.SerialNumber = str(data[packet_pointer+Ensemble().BytesInInt32*13:packet_pointer+Ensemble().BytesInInt32*21], "UTF-8")
-        self.SysFirmwareRevision = struct.unpack("B", data[packet_pointer+Ensemble().BytesInInt32*21 + 0:packet_pointer+Ensemble().BytesInInt32*21 + 1])[0]
-        self.SysFirmwareMinor = struct.unpack("B", data[packet_pointer+Ensemble().BytesInInt32*21 + 1:packet_pointer+Ensemble().BytesInInt32*21 + 2])[0]
-        self.SysFirmwareMajor = struct.unpack("B", data[packet_pointer + Ensemble().BytesInInt32 * 21 + 2:packet_pointer + Ensemble().BytesInInt32 * 21 + 3])[0]
-        self.SysFirmwareSubsystemCode = str(data[packet_pointer + Ensemble().BytesInInt32 * 21 + 3:packet_pointer + Ensemble().BytesInInt32 * 21 + 4], "UTF-8")
-
-        self.SubsystemConfig = struct.unpack("B", data[packet_pointer + Ensemble().BytesInInt32 * 22 + 3:packet_pointer + Ensemble().BytesInInt32 * 22 + 4])[0]
+        EnsembleData.SCHEMA.decode(self, data, self.num_elements, Ensemble.GetBaseDataSize(self.name_len))
 
         logging.debug(self.EnsembleNumber)
         logging.debug(str(self.Month) + "/" + str(self.Day) + "/" + str(self.Year) + "  " + str(self.Hour) + ":" + str(self.Minute) + ":" + str(self.Second) + "." + str(self.HSec))
@@ -198,28 +204,7 @@ class EnsembleData:
                                            self.Name)
 
         # Add the data
-        result += Ensemble.int32_to_bytes(self.EnsembleNumber)
-        result += Ensemble.int32_to_bytes(self.NumBins)
-        result += Ensemble.int32_to_bytes(self.NumBeams)
-        result += Ensemble.int32_to_bytes(self.DesiredPingCount)
-        result += Ensemble.int32_to_bytes(self.ActualPingCount)
-        result += Ensemble.int32_to_bytes(self.Status)
-        result += Ensemble.int32_to_bytes(self.Year)
-        result += Ensemble.int32_to_bytes(self.Month)
-        result += Ensemble.int32_to_bytes(self.Day)
-        result += Ensemble.int32_to_bytes(self.Hour)
-        result += Ensemble.int32_to_bytes(self.Minute)
-        result += Ensemble.int32_to_bytes(self.Second)
-        result += Ensemble.int32_to_bytes(self.HSec)
-        result += self.SerialNumber.encode("UTF-8")
-        result += bytes([self.SysFirmwareRevision])
-        result += bytes([self.SysFirmwareMinor])
-        result += bytes([self.SysFirmwareMajor])
-        result += self.SysFirmwareSubsystemCode.encode("UTF-8")
-        result += bytes([0])
-        result += bytes([0])
-        result += bytes([0])
-        result += bytes([self.SubsystemConfig])
+        result += EnsembleData.SCHEMA.encode(self)
 
         return result
 
@@ -239,3 +224,6 @@ class EnsembleData:
         str_result.append(Ensemble.gen_csv_line(dt, Ensemble.CSV_STATUS, ss_code, ss_config, 0, 0, blank, bin_size, self.Status))
 
         return str_result
+
+
+DatasetRegistry.register("E000008", "EnsembleData", EnsembleData)
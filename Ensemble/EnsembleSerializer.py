@@ -0,0 +1,440 @@
+import struct
+import logging
+import datetime
+import numpy as np
+from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Ensemble.DatasetRegistry import DatasetRegistry
+
+# Import the datasets so they are registered
+from rti_python.Ensemble.BeamVelocity import BeamVelocity
+from rti_python.Ensemble.InstrumentVelocity import InstrumentVelocity
+from rti_python.Ensemble.EarthVelocity import EarthVelocity
+from rti_python.Ensemble.Amplitude import Amplitude
+from rti_python.Ensemble.Correlation import Correlation
+from rti_python.Ensemble.GoodBeam import GoodBeam
+from rti_python.Ensemble.GoodEarth import GoodEarth
+from rti_python.Ensemble.EnsembleData import EnsembleData
+from rti_python.Ensemble.AncillaryData import AncillaryData
+from rti_python.Ensemble.BottomTrack import BottomTrack
+from rti_python.Ensemble.NmeaData import NmeaData
+from rti_python.Ensemble.RangeTracking import RangeTracking
+from rti_python.Ensemble.SystemSetup import SystemSetup
+
+
+class EnsembleSerializer:
+    """
+    Compact versioned binary format for an Ensemble.
+
+    The ensemble is written as a header (magic and version) followed by a
+    MessagePack map.  The map has a map for each dataset in the ensemble,
+    keyed by the Ensemble attribute name, with a value for each field of
+    the dataset.  Any MessagePack reader can read the envelope.
+
+    Arrays and lists of numbers are stored as a MessagePack extension with
+    the dtype, shape and the raw little endian values.  Float arrays are stored
+    as float32, which is the precision of the RTB data.  The values are 8 byte
+    aligned, so the arrays are decoded as NumPy views of the buffer without
+    copying the data.
+
+    The format is schema aware.  A dataset or field that is not known when
+    decoding is skipped and a field that is missing keeps the default value
+    of the dataset, so newer and older files can be read.
+
+    data = EnsembleSerializer.dumps(ens)
+    ens = EnsembleSerializer.loads(data)
+    """
+
+    # Header: Magic and Version
+    MAGIC = b"RTIE"
+    VERSION = 1
+    HEADER = struct.Struct("<4sH")
+
+    # MessagePack extension types
+    EXT_ARRAY = 1               # NumPy array
+    EXT_LIST = 2                # List of numbers, decoded as a list
+    EXT_DATETIME = 3            # ISO format datetime string
+
+    # Array dtype codes
+    DTYPES = {1: np.dtype("<f4"),
+              2: np.dtype("<f8"),
+              3: np.dtype("<i4"),
+              4: np.dtype("<i8"),
+              5: np.dtype("u1"),
+              6: np.dtype("?")}
+    DTYPE_CODES = {dtype: code for code, dtype in DTYPES.items()}
+
+    # Alignment of the array values in the buffer
+    ALIGNMENT = 8
+
+    # Datasets rebuilt from a field instead of storing the decoded values
+    # Attribute Name: (Field, Method to add each value)
+    REBUILD = {"NmeaData": ("nmea_sentences", "add_nmea")}
+
+    @staticmethod
+    def dumps(ens, float32: bool = True, include_raw: bool = False) -> bytes:
+        """
+        Serialize the ensemble.
+        :param ens: Ensemble to serialize.
+        :param float32: Store the float arrays as float32.  Otherwise float64.
+        :param include_raw: Include the raw RTB data of the ensemble.
+        :return: Serialized ensemble.
+        """
+        datasets = {}
+        for attr_name in EnsembleSerializer.dataset_names(ens):
+            ds = getattr(ens, attr_name)
+            rebuild = EnsembleSerializer.REBUILD.get(attr_name)
+
+            fields = {}
+            for name, value in Ensemble.to_json_obj(ds).items():
+                # Decoded values are created again from the rebuild field
+                if rebuild and name not in ("ds_type", "num_elements", "element_multiplier", "image", "name_len", "Name", rebuild[0]):
+                    continue
+                if EnsembleSerializer.is_supported(value):
+                    fields[name] = value
+                else:
+                    logging.debug("Field not serialized: " + attr_name + "." + name)
+
+            datasets[attr_name] = fields
+
+        envelope = {"datasets": datasets}
+        if include_raw and ens.RawData is not None:
+            envelope["raw"] = bytes(ens.RawData)
+
+        packer = _Packer(float32)
+        packer.buf += EnsembleSerializer.HEADER.pack(EnsembleSerializer.MAGIC, EnsembleSerializer.VERSION)
+        packer.pack(envelope)
+
+        return bytes(packer.buf)
+
+    @staticmethod
+    def loads(data, copy: bool = False):
+        """
+        Deserialize the ensemble.
+
+        The arrays are NumPy views of the data, so the data is not copied.
+        The views are read only if the data is bytes.  Use copy or give a
+        bytearray if the arrays will be modified in place.
+        :param data: Serialized ensemble.  bytes, bytearray or memoryview.
+        :param copy: Copy the arrays from the data.
+        :return: Ensemble.
+        """
+        header_size = EnsembleSerializer.HEADER.size
+        if len(data) < header_size:
+            raise ValueError("Serialized ensemble too short")
+
+        magic, version = EnsembleSerializer.HEADER.unpack_from(data, 0)
+        if magic != EnsembleSerializer.MAGIC:
+            raise ValueError("Not a serialized ensemble")
+        if version > EnsembleSerializer.VERSION:
+            raise ValueError("Serialized ensemble version " + str(version) + " is not supported")
+
+        envelope = _Unpacker(data, header_size, copy).unpack()
+
+        ens = Ensemble()
+        if envelope.get("raw") is not None:
+            ens.AddRawData(envelope["raw"])
+
+        # Attribute Name: Dataset Class
+        ds_classes = {attr_name: ds_class for attr_name, ds_class in DatasetRegistry.DATASETS.values()}
+
+        for attr_name, fields in envelope.get("datasets", {}).items():
+            ds_class = ds_classes.get(attr_name)
+            if ds_class is None:
+                logging.debug("Unknown dataset: " + attr_name)
+                continue
+
+            try:
+                ens.AddDataSet(attr_name, EnsembleSerializer.create_dataset(attr_name, ds_class, fields))
+            except Exception as e:
+                logging.error("Error deserializing the dataset " + attr_name + ".  " + str(e))
+
+        return ens
+
+    @staticmethod
+    def create_dataset(attr_name, ds_class, fields):
+        """
+        Create the dataset and set the fields.
+        :param attr_name: Name of the dataset attribute.
+        :param ds_class: Dataset class.
+        :param fields: Dictionary of field name to value.
+        :return: Dataset object.
+        """
+        ds = ds_class(fields.get("num_elements", 0), fields.get("element_multiplier", 1))
+
+        rebuild = EnsembleSerializer.REBUILD.get(attr_name)
+        if rebuild:
+            add_value = getattr(ds, rebuild[1])
+            for value in fields.get(rebuild[0], []):
+                add_value(value)
+
+        for name, value in fields.items():
+            if rebuild and name == rebuild[0]:
+                continue
+
+            # Skip the fields this version of the dataset does not have
+            if not hasattr(ds, name):
+                logging.debug("Unknown field: " + attr_name + "." + name)
+                continue
+
+            setattr(ds, name, value)
+
+        return ds
+
+    @staticmethod
+    def dataset_names(ens):
+        """
+        Get the attribute names of the datasets in the ensemble.
+        :param ens: Ensemble.
+        :return: List of attribute names.
+        """
+        names = []
+        for name in Ensemble.__slots__:
+            if name.startswith("Is") and getattr(ens, name, False) and getattr(ens, name[2:], None) is not None:
+                names.append(name[2:])
+
+        return names
+
+    @staticmethod
+    def is_supported(value) -> bool:
+        """
+        Check if the value can be serialized.
+        :param value: Value to check.
+        :return: TRUE if the value can be serialized.
+        """
+        if value is None or isinstance(value, (bool, int, float, str, bytes, bytearray, np.generic, datetime.datetime)):
+            return True
+        if isinstance(value, np.ndarray):
+            return value.dtype.kind in "biuf" or value.dtype == object
+        if isinstance(value, (list, tuple)):
+            return all(EnsembleSerializer.is_supported(item) for item in value)
+        if isinstance(value, dict):
+            return all(isinstance(key, str) and EnsembleSerializer.is_supported(item) for key, item in value.items())
+
+        return False
+
+
+class _Packer:
+    """
+    MessagePack encoder with the extensions for arrays.
+    """
+
+    def __init__(self, float32=True):
+        self.buf = bytearray()
+        self.float32 = float32
+
+    def pack(self, value):
+        if value is None:
+            self.buf.append(0xc0)
+        elif isinstance(value, (bool, np.bool_)):
+            self.buf.append(0xc3 if value else 0xc2)
+        elif isinstance(value, (int, np.integer)):
+            self.pack_int(int(value))
+        elif isinstance(value, (float, np.floating)):
+            self.buf.append(0xcb)
+            self.buf += struct.pack(">d", float(value))
+        elif isinstance(value, str):
+            data = value.encode("UTF-8")
+            self.pack_len(len(data), 0xa0, 32, 0xd9, 0xda, 0xdb)
+            self.buf += data
+        elif isinstance(value, (bytes, bytearray)):
+            self.pack_len(len(value), None, 0, 0xc4, 0xc5, 0xc6)
+            self.buf += value
+        elif isinstance(value, datetime.datetime):
+            self.pack_ext(EnsembleSerializer.EXT_DATETIME, value.isoformat().encode("UTF-8"))
+        elif isinstance(value, np.ndarray):
+            if value.dtype == object:
+                self.pack_list(value.tolist())
+            else:
+                self.pack_array(EnsembleSerializer.EXT_ARRAY, value)
+        elif isinstance(value, (list, tuple)):
+            self.pack_list(value)
+        elif isinstance(value, dict):
+            self.pack_len(len(value), 0x80, 16, None, 0xde, 0xdf)
+            for key, item in value.items():
+                self.pack(key)
+                self.pack(item)
+        else:
+            raise TypeError("Can not serialize " + type(value).__name__)
+
+    def pack_int(self, value):
+        if 0 <= value < 0x80:
+            self.buf.append(value)
+        elif -32 <= value < 0:
+            self.buf += struct.pack(">b", value)
+        elif -(1 << 63) <= value < (1 << 63):
+            self.buf.append(0xd3)
+            self.buf += struct.pack(">q", value)
+        else:
+            self.buf.append(0xcf)
+            self.buf += struct.pack(">Q", value)
+
+    def pack_len(self, length, fix_code, fix_max, code8, code16, code32):
+        if fix_code is not None and length < fix_max:
+            self.buf.append(fix_code | length)
+        elif code8 is not None and length < 0x100:
+            self.buf += struct.pack(">BB", code8, length)
+        elif length < 0x10000:
+            self.buf += struct.pack(">BH", code16, length)
+        else:
+            self.buf += struct.pack(">BI", code32, length)
+
+    def pack_list(self, value):
+        # Lists of numbers are stored as arrays
+        if len(value) > 0 and all(isinstance(item, (int, float, np.integer, np.floating)) and not isinstance(item, (bool, np.bool_)) for item in value):
+            self.pack_array(EnsembleSerializer.EXT_LIST, np.asarray(value))
+            return
+
+        self.pack_len(len(value), 0x90, 16, None, 0xdc, 0xdd)
+        for item in value:
+            self.pack(item)
+
+    def pack_ext(self, ext_type, payload, header_length=0):
+        # Header length selects a larger header than the payload needs
+        length = len(payload)
+        if max(length, header_length) < 0x100:
+            self.buf += struct.pack(">BBb", 0xc7, length, ext_type)
+        elif max(length, header_length) < 0x10000:
+            self.buf += struct.pack(">BHb", 0xc8, length, ext_type)
+        else:
+            self.buf += struct.pack(">BIb", 0xc9, length, ext_type)
+        self.buf += payload
+
+    def pack_array(self, ext_type, value):
+        """
+        Array payload: dtype code, number of dimensions, padding size, shape,
+        padding then the values.  The padding aligns the values in the buffer.
+        """
+        if value.dtype.kind == "f":
+            dtype = np.dtype("<f4") if self.float32 else np.dtype("<f8")
+        elif value.dtype == np.uint8:
+            dtype = np.dtype("u1")
+        elif value.dtype.kind in "iu":
+            dtype = np.dtype("<i4") if value.size == 0 or (value.min() >= -(1 << 31) and value.max() < (1 << 31)) else np.dtype("<i8")
+        else:
+            dtype = np.dtype("?")
+
+        data = np.ascontiguousarray(value, dtype=dtype).tobytes()
+        meta_size = 3 + 4 * value.ndim
+
+        # Ext header size for the largest padding, so the padding does not change the header
+        max_length = meta_size + len(data) + EnsembleSerializer.ALIGNMENT - 1
+        header_size = 3 if max_length < 0x100 else 4 if max_length < 0x10000 else 6
+        pad = -(len(self.buf) + header_size + meta_size) % EnsembleSerializer.ALIGNMENT
+
+        payload = bytearray(struct.pack("<BBB", EnsembleSerializer.DTYPE_CODES[dtype], value.ndim, pad))
+        payload += struct.pack("<" + str(value.ndim) + "I", *value.shape)
+        payload += bytes(pad)
+        payload += data
+        self.pack_ext(ext_type, payload, max_length)
+
+
+class _Unpacker:
+    """
+    MessagePack decoder with the extensions for arrays.
+    The arrays are NumPy views of the data unless copy is set.
+    """
+
+    # Fixed size values: Code: (Struct, Size)
+    FIXED = {0xca: (">f", 4), 0xcb: (">d", 8),
+             0xcc: (">B", 1), 0xcd: (">H", 2), 0xce: (">I", 4), 0xcf: (">Q", 8),
+             0xd0: (">b", 1), 0xd1: (">h", 2), 0xd2: (">i", 4), 0xd3: (">q", 8)}
+
+    def __init__(self, data, offset=0, copy=False):
+        self.view = memoryview(data).cast("B")
+        self.pos = offset
+        self.copy = copy
+
+    def read(self, size):
+        if self.pos + size > len(self.view):
+            raise ValueError("Serialized ensemble is truncated")
+        start = self.pos
+        self.pos += size
+        return self.view[start:self.pos]
+
+    def read_struct(self, fmt, size):
+        return struct.unpack(fmt, self.read(size))[0]
+
+    def unpack(self):
+        code = self.read_struct(">B", 1)
+
+        if code < 0x80:
+            return code
+        if code >= 0xe0:
+            return code - 0x100
+        if code <= 0x8f:
+            return self.unpack_map(code & 0x0f)
+        if code <= 0x9f:
+            return self.unpack_list(code & 0x0f)
+        if code <= 0xbf:
+            return str(self.read(code & 0x1f), "UTF-8")
+        if code == 0xc0:
+            return None
+        if code == 0xc2:
+            return False
+        if code == 0xc3:
+            return True
+        if code in _Unpacker.FIXED:
+            return self.read_struct(*_Unpacker.FIXED[code])
+        if code in (0xc4, 0xc5, 0xc6):
+            return bytes(self.read(self.read_len(code - 0xc4)))
+        if code in (0xc7, 0xc8, 0xc9):
+            length = self.read_len(code - 0xc7)
+            return self.unpack_ext(self.read_struct(">b", 1), length)
+        if code in (0xd4, 0xd5, 0xd6, 0xd7, 0xd8):
+            ext_type = self.read_struct(">b", 1)
+            return self.unpack_ext(ext_type, 1 << (code - 0xd4))
+        if code in (0xd9, 0xda, 0xdb):
+            return str(self.read(self.read_len(code - 0xd9)), "UTF-8")
+        if code in (0xdc, 0xdd):
+            return self.unpack_list(self.read_len(code - 0xdc + 1))
+        if code in (0xde, 0xdf):
+            return self.unpack_map(self.read_len(code - 0xde + 1))
+
+        raise ValueError("Unknown MessagePack code " + hex(code))
+
+    def read_len(self, size_index):
+        # Length is 1, 2 or 4 bytes
+        return self.read_struct(*((">B", 1), (">H", 2), (">I", 4))[size_index])
+
+    def unpack_list(self, length):
+        return [self.unpack() for _ in range(length)]
+
+    def unpack_map(self, length):
+        result = {}
+        for _ in range(length):
+            key = self.unpack()
+            result[key] = self.unpack()
+        return result
+
+    def unpack_ext(self, ext_type, length):
+        start = self.pos
+        end = start + length
+        if ext_type in (EnsembleSerializer.EXT_ARRAY, EnsembleSerializer.EXT_LIST):
+            dtype_code, ndim, pad = struct.unpack("<BBB", self.read(3))
+            shape = struct.unpack("<" + str(ndim) + "I", self.read(4 * ndim))
+            dtype = EnsembleSerializer.DTYPES.get(dtype_code)
+            if dtype is None:
+                raise ValueError("Unknown array dtype " + str(dtype_code))
+
+            offset = self.pos + pad
+            count = int(np.prod(shape, dtype=np.int64))
+            if offset + count * dtype.itemsize > end:
+                raise ValueError("Serialized array is truncated")
+            self.pos = end
+
+            # View of the data without copying
+            value = np.frombuffer(self.view, dtype=dtype, count=count, offset=offset).reshape(shape)
+            if ext_type == EnsembleSerializer.EXT_LIST:
+                return value.tolist()
+            if self.copy:
+                return value.copy()
+            return value
+
+        payload = self.read(length)
+        if ext_type == EnsembleSerializer.EXT_DATETIME:
+            return datetime.datetime.fromisoformat(str(payload, "UTF-8"))
+
+        # Unknown extension from a newer version
+        logging.debug("Unknown extension type " + str(ext_type))
+        self.pos = end
+        return None
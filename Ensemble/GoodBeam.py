@@ -1,5 +1,8 @@
 from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Ensemble.DatasetRegistry import DatasetRegistry
+from rti_python.Ensemble.ProfileArray import ProfileArrayProperty
 import logging
+import numpy as np
 
 
 class GoodBeam:
@@ -9,6 +12,10 @@ class GoodBeam:
     [Bin x Beam] data.
     """
 
+    __slots__ = ("ds_type", "num_elements", "element_multiplier", "image", "name_len", "Name", "_GoodBeam")
+
+    GoodBeam = ProfileArrayProperty(np.int32)
+
     def __init__(self, num_elements, element_multiplier):
         self.ds_type = 20                               # Int
         self.num_elements = num_elements
@@ -16,15 +23,9 @@ class GoodBeam:
         self.image = 0
         self.name_len = 8
         self.Name = "E000006\0"
-        self.GoodBeam = []
         # Create enough entries for all the (bins x beams)
         # Initialize with bad values
-        for bins in range(num_elements):
-            bins = []
-            for beams in range(element_multiplier):
-                bins.append([0])
-
-            self.GoodBeam.append(bins)
+        self.GoodBeam = np.zeros((num_elements, element_multiplier), dtype=np.int32)
 
     def decode(self, data):
         """
@@ -34,10 +35,7 @@ class GoodBeam:
         """
         packet_pointer = Ensemble.GetBaseDataSize(self.name_len)
 
-        for beam in range(self.element_multiplier):
-            for bin_num in range(self.num_elements):
-                self.GoodBeam[bin_num][beam] = Ensemble.GetInt32(packet_pointer, Ensemble().BytesInInt32, data)
-                packet_pointer += Ensemble().BytesInInt32
+        self.GoodBeam = Ensemble.GetInt32Array(packet_pointer, self.num_elements, self.element_multiplier, data)
 
         logging.debug(self.GoodBeam)
 
@@ -57,10 +55,7 @@ class GoodBeam:
                                            self.Name)
 
         # Add the data
-        for beam in range(self.element_multiplier):
-            for bin_num in range(self.num_elements):
-                val = self.GoodBeam[bin_num][beam]
-                result += Ensemble.int32_to_bytes(val)
+        result += Ensemble.int32_array_to_bytes(self.GoodBeam)
 
         return result
 
@@ -124,3 +119,6 @@ class GoodBeam:
             return [round((v * 100.0) / pings_per_ens) for v in beam0]            # Convert to percent
 
         return None
+
+
+DatasetRegistry.register("E000006", "GoodBeam", GoodBeam)
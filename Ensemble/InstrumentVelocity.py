@@ -1,5 +1,8 @@
 from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Ensemble.DatasetRegistry import DatasetRegistry
+from rti_python.Ensemble.ProfileArray import ProfileArrayProperty
 import logging
+import numpy as np
 
 class InstrumentVelocity:
     """
@@ -7,6 +10,10 @@ class InstrumentVelocity:
     [Bin x Beam] data.
     """
 
+    __slots__ = ("ds_type", "num_elements", "element_multiplier", "image", "name_len", "Name", "_Velocities")
+
+    Velocities = ProfileArrayProperty(np.float32)
+
     def __init__(self, num_elements, element_multiplier):
         self.ds_type = 10
         self.num_elements = num_elements
@@ -14,15 +21,9 @@ class InstrumentVelocity:
         self.image = 0
         self.name_len = 8
         self.Name = "E000002\0"
-        self.Velocities = []
         # Create enough entries for all the (bins x beams)
         # Initialize with bad values
-        for bins in range(num_elements):
-            bins = []
-            for beams in range(element_multiplier):
-                bins.append([Ensemble().BadVelocity])
-
-            self.Velocities.append(bins)
+        self.Velocities = np.full((num_elements, element_multiplier), Ensemble.BadVelocity)
 
     def decode(self, data):
         """
@@ -32,10 +33,7 @@ class InstrumentVelocity:
         """
         packetpointer = Ensemble.GetBaseDataSize(self.name_len)
 
-        for beam in range(self.element_multiplier):
-            for bin_num in range(self.num_elements):
-                self.Velocities[bin_num][beam] = Ensemble.GetFloat(packetpointer, Ensemble().BytesInFloat, data)
-                packetpointer += Ensemble().BytesInFloat
+        self.Velocities = Ensemble.GetFloatArray(packetpointer, self.num_elements, self.element_multiplier, data)
 
         logging.debug(self.Velocities)
 
@@ -55,10 +53,7 @@ class InstrumentVelocity:
                                            self.Name)
 
         # Add the data
-        for beam in range(self.element_multiplier):
-            for bin_num in range(self.num_elements):
-                val = self.Velocities[bin_num][beam]
-                result += Ensemble.float_to_bytes(val)
+        result += Ensemble.float_array_to_bytes(self.Velocities)
 
         return result
 
@@ -84,3 +79,5 @@ class InstrumentVelocity:
 
         return str_result
 
+
+DatasetRegistry.register("E000002", "InstrumentVelocity", InstrumentVelocity)
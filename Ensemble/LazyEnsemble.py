@@ -0,0 +1,136 @@
+import logging
+from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Ensemble.DatasetRegistry import DatasetRegistry
+
+# Import the datasets so they are registered
+from rti_python.Ensemble.BeamVelocity import BeamVelocity
+from rti_python.Ensemble.InstrumentVelocity import InstrumentVelocity
+from rti_python.Ensemble.EarthVelocity import EarthVelocity
+from rti_python.Ensemble.Amplitude import Amplitude
+from rti_python.Ensemble.Correlation import Correlation
+from rti_python.Ensemble.GoodBeam import GoodBeam
+from rti_python.Ensemble.GoodEarth import GoodEarth
+from rti_python.Ensemble.EnsembleData import EnsembleData
+from rti_python.Ensemble.AncillaryData import AncillaryData
+from rti_python.Ensemble.BottomTrack import BottomTrack
+from rti_python.Ensemble.NmeaData import NmeaData
+from rti_python.Ensemble.RangeTracking import RangeTracking
+from rti_python.Ensemble.SystemSetup import SystemSetup
+
+
+class LazyEnsemble(Ensemble):
+    """
+    RoweTech Binary Ensemble that decodes the datasets on first access.
+
+    The ensemble keeps a memoryview of the verified raw ensemble bytes and a
+    table of where each dataset is located.  The Is<Dataset> flags are set
+    when the ensemble is created.  The dataset object is only decoded
+    when the attribute is first touched, then it is cached on the ensemble.
+
+    ens.IsEarthVelocity         # No decoding
+    ens.EarthVelocity           # Decode Earth Velocity and cache it
+    """
+
+    __slots__ = ("_raw_view", "_pending_ds")
+
+    def __init__(self, ens_data, dataset_table):
+        """
+        Create the ensemble from the raw data and the dataset table.
+        :param ens_data: Verified raw ensemble bytes.
+        :param dataset_table: Dictionary of dataset ID to (start, size, num_elements, element_multiplier).
+        """
+        Ensemble.__init__(self)
+
+        # Raw data is not copied, each dataset is a slice of the view
+        self._raw_view = memoryview(ens_data)
+
+        # Datasets not decoded yet
+        # Attribute Name: (Dataset Class, start, size, num_elements, element_multiplier)
+        self._pending_ds = {}
+
+        for ds_id, (start, size, num_elements, element_multiplier) in dataset_table.items():
+            ds_info = DatasetRegistry.get(ds_id)
+            if not ds_info:
+                logging.debug("Unknown dataset: " + ds_id)
+                continue
+
+            attr_name, ds_class = ds_info
+            self._pending_ds[attr_name] = (ds_class, start, size, num_elements, element_multiplier)
+
+            # Set the flag and remove the placeholder so __getattr__ is used on access
+            setattr(self, "Is" + attr_name, True)
+            delattr(self, attr_name)
+
+    def __getattr__(self, name):
+        """
+        Only called when the attribute is not found.  If the attribute
+        is a dataset that has not been decoded yet, decode it and
+        cache it on the ensemble.
+        :param name: Attribute name.
+        :return: Decoded dataset.
+        """
+        try:
+            pending = object.__getattribute__(self, "_pending_ds")
+        except AttributeError:
+            pending = None
+
+        if not pending or name not in pending:
+            raise AttributeError("'{}' object has no attribute '{}'".format(type(self).__name__, name))
+
+        ds_class, start, size, num_elements, element_multiplier = pending.pop(name)
+        ds = ds_class(num_elements, element_multiplier)
+        ds.decode(self._raw_view[start:start + size])
+        setattr(self, name, ds)
+
+        return ds
+
+    def decode_all(self):
+        """
+        Decode all the datasets that have not been accessed yet.
+        The raw data is released when all the datasets are decoded.
+        """
+        for attr_name in list(self._pending_ds.keys()):
+            getattr(self, attr_name)
+
+        self._raw_view = None
+
+    def is_decoded(self, attr_name):
+        """
+        Check if the dataset has been decoded.
+        :param attr_name: Attribute name of the dataset.  Ex: "EarthVelocity"
+        :return: TRUE if the dataset is decoded or not available.
+        """
+        return attr_name not in self._pending_ds
+
+    def raw_dataset(self, attr_name):
+        """
+        Get the raw bytes of a dataset that has not been decoded.
+        This allows a dataset to be processed without creating the dataset object.
+        :param attr_name: Attribute name of the dataset.  Ex: "NmeaData"
+        :return: Memoryview of the dataset including the dataset header.  None if already decoded or not available.
+        """
+        pending = self._pending_ds.get(attr_name)
+        if not pending or self._raw_view is None:
+            return None
+
+        ds_class, start, size, num_elements, element_multiplier = pending
+        return self._raw_view[start:start + size]
+
+    def __getstate__(self):
+        """
+        Decode all the datasets before pickling.
+        A memoryview can not be pickled.
+        :return: State of the ensemble.
+        """
+        self.decode_all()
+        return {name: getattr(self, name) for name in Ensemble.__slots__}
+
+    def __setstate__(self, state):
+        """
+        Restore the ensemble from the pickled state.
+        :param state: State of the ensemble.
+        """
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._raw_view = None
+        self._pending_ds = {}
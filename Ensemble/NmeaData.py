@@ -1,8 +1,8 @@
-import pynmea2
 from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Ensemble.DatasetRegistry import DatasetRegistry
+from rti_python.Codecs.NmeaParser import NmeaParser, KNOTS_TO_M_S
 import logging
 from pygeodesy import ellipsoidalVincenty
-from decimal import *
 
 
 class NmeaData:
@@ -11,6 +11,10 @@ class NmeaData:
     String data to decode.
     """
 
+    __slots__ = ("ds_type", "num_elements", "element_multiplier", "image", "name_len", "Name",
+                 "nmea_sentences", "GPGGA", "GPVTG", "GPRMC", "GPGLL", "GPGSV", "GPGSA", "GPHDT", "GPHDG",
+                 "latitude", "longitude", "speed_knots", "speed_m_s", "heading", "datetime")
+
     def __init__(self, num_elements=0, element_multiplier=1):
         self.ds_type = 50           # Bytes
         self.num_elements = num_elements
@@ -61,34 +65,42 @@ class NmeaData:
             self.num_elements += len(msg)
 
             # Parse the NMEA data
-            nmea_msg = pynmea2.parse(msg)
-
-            if isinstance(nmea_msg, pynmea2.types.talker.GGA):
+            # GGA, VTG, HDT, RMC and DBT are parsed directly, other sentences use pynmea2
+            nmea_msg = NmeaParser.parse(msg)
+            if nmea_msg is None:
+                logging.debug("Bad NMEA String")
+                return
+
+            # Empty fields keep the last good value or the default
+            sentence_type = nmea_msg.sentence_type
+            if sentence_type == "GGA":
                 self.GPGGA = nmea_msg
-                self.latitude = nmea_msg.latitude
-                self.longitude = nmea_msg.longitude
+                if nmea_msg.latitude is not None:
+                    self.latitude = nmea_msg.latitude
+                if nmea_msg.longitude is not None:
+                    self.longitude = nmea_msg.longitude
                 self.datetime = nmea_msg.timestamp
-            if isinstance(nmea_msg, pynmea2.types.talker.VTG):
+            elif sentence_type == "VTG":
                 self.GPVTG = nmea_msg
-                self.speed_knots = nmea_msg.spd_over_grnd_kts
-                self.speed_m_s = nmea_msg.spd_over_grnd_kts * Decimal(0.51444444444444)
-            if isinstance(nmea_msg, pynmea2.types.talker.RMC):
+                if nmea_msg.spd_over_grnd_kts is not None:
+                    self.speed_knots = nmea_msg.spd_over_grnd_kts
+                    self.speed_m_s = nmea_msg.spd_over_grnd_kts * KNOTS_TO_M_S
+            elif sentence_type == "RMC":
                 self.GPRMC = nmea_msg
-            if isinstance(nmea_msg, pynmea2.types.talker.GLL):
+            elif sentence_type == "GLL":
                 self.GPGLL = nmea_msg
-            if isinstance(nmea_msg, pynmea2.types.talker.GSV):
+            elif sentence_type == "GSV":
                 self.GPGSV = nmea_msg
-            if isinstance(nmea_msg, pynmea2.types.talker.GSA):
+            elif sentence_type == "GSA":
                 self.GPGSA = nmea_msg
-            if isinstance(nmea_msg, pynmea2.types.talker.HDT):
+            elif sentence_type == "HDT":
                 self.GPHDT = nmea_msg
-                self.heading = nmea_msg.heading
-            if isinstance(nmea_msg, pynmea2.types.talker.HDG):
+                if nmea_msg.heading is not None:
+                    self.heading = nmea_msg.heading
+            elif sentence_type == "HDG":
                 self.GPHDG = nmea_msg
 
             self.nmea_sentences.append(msg.strip())
-        except pynmea2.nmea.ParseError as pe:
-            logging.debug("Bad NMEA String")
         except Exception as e:
             logging.debug("Error decoding NMEA msg", e)
 
@@ -180,4 +192,4 @@ class NmeaData:
         return 0.0, 0.0
 
 
-
+DatasetRegistry.register("E000011", "NmeaData", NmeaData)
@@ -0,0 +1,123 @@
+import numpy as np
+
+
+class ProfileArray(np.ndarray):
+    """
+    NumPy array of the [bin][beam] values of a profile dataset.
+
+    The dataset stores a plain NumPy array.  When the values are read from
+    the dataset, a ProfileArray view of the array is given.  The view also has
+    the list methods append(), extend() and clear(), and is TRUE if it has
+    any bins, like the list of lists the datasets used before.  The list
+    methods replace the array in the dataset, so read the attribute again
+    to get the new values.
+
+    Indexing gives the bins as ProfileArray views and the values as Python
+    numbers, like the lists.  Math on the view gives plain NumPy arrays.
+
+    ens.EarthVelocity.Velocities[bin][beam] = 1.2                   # Set a value in the dataset
+    ens.EarthVelocity.Velocities.clear()                            # Remove all the bins from the dataset
+    ens.EarthVelocity.Velocities.append([1.33, 1.45, 0.3, 0.0])     # Add a bin to the dataset
+    """
+
+    # Dataset and attribute name of the values
+    _owner = None
+    _name = None
+
+    def __array_finalize__(self, obj):
+        # Only the view given by the dataset can add or remove bins
+        self._owner = None
+        self._name = None
+
+    def __bool__(self):
+        return self.ndim > 0 and self.shape[0] > 0
+
+    def __getitem__(self, key):
+        value = self.view(np.ndarray)[key]
+        if isinstance(value, np.ndarray):
+            return value.view(ProfileArray)
+        return value.item()
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        inputs = tuple(value.view(np.ndarray) if isinstance(value, ProfileArray) else value for value in inputs)
+        if "out" in kwargs:
+            kwargs["out"] = tuple(value.view(np.ndarray) if isinstance(value, ProfileArray) else value for value in kwargs["out"])
+        return getattr(ufunc, method)(*inputs, **kwargs)
+
+    def _values(self):
+        """
+        Get the array stored in the dataset.
+        :return: Array of the dataset.
+        """
+        if self._owner is None:
+            raise TypeError("Array is not the values of a dataset.  Use a NumPy function to create a new array.")
+        return getattr(self._owner, "_" + self._name)
+
+    def append(self, value):
+        """
+        Add a bin to the end of the dataset values.
+        :param value: Values of the bin.  A value for each beam or a single value.
+        """
+        self.extend([value])
+
+    def extend(self, values):
+        """
+        Add the bins to the end of the dataset values.
+        :param values: List of the bin values.
+        """
+        current = self._values()
+        values = np.asarray(values, dtype=current.dtype).reshape((-1,) + current.shape[1:])
+        setattr(self._owner, self._name, np.concatenate((current, values)))
+
+    def clear(self):
+        """
+        Remove all the bins from the dataset values.
+        """
+        current = self._values()
+        setattr(self._owner, self._name, np.zeros((0,) + current.shape[1:], dtype=current.dtype))
+
+
+class ProfileArrayProperty:
+    """
+    Dataset attribute with the values stored in a NumPy array.
+
+    Any list or array assigned to the attribute is stored as an array of the
+    dtype.  The values are read as a ProfileArray view of the array, so they can
+    also be changed with the list methods.  The array is stored in the slot of the
+    dataset with the attribute name and a leading underscore.
+
+    class EarthVelocity:
+        __slots__ = (..., "_Velocities")
+        Velocities = ProfileArrayProperty(np.float32)
+    """
+
+    def __init__(self, dtype):
+        """
+        :param dtype: Type of the values.
+        """
+        self.dtype = np.dtype(dtype)
+        self.name = None
+        self.slot_name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.slot_name = "_" + name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+
+        values = getattr(obj, self.slot_name)
+        view = values.view(ProfileArray)
+        view._owner = obj
+        view._name = self.name
+        return view
+
+    def __set__(self, obj, value):
+        if isinstance(value, ProfileArray):
+            value = value.view(np.ndarray)
+        setattr(obj, self.slot_name, np.asarray(value, dtype=self.dtype))
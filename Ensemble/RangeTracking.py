@@ -1,4 +1,5 @@
 from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Ensemble.DatasetRegistry import DatasetRegistry
 import logging
 
 
@@ -260,3 +261,4 @@ class RangeTracking:
         return 0.0
 
 
+DatasetRegistry.register("E000015", "RangeTracking", RangeTracking)
@@ -1,4 +1,5 @@
 from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Ensemble.DatasetRegistry import DatasetRegistry, DatasetSchema
 import logging
 from pandas import DataFrame
 
@@ -9,6 +10,40 @@ class SystemSetup:
     Float values that give details about the system setup.
     """
 
+    __slots__ = ("ds_type", "num_elements", "element_multiplier", "image", "name_len", "Name",
+                 "BtSamplesPerSecond", "BtSystemFreqHz", "BtCPCE", "BtNCE", "BtRepeatN",
+                 "WpSamplesPerSecond", "WpSystemFreqHz", "WpCPCE", "WpNCE", "WpRepeatN", "WpLagSamples",
+                 "Voltage", "XmtVoltage", "BtBroadband", "BtLagLength", "BtNarrowband", "BtBeamMux",
+                 "WpBroadband", "WpLagLength", "WpTransmitBandwidth", "WpReceiveBandwidth",
+                 "TransmitBoostNegVolt", "WpBeamMux", "Reserved", "Reserved1")
+
+    # Layout of the data after the dataset header.  Newer firmware added the later groups.
+    SCHEMA = DatasetSchema([("BtSamplesPerSecond", "f"),
+                            ("BtSystemFreqHz", "f"),
+                            ("BtCPCE", "f"),
+                            ("BtNCE", "f"),
+                            ("BtRepeatN", "f"),
+                            ("WpSamplesPerSecond", "f"),
+                            ("WpSystemFreqHz", "f"),
+                            ("WpCPCE", "f"),
+                            ("WpNCE", "f"),
+                            ("WpRepeatN", "f"),
+                            ("WpLagSamples", "f"),
+                            ("Voltage", "f")],
+                           [("XmtVoltage", "f"),
+                            ("BtBroadband", "f"),
+                            ("BtLagLength", "f"),
+                            ("BtNarrowband", "f"),
+                            ("BtBeamMux", "f"),
+                            ("WpBroadband", "f"),
+                            ("WpLagLength", "f"),
+                            ("WpTransmitBandwidth", "f"),
+                            ("WpReceiveBandwidth", "f"),
+                            ("TransmitBoostNegVolt", "f"),
+                            ("WpBeamMux", "f")],
+                           [("Reserved", "f"),
+                            ("Reserved1", "f")])
+
     def __init__(self, num_elements=25, element_multiplier=1):
         self.ds_type = 10                       # Float
         self.num_elements = num_elements
@@ -49,36 +84,7 @@ class SystemSetup:
         the values.
         :param data: Bytearray for the dataset.
         """
-        packet_pointer = Ensemble.GetBaseDataSize(self.name_len)
-
-        self.BtSamplesPerSecond = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 0, Ensemble().BytesInFloat, data)
-        self.BtSystemFreqHz = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 1, Ensemble().BytesInFloat, data)
-        self.BtCPCE = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 2, Ensemble().BytesInFloat, data)
-        self.BtNCE = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 3, Ensemble().BytesInFloat, data)
-        self.BtRepeatN = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 4, Ensemble().BytesInFloat, data)
-        self.WpSamplesPerSecond = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 5, Ensemble().BytesInFloat, data)
-        self.WpSystemFreqHz = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 6, Ensemble().BytesInFloat, data)
-        self.WpCPCE = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 7, Ensemble().BytesInFloat, data)
-        self.WpNCE = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 8, Ensemble().BytesInFloat, data)
-        self.WpRepeatN = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 9, Ensemble().BytesInFloat, data)
-        self.WpLagSamples = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 10, Ensemble().BytesInFloat, data)
-        self.Voltage = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 11, Ensemble().BytesInFloat, data)
-
-        if self.num_elements > 12:
-            self.XmtVoltage = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 12, Ensemble().BytesInFloat, data)
-            self.BtBroadband = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 13, Ensemble().BytesInFloat, data)
-            self.BtLagLength = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 14, Ensemble().BytesInFloat, data)
-            self.BtNarrowband = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 15, Ensemble().BytesInFloat, data)
-            self.BtBeamMux = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 16, Ensemble().BytesInFloat, data)
-            self.WpBroadband = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 17, Ensemble().BytesInFloat, data)
-            self.WpLagLength = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 18, Ensemble().BytesInFloat, data)
-            self.WpTransmitBandwidth = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 19, Ensemble().BytesInFloat, data)
-            self.WpReceiveBandwidth = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 20, Ensemble().BytesInFloat, data)
-            self.TransmitBoostNegVolt = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 21, Ensemble().BytesInFloat, data)
-            self.WpBeamMux = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 22, Ensemble().BytesInFloat, data)
-        if self.num_elements > 23:
-            self.Reserved = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 23, Ensemble().BytesInFloat, data)
-            self.Reserved1 = Ensemble.GetFloat(packet_pointer + Ensemble().BytesInFloat * 24, Ensemble().BytesInFloat, data)
+        SystemSetup.SCHEMA.decode(self, data, self.num_elements, Ensemble.GetBaseDataSize(self.name_len))
 
         logging.debug(self.BtSamplesPerSecond)
         logging.debug(self.BtSystemFreqHz)
@@ -118,31 +124,7 @@ class SystemSetup:
                                            self.Name)
 
         # Add the data
-        result += Ensemble.float_to_bytes(self.BtSamplesPerSecond)
-        result += Ensemble.float_to_bytes(self.BtSystemFreqHz)
-        result += Ensemble.float_to_bytes(self.BtCPCE)
-        result += Ensemble.float_to_bytes(self.BtNCE)
-        result += Ensemble.float_to_bytes(self.BtRepeatN)
-        result += Ensemble.float_to_bytes(self.WpSamplesPerSecond)
-        result += Ensemble.float_to_bytes(self.WpSystemFreqHz)
-        result += Ensemble.float_to_bytes(self.WpCPCE)
-        result += Ensemble.float_to_bytes(self.WpNCE)
-        result += Ensemble.float_to_bytes(self.WpRepeatN)
-        result += Ensemble.float_to_bytes(self.WpLagSamples)
-        result += Ensemble.float_to_bytes(self.Voltage)
-        result += Ensemble.float_to_bytes(self.XmtVoltage)
-        result += Ensemble.float_to_bytes(self.BtBroadband)
-        result += Ensemble.float_to_bytes(self.BtLagLength)
-        result += Ensemble.float_to_bytes(self.BtNarrowband)
-        result += Ensemble.float_to_bytes(self.BtBeamMux)
-        result += Ensemble.float_to_bytes(self.WpBroadband)
-        result += Ensemble.float_to_bytes(self.WpLagLength)
-        result += Ensemble.float_to_bytes(self.WpTransmitBandwidth)
-        result += Ensemble.float_to_bytes(self.WpReceiveBandwidth)
-        result += Ensemble.float_to_bytes(self.TransmitBoostNegVolt)
-        result += Ensemble.float_to_bytes(self.WpBeamMux)
-        result += Ensemble.float_to_bytes(self.Reserved)
-        result += Ensemble.float_to_bytes(self.Reserved1)
+        result += SystemSetup.SCHEMA.encode(self)
 
         return result
 
@@ -180,3 +162,6 @@ class SystemSetup:
         df_earth_columns = ["dt", "type", "ss_code", "ss_config", "bin_num", "beam", "val"]
 
         return DataFrame(df_result, columns=df_earth_columns)
+
+
+DatasetRegistry.register("E000014", "SystemSetup", SystemSetup)
@@ -0,0 +1,452 @@
+import zlib
+import lzma
+import struct
+import logging
+import numpy as np
+from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Ensemble.DatasetRegistry import DatasetSchema
+from rti_python.Ensemble.BeamVelocity import BeamVelocity
+from rti_python.Ensemble.InstrumentVelocity import InstrumentVelocity
+from rti_python.Ensemble.EarthVelocity import EarthVelocity
+from rti_python.Ensemble.Amplitude import Amplitude
+from rti_python.Ensemble.Correlation import Correlation
+from rti_python.Ensemble.GoodBeam import GoodBeam
+from rti_python.Ensemble.GoodEarth import GoodEarth
+from rti_python.Ensemble.EnsembleData import EnsembleData
+from rti_python.Ensemble.AncillaryData import AncillaryData
+from rti_python.Ensemble.BottomTrack import BottomTrack
+from rti_python.Ensemble.SystemSetup import SystemSetup
+
+
+class TelemetryCodec:
+    """
+    Bandwidth optimized encoding of ensembles for telemetry links.
+
+    Ensemble_Compactor only shortens the names.  This codec reduces the
+    profile data to the resolution needed and removes the redundancy:
+
+    - Velocities are quantized to int16 at the velocity resolution (1 mm/s).
+      Amplitude and Correlation are quantized to uint8.
+    - Bad values are sent as a bitmask and not as values.
+    - The quantized values are delta encoded across the bins and against the
+      previous ensemble of the same subsystem configuration, then stored
+      in the smallest integer type that holds the deltas.
+    - The packet is compressed.
+
+    The Ensemble Data, Ancillary Data, Bottom Track and System Setup are sent
+    with their RTB layout.  Other datasets are not sent.
+
+    The encoder and decoder keep the last ensemble of each subsystem
+    configuration to delta encode against.  Every keyframe_interval ensembles
+    a keyframe is sent that does not need the previous ensemble, so the
+    decoder can start or recover after a lost packet.
+
+    encoder = TelemetryCodec()
+    packet = encoder.encode(ens)
+    decoder = TelemetryCodec()
+    ens = decoder.decode(packet)
+    """
+
+    # Header: Magic, Version and Compression
+    MAGIC = b"RTT"
+    VERSION = 1
+    HEADER = struct.Struct("<3sBB")
+
+    # Compression types
+    COMPRESS_NONE = 0
+    COMPRESS_ZLIB = 1
+    COMPRESS_LZMA = 2
+
+    # Packet: Reference ensemble number, Subsystem Code, Subsystem Config, Datasets flags, Flags, Number of profile records
+    PACKET = struct.Struct("<icBBBB")
+
+    # Profile record: Field ID, Flags, dtype code, Number of bins, Number of beams
+    RECORD = struct.Struct("<BBBHB")
+
+    # Packet and record flags
+    FLAG_TIME_DELTA = 0x01                  # Delta against the previous ensemble
+    FLAG_BIN_DELTA = 0x02                   # Delta across the bins
+
+    # Dataset flags
+    DS_ENSEMBLE_DATA = 0x01
+    DS_ANCILLARY_DATA = 0x02
+    DS_BOTTOM_TRACK = 0x04
+    DS_SYSTEM_SETUP = 0x08
+
+    # Storage types of the zigzag encoded deltas
+    DTYPES = {1: np.dtype("u1"), 2: np.dtype("<u2"), 3: np.dtype("<u4")}
+
+    # Quantization kinds: (Min quantized value, Max quantized value)
+    KIND_VEL = "vel"
+    KIND_AMP = "amp"
+    KIND_CORR = "corr"
+    KIND_COUNT = "count"
+    KIND_LIMITS = {KIND_VEL: (-32767, 32767),
+                   KIND_AMP: (0, 255),
+                   KIND_CORR: (0, 255),
+                   KIND_COUNT: (0, 65535)}
+
+    # Field ID: (Attribute Name, Value Attribute, Dataset Class, Kind)
+    PROFILE_FIELDS = {1: ("BeamVelocity", "Velocities", BeamVelocity, KIND_VEL),
+                      2: ("InstrumentVelocity", "Velocities", InstrumentVelocity, KIND_VEL),
+                      3: ("EarthVelocity", "Velocities", EarthVelocity, KIND_VEL),
+                      4: ("Amplitude", "Amplitude", Amplitude, KIND_AMP),
+                      5: ("Correlation", "Correlation", Correlation, KIND_CORR),
+                      6: ("GoodBeam", "GoodBeam", GoodBeam, KIND_COUNT),
+                      7: ("GoodEarth", "GoodEarth", GoodEarth, KIND_COUNT)}
+
+    # Profile datasets sent by default
+    # Add BeamVelocity for systems that only output Beam coordinates
+    DEFAULT_FIELDS = ["EarthVelocity", "Amplitude", "Correlation", "GoodEarth"]
+
+    def __init__(self,
+                 vel_resolution: float = 0.001,
+                 amp_resolution: float = 0.5,
+                 corr_resolution: float = 1.0 / 255.0,
+                 fields: list = None,
+                 keyframe_interval: int = 10,
+                 compression: int = COMPRESS_ZLIB):
+        """
+        Initialize the codec.  The decoder does not need the same settings,
+        the packet contains everything needed to decode it.
+        :param vel_resolution: Velocity resolution in m/s.
+        :param amp_resolution: Amplitude resolution in dB.
+        :param corr_resolution: Correlation resolution.  Correlation is 0.0 to 1.0.
+        :param fields: Profile dataset attribute names to send.  Default is DEFAULT_FIELDS.
+        :param keyframe_interval: Number of ensembles between keyframes.  1 sends only keyframes.
+        :param compression: Compression type.  COMPRESS_NONE, COMPRESS_ZLIB or COMPRESS_LZMA.
+        """
+        self.resolution = {TelemetryCodec.KIND_VEL: vel_resolution,
+                           TelemetryCodec.KIND_AMP: amp_resolution,
+                           TelemetryCodec.KIND_CORR: corr_resolution,
+                           TelemetryCodec.KIND_COUNT: 1.0}
+        self.fields = fields if fields is not None else TelemetryCodec.DEFAULT_FIELDS
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.compression = compression
+
+        # Max absolute error of each field in the last ensemble encoded
+        self.last_error = {}
+
+        # Size of the last packet encoded and the RTB ensemble
+        self.last_size = 0
+        self.last_raw_size = 0
+
+        # Subsystem Configuration: (Ensemble Number, Ensembles since keyframe, Dataset bytes, {Field ID: (Resolution, Quantized values)})
+        self._encode_state = {}
+        self._decode_state = {}
+
+    def reset(self):
+        """
+        Clear the previous ensembles.  The next ensemble of each
+        subsystem configuration is a keyframe.
+        """
+        self._encode_state = {}
+        self._decode_state = {}
+
+    def error_bounds(self):
+        """
+        Maximum error of the values in each profile field sent.
+        Values outside the range of the quantized type are clipped
+        and are not within the bound.
+        :return: Dictionary of attribute name to max absolute error.
+        """
+        bounds = {}
+        for attr_name, value_name, ds_class, kind in TelemetryCodec.PROFILE_FIELDS.values():
+            if attr_name in self.fields:
+                bounds[attr_name] = 0.0 if kind == TelemetryCodec.KIND_COUNT else self.resolution[kind] / 2.0
+
+        return bounds
+
+    @staticmethod
+    def stream_key(ens):
+        """
+        Key of the subsystem configuration of the ensemble.  The
+        ensembles are only delta encoded against the same configuration.
+        :param ens: Ensemble.
+        :return: (Subsystem Code byte, Subsystem Config)
+        """
+        if ens.IsEnsembleData:
+            ss_code = str(ens.EnsembleData.SysFirmwareSubsystemCode).encode("UTF-8")[:1]
+            return ss_code.ljust(1, b"\0"), int(ens.EnsembleData.SubsystemConfig) & 0xff
+
+        return b"\0", 0
+
+    def encode(self, ens) -> bytes:
+        """
+        Encode the ensemble into a telemetry packet.
+        :param ens: Ensemble to encode.
+        :return: Telemetry packet.
+        """
+        key = TelemetryCodec.stream_key(ens)
+        ens_num = ens.EnsembleData.EnsembleNumber if ens.IsEnsembleData else -1
+
+        # Use the previous ensemble unless a keyframe is needed
+        prev_num, since_keyframe, prev_meta, prev_fields = self._encode_state.get(key, (-1, 0, b"", {}))
+        if since_keyframe + 1 >= self.keyframe_interval or prev_num < 0:
+            prev_num, since_keyframe, prev_meta, prev_fields = -1, -1, b"", {}
+
+        ds_flags = 0
+        meta = bytearray()
+        if ens.IsEnsembleData:
+            ds_flags |= TelemetryCodec.DS_ENSEMBLE_DATA
+            meta += EnsembleData.SCHEMA.encode(ens.EnsembleData)
+        if ens.IsAncillaryData:
+            ds_flags |= TelemetryCodec.DS_ANCILLARY_DATA
+            meta += AncillaryData.SCHEMA.encode(ens.AncillaryData)
+        if ens.IsSystemSetup:
+            ds_flags |= TelemetryCodec.DS_SYSTEM_SETUP
+            meta += SystemSetup.SCHEMA.encode(ens.SystemSetup)
+        if ens.IsBottomTrack and TelemetryCodec.is_bt_complete(ens.BottomTrack):
+            ds_flags |= TelemetryCodec.DS_BOTTOM_TRACK
+            meta += BottomTrack.SCHEMA.encode(ens.BottomTrack)
+            meta += DatasetSchema.encode_beams(ens.BottomTrack, BottomTrack.BEAM_FIELDS)
+
+        # XOR against the previous ensemble, so the values that did not change are 0
+        packet_flags = 0
+        body = bytearray(meta)
+        if len(prev_meta) == len(meta) and len(meta) > 0:
+            packet_flags |= TelemetryCodec.FLAG_TIME_DELTA
+            body = bytearray(np.bitwise_xor(np.frombuffer(meta, dtype=np.uint8), np.frombuffer(prev_meta, dtype=np.uint8)).tobytes())
+
+        self.last_error = {}
+        num_records = 0
+        fields = {}
+        for field_id, (attr_name, value_name, ds_class, kind) in TelemetryCodec.PROFILE_FIELDS.items():
+            if attr_name not in self.fields or not getattr(ens, "Is" + attr_name, False):
+                continue
+
+            values = np.asarray(getattr(getattr(ens, attr_name), value_name), dtype=float)
+            if values.ndim != 2 or values.size == 0:
+                continue
+
+            resolution = self.resolution[kind]
+            quantized, bad = self.quantize(values, kind)
+            fields[field_id] = (resolution, quantized)
+
+            good = ~bad
+            if np.any(good):
+                self.last_error[attr_name] = float(np.max(np.abs(quantized[good] * resolution - values[good])))
+            else:
+                self.last_error[attr_name] = 0.0
+
+            # Delta against the previous ensemble if it has the same shape and resolution
+            candidates = {0: quantized}
+            prev = prev_fields.get(field_id)
+            if prev is not None and prev[0] == resolution and prev[1].shape == quantized.shape:
+                candidates[TelemetryCodec.FLAG_TIME_DELTA] = quantized - prev[1]
+
+            # Delta across the bins
+            for flags in list(candidates.keys()):
+                candidates[flags | TelemetryCodec.FLAG_BIN_DELTA] = np.diff(candidates[flags], axis=0, prepend=0)
+
+            # Noisy data is smaller without the deltas, so use the smallest
+            flags = min(candidates, key=lambda flag: TelemetryCodec.estimate_size(candidates[flag]))
+
+            dtype_code, data = TelemetryCodec.pack_deltas(candidates[flags])
+            body += TelemetryCodec.RECORD.pack(field_id, flags, dtype_code, values.shape[0], values.shape[1])
+            body += struct.pack("<d", resolution)
+            body += np.packbits(bad, axis=None).tobytes()
+            body += data
+            num_records += 1
+
+        packet = TelemetryCodec.PACKET.pack(prev_num, key[0], key[1], ds_flags, packet_flags, num_records) + body
+
+        if self.compression == TelemetryCodec.COMPRESS_ZLIB:
+            # Raw deflate without the zlib header and checksum
+            compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+            packet = compressor.compress(packet) + compressor.flush()
+        elif self.compression == TelemetryCodec.COMPRESS_LZMA:
+            packet = lzma.compress(packet, format=lzma.FORMAT_RAW, filters=[{"id": lzma.FILTER_LZMA2, "preset": 9}])
+
+        self._encode_state[key] = (ens_num, since_keyframe + 1, bytes(meta), fields)
+
+        result = TelemetryCodec.HEADER.pack(TelemetryCodec.MAGIC, TelemetryCodec.VERSION, self.compression) + packet
+        self.last_size = len(result)
+        self.last_raw_size = len(ens.RawData) if ens.RawData is not None else 0
+        return result
+
+    def decode(self, data):
+        """
+        Decode a telemetry packet into an ensemble.
+        If the packet is delta encoded and the previous ensemble was
+        not decoded, the ensemble can not be decoded.
+        :param data: Telemetry packet.
+        :return: Ensemble or None if the previous ensemble is missing.
+        """
+        if len(data) < TelemetryCodec.HEADER.size:
+            raise ValueError("Telemetry packet too short")
+
+        magic, version, compression = TelemetryCodec.HEADER.unpack_from(data, 0)
+        if magic != TelemetryCodec.MAGIC:
+            raise ValueError("Not a telemetry packet")
+        if version > TelemetryCodec.VERSION:
+            raise ValueError("Telemetry packet version " + str(version) + " is not supported")
+
+        packet = bytes(data[TelemetryCodec.HEADER.size:])
+        try:
+            if compression == TelemetryCodec.COMPRESS_ZLIB:
+                packet = zlib.decompress(packet, -15)
+            elif compression == TelemetryCodec.COMPRESS_LZMA:
+                packet = lzma.decompress(packet, format=lzma.FORMAT_RAW, filters=[{"id": lzma.FILTER_LZMA2}])
+            elif compression != TelemetryCodec.COMPRESS_NONE:
+                raise ValueError("Unknown compression " + str(compression))
+        except (zlib.error, lzma.LZMAError) as e:
+            raise ValueError("Telemetry packet can not be decompressed.  " + str(e))
+
+        try:
+            return self.decode_packet(packet)
+        except struct.error as e:
+            raise ValueError("Telemetry packet is truncated.  " + str(e))
+
+    def decode_packet(self, packet):
+        """
+        Decode the decompressed packet.
+        :param packet: Decompressed packet.
+        :return: Ensemble or None if the previous ensemble is missing.
+        """
+        ref_num, ss_code, ss_config, ds_flags, packet_flags, num_records = TelemetryCodec.PACKET.unpack_from(packet, 0)
+        pos = TelemetryCodec.PACKET.size
+
+        key = (ss_code, ss_config)
+        prev_num, _, prev_meta, prev_fields = self._decode_state.get(key, (-1, 0, b"", {}))
+        has_prev = ref_num >= 0 and prev_num == ref_num
+        if (packet_flags & TelemetryCodec.FLAG_TIME_DELTA) and not has_prev:
+            logging.warning("Telemetry packet needs ensemble " + str(ref_num) + " which was not decoded")
+            return None
+
+        # Undo the XOR against the previous ensemble
+        meta = packet[pos:]
+        if packet_flags & TelemetryCodec.FLAG_TIME_DELTA:
+            if pos + len(prev_meta) > len(packet):
+                raise ValueError("Telemetry packet is truncated")
+            meta = np.bitwise_xor(np.frombuffer(packet, dtype=np.uint8, count=len(prev_meta), offset=pos),
+                                  np.frombuffer(prev_meta, dtype=np.uint8)).tobytes()
+
+        ens = Ensemble()
+        meta_pos = 0
+        if ds_flags & TelemetryCodec.DS_ENSEMBLE_DATA:
+            ds = EnsembleData()
+            meta_pos = EnsembleData.SCHEMA.decode(ds, meta, offset=meta_pos)
+            ens.AddEnsembleData(ds)
+        if ds_flags & TelemetryCodec.DS_ANCILLARY_DATA:
+            ds = AncillaryData()
+            meta_pos = AncillaryData.SCHEMA.decode(ds, meta, offset=meta_pos)
+            ens.AddAncillaryData(ds)
+        if ds_flags & TelemetryCodec.DS_SYSTEM_SETUP:
+            ds = SystemSetup()
+            meta_pos = SystemSetup.SCHEMA.decode(ds, meta, offset=meta_pos)
+            ens.AddSystemSetup(ds)
+        if ds_flags & TelemetryCodec.DS_BOTTOM_TRACK:
+            ds = BottomTrack()
+            meta_pos = BottomTrack.SCHEMA.decode(ds, meta, offset=meta_pos)
+            meta_pos = DatasetSchema.decode_beams(ds, meta, meta_pos, BottomTrack.BEAM_FIELDS, int(ds.NumBeams))
+            ens.AddBottomTrack(ds)
+
+        if meta_pos > len(meta):
+            raise ValueError("Telemetry packet is truncated")
+        meta = bytes(meta[:meta_pos])
+        pos += meta_pos
+
+        fields = {}
+        for _ in range(num_records):
+            field_id, flags, dtype_code, num_bins, num_beams = TelemetryCodec.RECORD.unpack_from(packet, pos)
+            pos += TelemetryCodec.RECORD.size
+            resolution = struct.unpack_from("<d", packet, pos)[0]
+            pos += 8
+
+            count = num_bins * num_beams
+            mask_size = (count + 7) // 8
+            dtype = TelemetryCodec.DTYPES.get(dtype_code)
+            if dtype is None:
+                raise ValueError("Unknown delta type " + str(dtype_code))
+            if pos + mask_size + count * dtype.itemsize > len(packet):
+                raise ValueError("Telemetry packet is truncated")
+
+            bad = np.unpackbits(np.frombuffer(packet, dtype=np.uint8, count=mask_size, offset=pos), count=count).astype(bool)
+            pos += mask_size
+
+            zigzag = np.frombuffer(packet, dtype=dtype, count=count, offset=pos).astype(np.int64)
+            pos += count * dtype.itemsize
+
+            # Undo the zigzag and the delta across the bins
+            quantized = ((zigzag >> 1) ^ -(zigzag & 1)).reshape(num_bins, num_beams)
+            if flags & TelemetryCodec.FLAG_BIN_DELTA:
+                quantized = np.cumsum(quantized, axis=0)
+
+            # Undo the delta against the previous ensemble
+            if flags & TelemetryCodec.FLAG_TIME_DELTA:
+                prev = prev_fields.get(field_id)
+                if not has_prev or prev is None or prev[1].shape != quantized.shape:
+                    logging.warning("Telemetry packet needs ensemble " + str(ref_num) + " which was not decoded")
+                    return None
+                quantized = quantized + prev[1]
+
+            fields[field_id] = (resolution, quantized)
+
+            field_info = TelemetryCodec.PROFILE_FIELDS.get(field_id)
+            if field_info is None:
+                logging.debug("Unknown telemetry field " + str(field_id))
+                continue
+
+            attr_name, value_name, ds_class, kind = field_info
+            values = quantized * resolution
+            values[bad.reshape(num_bins, num_beams)] = Ensemble.BadVelocity
+
+            ds = ds_class(num_bins, num_beams)
+            setattr(ds, value_name, values)
+            ens.AddDataSet(attr_name, ds)
+
+        ens_num = ens.EnsembleData.EnsembleNumber if ens.IsEnsembleData else -1
+        self._decode_state[key] = (ens_num, 0, meta, fields)
+
+        return ens
+
+    def quantize(self, values, kind):
+        """
+        Quantize the values.  Bad values are set to 0.
+        :param values: [bin][beam] values.
+        :param kind: Quantization kind.
+        :return: Quantized values and the bad value mask.
+        """
+        bad = Ensemble.is_bad_velocity_array(values) | ~np.isfinite(values)
+        low, high = TelemetryCodec.KIND_LIMITS[kind]
+        with np.errstate(invalid="ignore"):
+            quantized = np.clip(np.rint(values / self.resolution[kind]), low, high)
+        quantized[bad] = 0
+
+        return quantized.astype(np.int64), bad
+
+    @staticmethod
+    def estimate_size(deltas):
+        """
+        Estimate the number of bits to store the deltas.
+        :param deltas: Integer deltas.
+        :return: Estimated number of bits.
+        """
+        return float(np.sum(np.log2(np.abs(deltas) + 1.0)))
+
+    @staticmethod
+    def pack_deltas(deltas):
+        """
+        Zigzag encode the deltas so small negative values are small,
+        then store them in the smallest type that holds all the values.
+        :param deltas: Integer deltas.
+        :return: dtype code and the bytes of the values.
+        """
+        zigzag = (deltas << 1) ^ (deltas >> 63)
+        max_value = int(zigzag.max()) if zigzag.size > 0 else 0
+        for dtype_code, dtype in TelemetryCodec.DTYPES.items():
+            if max_value <= np.iinfo(dtype).max:
+                return dtype_code, zigzag.astype(dtype).tobytes()
+
+        raise ValueError("Telemetry deltas are too large")
+
+    @staticmethod
+    def is_bt_complete(bt):
+        """
+        Check the Bottom Track has all the per beam values.
+        :param bt: Bottom Track dataset.
+        :return: TRUE if all the per beam values are given.
+        """
+        num_beams = int(bt.NumBeams)
+        return all(len(getattr(bt, name)) == num_beams for name in BottomTrack.BEAM_FIELDS)
@@ -0,0 +1,471 @@
+import logging
+import numpy as np
+from threading import Lock
+from rti_python.Ensemble.Ensemble import Ensemble
+
+
+class RunningStats:
+    """
+    Running mean, standard deviation, min and max for every element of an array.
+    This uses the Welford update, so the values do not need to be stored.
+    Two accumulators can be merged, so the statistics can be computed in parallel.
+
+    Bad values are given as NaN and are not included.  The array grows if a
+    larger array is added.
+    """
+
+    def __init__(self, shape=(0, 0)):
+        """
+        Initialize the statistics.
+        :param shape: Shape of the arrays.  [bin][beam]
+        """
+        self.count = np.zeros(shape, dtype=np.int64)
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)                       # Sum of squares of the differences from the mean
+        self.min = np.full(shape, np.inf)
+        self.max = np.full(shape, -np.inf)
+
+    @property
+    def shape(self):
+        return self.count.shape
+
+    def resize(self, shape):
+        """
+        Grow the arrays to the given shape.  The arrays never shrink.
+        :param shape: New shape.
+        """
+        shape = tuple(max(old, new) for old, new in zip(self.shape, shape))
+        if shape == self.shape:
+            return
+
+        pad = [(0, new - old) for old, new in zip(self.shape, shape)]
+        self.count = np.pad(self.count, pad)
+        self.mean = np.pad(self.mean, pad)
+        self.m2 = np.pad(self.m2, pad)
+        self.min = np.pad(self.min, pad, constant_values=np.inf)
+        self.max = np.pad(self.max, pad, constant_values=-np.inf)
+
+    def update(self, values):
+        """
+        Add the values to the statistics.
+        :param values: Array of values.  NaN values are not included.
+        """
+        values = fit_shape(np.asarray(values, dtype=np.float64), self.shape)
+        self.resize(values.shape)
+
+        good = ~np.isnan(values)
+        values = np.where(good, values, 0.0)
+
+        self.count += good
+        delta = values - self.mean
+        self.mean += np.where(good, delta / np.maximum(self.count, 1), 0.0)
+        self.m2 += np.where(good, delta * (values - self.mean), 0.0)
+        self.min = np.where(good, np.minimum(self.min, values), self.min)
+        self.max = np.where(good, np.maximum(self.max, values), self.max)
+
+    def merge(self, other):
+        """
+        Merge the statistics of the other accumulator into this one.
+        :param other: Other running statistics.
+        """
+        self.resize(other.shape)
+        other_count = fit_shape(other.count, self.shape, 0)
+        other_mean = fit_shape(other.mean, self.shape, 0.0)
+        other_m2 = fit_shape(other.m2, self.shape, 0.0)
+
+        total = self.count + other_count
+        safe_total = np.maximum(total, 1)
+        delta = other_mean - self.mean
+
+        self.mean = self.mean + (delta * other_count / safe_total)
+        self.m2 = self.m2 + other_m2 + (delta * delta * self.count * other_count / safe_total)
+        self.count = total
+        self.min = np.minimum(self.min, fit_shape(other.min, self.shape, np.inf))
+        self.max = np.maximum(self.max, fit_shape(other.max, self.shape, -np.inf))
+
+    def variance(self):
+        """
+        Sample variance.  NaN if there are less than 2 values.
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.count > 1, self.m2 / np.maximum(self.count - 1, 1), np.nan)
+
+    def std(self):
+        """
+        Sample standard deviation.  NaN if there are less than 2 values.
+        """
+        return np.sqrt(self.variance())
+
+    def get_mean(self):
+        """
+        Mean value.  NaN if there are no values.
+        """
+        return np.where(self.count > 0, self.mean, np.nan)
+
+    def get_min(self):
+        """
+        Minimum value.  NaN if there are no values.
+        """
+        return np.where(self.count > 0, self.min, np.nan)
+
+    def get_max(self):
+        """
+        Maximum value.  NaN if there are no values.
+        """
+        return np.where(self.count > 0, self.max, np.nan)
+
+
+class QuantileSketch:
+    """
+    Approximate quantiles for every element of an array.
+
+    The values are counted in fixed width buckets between low and high,
+    so the memory does not grow with the number of values.  Values outside
+    the range are counted in the first and last bucket.  The quantile is accurate
+    to the bucket width.  Sketches with the same range and buckets
+    are merged by adding the counts.
+    """
+
+    def __init__(self, shape=(0, 0), low: float = -10.0, high: float = 10.0, num_buckets: int = 1000):
+        """
+        Initialize the sketch.
+        :param shape: Shape of the arrays.  [bin][beam]
+        :param low: Lowest value of the buckets.
+        :param high: Highest value of the buckets.
+        :param num_buckets: Number of buckets.
+        """
+        self.low = float(low)
+        self.high = float(high)
+        self.num_buckets = int(num_buckets)
+        self.counts = np.zeros(tuple(shape) + (self.num_buckets,), dtype=np.int64)
+
+    @property
+    def shape(self):
+        return self.counts.shape[:-1]
+
+    @property
+    def bucket_width(self) -> float:
+        return (self.high - self.low) / self.num_buckets
+
+    def resize(self, shape):
+        """
+        Grow the counts to the given shape.  The counts never shrink.
+        :param shape: New shape.
+        """
+        shape = tuple(max(old, new) for old, new in zip(self.shape, shape))
+        if shape == self.shape:
+            return
+
+        pad = [(0, new - old) for old, new in zip(self.shape, shape)] + [(0, 0)]
+        self.counts = np.pad(self.counts, pad)
+
+    def update(self, values):
+        """
+        Add the values to the sketch.
+        :param values: Array of values.  NaN values are not included.
+        """
+        values = fit_shape(np.asarray(values, dtype=np.float64), self.shape)
+        self.resize(values.shape)
+
+        good = ~np.isnan(values)
+        if not np.any(good):
+            return
+
+        bucket = np.clip(np.floor((values[good] - self.low) / self.bucket_width), 0, self.num_buckets - 1).astype(np.int64)
+        element = np.flatnonzero(good)
+
+        # Count all the values at once.  Each element has one value per update, so the
+        # indexes are unique.  Use np.add.at() if an update can count an element twice.
+        self.counts.reshape(-1)[element * self.num_buckets + bucket] += 1
+
+    def merge(self, other):
+        """
+        Merge the counts of the other sketch into this one.
+        :param other: Other sketch with the same range and buckets.
+        """
+        if other.low != self.low or other.high != self.high or other.num_buckets != self.num_buckets:
+            raise ValueError("Quantile sketches must have the same range and buckets to merge.")
+
+        self.resize(other.shape)
+        pad = [(0, new - old) for old, new in zip(other.shape, self.shape)] + [(0, 0)]
+        self.counts += np.pad(other.counts, pad)
+
+    def quantile(self, q, min_value=None, max_value=None):
+        """
+        Get the approximate quantile for every element.
+        :param q: Quantile from 0.0 to 1.0.
+        :param min_value: Exact minimum values to limit the result.
+        :param max_value: Exact maximum values to limit the result.
+        :return: Array of quantiles.  NaN if there are no values.
+        """
+        total = self.counts.sum(axis=-1)
+        cum_counts = np.cumsum(self.counts, axis=-1)
+        target = q * total
+
+        # First bucket that reaches the target
+        bucket = np.argmax(cum_counts >= target[..., np.newaxis], axis=-1)
+        bucket_count = np.take_along_axis(self.counts, bucket[..., np.newaxis], axis=-1)[..., 0]
+        prev_count = np.take_along_axis(cum_counts, bucket[..., np.newaxis], axis=-1)[..., 0] - bucket_count
+
+        # Interpolate within the bucket
+        with np.errstate(invalid="ignore", divide="ignore"):
+            fraction = np.where(bucket_count > 0, (target - prev_count) / bucket_count, 0.0)
+        result = self.low + (bucket + fraction) * self.bucket_width
+
+        if min_value is not None:
+            result = np.maximum(result, min_value)
+        if max_value is not None:
+            result = np.minimum(result, max_value)
+
+        return np.where(total > 0, result, np.nan)
+
+
+class DatasetStats:
+    """
+    Running statistics and quantile sketch for a dataset.
+    """
+
+    def __init__(self, low: float, high: float, num_buckets: int):
+        self.stats = RunningStats()
+        self.sketch = QuantileSketch(low=low, high=high, num_buckets=num_buckets)
+
+    def update(self, values):
+        """
+        Add the [bin][beam] values.
+        :param values: Values.  Bad values are NaN.
+        """
+        self.stats.update(values)
+        self.sketch.update(values)
+
+    def merge(self, other):
+        """
+        Merge the other dataset statistics.
+        :param other: Other dataset statistics.
+        """
+        self.stats.merge(other.stats)
+        self.sketch.merge(other.sketch)
+
+    def results(self, quantiles=(0.05, 0.25, 0.5, 0.75, 0.95)):
+        """
+        Get the statistics.
+        :param quantiles: Quantiles to calculate.
+        :return: Dictionary of [bin][beam] arrays.
+        """
+        min_value = self.stats.get_min()
+        max_value = self.stats.get_max()
+        result = {"count": self.stats.count.copy(),
+                  "mean": self.stats.get_mean(),
+                  "std": self.stats.std(),
+                  "min": min_value,
+                  "max": max_value}
+        for q in quantiles:
+            result["p{:g}".format(q * 100)] = self.sketch.quantile(q, min_value, max_value)
+
+        return result
+
+
+class EnsembleStats:
+    """
+    Per bin and per beam statistics of a deployment.
+
+    The statistics are updated as each ensemble is received, so the
+    memory does not grow with the length of the deployment.  Each file can be
+    processed separately, even in different processes, and merged.  The statistics
+    can be saved and loaded to continue later.
+
+    stats = EnsembleStats()
+    reader.ensemble_event += lambda sender, ens: stats.add_ens(ens)
+    reader.playback(file_path)
+    stats.save("deployment_stats.npz")
+    results = stats.results()
+    results[EnsembleStats.EARTH_VELOCITY]["p50"]
+    """
+
+    # Snapshot format version
+    VERSION = 1
+
+    # Datasets
+    BEAM_VELOCITY = "BeamVelocity"
+    INSTRUMENT_VELOCITY = "InstrumentVelocity"
+    EARTH_VELOCITY = "EarthVelocity"
+    AMPLITUDE = "Amplitude"
+    CORRELATION = "Correlation"
+
+    # Default sketch range for each dataset.  (Low, High, Buckets)
+    DEFAULT_RANGES = {BEAM_VELOCITY: (-10.0, 10.0, 2000),
+                      INSTRUMENT_VELOCITY: (-10.0, 10.0, 2000),
+                      EARTH_VELOCITY: (-10.0, 10.0, 2000),
+                      AMPLITUDE: (0.0, 140.0, 1400),
+                      CORRELATION: (0.0, 1.0, 200)}
+
+    # Velocity datasets use Bad Velocity for bad values
+    VELOCITY_DATASETS = [BEAM_VELOCITY, INSTRUMENT_VELOCITY, EARTH_VELOCITY]
+
+    def __init__(self, ss_code=None, ss_config=None, ranges: dict = None):
+        """
+        Initialize the statistics.
+        :param ss_code: Only use ensembles with this subsystem code.  None uses all the ensembles.
+        :param ss_config: Only use ensembles with this subsystem configuration.  None uses all the ensembles.
+        :param ranges: Sketch range for each dataset.  Dictionary of dataset name to (Low, High, Buckets).
+        """
+        self.ss_code = ss_code
+        self.ss_config = ss_config
+        self.ranges = dict(EnsembleStats.DEFAULT_RANGES)
+        if ranges:
+            self.ranges.update(ranges)
+
+        self.datasets = {name: DatasetStats(*dataset_range) for name, dataset_range in self.ranges.items()}
+        self.num_ens = 0
+        self.first_ens_num = None
+        self.last_ens_num = None
+
+        self.thread_lock = Lock()
+
+    def add_ens(self, ens):
+        """
+        Add the ensemble data to the statistics.
+        :param ens: Ensemble.
+        """
+        if ens.IsEnsembleData:
+            if self.ss_code is not None and ens.EnsembleData.SysFirmwareSubsystemCode != self.ss_code:
+                return
+            if self.ss_config is not None and ens.EnsembleData.SubsystemConfig != self.ss_config:
+                return
+
+        with self.thread_lock:
+            try:
+                if ens.IsBeamVelocity:
+                    self.update(self.BEAM_VELOCITY, ens.BeamVelocity.Velocities)
+                if ens.IsInstrumentVelocity:
+                    self.update(self.INSTRUMENT_VELOCITY, ens.InstrumentVelocity.Velocities)
+                if ens.IsEarthVelocity:
+                    self.update(self.EARTH_VELOCITY, ens.EarthVelocity.Velocities)
+                if ens.IsAmplitude:
+                    self.update(self.AMPLITUDE, ens.Amplitude.Amplitude)
+                if ens.IsCorrelation:
+                    self.update(self.CORRELATION, ens.Correlation.Correlation)
+
+                self.num_ens += 1
+                if ens.IsEnsembleData:
+                    if self.first_ens_num is None:
+                        self.first_ens_num = ens.EnsembleData.EnsembleNumber
+                    self.last_ens_num = ens.EnsembleData.EnsembleNumber
+            except Exception as e:
+                logging.error("Error adding ensemble to the statistics.  " + str(e))
+
+    def update(self, name: str, values):
+        """
+        Add the [bin][beam] values to the dataset statistics.
+        Bad velocities are not included.
+        :param name: Dataset name.
+        :param values: [bin][beam] values.
+        """
+        values = np.array(values, dtype=np.float64)
+        if values.ndim != 2:
+            return
+
+        if name in self.VELOCITY_DATASETS:
+            values[Ensemble.is_bad_velocity_array(values)] = np.nan
+
+        self.datasets[name].update(values)
+
+    def merge(self, other):
+        """
+        Merge the statistics from another file or process.
+        :param other: Other ensemble statistics.
+        """
+        with self.thread_lock:
+            for name, dataset in other.datasets.items():
+                if name in self.datasets:
+                    self.datasets[name].merge(dataset)
+
+            self.num_ens += other.num_ens
+            if other.first_ens_num is not None:
+                self.first_ens_num = other.first_ens_num if self.first_ens_num is None else min(self.first_ens_num, other.first_ens_num)
+                self.last_ens_num = other.last_ens_num if self.last_ens_num is None else max(self.last_ens_num, other.last_ens_num)
+
+    def results(self, quantiles=(0.05, 0.25, 0.5, 0.75, 0.95)) -> dict:
+        """
+        Get the statistics for each dataset.
+        :param quantiles: Quantiles to calculate.  The keys are p5, p25, p50...
+        :return: Dictionary of dataset name to a dictionary of [bin][beam] arrays.
+        """
+        with self.thread_lock:
+            return {name: dataset.results(quantiles) for name, dataset in self.datasets.items()}
+
+    def save(self, file_path: str):
+        """
+        Save a snapshot of the statistics.
+        :param file_path: File path.  Numpy .npz file.
+        """
+        arrays = {"version": np.array(self.VERSION),
+                  "ss_code": np.array("" if self.ss_code is None else str(self.ss_code)),
+                  "ss_config": np.array(-1 if self.ss_config is None else self.ss_config),
+                  "num_ens": np.array(self.num_ens),
+                  "first_ens_num": np.array(-1 if self.first_ens_num is None else self.first_ens_num),
+                  "last_ens_num": np.array(-1 if self.last_ens_num is None else self.last_ens_num)}
+
+        with self.thread_lock:
+            for name, dataset in self.datasets.items():
+                arrays[name + "/range"] = np.array([dataset.sketch.low, dataset.sketch.high, dataset.sketch.num_buckets])
+                arrays[name + "/count"] = dataset.stats.count
+                arrays[name + "/mean"] = dataset.stats.mean
+                arrays[name + "/m2"] = dataset.stats.m2
+                arrays[name + "/min"] = dataset.stats.min
+                arrays[name + "/max"] = dataset.stats.max
+                arrays[name + "/sketch"] = dataset.sketch.counts
+
+        with open(file_path, "wb") as f:
+            np.savez_compressed(f, **arrays)
+
+    @staticmethod
+    def load(file_path: str):
+        """
+        Load a snapshot of the statistics.
+        :param file_path: File path.
+        :return: Ensemble statistics.
+        """
+        with np.load(file_path, allow_pickle=False) as snapshot:
+            version = int(snapshot["version"])
+            if version > EnsembleStats.VERSION:
+                raise ValueError("Statistics snapshot version " + str(version) + " is not supported.")
+
+            names = sorted({key.split("/")[0] for key in snapshot.files if "/" in key})
+            ranges = {}
+            for name in names:
+                low, high, num_buckets = snapshot[name + "/range"]
+                ranges[name] = (float(low), float(high), int(num_buckets))
+
+            ss_code = str(snapshot["ss_code"])
+            ss_config = int(snapshot["ss_config"])
+            stats = EnsembleStats(ss_code if ss_code else None, ss_config if ss_config >= 0 else None, ranges)
+            stats.num_ens = int(snapshot["num_ens"])
+            stats.first_ens_num = int(snapshot["first_ens_num"]) if int(snapshot["first_ens_num"]) >= 0 else None
+            stats.last_ens_num = int(snapshot["last_ens_num"]) if int(snapshot["last_ens_num"]) >= 0 else None
+
+            for name in names:
+                dataset = stats.datasets[name]
+                dataset.stats.count = snapshot[name + "/count"]
+                dataset.stats.mean = snapshot[name + "/mean"]
+                dataset.stats.m2 = snapshot[name + "/m2"]
+                dataset.stats.min = snapshot[name + "/min"]
+                dataset.stats.max = snapshot[name + "/max"]
+                dataset.sketch.counts = snapshot[name + "/sketch"]
+
+        return stats
+
+
+def fit_shape(values, shape, fill_value=np.nan):
+    """
+    Pad the array to the shape.  The array is not cut if it is larger.
+    :param values: Array.
+    :param shape: Shape to pad to.
+    :param fill_value: Value for the padding.
+    :return: Padded array.
+    """
+    values = np.asarray(values)
+    pad = [(0, max(0, new - old)) for old, new in zip(values.shape, shape)]
+    if not any(after for _, after in pad):
+        return values
+
+    return np.pad(values, pad, constant_values=fill_value)
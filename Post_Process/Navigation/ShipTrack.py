@@ -0,0 +1,298 @@
+import math
+import logging
+import numpy as np
+from rti_python.Ensemble.Ensemble import Ensemble
+
+
+class NavigationResult:
+    """
+    Ship track results.  Each value is an array with a value for each ensemble.
+    The tracks are in meters East and North of the start of the transect.
+    """
+
+    def __init__(self, num_ens: int):
+        self.elapsed_time = np.zeros(num_ens)               # Seconds since the first ensemble
+        self.bt_east = np.zeros(num_ens)                    # Bottom Track ship track East
+        self.bt_north = np.zeros(num_ens)                   # Bottom Track ship track North
+        self.bt_dmg = np.zeros(num_ens)                     # Bottom Track distance made good
+        self.bt_cmg = np.zeros(num_ens)                     # Bottom Track course made good in degrees
+        self.bt_path_length = np.zeros(num_ens)             # Bottom Track distance traveled
+        self.gps_east = np.full(num_ens, np.nan)            # GPS ship track East
+        self.gps_north = np.full(num_ens, np.nan)           # GPS ship track North
+        self.gps_dmg = np.full(num_ens, np.nan)             # GPS distance made good
+        self.gps_cmg = np.full(num_ens, np.nan)             # GPS course made good in degrees
+        self.gps_path_length = np.full(num_ens, np.nan)     # GPS distance traveled
+
+    @property
+    def num_ens(self) -> int:
+        return len(self.elapsed_time)
+
+    def track_diff(self):
+        """
+        Difference between the GPS and the Bottom Track ship track.
+        :return: East, North and distance difference for each ensemble.
+        """
+        diff_east = self.gps_east - self.bt_east
+        diff_north = self.gps_north - self.bt_north
+        return diff_east, diff_north, np.hypot(diff_east, diff_north)
+
+    def moving_bed_velocity(self):
+        """
+        Moving bed velocity from the difference between the GPS and Bottom Track
+        position at the end of the transect.  A moving bed biases the Bottom Track
+        ship track upstream, so the bed velocity is GPS - BT over the elapsed time.
+        :return: Speed in m/s and direction in degrees.  NaN if it can not be calculated.
+        """
+        diff_east, diff_north, _ = self.track_diff()
+        good = np.isfinite(diff_east) & np.isfinite(diff_north) & (self.elapsed_time > 0.0)
+        if not np.any(good):
+            return np.nan, np.nan
+
+        last = np.flatnonzero(good)[-1]
+        bed_east = diff_east[last] / self.elapsed_time[last]
+        bed_north = diff_north[last] / self.elapsed_time[last]
+
+        return math.hypot(bed_east, bed_north), float(ShipTrack.course(bed_east, bed_north))
+
+
+class ShipTrack:
+    """
+    Vectorized navigation for a transect.
+
+    The ship track, distance made good and course made good are calculated
+    for all the ensembles at once from the Bottom Track Earth velocity, the
+    ensemble times and the GPS positions.  GPS positions are converted to meters
+    with a local East North Up approximation of the WGS84 ellipsoid around the
+    first good position.  This is accurate to a few centimeters over the
+    length of a river transect.
+
+    The Bottom Track Earth velocity is the vessel velocity.
+
+    result = ShipTrack.from_ensembles(ens_list)
+    result.bt_dmg[-1]           # Distance made good at the end of the transect
+    """
+
+    # WGS84 Ellipsoid
+    WGS84_A = 6378137.0
+    WGS84_E2 = 6.69437999014E-3
+
+    @staticmethod
+    def calculate(bt_east, bt_north, times, latitude=None, longitude=None, interpolate_bad=True) -> NavigationResult:
+        """
+        Calculate the Bottom Track and GPS ship track.
+        :param bt_east: Bottom Track East velocity for each ensemble in m/s.
+        :param bt_north: Bottom Track North velocity for each ensemble in m/s.
+        :param times: Time of each ensemble in seconds.
+        :param latitude: GPS latitude for each ensemble in degrees or None.
+        :param longitude: GPS longitude for each ensemble in degrees or None.
+        :param interpolate_bad: Interpolate bad Bottom Track velocities from the good velocities.  If FALSE, bad velocities do not move the ship.
+        :return: Navigation results.
+        """
+        times = np.asarray(times, dtype=float)
+        num_ens = len(times)
+        result = NavigationResult(num_ens)
+        if num_ens == 0:
+            return result
+
+        result.elapsed_time = times - times[0]
+
+        # Time each ensemble covers
+        delta_time = np.diff(times, prepend=times[0])
+
+        # Bottom Track ship track
+        bt_east = ShipTrack.screen_velocity(bt_east, times, interpolate_bad)
+        bt_north = ShipTrack.screen_velocity(bt_north, times, interpolate_bad)
+        result.bt_east = np.cumsum(bt_east * delta_time)
+        result.bt_north = np.cumsum(bt_north * delta_time)
+        result.bt_dmg, result.bt_cmg, result.bt_path_length = ShipTrack.made_good(result.bt_east, result.bt_north)
+
+        # GPS ship track
+        if latitude is not None and longitude is not None:
+            result.gps_east, result.gps_north = ShipTrack.gps_track(latitude, longitude)
+            result.gps_dmg, result.gps_cmg, result.gps_path_length = ShipTrack.made_good(result.gps_east, result.gps_north)
+
+        return result
+
+    @staticmethod
+    def from_ensembles(ens_list: list, interpolate_bad=True) -> NavigationResult:
+        """
+        Calculate the ship track for the ensembles.
+        The GPS positions are taken from the NMEA data if available.
+        :param ens_list: List of ensembles in the transect.
+        :param interpolate_bad: Interpolate bad Bottom Track velocities from the good velocities.
+        :return: Navigation results.
+        """
+        num_ens = len(ens_list)
+        bt_vel = np.full((num_ens, 2), np.nan)
+        times = np.zeros(num_ens)
+        latitude = np.full(num_ens, np.nan)
+        longitude = np.full(num_ens, np.nan)
+
+        for index, ens in enumerate(ens_list):
+            try:
+                if ens.IsEnsembleData:
+                    times[index] = ens.EnsembleData.datetime().timestamp()
+                if ens.IsBottomTrack and len(ens.BottomTrack.EarthVelocity) >= 2:
+                    bt_vel[index] = ens.BottomTrack.EarthVelocity[0:2]
+                if ens.IsNmeaData and ens.NmeaData.GPGGA:
+                    latitude[index] = ens.NmeaData.latitude
+                    longitude[index] = ens.NmeaData.longitude
+            except Exception as e:
+                logging.error("Error getting the navigation data from the ensemble.  " + str(e))
+
+        if np.all(np.isnan(latitude)):
+            latitude = longitude = None
+
+        return ShipTrack.calculate(bt_vel[:, 0], bt_vel[:, 1], times, latitude, longitude, interpolate_bad)
+
+    @staticmethod
+    def screen_velocity(vel, times, interpolate_bad=True):
+        """
+        Replace the bad velocities.
+        :param vel: Velocity for each ensemble.
+        :param times: Time of each ensemble in seconds.
+        :param interpolate_bad: Interpolate from the good velocities.  If FALSE, bad velocities are set to 0.
+        :return: Velocities with no bad values.
+        """
+        vel = np.array(vel, dtype=float)
+        good = ShipTrack.is_good_velocity(vel)
+        if interpolate_bad and np.any(good):
+            vel[~good] = np.interp(times[~good], times[good], vel[good])
+        else:
+            vel[~good] = 0.0
+
+        return vel
+
+    @staticmethod
+    def is_good_velocity(vel):
+        """
+        Check for bad velocities.
+        :param vel: Velocity array.
+        :return: Boolean array, TRUE if the velocity is good.
+        """
+        vel = np.asarray(vel, dtype=float)
+        return np.isfinite(vel) & ~Ensemble.is_bad_velocity_array(vel)
+
+    @staticmethod
+    def made_good(east, north):
+        """
+        Distance made good, course made good and the distance traveled along the track.
+        :param east: Ship track East in meters.
+        :param north: Ship track North in meters.
+        :return: Distance made good, course made good in degrees and distance traveled.
+        """
+        east = np.asarray(east, dtype=float)
+        north = np.asarray(north, dtype=float)
+
+        dmg = np.hypot(east, north)
+        cmg = ShipTrack.course(east, north)
+
+        # Skip the bad GPS positions when adding up the distance traveled
+        good = np.isfinite(dmg)
+        path_length = np.full(len(dmg), np.nan)
+        good_east = east[good]
+        good_north = north[good]
+        segment = np.hypot(np.diff(good_east, prepend=good_east[0:1]), np.diff(good_north, prepend=good_north[0:1]))
+        path_length[good] = np.cumsum(segment)
+
+        return dmg, cmg, path_length
+
+    @staticmethod
+    def course(east, north):
+        """
+        Direction of the East and North components.
+        :param east: East component.
+        :param north: North component.
+        :return: Direction in degrees from 0 to 360.
+        """
+        return np.mod(np.degrees(np.arctan2(east, north)), 360.0)
+
+    @staticmethod
+    def gps_track(latitude, longitude):
+        """
+        Convert the GPS positions to meters East and North of the first good position.
+        :param latitude: Latitude in degrees.
+        :param longitude: Longitude in degrees.
+        :return: East and North in meters.  NaN for bad positions.
+        """
+        latitude = np.asarray(latitude, dtype=float)
+        longitude = np.asarray(longitude, dtype=float)
+
+        # 0.0 is used for no position
+        good = np.isfinite(latitude) & np.isfinite(longitude) & ((latitude != 0.0) | (longitude != 0.0))
+        if not np.any(good):
+            return np.full(len(latitude), np.nan), np.full(len(latitude), np.nan)
+
+        first = np.argmax(good)
+        east, north = ShipTrack.latlon_to_enu(latitude, longitude, latitude[first], longitude[first])
+        east[~good] = np.nan
+        north[~good] = np.nan
+
+        return east, north
+
+    @staticmethod
+    def latlon_to_enu(latitude, longitude, ref_latitude: float, ref_longitude: float):
+        """
+        Convert the positions to meters East and North of the reference position.
+        This uses the WGS84 radius of curvature at the reference latitude.
+        :param latitude: Latitude in degrees.
+        :param longitude: Longitude in degrees.
+        :param ref_latitude: Reference latitude in degrees.
+        :param ref_longitude: Reference longitude in degrees.
+        :return: East and North in meters.
+        """
+        meridian_radius, normal_radius = ShipTrack.earth_radius(ref_latitude)
+        delta_lon = (np.asarray(longitude, dtype=float) - ref_longitude + 180.0) % 360.0 - 180.0
+        east = np.radians(delta_lon) * normal_radius * math.cos(math.radians(ref_latitude))
+        north = np.radians(np.asarray(latitude, dtype=float) - ref_latitude) * meridian_radius
+
+        return east, north
+
+    @staticmethod
+    def enu_to_latlon(east, north, ref_latitude: float, ref_longitude: float):
+        """
+        Convert meters East and North of the reference position to positions.
+        :param east: East in meters.
+        :param north: North in meters.
+        :param ref_latitude: Reference latitude in degrees.
+        :param ref_longitude: Reference longitude in degrees.
+        :return: Latitude and Longitude in degrees.
+        """
+        meridian_radius, normal_radius = ShipTrack.earth_radius(ref_latitude)
+        latitude = ref_latitude + np.degrees(np.asarray(north, dtype=float) / meridian_radius)
+        longitude = ref_longitude + np.degrees(np.asarray(east, dtype=float) / (normal_radius * math.cos(math.radians(ref_latitude))))
+
+        return latitude, longitude
+
+    @staticmethod
+    def earth_radius(latitude: float):
+        """
+        WGS84 radius of curvature at the latitude.
+        :param latitude: Latitude in degrees.
+        :return: Meridian (North South) and prime vertical (East West) radius in meters.
+        """
+        sin_lat = math.sin(math.radians(latitude))
+        w = 1.0 - ShipTrack.WGS84_E2 * sin_lat * sin_lat
+        meridian_radius = ShipTrack.WGS84_A * (1.0 - ShipTrack.WGS84_E2) / (w ** 1.5)
+        normal_radius = ShipTrack.WGS84_A / math.sqrt(w)
+
+        return meridian_radius, normal_radius
+
+    @staticmethod
+    def align_gps(ens_times, gps_times, latitude, longitude):
+        """
+        Interpolate the GPS positions to the ensemble times.
+        Use this when the GPS fixes are not recorded with the ensembles.
+        :param ens_times: Time of each ensemble in seconds.
+        :param gps_times: Time of each GPS fix in seconds.
+        :param latitude: GPS latitude for each fix.
+        :param longitude: GPS longitude for each fix.
+        :return: Latitude and Longitude at each ensemble time.  NaN outside the GPS times.
+        """
+        ens_times = np.asarray(ens_times, dtype=float)
+        gps_times = np.asarray(gps_times, dtype=float)
+        order = np.argsort(gps_times)
+        lat = np.interp(ens_times, gps_times[order], np.asarray(latitude, dtype=float)[order], left=np.nan, right=np.nan)
+        lon = np.interp(ens_times, gps_times[order], np.asarray(longitude, dtype=float)[order], left=np.nan, right=np.nan)
+
+        return lat, lon
@@ -0,0 +1,278 @@
+import math
+import numpy as np
+from rti_python.Ensemble.Ensemble import Ensemble
+
+
+class ScreeningThresholds:
+    """
+    Thresholds used to screen the data.
+    A threshold set to None is not used.
+    The defaults match Ensemble.is_good_bin().
+    """
+
+    def __init__(self,
+                 min_amp: float = 0.25,
+                 min_corr: float = 0.10,
+                 screen_bad_vel: bool = True,
+                 max_error_vel: float = None,
+                 min_percent_good: float = None,
+                 max_bad_beams: int = 1,
+                 side_lobe: bool = False,
+                 beam_angle: float = 20.0,
+                 pulse_length: float = 0.0):
+        self.min_amp = min_amp                              # Minimum amplitude in dB
+        self.min_corr = min_corr                            # Minimum correlation.  0.0 to 1.0
+        self.screen_bad_vel = screen_bad_vel                # Screen for Bad Velocity
+        self.max_error_vel = max_error_vel                  # Maximum absolute error velocity in m/s
+        self.min_percent_good = min_percent_good            # Minimum percent of good pings.  0 to 100
+        self.max_bad_beams = max_bad_beams                  # Maximum number of bad beams in a good bin
+        self.side_lobe = side_lobe                          # Screen the bins in the bottom side lobe
+        self.beam_angle = beam_angle                        # Beam angle in degrees for the side lobe
+        self.pulse_length = pulse_length                    # Pulse length in meters for the side lobe
+
+
+class ScreeningData:
+    """
+    Stacked data for all the ensembles to screen.
+
+    Profile arrays are [ens][bin][beam] and Bottom Track Range is [ens][beam].
+    Ensembles with fewer bins or beams are padded with NaN.  Missing
+    datasets are all NaN, so they are not screened.
+    """
+
+    def __init__(self, num_ens: int, num_bins: int, num_beams: int):
+        self.first_bin_range = np.full(num_ens, np.nan)                 # First bin range in meters
+        self.bin_size = np.full(num_ens, np.nan)                        # Bin size in meters
+        self.velocity = np.full((num_ens, num_bins, num_beams), np.nan)
+        self.amplitude = np.full((num_ens, num_bins, num_beams), np.nan)
+        self.correlation = np.full((num_ens, num_bins, num_beams), np.nan)
+        self.percent_good = np.full((num_ens, num_bins, num_beams), np.nan)
+        self.bt_range = np.full((num_ens, num_beams), np.nan)
+
+    @staticmethod
+    def from_ensembles(ens_list: list, use_beam_vel: bool = False):
+        """
+        Stack the data from the ensembles.
+        :param ens_list: List of ensembles.
+        :param use_beam_vel: Screen the Beam Velocity instead of the Earth Velocity.
+        :return: Screening data.
+        """
+        def vel_ds(ens):
+            if use_beam_vel:
+                return ens.BeamVelocity if ens.IsBeamVelocity else None
+            return ens.EarthVelocity if ens.IsEarthVelocity else None
+
+        max_bins = 0
+        max_beams = 0
+        for ens in ens_list:
+            ds = vel_ds(ens)
+            if ds is not None:
+                max_bins = max(max_bins, ds.num_elements)
+                max_beams = max(max_beams, ds.element_multiplier)
+
+        data = ScreeningData(len(ens_list), max_bins, max_beams)
+        for index, ens in enumerate(ens_list):
+            ds = vel_ds(ens)
+            if ds is None:
+                continue
+
+            ScreeningData.copy_profile(data.velocity[index], ds.Velocities)
+            if ens.IsAmplitude:
+                ScreeningData.copy_profile(data.amplitude[index], ens.Amplitude.Amplitude)
+            if ens.IsCorrelation:
+                ScreeningData.copy_profile(data.correlation[index], ens.Correlation.Correlation)
+
+            # Percent of pings that were good
+            good_ds = None
+            if use_beam_vel and ens.IsGoodBeam:
+                good_ds = ens.GoodBeam.GoodBeam
+            elif not use_beam_vel and ens.IsGoodEarth:
+                good_ds = ens.GoodEarth.GoodEarth
+            if good_ds is not None and ens.IsEnsembleData and ens.EnsembleData.ActualPingCount > 0:
+                good_pings = np.asarray(good_ds, dtype=float)
+                ScreeningData.copy_profile(data.percent_good[index], good_pings * 100.0 / ens.EnsembleData.ActualPingCount)
+
+            if ens.IsAncillaryData:
+                data.first_bin_range[index] = ens.AncillaryData.FirstBinRange
+                data.bin_size[index] = ens.AncillaryData.BinSize
+            if ens.IsBottomTrack:
+                bt_range = np.asarray(ens.BottomTrack.Range, dtype=float)[:max_beams]
+                data.bt_range[index, :len(bt_range)] = bt_range
+
+        return data
+
+    @staticmethod
+    def copy_profile(dest, values):
+        """
+        Copy the profile data into the padded array.
+        :param dest: Padded [bin][beam] array.
+        :param values: [bin][beam] values.
+        """
+        values = np.asarray(values, dtype=float)
+        if values.ndim == 2 and values.size > 0:
+            num_bins = min(values.shape[0], dest.shape[0])
+            num_beams = min(values.shape[1], dest.shape[1])
+            dest[:num_bins, :num_beams] = values[:num_bins, :num_beams]
+
+
+class ScreeningMask:
+    """
+    Good data masks for all the ensembles.  TRUE is good data.
+
+    The beam masks are [ens][bin][beam] and the bin masks are [ens][bin].
+    The masks can be shared by the averaging, discharge, export and QA
+    so the data is only screened once.
+    """
+
+    def __init__(self, num_ens: int, num_bins: int, num_beams: int):
+        shape = (num_ens, num_bins, num_beams)
+        self.amplitude = np.ones(shape, dtype=bool)                     # Amplitude above the minimum
+        self.correlation = np.ones(shape, dtype=bool)                   # Correlation above the minimum
+        self.velocity = np.ones(shape, dtype=bool)                      # Velocity is not Bad Velocity
+        self.percent_good = np.ones(shape, dtype=bool)                  # Percent good above the minimum
+        self.error_velocity = np.ones(shape[0:2], dtype=bool)           # Error velocity below the maximum
+        self.side_lobe = np.ones(shape[0:2], dtype=bool)                # Bin above the bottom side lobe
+        self.bin = np.ones(shape[0:2], dtype=bool)                      # All the checks pass for the bin
+        self.beam = np.ones(shape, dtype=bool)                          # Beam is good and the bin is good
+
+    @property
+    def shape(self):
+        return self.beam.shape
+
+    def good_bin(self, ens_index: int, bin_num: int) -> bool:
+        """
+        Same as Ensemble.is_good_bin() for the ensemble.
+        :param ens_index: Ensemble index in the mask.
+        :param bin_num: Bin Number.
+        :return: TRUE if the bin is good.
+        """
+        if ens_index >= self.bin.shape[0] or bin_num >= self.bin.shape[1]:
+            return False
+
+        return bool(self.bin[ens_index, bin_num])
+
+    def apply(self, values, bad_value=Ensemble.BadVelocity, per_beam: bool = False):
+        """
+        Mark the bad data in the values.
+        :param values: [ens][bin][beam] or [ens][bin] values.
+        :param bad_value: Value to set for bad data.
+        :param per_beam: Use the beam mask.  Otherwise the whole bin is marked bad.
+        :return: New array with the bad data replaced.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        num_ens, num_bins = values.shape[0:2]
+        if values.ndim == 3 and per_beam:
+            mask = self.beam[:num_ens, :num_bins, :values.shape[2]]
+        elif values.ndim == 3:
+            mask = self.bin[:num_ens, :num_bins, np.newaxis]
+        else:
+            mask = self.bin[:num_ens, :num_bins]
+
+        return np.where(mask, values, bad_value)
+
+    def percent_good_bins(self) -> float:
+        """
+        Percent of all the bins that are good.
+        :return: Percent good from 0 to 100.
+        """
+        if self.bin.size == 0:
+            return 0.0
+
+        return 100.0 * np.count_nonzero(self.bin) / self.bin.size
+
+
+class Screening:
+    """
+    Screen all the ensembles at once.
+
+    The checks are done on the stacked arrays, so the whole deployment
+    is screened in one call instead of one bin at a time.
+
+    mask = Screening.screen_ensembles(ens_list, ScreeningThresholds(min_corr=0.5, max_error_vel=0.5))
+    earth_vel = mask.apply(ScreeningData.from_ensembles(ens_list).velocity)
+    """
+
+    @staticmethod
+    def screen(data: ScreeningData, thresholds: ScreeningThresholds = None) -> ScreeningMask:
+        """
+        Create the good data masks.
+        :param data: Stacked data for all the ensembles.
+        :param thresholds: Thresholds to screen with.
+        :return: Good data masks.
+        """
+        if thresholds is None:
+            thresholds = ScreeningThresholds()
+
+        num_ens, num_bins, num_beams = data.velocity.shape
+        mask = ScreeningMask(num_ens, num_bins, num_beams)
+
+        # Beam checks.  NaN is missing data and is not screened
+        if thresholds.min_amp is not None:
+            mask.amplitude = ~(data.amplitude < thresholds.min_amp)
+        if thresholds.min_corr is not None:
+            mask.correlation = ~(data.correlation < thresholds.min_corr)
+        if thresholds.screen_bad_vel:
+            mask.velocity = ~Ensemble.is_bad_velocity_array(data.velocity)
+        if thresholds.min_percent_good is not None:
+            mask.percent_good = ~(data.percent_good < thresholds.min_percent_good)
+
+        # Error velocity is the 4th beam of the Earth and Instrument velocity
+        if thresholds.max_error_vel is not None and num_beams >= 4:
+            error_vel = data.velocity[:, :, 3]
+            mask.error_velocity = ~((np.abs(error_vel) > thresholds.max_error_vel) & ~Ensemble.is_bad_velocity_array(error_vel))
+
+        if thresholds.side_lobe:
+            mask.side_lobe = Screening.side_lobe_mask(data, thresholds.beam_angle, thresholds.pulse_length)
+
+        # A bin is good if each check has no more than the max bad beams
+        max_bad = thresholds.max_bad_beams
+        mask.bin = (np.count_nonzero(~mask.amplitude, axis=2) <= max_bad) & \
+                   (np.count_nonzero(~mask.correlation, axis=2) <= max_bad) & \
+                   (np.count_nonzero(~mask.velocity, axis=2) <= max_bad) & \
+                   (np.count_nonzero(~mask.percent_good, axis=2) <= max_bad) & \
+                   mask.error_velocity & \
+                   mask.side_lobe
+
+        mask.beam = mask.amplitude & mask.correlation & mask.velocity & mask.percent_good & mask.bin[:, :, np.newaxis]
+
+        return mask
+
+    @staticmethod
+    def screen_ensembles(ens_list: list, thresholds: ScreeningThresholds = None, use_beam_vel: bool = False) -> ScreeningMask:
+        """
+        Stack the ensembles and create the good data masks.
+        :param ens_list: List of ensembles.
+        :param thresholds: Thresholds to screen with.
+        :param use_beam_vel: Screen the Beam Velocity instead of the Earth Velocity.
+        :return: Good data masks.
+        """
+        return Screening.screen(ScreeningData.from_ensembles(ens_list, use_beam_vel), thresholds)
+
+    @staticmethod
+    def side_lobe_mask(data: ScreeningData, beam_angle: float = 20.0, pulse_length: float = 0.0):
+        """
+        Screen the bins in the bottom side lobe.  The side lobe reflects off the bottom
+        before the beam reaches the bottom, so the bins near the bottom are contaminated.
+        The shallowest good Bottom Track range is used.  If there is no good Bottom
+        Track range, the bins are not screened.
+        :param data: Stacked data for all the ensembles.
+        :param beam_angle: Beam angle in degrees.
+        :param pulse_length: Pulse length in meters.
+        :return: [ens][bin] mask, TRUE if the bin is above the side lobe.
+        """
+        num_ens, num_bins = data.velocity.shape[0:2]
+
+        bt_range = np.where((data.bt_range > 0.0) & ~Ensemble.is_bad_velocity_array(data.bt_range), data.bt_range, np.nan)
+        has_range = np.any(~np.isnan(bt_range), axis=1)
+        min_range = np.nanmin(np.where(has_range[:, np.newaxis], bt_range, 0.0), axis=1)
+
+        # Same cutoff as the discharge calculation
+        cutoff = min_range * math.cos(math.radians(beam_angle)) - np.maximum(pulse_length / 2.0, data.bin_size / 2.0)
+        bin_depth = data.first_bin_range[:, np.newaxis] + data.bin_size[:, np.newaxis] * np.arange(num_bins)
+
+        # Missing Ancillary data is not screened
+        good = bin_depth < cutoff[:, np.newaxis]
+        good |= ~has_range[:, np.newaxis]
+        good |= np.isnan(bin_depth)
+
+        return good
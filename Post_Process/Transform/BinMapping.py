@@ -0,0 +1,337 @@
+import math
+import logging
+import numpy as np
+from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Post_Process.Transform.CoordinateTransform import CoordinateTransform
+
+
+class BinMapping:
+    """
+    Sound speed correction and bin mapping for whole deployments.
+
+    The ADCP uses the speed of sound to calculate the velocities and the
+    cell positions.  If the salinity or temperature was wrong, the velocities
+    and cell positions are scaled by the ratio of the corrected speed of sound
+    to the speed of sound used by the ADCP.
+
+    When the ADCP is tilted, the same bin in each beam is at a different depth.
+    Bin mapping interpolates each beam onto common level layers, so the beams
+    are combined from the same depth when transformed.
+
+    All the methods work on stacked arrays with a value for each ensemble,
+    so a whole deployment is corrected in one pass.
+
+    Correct the salinity of all the ensembles and map the bins:
+    BinMapping.correct_ensembles(ens_list, salinity=0.0)
+    """
+
+    @staticmethod
+    def speed_of_sound(temperature, salinity, depth):
+        """
+        Calculate the speed of sound in water using the Mackenzie equation.
+        :param temperature: Water temperature in degrees Celsius.
+        :param salinity: Salinity in PPT.
+        :param depth: Depth in meters.
+        :return: Speed of sound in m/s.  A value for each value given.
+        """
+        t = np.asarray(temperature, dtype=np.float64)
+        s = np.asarray(salinity, dtype=np.float64) - 35.0
+        d = np.asarray(depth, dtype=np.float64)
+
+        return (1448.96 + (4.591 * t) - (5.304e-2 * t**2) + (2.374e-4 * t**3)
+                + (1.340 * s)
+                + (1.630e-2 * d) + (1.675e-7 * d**2)
+                - (1.025e-2 * t * s) - (7.139e-13 * t * d**3))
+
+    @staticmethod
+    def sound_speed_ratio(recorded_sos, corrected_sos):
+        """
+        Ratio to scale the velocities and cell positions.
+        If the recorded speed of sound is not valid, the ratio is 1.
+        :param recorded_sos: Speed of sound used by the ADCP in m/s.
+        :param corrected_sos: Corrected speed of sound in m/s.
+        :return: Ratio of corrected to recorded speed of sound.
+        """
+        recorded_sos, corrected_sos = np.broadcast_arrays(np.asarray(recorded_sos, dtype=np.float64),
+                                                          np.asarray(corrected_sos, dtype=np.float64))
+        valid = np.isfinite(recorded_sos) & np.isfinite(corrected_sos) & (recorded_sos > 0.0) & (corrected_sos > 0.0)
+
+        return np.where(valid, corrected_sos / np.where(valid, recorded_sos, 1.0), 1.0)
+
+    @staticmethod
+    def scale_velocity(vel, ratio):
+        """
+        Scale the velocities by the sound speed ratio.  Bad velocities are not changed.
+        :param vel: [ens][bin][beam] Velocity array.
+        :param ratio: Sound speed ratio.  A value for each ensemble or a single value.
+        :return: New scaled velocity array.
+        """
+        vel = np.array(vel, dtype=np.float64)
+        ratio = np.asarray(ratio, dtype=np.float64)
+        ratio = ratio.reshape(ratio.shape + (1,) * (vel.ndim - ratio.ndim))
+
+        return np.where(CoordinateTransform.is_bad(vel), vel, vel * ratio)
+
+    @staticmethod
+    def bin_depths(blank, bin_size, num_bins: int, ratio=1.0):
+        """
+        Depth of each bin for a level ADCP.  This is Ensemble.get_bin_depth_list()
+        for each ensemble, scaled by the sound speed ratio.
+        :param blank: Blank or first bin position in meters.  A value for each ensemble or a single value.
+        :param bin_size: Bin size in meters.  A value for each ensemble or a single value.
+        :param num_bins: Number of bins.
+        :param ratio: Sound speed ratio.  A value for each ensemble or a single value.
+        :return: [ens][bin] Depth of each bin in meters.
+        """
+        blank, bin_size, ratio = np.broadcast_arrays(np.atleast_1d(np.asarray(blank, dtype=np.float64)),
+                                                     np.atleast_1d(np.asarray(bin_size, dtype=np.float64)),
+                                                     np.atleast_1d(np.asarray(ratio, dtype=np.float64)))
+
+        return ratio[:, np.newaxis] * (blank[:, np.newaxis] + bin_size[:, np.newaxis] * np.arange(num_bins))
+
+    @staticmethod
+    def beam_depth_factor(pitch, roll, beam_angle: float = CoordinateTransform.DEFAULT_BEAM_ANGLE):
+        """
+        Vertical distance along each beam for each meter of level depth.
+        A level ADCP has a factor of 1 for all the beams.
+        This works for upward and downward looking ADCPs.
+        :param pitch: Pitch in degrees.  A value for each ensemble.
+        :param roll: Roll in degrees.  A value for each ensemble.
+        :param beam_angle: Beam angle in degrees.
+        :return: [ens][beam] Depth factor for each beam.
+        """
+        # Beam directions in the instrument frame
+        # These match the beam pairs in CoordinateTransform.beam_matrix()
+        sin_a = math.sin(math.radians(beam_angle))
+        cos_a = math.cos(math.radians(beam_angle))
+        beam_dir = np.array([[-sin_a, 0.0, -cos_a],
+                             [sin_a, 0.0, -cos_a],
+                             [0.0, -sin_a, -cos_a],
+                             [0.0, sin_a, -cos_a]])
+
+        # Vertical component of each beam
+        # The heading does not change the vertical component
+        rot = CoordinateTransform.rotation_matrix(0.0, np.atleast_1d(pitch), np.atleast_1d(roll))
+        vertical = np.abs(np.einsum("ej,bj->eb", rot[:, 2, :], beam_dir))
+
+        return vertical / cos_a
+
+    @staticmethod
+    def beam_cell_depths(blank, bin_size, num_bins: int, pitch, roll,
+                         beam_angle: float = CoordinateTransform.DEFAULT_BEAM_ANGLE,
+                         ratio=1.0):
+        """
+        Depth of each bin in each beam for a tilted ADCP.
+        :param blank: Blank or first bin position in meters.  A value for each ensemble or a single value.
+        :param bin_size: Bin size in meters.  A value for each ensemble or a single value.
+        :param num_bins: Number of bins.
+        :param pitch: Pitch in degrees.  A value for each ensemble.
+        :param roll: Roll in degrees.  A value for each ensemble.
+        :param beam_angle: Beam angle in degrees.
+        :param ratio: Sound speed ratio.  A value for each ensemble or a single value.
+        :return: [ens][bin][beam] Depth of each bin in meters.
+        """
+        level_depths = BinMapping.bin_depths(blank, bin_size, num_bins, ratio)
+        factor = BinMapping.beam_depth_factor(pitch, roll, beam_angle)
+
+        return level_depths[:, :, np.newaxis] * factor[:, np.newaxis, :]
+
+    @staticmethod
+    def map_to_layers(beam_vel, blank, bin_size, pitch, roll,
+                      beam_angle: float = CoordinateTransform.DEFAULT_BEAM_ANGLE,
+                      ratio=1.0,
+                      layer_depths=None,
+                      nearest: bool = False):
+        """
+        Map the beam velocities onto level layers.  The bins in each beam
+        are interpolated to the layer depths.  Layers outside the beam or next
+        to a bad bin are marked bad.
+        :param beam_vel: [ens][bin][beam] Beam velocity array with 4 beams.
+        :param blank: Blank or first bin position in meters.  A value for each ensemble or a single value.
+        :param bin_size: Bin size in meters.  A value for each ensemble or a single value.
+        :param pitch: Pitch in degrees.  A value for each ensemble.
+        :param roll: Roll in degrees.  A value for each ensemble.
+        :param beam_angle: Beam angle in degrees.
+        :param ratio: Sound speed ratio.  A value for each ensemble or a single value.
+        :param layer_depths: [layer] or [ens][layer] Layer depths in meters.  Default is the level bin depths.
+        :param nearest: Use the nearest bin instead of linear interpolation.
+        :return: [ens][layer][beam] Beam velocity array.
+        """
+        beam_vel = np.asarray(beam_vel, dtype=np.float64)
+        num_ens, num_bins, num_beams = beam_vel.shape
+        if num_beams != 4:
+            raise ValueError("Bin mapping requires 4 beams.  Found " + str(num_beams))
+
+        blank, bin_size, ratio = np.broadcast_arrays(np.atleast_1d(np.asarray(blank, dtype=np.float64)),
+                                                     np.atleast_1d(np.asarray(bin_size, dtype=np.float64)),
+                                                     np.atleast_1d(np.asarray(ratio, dtype=np.float64)))
+        blank, bin_size, ratio = (np.broadcast_to(blank, num_ens), np.broadcast_to(bin_size, num_ens),
+                                  np.broadcast_to(ratio, num_ens))
+
+        if layer_depths is None:
+            layer_depths = BinMapping.bin_depths(blank, bin_size, num_bins, ratio)
+        layer_depths = np.broadcast_to(np.atleast_2d(np.asarray(layer_depths, dtype=np.float64)),
+                                       (num_ens, np.shape(layer_depths)[-1]))
+
+        # Fractional bin in each beam at the layer depth
+        factor = BinMapping.beam_depth_factor(pitch, roll, beam_angle) * ratio[:, np.newaxis]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            bin_index = ((layer_depths[:, :, np.newaxis] / factor[:, np.newaxis, :]) - blank[:, np.newaxis, np.newaxis]) \
+                        / bin_size[:, np.newaxis, np.newaxis]
+
+        # Small tolerance so the layers at the first and last bin are used
+        in_range = np.isfinite(bin_index) & (bin_index > -1e-6) & (bin_index < (num_bins - 1) + 1e-6)
+        bin_index = np.clip(np.where(in_range, bin_index, 0.0), 0.0, max(num_bins - 1, 0))
+
+        if num_bins == 0:
+            return np.full(layer_depths.shape + (num_beams,), Ensemble.BadVelocity)
+
+        bad = CoordinateTransform.is_bad(beam_vel)
+        vel = np.where(bad, 0.0, beam_vel)
+
+        if nearest:
+            index = np.rint(bin_index).astype(int)
+            mapped = np.take_along_axis(vel, index, axis=1)
+            mapped_bad = np.take_along_axis(bad, index, axis=1)
+        else:
+            lower = np.floor(bin_index).astype(int)
+            upper = np.minimum(lower + 1, num_bins - 1)
+            weight = bin_index - lower
+
+            mapped = (np.take_along_axis(vel, lower, axis=1) * (1.0 - weight)) + \
+                     (np.take_along_axis(vel, upper, axis=1) * weight)
+
+            # Only use the bins that are part of the result
+            mapped_bad = (np.take_along_axis(bad, lower, axis=1) & (weight < 1.0 - 1e-9)) | \
+                         (np.take_along_axis(bad, upper, axis=1) & (weight > 1e-9))
+
+        return np.where(in_range & ~mapped_bad, mapped, Ensemble.BadVelocity)
+
+    @staticmethod
+    def corrected_sound_speed(ens_list: list, salinity=None, temperature=None, sos=None):
+        """
+        Get the recorded and corrected speed of sound for each ensemble.
+        If the speed of sound is given, it is used.  Otherwise the speed of sound
+        is calculated with the corrected salinity and temperature.  If the salinity or
+        temperature is not given, the recorded value is used.
+        :param ens_list: List of ensembles.
+        :param salinity: Corrected salinity in PPT.  A value for each ensemble or a single value.
+        :param temperature: Corrected water temperature in degrees Celsius.  A value for each ensemble or a single value.
+        :param sos: Measured speed of sound in m/s.  A value for each ensemble or a single value.
+        :return: Recorded and corrected speed of sound arrays.  NaN if the ensemble has no Ancillary Data.
+        """
+        num_ens = len(ens_list)
+        recorded_sos = np.full(num_ens, np.nan)
+        recorded_temp = np.full(num_ens, np.nan)
+        recorded_salinity = np.full(num_ens, np.nan)
+        xdcr_depth = np.full(num_ens, np.nan)
+
+        for index, ens in enumerate(ens_list):
+            if ens.IsAncillaryData:
+                recorded_sos[index] = ens.AncillaryData.SpeedOfSound
+                recorded_temp[index] = ens.AncillaryData.WaterTemp
+                recorded_salinity[index] = ens.AncillaryData.Salinity
+                xdcr_depth[index] = ens.AncillaryData.TransducerDepth
+
+        if sos is not None:
+            corrected_sos = np.broadcast_to(np.asarray(sos, dtype=np.float64), num_ens)
+        else:
+            if salinity is None:
+                salinity = recorded_salinity
+            if temperature is None:
+                temperature = recorded_temp
+            corrected_sos = BinMapping.speed_of_sound(np.broadcast_to(temperature, num_ens),
+                                                      np.broadcast_to(salinity, num_ens),
+                                                      np.maximum(xdcr_depth, 0.0))
+
+        corrected_sos = np.where(np.isnan(recorded_sos), np.nan, corrected_sos)
+
+        return recorded_sos, corrected_sos
+
+    @staticmethod
+    def correct_ensembles(ens_list: list,
+                          salinity=None,
+                          temperature=None,
+                          sos=None,
+                          beam_angle: float = CoordinateTransform.DEFAULT_BEAM_ANGLE,
+                          map_bins: bool = True,
+                          nearest: bool = False,
+                          heading_offset: float = 0.0,
+                          mag_decl: float = 0.0):
+        """
+        Correct the speed of sound for all the ensembles.
+
+        The Beam, Instrument and Earth velocities are scaled by the sound speed ratio.
+        The blank and bin size are scaled, and the corrected speed of sound, salinity and
+        temperature are stored in the Ancillary Data.
+
+        If map_bins is set, the Beam velocities are mapped to level layers and the
+        Instrument and Earth velocities are recalculated from the mapped Beam velocities.
+        Only 4 beam ensembles are mapped.
+
+        :param ens_list: List of ensembles.
+        :param salinity: Corrected salinity in PPT.  A value for each ensemble or a single value.
+        :param temperature: Corrected water temperature in degrees Celsius.  A value for each ensemble or a single value.
+        :param sos: Measured speed of sound in m/s.  A value for each ensemble or a single value.
+        :param beam_angle: Beam angle in degrees.
+        :param map_bins: Map the Beam velocities to level layers.
+        :param nearest: Use the nearest bin instead of linear interpolation when mapping.
+        :param heading_offset: Heading offset in degrees used to recalculate the Earth velocities.
+        :param mag_decl: Magnetic declination in degrees used to recalculate the Earth velocities.
+        :return: Sound speed ratio for each ensemble.
+        """
+        if not ens_list:
+            return np.zeros(0)
+
+        recorded_sos, corrected_sos = BinMapping.corrected_sound_speed(ens_list, salinity, temperature, sos)
+        ratio = BinMapping.sound_speed_ratio(recorded_sos, corrected_sos)
+
+        # Stack all the data
+        beam_vel, heading, pitch, roll = CoordinateTransform.stack_ensembles(ens_list)
+        blank = np.array([ens.AncillaryData.FirstBinRange if ens.IsAncillaryData else np.nan for ens in ens_list])
+        bin_size = np.array([ens.AncillaryData.BinSize if ens.IsAncillaryData else np.nan for ens in ens_list])
+
+        # Map the scaled beam velocities
+        # Ensembles without 4 beams or Ancillary Data are all bad and are not changed
+        mapped_vel = None
+        if map_bins and beam_vel.size:
+            beam_vel = BinMapping.scale_velocity(beam_vel, ratio)
+            mapped_vel = BinMapping.map_to_layers(beam_vel, blank, bin_size, pitch, roll, beam_angle, ratio, nearest=nearest)
+            inst_vel, earth_vel = CoordinateTransform.beam_to_earth(mapped_vel, heading, pitch, roll,
+                                                                    beam_angle, heading_offset, mag_decl)
+
+        for index, ens in enumerate(ens_list):
+            if not ens.IsAncillaryData or np.isnan(recorded_sos[index]):
+                continue
+
+            try:
+                if mapped_vel is not None and not np.isnan(heading[index]):
+                    num_bins = ens.BeamVelocity.num_elements
+                    ens.BeamVelocity.Velocities = mapped_vel[index, :num_bins].copy()
+                    if ens.IsInstrumentVelocity:
+                        ens.InstrumentVelocity.Velocities = inst_vel[index, :num_bins].copy()
+                    if ens.IsEarthVelocity:
+                        ens.EarthVelocity.Velocities = earth_vel[index, :num_bins].copy()
+                        ens.EarthVelocity.generate_velocity_vectors()
+                else:
+                    if ens.IsBeamVelocity:
+                        ens.BeamVelocity.Velocities = BinMapping.scale_velocity(ens.BeamVelocity.Velocities, ratio[index])
+                    if ens.IsInstrumentVelocity:
+                        ens.InstrumentVelocity.Velocities = BinMapping.scale_velocity(ens.InstrumentVelocity.Velocities, ratio[index])
+                    if ens.IsEarthVelocity:
+                        ens.EarthVelocity.Velocities = BinMapping.scale_velocity(ens.EarthVelocity.Velocities, ratio[index])
+                        ens.EarthVelocity.generate_velocity_vectors()
+
+                # Cell positions
+                ens.AncillaryData.FirstBinRange = float(ens.AncillaryData.FirstBinRange * ratio[index])
+                ens.AncillaryData.BinSize = float(ens.AncillaryData.BinSize * ratio[index])
+                ens.AncillaryData.SpeedOfSound = float(corrected_sos[index])
+                if sos is None:
+                    if salinity is not None:
+                        ens.AncillaryData.Salinity = float(np.broadcast_to(salinity, len(ens_list))[index])
+                    if temperature is not None:
+                        ens.AncillaryData.WaterTemp = float(np.broadcast_to(temperature, len(ens_list))[index])
+            except Exception as e:
+                logging.error("Error correcting the speed of sound.  " + str(e))
+
+        return ratio
@@ -0,0 +1,257 @@
+import math
+import logging
+import numpy as np
+from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Ensemble.InstrumentVelocity import InstrumentVelocity
+from rti_python.Ensemble.EarthVelocity import EarthVelocity
+
+
+class CoordinateTransform:
+    """
+    Vectorized Beam to Instrument to Earth coordinate transform.
+
+    The transforms work on stacked arrays.  The last axis is the beam or
+    the velocity component, so a single ensemble [bin][beam] or a whole
+    deployment [ens][bin][beam] is transformed with the same call.
+    Bad values can be given as Ensemble.BadVelocity or NaN.  The results
+    use Ensemble.BadVelocity for bad values.
+
+    Only 4 beam systems can be transformed.  If one beam is bad,
+    a 3 beam solution is used.  The bad beam is calculated by assuming the
+    error velocity is 0, and the error velocity is set to 0.
+
+    Retransform the ensembles with a new heading offset and magnetic declination:
+    CoordinateTransform.retransform_ensembles(ens_list, heading_offset=1.5, mag_decl=10.2)
+    """
+
+    # Default beam angle in degrees
+    DEFAULT_BEAM_ANGLE = 20.0
+
+    # Beam sign for the error velocity.  Beam 0 and 1 are one pair, Beam 2 and 3 the other.
+    ERROR_SIGN = np.array([1.0, 1.0, -1.0, -1.0])
+
+    @staticmethod
+    def beam_matrix(beam_angle: float = DEFAULT_BEAM_ANGLE):
+        """
+        Beam to Instrument matrix for a 4 beam system.
+        Instrument = Matrix * Beam
+        :param beam_angle: Beam angle in degrees.
+        :return: 4x4 matrix.  Rows are X, Y, Z and Error.
+        """
+        a = 1.0 / (2.0 * math.sin(math.radians(beam_angle)))
+        b = 1.0 / (4.0 * math.cos(math.radians(beam_angle)))
+
+        return np.array([[-a, a, 0.0, 0.0],
+                         [0.0, 0.0, -a, a],
+                         [-b, -b, -b, -b],
+                         [0.25, 0.25, -0.25, -0.25]])
+
+    @staticmethod
+    def rotation_matrix(heading, pitch, roll):
+        """
+        Instrument to Earth rotation matrix for each ensemble.
+        Earth = Matrix * Instrument XYZ
+        :param heading: Heading in degrees.  A value for each ensemble or a single value.
+        :param pitch: Pitch in degrees.  A value for each ensemble or a single value.
+        :param roll: Roll in degrees.  A value for each ensemble or a single value.
+        :return: [ens][3][3] matrix.  Rows are East, North and Up.
+        """
+        heading, pitch, roll = np.broadcast_arrays(np.radians(np.asarray(heading, dtype=float)),
+                                                   np.radians(np.asarray(pitch, dtype=float)),
+                                                   np.radians(np.asarray(roll, dtype=float)))
+        ch, sh = np.cos(heading), np.sin(heading)
+        cp, sp = np.cos(pitch), np.sin(pitch)
+        cr, sr = np.cos(roll), np.sin(roll)
+
+        # Rotation of the instrument frame with the instrument Y axis forward and X starboard.
+        # The RTB instrument X is forward and Y is port, so the columns are swapped and X is negated.
+        rot = np.empty(heading.shape + (3, 3))
+        rot[..., 0, 0] = sh * cp
+        rot[..., 0, 1] = -(ch * cr + sh * sp * sr)
+        rot[..., 0, 2] = ch * sr - sh * sp * cr
+        rot[..., 1, 0] = ch * cp
+        rot[..., 1, 1] = -(-sh * cr + ch * sp * sr)
+        rot[..., 1, 2] = -sh * sr - ch * sp * cr
+        rot[..., 2, 0] = sp
+        rot[..., 2, 1] = cp * sr
+        rot[..., 2, 2] = cp * cr
+
+        return rot
+
+    @staticmethod
+    def is_bad(vel):
+        """
+        Check for bad velocities.
+        :param vel: Velocity array.
+        :return: Boolean array, TRUE if the velocity is bad.
+        """
+        return np.isnan(vel) | Ensemble.is_bad_velocity_array(vel)
+
+    @staticmethod
+    def beam_to_instrument(beam_vel, beam_angle: float = DEFAULT_BEAM_ANGLE, allow_3_beam: bool = True):
+        """
+        Transform the Beam velocities to Instrument velocities.
+        :param beam_vel: [...][beam] Beam velocity array with 4 beams.
+        :param beam_angle: Beam angle in degrees.
+        :param allow_3_beam: Use a 3 beam solution if one beam is bad.
+        :return: [...][4] Instrument velocity array.  X, Y, Z and Error.
+        """
+        beam_vel = np.asarray(beam_vel, dtype=float)
+        if beam_vel.shape[-1] != 4:
+            raise ValueError("Beam to Instrument transform requires 4 beams.  Found " + str(beam_vel.shape[-1]))
+
+        bad = CoordinateTransform.is_bad(beam_vel)
+        num_bad = np.count_nonzero(bad, axis=-1)
+        beams = np.where(bad, 0.0, beam_vel)
+
+        # 3 Beam solution
+        # Solve the bad beam so the error velocity is 0
+        three_beam = num_bad == 1
+        if allow_3_beam and np.any(three_beam):
+            error_sum = np.sum(beams * CoordinateTransform.ERROR_SIGN, axis=-1, keepdims=True)
+            beams = np.where(bad & three_beam[..., np.newaxis], -CoordinateTransform.ERROR_SIGN * error_sum, beams)
+        else:
+            three_beam = np.zeros(num_bad.shape, dtype=bool)
+
+        inst_vel = np.einsum("ij,...j->...i", CoordinateTransform.beam_matrix(beam_angle), beams)
+
+        # Error velocity is not known for a 3 beam solution
+        inst_vel[..., 3] = np.where(three_beam, 0.0, inst_vel[..., 3])
+
+        good = (num_bad == 0) | three_beam
+        return np.where(good[..., np.newaxis], inst_vel, Ensemble.BadVelocity)
+
+    @staticmethod
+    def instrument_to_earth(inst_vel, heading, pitch, roll, heading_offset: float = 0.0, mag_decl: float = 0.0):
+        """
+        Transform the Instrument velocities to Earth velocities.
+        The error velocity is not changed.
+        :param inst_vel: [ens][bin][4] Instrument velocity array.  X, Y, Z and Error.  [bin][4] for a single ensemble.
+        :param heading: Heading in degrees.  A value for each ensemble.
+        :param pitch: Pitch in degrees.  A value for each ensemble.
+        :param roll: Roll in degrees.  A value for each ensemble.
+        :param heading_offset: Heading offset in degrees added to the heading.
+        :param mag_decl: Magnetic declination in degrees added to the heading.
+        :return: [ens][bin][4] Earth velocity array.  East, North, Up and Error.
+        """
+        inst_vel = np.asarray(inst_vel, dtype=float)
+        is_single = inst_vel.ndim == 2
+        if is_single:
+            inst_vel = inst_vel[np.newaxis]
+
+        heading = np.atleast_1d(np.asarray(heading, dtype=float)) + heading_offset + mag_decl
+        rot = CoordinateTransform.rotation_matrix(heading, np.atleast_1d(pitch), np.atleast_1d(roll))
+
+        bad = np.any(CoordinateTransform.is_bad(inst_vel[..., 0:3]), axis=-1)
+        xyz = np.where(bad[..., np.newaxis], 0.0, inst_vel[..., 0:3])
+
+        earth_vel = np.empty(inst_vel.shape[:-1] + (4,))
+        earth_vel[..., 0:3] = np.einsum("eij,ebj->ebi", rot, xyz)
+        earth_vel[..., 3] = inst_vel[..., 3] if inst_vel.shape[-1] > 3 else Ensemble.BadVelocity
+
+        # Bad orientation makes all the bins bad
+        bad |= ~np.isfinite(heading + np.atleast_1d(pitch) + np.atleast_1d(roll))[:, np.newaxis]
+        earth_vel[bad] = Ensemble.BadVelocity
+
+        if is_single:
+            return earth_vel[0]
+        return earth_vel
+
+    @staticmethod
+    def beam_to_earth(beam_vel, heading, pitch, roll,
+                      beam_angle: float = DEFAULT_BEAM_ANGLE,
+                      heading_offset: float = 0.0,
+                      mag_decl: float = 0.0,
+                      allow_3_beam: bool = True):
+        """
+        Transform the Beam velocities to Earth velocities.
+        :param beam_vel: [ens][bin][beam] Beam velocity array with 4 beams.
+        :param heading: Heading in degrees.  A value for each ensemble.
+        :param pitch: Pitch in degrees.  A value for each ensemble.
+        :param roll: Roll in degrees.  A value for each ensemble.
+        :param beam_angle: Beam angle in degrees.
+        :param heading_offset: Heading offset in degrees added to the heading.
+        :param mag_decl: Magnetic declination in degrees added to the heading.
+        :param allow_3_beam: Use a 3 beam solution if one beam is bad.
+        :return: Instrument and Earth velocity arrays.
+        """
+        inst_vel = CoordinateTransform.beam_to_instrument(beam_vel, beam_angle, allow_3_beam)
+        earth_vel = CoordinateTransform.instrument_to_earth(inst_vel, heading, pitch, roll, heading_offset, mag_decl)
+
+        return inst_vel, earth_vel
+
+    @staticmethod
+    def stack_ensembles(ens_list: list):
+        """
+        Stack the Beam velocity and orientation of the ensembles.
+        The ensembles are padded to the largest number of bins with bad values.
+        Ensembles without 4 beam Beam Velocity and Ancillary Data are all bad.
+        :param ens_list: List of ensembles.
+        :return: [ens][bin][beam] Beam velocity, heading, pitch and roll arrays.
+        """
+        max_bins = max([ens.BeamVelocity.num_elements for ens in ens_list if ens.IsBeamVelocity], default=0)
+        beam_vel = np.full((len(ens_list), max_bins, 4), np.nan)
+        heading = np.full(len(ens_list), np.nan)
+        pitch = np.full(len(ens_list), np.nan)
+        roll = np.full(len(ens_list), np.nan)
+
+        for index, ens in enumerate(ens_list):
+            if not ens.IsBeamVelocity or not ens.IsAncillaryData:
+                continue
+
+            vel = np.asarray(ens.BeamVelocity.Velocities, dtype=float)
+            if vel.ndim != 2 or vel.shape[1] != 4:
+                continue
+
+            beam_vel[index, :vel.shape[0]] = vel
+            heading[index] = ens.AncillaryData.Heading
+            pitch[index] = ens.AncillaryData.Pitch
+            roll[index] = ens.AncillaryData.Roll
+
+        return beam_vel, heading, pitch, roll
+
+    @staticmethod
+    def retransform_ensembles(ens_list: list,
+                              beam_angle: float = DEFAULT_BEAM_ANGLE,
+                              heading_offset: float = 0.0,
+                              mag_decl: float = 0.0,
+                              allow_3_beam: bool = True):
+        """
+        Recalculate the Instrument and Earth velocities of the ensembles from the Beam velocities.
+        The Instrument and Earth Velocity datasets are replaced.  Ensembles that can not be
+        transformed are not changed.
+        :param ens_list: List of ensembles.
+        :param beam_angle: Beam angle in degrees.
+        :param heading_offset: Heading offset in degrees added to the heading.
+        :param mag_decl: Magnetic declination in degrees added to the heading.
+        :param allow_3_beam: Use a 3 beam solution if one beam is bad.
+        :return: Number of ensembles transformed.
+        """
+        beam_vel, heading, pitch, roll = CoordinateTransform.stack_ensembles(ens_list)
+        if beam_vel.size == 0:
+            return 0
+
+        inst_vel, earth_vel = CoordinateTransform.beam_to_earth(beam_vel, heading, pitch, roll,
+                                                                beam_angle, heading_offset, mag_decl, allow_3_beam)
+
+        count = 0
+        for index, ens in enumerate(ens_list):
+            if np.isnan(heading[index]):
+                continue
+
+            try:
+                num_bins = ens.BeamVelocity.num_elements
+
+                inst_ds = InstrumentVelocity(num_bins, 4)
+                inst_ds.Velocities = inst_vel[index, :num_bins].copy()
+                ens.AddInstrumentVelocity(inst_ds)
+
+                earth_ds = EarthVelocity(num_bins, 4)
+                earth_ds.Velocities = earth_vel[index, :num_bins].copy()
+                ens.AddEarthVelocity(earth_ds)
+
+                count += 1
+            except Exception as e:
+                logging.error("Error setting the transformed velocities.  " + str(e))
+
+        return count
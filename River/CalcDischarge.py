@@ -3,6 +3,9 @@ import datetime
 import numpy as np
 from enum import Enum
 from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Post_Process.Screening.Screening import Screening
+from rti_python.Post_Process.Screening.Screening import ScreeningData
+from rti_python.Post_Process.Screening.Screening import ScreeningThresholds
 
 
 class EnsembleFlowInfo:
@@ -21,6 +24,150 @@ class MeasuredBinInfo:
         self.flow = 0.0
         self.valid = False
 
+
+class TransectFlowInfo:
+    """
+    Flow results for all the ensembles in a transect.
+    Each value is an array with a value for each ensemble.
+    """
+
+    def __init__(self, num_ens: int, num_bins: int):
+        self.top_flow = np.zeros(num_ens)
+        self.bottom_flow = np.zeros(num_ens)
+        self.measured_flow = np.zeros(num_ens)
+        self.valid = np.zeros(num_ens, dtype=bool)
+        self.bin_depth = np.zeros((num_ens, num_bins))                  # Depth of each bin
+        self.bin_flow = np.zeros((num_ens, num_bins))                   # Flow of each measured bin
+        self.bin_measured = np.zeros((num_ens, num_bins), dtype=bool)   # Bin is above the bottom
+        self.bin_valid = np.zeros((num_ens, num_bins), dtype=bool)      # Measured bin passed screening
+
+    def total_top_flow(self) -> float:
+        """
+        Total top flow of the valid ensembles.
+        """
+        return float(np.sum(self.top_flow[self.valid]))
+
+    def total_bottom_flow(self) -> float:
+        """
+        Total bottom flow of the valid ensembles.
+        """
+        return float(np.sum(self.bottom_flow[self.valid]))
+
+    def total_measured_flow(self) -> float:
+        """
+        Total measured flow of the valid ensembles.
+        """
+        return float(np.sum(self.measured_flow[self.valid]))
+
+    def total_flow(self) -> float:
+        """
+        Total flow of the valid ensembles.  Top, measured and bottom flow.
+        """
+        return self.total_top_flow() + self.total_measured_flow() + self.total_bottom_flow()
+
+    def ensemble_flow_info(self, index: int) -> EnsembleFlowInfo:
+        """
+        Get the results of a single ensemble.
+        :param index: Index of the ensemble in the transect.
+        :return: Ensemble flow info.
+        """
+        ensemble_flow_info = EnsembleFlowInfo()
+        ensemble_flow_info.valid = bool(self.valid[index])
+        ensemble_flow_info.top_flow = float(self.top_flow[index])
+        ensemble_flow_info.bottom_flow = float(self.bottom_flow[index])
+        ensemble_flow_info.measured_flow = float(self.measured_flow[index])
+        for bin_index in np.flatnonzero(self.bin_measured[index]):
+            measured_bin_info = MeasuredBinInfo()
+            measured_bin_info.depth = float(self.bin_depth[index, bin_index])
+            measured_bin_info.flow = float(self.bin_flow[index, bin_index])
+            measured_bin_info.valid = bool(self.bin_valid[index, bin_index])
+            ensemble_flow_info.measured_bin_info.append(measured_bin_info)
+
+        return ensemble_flow_info
+
+
+class TransectGeometry:
+    """
+    Depths and measured bins of a transect.
+    These only change with the boat and ADCP setup.
+    """
+
+    def __init__(self):
+        self.boat_draft = 0.0
+        self.valid = None               # [ens] Good bin size and bottom
+        self.overall_depth = None       # [ens] Distance from the water surface to the bottom
+        self.bin_depth = None           # [ens][bin] Depth of each bin
+        self.measured = None            # [ens][bin] Bin is above the bottom
+
+
+class TransectData:
+    """
+    Stacked data for all the ensembles in a transect.
+
+    Profile arrays are [ens][bin][beam] and Bottom Track arrays are [ens][beam].
+    Ensembles with fewer bins or beams are padded with NaN.  A missing
+    Amplitude or Correlation dataset is all NaN, so it is not screened.
+    """
+
+    def __init__(self, num_ens: int, num_bins: int, num_beams: int):
+        self.num_bins = np.zeros(num_ens, dtype=int)                    # Number of bins in each ensemble
+        self.num_beams = np.zeros(num_ens, dtype=int)                   # Number of beams in each ensemble
+        self.first_bin_range = np.zeros(num_ens)                        # First bin range in meters
+        self.bin_size = np.zeros(num_ens)                               # Bin size in meters
+        self.earth_vel = np.full((num_ens, num_bins, num_beams), np.nan)
+        self.amplitude = np.full((num_ens, num_bins, num_beams), np.nan)
+        self.correlation = np.full((num_ens, num_bins, num_beams), np.nan)
+        self.bt_range = np.full((num_ens, num_beams), np.nan)
+        self.bt_earth_vel = np.full((num_ens, num_beams), np.nan)
+
+    @staticmethod
+    def from_ensembles(ens_list: list):
+        """
+        Stack the data from the ensembles.
+        The ensembles must have Ensemble Data, Ancillary Data and Earth Velocity.
+        :param ens_list: List of ensembles in the transect.
+        :return: Transect data.
+        """
+        max_bins = max([ens.EarthVelocity.num_elements for ens in ens_list], default=0)
+        max_beams = max([ens.EarthVelocity.element_multiplier for ens in ens_list], default=0)
+        if any(ens.IsBottomTrack for ens in ens_list):
+            max_beams = max([max_beams] + [len(ens.BottomTrack.Range) for ens in ens_list if ens.IsBottomTrack])
+
+        # East and North are always needed
+        max_beams = max(max_beams, 2)
+
+        data = TransectData(len(ens_list), max_bins, max_beams)
+        for index, ens in enumerate(ens_list):
+            data.num_bins[index] = ens.EnsembleData.NumBins
+            data.num_beams[index] = ens.EnsembleData.NumBeams
+            data.first_bin_range[index] = ens.AncillaryData.FirstBinRange
+            data.bin_size[index] = ens.AncillaryData.BinSize
+
+            TransectData.copy_profile(data.earth_vel[index], ens.EarthVelocity.Velocities)
+            if ens.IsAmplitude:
+                TransectData.copy_profile(data.amplitude[index], ens.Amplitude.Amplitude)
+            if ens.IsCorrelation:
+                TransectData.copy_profile(data.correlation[index], ens.Correlation.Correlation)
+            if ens.IsBottomTrack:
+                bt_range = np.asarray(ens.BottomTrack.Range, dtype=float)
+                data.bt_range[index, :len(bt_range)] = bt_range
+                bt_vel = np.asarray(ens.BottomTrack.EarthVelocity, dtype=float)[:max_beams]
+                data.bt_earth_vel[index, :len(bt_vel)] = bt_vel
+
+        return data
+
+    @staticmethod
+    def copy_profile(dest, values):
+        """
+        Copy the profile data into the padded array.
+        :param dest: Padded [bin][beam] array.
+        :param values: [bin][beam] values.
+        """
+        values = np.asarray(values, dtype=float)
+        if values.ndim == 2:
+            dest[:values.shape[0], :values.shape[1]] = values
+
+
 class FlowMode(Enum):
     """
     TRDI restricts the constant
@@ -221,6 +368,9 @@ class CalcDischarge:
         # Number of good bins
         accum_bins = 0
 
+        # Screen all the bins at once
+        screen_mask = Screening.screen_ensembles([ens], ScreeningThresholds(min_amp=min_amp, min_corr=min_corr))
+
         bin_depth_index = first_bin_pos
         for bin_index in range(ens.EnsembleData.NumBins):
             if bin_depth_index < depth_angle and ens.EnsembleData.NumBeams >= 2:
@@ -242,7 +392,7 @@ class CalcDischarge:
                 measured_bin_info = MeasuredBinInfo()
                 measured_bin_info.depth = bin_depth_index                                                 # Bin Depth
                 measured_bin_info.flow = cross_prod_bin * delta_time * ens.AncillaryData.BinSize          # Flow for bin
-                measured_bin_info.valid = ens.is_good_bin(bin_index, min_amp, min_corr)                   # Valid bin
+                measured_bin_info.valid = screen_mask.good_bin(0, bin_index)                              # Valid bin
                 measured_bin_info_list.append(measured_bin_info)
 
                 # Set the top most bin
@@ -448,13 +598,16 @@ class CalcDischarge:
 
         bin_depth_index = bin_depth
 
+        # Screen all the bins at once
+        screen_mask = Screening.screen_ensembles([ens], ScreeningThresholds(min_amp=min_amp, min_corr=min_corr))
+
         for bin_index in range(ens.EnsembleData.NumBins):
             if bin_depth_index < dlg_max:
 
                 # Get the bin info
                 bin_info = MeasuredBinInfo()
-                bin_info.Depth = bin_depth
-                bin_info.valid = ens.is_good_bin(bin_index, min_amp, min_corr)                   # Valid bin
+                bin_info.depth = bin_depth_index
+                bin_info.valid = screen_mask.good_bin(0, bin_index)                              # Valid bin
 
                 # Set the first good and last bin info
                 if bin_info.valid:
@@ -488,4 +641,366 @@ class CalcDischarge:
         bottom_vx = sum_east_vel * da / z1 * (z1 ** a) / ((z2 ** a) - (z1 ** a))
         bottom_vy = sum_north_vel * da / z1 * (z1 ** a) / ((z2 ** a) - (z1 ** a))
 
-        return top_vx, top_vy, bottom_vx, bottom_vy
\ No newline at end of file
+        return top_vx, top_vy, bottom_vx, bottom_vy
+
+    @staticmethod
+    def bottom_depths(bt_range):
+        """
+        Get the minimum and average bottom track range for each ensemble.
+        Only ranges greater than 0 are used.
+        :param bt_range: Bottom Track range [ens][beam].
+        :return: Minimum range, average range and number of good ranges for each ensemble.
+        """
+        good_range = bt_range >= 1E-06
+        range_count = np.count_nonzero(good_range, axis=1)
+        min_range = np.min(np.where(good_range, bt_range, np.inf), axis=1)
+        avg_range = np.sum(np.where(good_range, bt_range, 0.0), axis=1) / np.maximum(range_count, 1)
+
+        return min_range, avg_range, range_count
+
+    @staticmethod
+    def good_bins(data: TransectData, min_amp: float, min_corr: float):
+        """
+        Screen all the bins in the transect.  A bin is bad if more than
+        one beam has a low amplitude, low correlation or bad velocity.
+        Same as Ensemble.is_good_bin().
+        :param data: Transect data.
+        :param min_amp: Minimum amplitude.
+        :param min_corr: Minimum correlation.
+        :return: Boolean [ens][bin] array, TRUE if the bin is good.
+        """
+        screen_data = ScreeningData(*data.earth_vel.shape)
+        screen_data.velocity = data.earth_vel
+        screen_data.amplitude = data.amplitude
+        screen_data.correlation = data.correlation
+
+        return Screening.screen(screen_data, ScreeningThresholds(min_amp=min_amp, min_corr=min_corr)).bin
+
+    @staticmethod
+    def bin_depths(data: TransectData, boat_draft: float):
+        """
+        Get the depth of each bin.  The bin size is accumulated
+        the same as the ensemble calculations.
+        :param data: Transect data.
+        :param boat_draft: Boat draft in meters.
+        :return: [ens][bin] depths.
+        """
+        num_bins = data.earth_vel.shape[1]
+        bin_depth = np.repeat(data.bin_size[:, np.newaxis], num_bins, axis=1)
+        if num_bins > 0:
+            bin_depth[:, 0] = data.first_bin_range + boat_draft
+
+        return np.cumsum(bin_depth, axis=1)
+
+    def calculate_transect_flow(self,
+                                data: TransectData,
+                                boat_draft: float,
+                                beam_angle: float,
+                                pulse_length: float,
+                                pulse_lag: float,
+                                delta_time,
+                                bt_east=None,
+                                bt_north=None,
+                                top_flow_mode: FlowMode = FlowMode.Constants,
+                                top_pwr_func_exponent: float = ONE_SIXTH_POWER_LAW,
+                                bottom_flow_mode: FlowMode = FlowMode.PowerFunction,
+                                min_amp=MINIMUM_AMPLITUDE,
+                                min_corr=MINIMUM_CORRELATION,
+                                heading_offset=None) -> TransectFlowInfo:
+        """
+        Calculate the flow for all the ensembles in the transect at once.
+        This gives the same results as calling calculate_ensemble_flow() for each ensemble.
+
+        The 3 point slope top extrapolation fits the East and North velocity of the
+        first 3 measured bins against depth and uses the velocity at the middle of the top layer.
+        :param data: Transect data.
+        :param boat_draft: Boat draft in meters.
+        :param beam_angle: Beam angle in degrees.
+        :param pulse_length: Pulse length in meters.
+        :param pulse_lag: Pulse lag in meters.
+        :param delta_time: Time difference between ensembles.  A value for each ensemble or a single value.
+        :param bt_east: Boat East velocity for each ensemble.  Default is the Bottom Track East velocity.
+        :param bt_north: Boat North velocity for each ensemble.  Default is the Bottom Track North velocity.
+        :param top_flow_mode: Top extrapolation method.
+        :param top_pwr_func_exponent: Power law exponent.
+        :param bottom_flow_mode: Bottom extrapolation method.
+        :param min_amp: Minimum amplitude.
+        :param min_corr: Minimum correlation.
+        :param heading_offset: Heading angle correction used by the slope method.
+        :return: Flow results for all the ensembles.
+        """
+        num_ens, num_bins = data.earth_vel.shape[0:2]
+        if num_ens == 0 or num_bins == 0:
+            return TransectFlowInfo(num_ens, num_bins)
+
+        bt_east, bt_north = self.boat_velocity(data, bt_east, bt_north)
+        geometry = self.transect_geometry(data, boat_draft, beam_angle, pulse_length, pulse_lag)
+        good_bins = self.good_bins(data, min_amp, min_corr)
+        cross_prod_bin = self.transect_cross_products(data, bt_east, bt_north)
+
+        return self.transect_flow(data, geometry, good_bins, cross_prod_bin, delta_time, bt_east, bt_north,
+                                  top_flow_mode, top_pwr_func_exponent, bottom_flow_mode, heading_offset)
+
+    @staticmethod
+    def boat_velocity(data: TransectData, bt_east=None, bt_north=None):
+        """
+        Get the boat velocity for each ensemble.
+        :param data: Transect data.
+        :param bt_east: Boat East velocity for each ensemble.  Default is the Bottom Track East velocity.
+        :param bt_north: Boat North velocity for each ensemble.  Default is the Bottom Track North velocity.
+        :return: East and North boat velocity arrays.
+        """
+        if bt_east is None:
+            bt_east = data.bt_earth_vel[:, 0]
+        if bt_north is None:
+            bt_north = data.bt_earth_vel[:, 1]
+
+        return np.asarray(bt_east, dtype=float), np.asarray(bt_north, dtype=float)
+
+    def transect_geometry(self,
+                          data: TransectData,
+                          boat_draft: float,
+                          beam_angle: float,
+                          pulse_length: float,
+                          pulse_lag: float):
+        """
+        Calculate the depths and the measured bins of the transect.
+        This only depends on the bottom track range and the boat and ADCP setup.
+        :param data: Transect data.
+        :param boat_draft: Boat draft in meters.
+        :param beam_angle: Beam angle in degrees.
+        :param pulse_length: Pulse length in meters.
+        :param pulse_lag: Pulse lag in meters.
+        :return: Transect geometry.
+        """
+        geometry = TransectGeometry()
+        geometry.boat_draft = boat_draft
+        bin_size = data.bin_size
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Bin size and bottom must be good
+            min_range, avg_range, range_count = self.bottom_depths(data.bt_range)
+            geometry.valid = (bin_size >= 1E-06) & (range_count > 0)
+
+            # Possible maximum depth and the distance from the water surface to the bottom
+            depth_angle = min_range * math.cos(beam_angle / 180.0 * math.pi) + boat_draft - np.maximum((pulse_length + pulse_lag) / 2.0, bin_size / 2.0)
+            geometry.overall_depth = avg_range + boat_draft
+
+            # Measured bins are above the bottom, the first bin below the bottom ends the profile
+            geometry.bin_depth = self.bin_depths(data, boat_draft)
+            measured = (geometry.bin_depth < depth_angle[:, np.newaxis]) & (np.arange(data.earth_vel.shape[1]) < data.num_bins[:, np.newaxis]) & (data.num_beams[:, np.newaxis] >= 2)
+            geometry.measured = np.logical_and.accumulate(measured, axis=1) & geometry.valid[:, np.newaxis]
+
+        return geometry
+
+    def transect_cross_products(self, data: TransectData, bt_east, bt_north):
+        """
+        Calculate the cross product of the water velocity and boat velocity for each bin.
+        :param data: Transect data.
+        :param bt_east: Boat East velocity for each ensemble.
+        :param bt_north: Boat North velocity for each ensemble.
+        :return: [ens][bin] cross products.
+        """
+        return self.cross_product(data.earth_vel[:, :, 0], data.earth_vel[:, :, 1], bt_east[:, np.newaxis], bt_north[:, np.newaxis])
+
+    def transect_flow(self,
+                      data: TransectData,
+                      geometry,
+                      good_bins,
+                      cross_prod_bin,
+                      delta_time,
+                      bt_east,
+                      bt_north,
+                      top_flow_mode: FlowMode = FlowMode.Constants,
+                      top_pwr_func_exponent: float = ONE_SIXTH_POWER_LAW,
+                      bottom_flow_mode: FlowMode = FlowMode.PowerFunction,
+                      heading_offset=None) -> TransectFlowInfo:
+        """
+        Calculate the measured, top and bottom flow from the transect intermediates.
+        :param data: Transect data.
+        :param geometry: Transect geometry from transect_geometry().
+        :param good_bins: [ens][bin] screening from good_bins().
+        :param cross_prod_bin: [ens][bin] cross products from transect_cross_products().
+        :param delta_time: Time difference between ensembles.  A value for each ensemble or a single value.
+        :param bt_east: Boat East velocity for each ensemble.
+        :param bt_north: Boat North velocity for each ensemble.
+        :param top_flow_mode: Top extrapolation method.
+        :param top_pwr_func_exponent: Power law exponent.
+        :param bottom_flow_mode: Bottom extrapolation method.
+        :param heading_offset: Heading angle correction used by the slope method.
+        :return: Flow results for all the ensembles.
+        """
+        num_ens, num_bins = data.earth_vel.shape[0:2]
+        result = TransectFlowInfo(num_ens, num_bins)
+        if num_ens == 0 or num_bins == 0:
+            return result
+
+        delta_time = np.broadcast_to(np.asarray(delta_time, dtype=float), (num_ens,))
+        bin_size = data.bin_size
+        bin_depth = geometry.bin_depth
+        boat_draft = geometry.boat_draft
+        bin_index = np.arange(num_bins)
+        ens_index = np.arange(num_ens)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Check vessel velocity
+            valid = geometry.valid & (np.abs(bt_east) <= 80.0) & (np.abs(bt_north) <= 80.0)
+            measured = geometry.measured & valid[:, np.newaxis]
+            bin_valid = measured & good_bins
+
+            # Equation A16
+            # Qbin = (Vw X Vb)*dt*dz
+            vel_east = data.earth_vel[:, :, 0]
+            vel_north = data.earth_vel[:, :, 1]
+            bin_flow = np.where(measured, cross_prod_bin * delta_time[:, np.newaxis] * bin_size[:, np.newaxis], 0.0)
+
+            accum_flow = np.sum(bin_flow, axis=1)
+            accum_bins = np.count_nonzero(measured, axis=1)
+            avg_east = np.sum(np.where(measured, vel_east, 0.0), axis=1) / np.maximum(accum_bins, 1)
+            avg_north = np.sum(np.where(measured, vel_north, 0.0), axis=1) / np.maximum(accum_bins, 1)
+
+            # Top and bottom valid bins
+            valid &= np.any(bin_valid, axis=1)
+            top_index = np.argmax(bin_valid, axis=1)
+            bottom_index = num_bins - 1 - np.argmax(bin_valid[:, ::-1], axis=1)
+            top_bin_flow = bin_flow[ens_index, top_index]
+            bottom_bin_flow = bin_flow[ens_index, bottom_index]
+
+            overall_depth = geometry.overall_depth
+            x1 = overall_depth                                                          # Depth of the water
+            x2 = overall_depth - bin_depth[ens_index, top_index] + bin_size / 2.0       # Depth Not including the top
+            x3 = overall_depth - bin_depth[ens_index, bottom_index] - bin_size / 2.0    # Depth Not including the bottom
+
+            measured_flow = self.cross_product(avg_east, avg_north, bt_east, bt_north) * delta_time * (x2 - x3)
+
+            ################
+            # CALCULATE TOP
+            if top_flow_mode == FlowMode.Constants:
+                top_flow = top_bin_flow / bin_size * (x1 - x2)
+            elif top_flow_mode == FlowMode.PowerFunction:
+                y1 = top_pwr_func_exponent + 1.0
+                top_flow = accum_flow * ((x1 ** y1) - (x2 ** y1)) / ((x2 ** y1) - (x3 ** y1))
+            elif top_flow_mode == FlowMode.Slope:
+                # Use the top bin when there are not enough bins for the slope
+                top_flow = top_bin_flow / bin_size * (x1 - x2)
+
+                slope_ens = accum_bins >= 6
+                if np.any(slope_ens):
+                    depth_slope = data.first_bin_range[:, np.newaxis] + boat_draft + bin_index[np.newaxis, 0:3] * bin_size[:, np.newaxis]
+                    east_slope = vel_east[:, 0:3]
+                    north_slope = vel_north[:, 0:3]
+                    if heading_offset:
+                        east_slope, north_slope = (east_slope * math.cos(heading_offset) - north_slope * math.sin(heading_offset),
+                                                   east_slope * math.sin(heading_offset) + north_slope * math.cos(heading_offset))
+
+                    # Velocity at the middle of the top layer
+                    x4 = (x1 - x2) / 2.0
+                    slope_east = self.fit_slope(depth_slope, east_slope, x4)
+                    slope_north = self.fit_slope(depth_slope, north_slope, x4)
+                    cross_prod_top = self.cross_product(slope_east, slope_north, bt_east, bt_north)
+                    top_flow = np.where(slope_ens, delta_time * (x1 - x2) * cross_prod_top, top_flow)
+            else:
+                top_flow = np.zeros(num_ens)
+
+            ##################
+            # CALCULATE BOTTOM
+            if bottom_flow_mode == FlowMode.PowerFunction:
+                y2 = top_pwr_func_exponent + 1.0
+                bottom_flow = accum_flow * (x3 ** y2) / ((x2 ** y2) - (x3 ** y2))
+            elif bottom_flow_mode == FlowMode.Constants:
+                bottom_flow = bottom_bin_flow / bin_size * x3
+            else:
+                bottom_flow = np.zeros(num_ens)
+
+        result.valid = valid
+        result.measured_flow = np.where(valid, measured_flow, 0.0)
+        result.top_flow = np.where(valid, top_flow, 0.0)
+        result.bottom_flow = np.where(valid, bottom_flow, 0.0)
+        result.bin_depth = bin_depth
+        result.bin_flow = bin_flow
+        result.bin_measured = measured
+        result.bin_valid = bin_valid
+
+        return result
+
+    @staticmethod
+    def fit_slope(x, y, x_value):
+        """
+        Least squares line fit of each ensemble, then get the value of the line at x_value.
+        :param x: [ens][point] X values.
+        :param y: [ens][point] Y values.
+        :param x_value: X value for each ensemble.
+        :return: Y value of the line at x_value for each ensemble.
+        """
+        avg_x = np.mean(x, axis=1)
+        avg_y = np.mean(y, axis=1)
+        var_x = np.sum((x - avg_x[:, np.newaxis]) ** 2, axis=1)
+        cov_xy = np.sum((x - avg_x[:, np.newaxis]) * (y - avg_y[:, np.newaxis]), axis=1)
+
+        # All the points at the same depth, use the average value
+        slope = np.where(var_x == 0.0, 0.0, cov_xy / np.where(var_x == 0.0, 1.0, var_x))
+
+        return avg_y + slope * (x_value - avg_x)
+
+    def calculate_transect_avg_vel(self,
+                                   data: TransectData,
+                                   boat_draft: float,
+                                   beam_angle: float,
+                                   pulse_length: float,
+                                   pulse_width: float,
+                                   top_pwr_func_exponent: float = ONE_SIXTH_POWER_LAW,
+                                   min_amp=MINIMUM_AMPLITUDE,
+                                   min_corr=MINIMUM_CORRELATION):
+        """
+        Calculate the surface and bottom average velocity for all the ensembles in the transect at once.
+        This gives the same results as calling calculate_avg_vel() for each ensemble.
+        :param data: Transect data.
+        :param boat_draft: Boat draft in meters.
+        :param beam_angle: Beam angle in degrees.
+        :param pulse_length: Pulse length in meters.
+        :param pulse_width: Pulse width in meters.
+        :param top_pwr_func_exponent: Power law exponent.
+        :param min_amp: Minimum amplitude.
+        :param min_corr: Minimum correlation.
+        :return: Top East, Top North, Bottom East and Bottom North velocity for each ensemble.  NaN if the ensemble is not valid.
+        """
+        num_ens, num_bins = data.earth_vel.shape[0:2]
+        if num_bins == 0:
+            return tuple(np.full(num_ens, np.nan) for i in range(4))
+
+        da = data.bin_size
+        ens_index = np.arange(num_ens)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            min_range, avg_range, range_count = self.bottom_depths(data.bt_range)
+            valid = (da >= 1e-6) & (range_count > 0)
+
+            # Possible maximum depth and the distance from the water surface to bottom
+            dlg_max = min_range * math.cos(beam_angle / 180.0 * math.pi) + boat_draft - np.maximum((pulse_length + pulse_width) / 2, da / 2.0)
+            depth_total = avg_range + boat_draft
+
+            bin_depth = self.bin_depths(data, boat_draft)
+            measured = (bin_depth < dlg_max[:, np.newaxis]) & (np.arange(num_bins) < data.num_bins[:, np.newaxis])
+            bin_valid = measured & self.good_bins(data, min_amp, min_corr)
+            valid &= np.any(bin_valid, axis=1)
+
+            sum_east_vel = np.sum(np.where(measured, data.earth_vel[:, :, 0], 0.0), axis=1)
+            sum_north_vel = np.sum(np.where(measured, data.earth_vel[:, :, 1], 0.0), axis=1)
+
+            depth_top = bin_depth[ens_index, np.argmax(bin_valid, axis=1)]
+            depth_bottom = bin_depth[ens_index, num_bins - 1 - np.argmax(bin_valid[:, ::-1], axis=1)]
+
+            z3 = depth_total
+            z2 = depth_total - depth_top + da / 2.0
+            z1 = depth_total - depth_bottom - da / 2.0
+
+            a = top_pwr_func_exponent + 1
+            top_scale = da / (depth_top - da / 2.0) * ((z3 ** a) - (z2 ** a)) / ((z2 ** a) - (z1 ** a))
+            bottom_scale = da / z1 * (z1 ** a) / ((z2 ** a) - (z1 ** a))
+
+        top_vx = np.where(valid, sum_east_vel * top_scale, np.nan)
+        top_vy = np.where(valid, sum_north_vel * top_scale, np.nan)
+        bottom_vx = np.where(valid, sum_east_vel * bottom_scale, np.nan)
+        bottom_vy = np.where(valid, sum_north_vel * bottom_scale, np.nan)
+
+        return top_vx, top_vy, bottom_vx, bottom_vy
@@ -0,0 +1,192 @@
+import hashlib
+import numpy as np
+from collections import OrderedDict
+from rti_python.River.CalcDischarge import CalcDischarge
+from rti_python.River.CalcDischarge import FlowMode
+from rti_python.River.CalcDischarge import TransectData
+from rti_python.River.CalcDischarge import TransectFlowInfo
+
+
+class LruCache:
+    """
+    Small least recently used cache.
+    When the cache is full, the entry used the longest time ago is removed.
+    """
+
+    def __init__(self, max_size=16):
+        """
+        Initialize the cache.
+        :param max_size: Maximum number of entries.
+        """
+        self.max_size = max(1, max_size)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, calc_func):
+        """
+        Get the value for the key.  If the key is not in the cache,
+        the value is calculated and added to the cache.
+        :param key: Cache key.
+        :param calc_func: Function to calculate the value.
+        :return: Cached or calculated value.
+        """
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+        self.misses += 1
+        value = calc_func()
+        self.entries[key] = value
+
+        # Remove the oldest entries
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+        return value
+
+    def clear(self):
+        """
+        Remove all the entries and reset the stats.
+        """
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+
+class DischargeSession:
+    """
+    Recalculate the discharge of a transect as the parameters change.
+
+    The discharge is calculated in stages.  Each stage is cached and keyed
+    by a fingerprint of only the parameters it uses.  When a parameter changes,
+    only the stages that use it are recalculated.
+     - Screening: Good bins.  min_amp, min_corr
+     - Geometry: Depths and measured bins.  boat_draft, beam_angle, pulse_length, pulse_lag
+     - Cross Products: Water and boat velocity cross product.  bt_east, bt_north
+     - Flow: Measured flow and extrapolation.  Everything else
+
+    session = DischargeSession(TransectData.from_ensembles(ens_list))
+    result = session.calculate(0.1, 20, 0.2, 0.1, 0.5)
+    result = session.calculate(0.1, 20, 0.2, 0.1, 0.5, top_flow_mode=FlowMode.PowerFunction)
+    """
+
+    # Stage names
+    STAGE_SCREENING = "screening"
+    STAGE_GEOMETRY = "geometry"
+    STAGE_CROSS_PRODUCTS = "cross_products"
+    STAGE_FLOW = "flow"
+
+    def __init__(self, data: TransectData, max_cache=16):
+        """
+        Initialize the session.  The transect data should not be modified
+        after the session is created.  Create a new session instead.
+        :param data: Transect data.
+        :param max_cache: Maximum number of results cached for each stage.
+        """
+        self.data = data
+        self.discharge = CalcDischarge()
+        self.caches = {self.STAGE_SCREENING: LruCache(max_cache),
+                       self.STAGE_GEOMETRY: LruCache(max_cache),
+                       self.STAGE_CROSS_PRODUCTS: LruCache(max_cache),
+                       self.STAGE_FLOW: LruCache(max_cache)}
+
+    def calculate(self,
+                  boat_draft: float,
+                  beam_angle: float,
+                  pulse_length: float,
+                  pulse_lag: float,
+                  delta_time,
+                  bt_east=None,
+                  bt_north=None,
+                  top_flow_mode: FlowMode = FlowMode.Constants,
+                  top_pwr_func_exponent: float = CalcDischarge.ONE_SIXTH_POWER_LAW,
+                  bottom_flow_mode: FlowMode = FlowMode.PowerFunction,
+                  min_amp=CalcDischarge.MINIMUM_AMPLITUDE,
+                  min_corr=CalcDischarge.MINIMUM_CORRELATION,
+                  heading_offset=None) -> TransectFlowInfo:
+        """
+        Calculate the flow for the transect.  The parameters are the same
+        as CalcDischarge.calculate_transect_flow().
+        :param boat_draft: Boat draft in meters.
+        :param beam_angle: Beam angle in degrees.
+        :param pulse_length: Pulse length in meters.
+        :param pulse_lag: Pulse lag in meters.
+        :param delta_time: Time difference between ensembles.  A value for each ensemble or a single value.
+        :param bt_east: Boat East velocity for each ensemble.  Default is the Bottom Track East velocity.
+        :param bt_north: Boat North velocity for each ensemble.  Default is the Bottom Track North velocity.
+        :param top_flow_mode: Top extrapolation method.
+        :param top_pwr_func_exponent: Power law exponent.
+        :param bottom_flow_mode: Bottom extrapolation method.
+        :param min_amp: Minimum amplitude.
+        :param min_corr: Minimum correlation.
+        :param heading_offset: Heading angle correction used by the slope method.
+        :return: Flow results for all the ensembles.  The result is shared with the cache, do not modify it.
+        """
+        data = self.data
+        num_ens, num_bins = data.earth_vel.shape[0:2]
+        if num_ens == 0 or num_bins == 0:
+            return TransectFlowInfo(num_ens, num_bins)
+
+        bt_east, bt_north = self.discharge.boat_velocity(data, bt_east, bt_north)
+
+        screening_key = self.fingerprint(min_amp, min_corr)
+        good_bins = self.caches[self.STAGE_SCREENING].get(screening_key,
+                                                          lambda: self.discharge.good_bins(data, min_amp, min_corr))
+
+        geometry_key = self.fingerprint(boat_draft, beam_angle, pulse_length, pulse_lag)
+        geometry = self.caches[self.STAGE_GEOMETRY].get(geometry_key,
+                                                        lambda: self.discharge.transect_geometry(data, boat_draft, beam_angle, pulse_length, pulse_lag))
+
+        cross_key = self.fingerprint(bt_east, bt_north)
+        cross_prod_bin = self.caches[self.STAGE_CROSS_PRODUCTS].get(cross_key,
+                                                                    lambda: self.discharge.transect_cross_products(data, bt_east, bt_north))
+
+        # The flow uses the results of all the other stages
+        flow_key = (screening_key, geometry_key, cross_key,
+                    self.fingerprint(delta_time, top_flow_mode, top_pwr_func_exponent, bottom_flow_mode, heading_offset))
+        return self.caches[self.STAGE_FLOW].get(flow_key,
+                                                lambda: self.discharge.transect_flow(data, geometry, good_bins, cross_prod_bin,
+                                                                                     delta_time, bt_east, bt_north,
+                                                                                     top_flow_mode, top_pwr_func_exponent,
+                                                                                     bottom_flow_mode, heading_offset))
+
+    def stats(self):
+        """
+        Get the cache hits and misses for each stage.
+        :return: Dictionary of stage name to (hits, misses).
+        """
+        return {stage: (cache.hits, cache.misses) for stage, cache in self.caches.items()}
+
+    def clear(self):
+        """
+        Clear all the cached results.
+        """
+        for cache in self.caches.values():
+            cache.clear()
+
+    @staticmethod
+    def fingerprint(*params):
+        """
+        Create a hashable key from the parameters.
+        Arrays are hashed by their shape, type and contents.
+        :param params: Parameters.
+        :return: Tuple key.
+        """
+        key = []
+        for param in params:
+            if isinstance(param, (np.ndarray, list, tuple)):
+                arr = np.ascontiguousarray(param)
+                digest = hashlib.sha1(arr.view(np.uint8) if arr.size else b"").hexdigest()
+                key.append((arr.shape, arr.dtype.str, digest))
+            else:
+                key.append(param)
+
+        return tuple(key)
@@ -30,4 +30,9 @@ class RiverProjectMeta:
     TRANSECT_VERSION = 'transect_version'               # Transect Version
     TRANSECT_STATION_NAME = 'station_name'              # Transect Station name
     TRANSECT_STATION_INFO = 'station_info'              # Transect Station Info
-    TRANSECT_STATION_COMMENTS = 'station_comments'      # Transection Station comments
\ No newline at end of file
+    TRANSECT_STATION_COMMENTS = 'station_comments'      # Transection Station comments
+    TRANSECT_FILE_PATH = 'file_path'                    # Transect ensemble file path
+    TRANSECT_TOTAL_FLOW = 'total_flow'                  # Transect Total Discharge
+    TRANSECT_TOP_FLOW = 'top_flow'                      # Transect Top Discharge
+    TRANSECT_BOTTOM_FLOW = 'bottom_flow'                # Transect Bottom Discharge
+    TRANSECT_MEASURED_FLOW = 'measured_flow'            # Transect Measured Discharge
\ No newline at end of file
@@ -0,0 +1,294 @@
+import os
+import time
+import logging
+import h5py
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from obsub import event
+from rti_python.River.CalcDischarge import CalcDischarge
+from rti_python.River.CalcDischarge import FlowMode
+from rti_python.River.CalcDischarge import TransectData
+from rti_python.River.RiverProject import RiverProject
+from rti_python.River.RiverProjectMeta import RiverProjectMeta
+from rti_python.Utilities.read_binary_file import ReadBinaryFile
+
+
+class TransectSettings:
+    """
+    Discharge settings used for every transect in the batch.
+    """
+
+    def __init__(self,
+                 boat_draft: float = 0.0,
+                 beam_angle: float = 20.0,
+                 pulse_length: float = 0.0,
+                 pulse_lag: float = 0.0,
+                 top_flow_mode: FlowMode = FlowMode.Constants,
+                 top_pwr_func_exponent: float = CalcDischarge.ONE_SIXTH_POWER_LAW,
+                 bottom_flow_mode: FlowMode = FlowMode.PowerFunction,
+                 min_amp: float = CalcDischarge.MINIMUM_AMPLITUDE,
+                 min_corr: float = CalcDischarge.MINIMUM_CORRELATION):
+        self.boat_draft = boat_draft
+        self.beam_angle = beam_angle
+        self.pulse_length = pulse_length
+        self.pulse_lag = pulse_lag
+        self.top_flow_mode = top_flow_mode
+        self.top_pwr_func_exponent = top_pwr_func_exponent
+        self.bottom_flow_mode = bottom_flow_mode
+        self.min_amp = min_amp
+        self.min_corr = min_corr
+
+
+class TransectResult:
+    """
+    Compact discharge results of a transect.
+    The arrays have a value for each ensemble.
+    This is passed back from the worker process, so it only holds arrays and values.
+    """
+
+    def __init__(self, name: str, file_path: str):
+        self.name = name
+        self.file_path = file_path
+        self.ensemble_num = np.zeros(0, dtype=int)
+        self.delta_time = np.zeros(0)
+        self.top_flow = np.zeros(0)
+        self.bottom_flow = np.zeros(0)
+        self.measured_flow = np.zeros(0)
+        self.valid = np.zeros(0, dtype=bool)
+        self.decode_time = 0.0                      # Seconds to read and decode the file
+        self.calc_time = 0.0                        # Seconds to calculate the discharge
+        self.error = None                           # Error message if the transect could not be processed
+
+    @property
+    def num_ens(self) -> int:
+        return len(self.ensemble_num)
+
+    def total_top_flow(self) -> float:
+        return float(np.sum(self.top_flow))
+
+    def total_bottom_flow(self) -> float:
+        return float(np.sum(self.bottom_flow))
+
+    def total_measured_flow(self) -> float:
+        return float(np.sum(self.measured_flow))
+
+    def total_flow(self) -> float:
+        return self.total_top_flow() + self.total_measured_flow() + self.total_bottom_flow()
+
+
+def process_transect_file(file_path: str, settings: TransectSettings) -> TransectResult:
+    """
+    Decode the transect file and calculate the discharge.
+    This runs in the worker process.
+    :param file_path: Ensemble file path.
+    :param settings: Discharge settings.
+    :return: Transect results.
+    """
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    result = TransectResult(name, file_path)
+
+    try:
+        # Decode the file
+        start_time = time.perf_counter()
+        ens_list = []
+
+        def ens_rcv(sender, ens):
+            if ens.IsEnsembleData and ens.IsAncillaryData and ens.IsEarthVelocity:
+                ens_list.append(ens)
+
+        reader = ReadBinaryFile(is_lazy=True)
+        reader.ensemble_event += ens_rcv
+        reader.playback(file_path)
+
+        data = TransectData.from_ensembles(ens_list)
+        result.ensemble_num = np.array([ens.EnsembleData.EnsembleNumber for ens in ens_list], dtype=int)
+        result.delta_time = ensemble_delta_time(ens_list)
+        result.decode_time = time.perf_counter() - start_time
+
+        # Calculate the discharge
+        start_time = time.perf_counter()
+        flow = CalcDischarge().calculate_transect_flow(data,
+                                                       settings.boat_draft,
+                                                       settings.beam_angle,
+                                                       settings.pulse_length,
+                                                       settings.pulse_lag,
+                                                       result.delta_time,
+                                                       top_flow_mode=settings.top_flow_mode,
+                                                       top_pwr_func_exponent=settings.top_pwr_func_exponent,
+                                                       bottom_flow_mode=settings.bottom_flow_mode,
+                                                       min_amp=settings.min_amp,
+                                                       min_corr=settings.min_corr)
+        result.top_flow = flow.top_flow
+        result.bottom_flow = flow.bottom_flow
+        result.measured_flow = flow.measured_flow
+        result.valid = flow.valid
+        result.calc_time = time.perf_counter() - start_time
+    except Exception as e:
+        logging.error("Error processing transect " + file_path + ".  " + str(e))
+        result.error = str(e)
+
+    return result
+
+
+def ensemble_delta_time(ens_list: list):
+    """
+    Time between each ensemble and the previous ensemble in seconds.
+    The first ensemble uses the time to the next ensemble.
+    :param ens_list: List of ensembles.
+    :return: Array of delta times.
+    """
+    if len(ens_list) < 2:
+        return np.zeros(len(ens_list))
+
+    times = np.array([ens.EnsembleData.datetime().timestamp() for ens in ens_list])
+    delta_time = np.diff(times, prepend=times[0])
+    delta_time[0] = delta_time[1]
+
+    return delta_time
+
+
+class TransectProcessor:
+    """
+    Process all the transect files of a project.
+
+    Each transect file is decoded and the discharge is calculated in a
+    process pool.  The workers only pass back the result arrays.  The results
+    are written to the project HDF5 file as they complete, by this process only,
+    so the file is never written by more than one process.
+
+    processor = TransectProcessor(project)
+    processor.transect_progress += progress_func
+    results = processor.process(["/path/to/transect1.ens", "/path/to/transect2.ens"], TransectSettings(boat_draft=0.1))
+    """
+
+    # Datasets written for each transect
+    DS_ENSEMBLE_NUM = "ensemble_num"
+    DS_DELTA_TIME = "delta_time"
+    DS_TOP_FLOW = "top_flow"
+    DS_BOTTOM_FLOW = "bottom_flow"
+    DS_MEASURED_FLOW = "measured_flow"
+    DS_VALID = "valid"
+
+    def __init__(self, project: RiverProject, max_workers=None):
+        """
+        Initialize the processor.
+        :param project: Project to write the results to.
+        :param max_workers: Number of worker processes.  None will use the number of cores.  1 will process in this process.
+        """
+        self.project = project
+        self.max_workers = max_workers
+        self.elapsed_time = 0.0                     # Seconds to process the last batch
+
+    def process(self, file_list: list, settings: TransectSettings = None) -> list:
+        """
+        Process all the transect files and write the results to the project.
+        :param file_list: List of ensemble file paths.  Each file is a transect.
+        :param settings: Discharge settings.
+        :return: List of transect results in the same order as the files.
+        """
+        if settings is None:
+            settings = TransectSettings()
+
+        start_time = time.perf_counter()
+        results = [None] * len(file_list)
+        completed = 0
+
+        with h5py.File(self.project.file_path, "a") as prj_file:
+            transect_grp = prj_file.require_group(RiverProjectMeta.SUBGROUP_TRANSECT)
+
+            if self.max_workers == 1 or len(file_list) <= 1:
+                # No need for a pool
+                for index, file_path in enumerate(file_list):
+                    results[index] = process_transect_file(file_path, settings)
+                    self.write_result(transect_grp, results[index])
+                    completed += 1
+                    self.transect_progress(completed, len(file_list), results[index])
+            else:
+                with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                    futures = {pool.submit(process_transect_file, file_path, settings): index for index, file_path in enumerate(file_list)}
+
+                    # Write the results as they complete
+                    for future in as_completed(futures):
+                        index = futures[future]
+                        try:
+                            results[index] = future.result()
+                        except Exception as e:
+                            logging.error("Error processing transect " + file_list[index] + ".  " + str(e))
+                            results[index] = TransectResult(os.path.splitext(os.path.basename(file_list[index]))[0], file_list[index])
+                            results[index].error = str(e)
+
+                        self.write_result(transect_grp, results[index])
+                        completed += 1
+                        self.transect_progress(completed, len(file_list), results[index])
+
+        self.elapsed_time = time.perf_counter() - start_time
+
+        return results
+
+    def write_result(self, transect_grp: h5py.Group, result: TransectResult):
+        """
+        Write the transect results to the project file.
+        Any previous results for the same transect file are replaced.
+        The result name is changed if another file has the same name.
+        :param transect_grp: Transect subgroup in the project file.
+        :param result: Transect results.
+        """
+        if result.error:
+            return
+
+        try:
+            result.name = TransectProcessor.group_name(transect_grp, result.name, result.file_path)
+            if result.name in transect_grp:
+                del transect_grp[result.name]
+
+            grp = transect_grp.create_group(result.name)
+            grp.create_dataset(self.DS_ENSEMBLE_NUM, data=result.ensemble_num)
+            grp.create_dataset(self.DS_DELTA_TIME, data=result.delta_time)
+            grp.create_dataset(self.DS_TOP_FLOW, data=result.top_flow)
+            grp.create_dataset(self.DS_BOTTOM_FLOW, data=result.bottom_flow)
+            grp.create_dataset(self.DS_MEASURED_FLOW, data=result.measured_flow)
+            grp.create_dataset(self.DS_VALID, data=result.valid)
+
+            grp.attrs[RiverProjectMeta.TRANSECT_FILE_PATH] = result.file_path
+            grp.attrs[RiverProjectMeta.TRANSECT_TOTAL_FLOW] = result.total_flow()
+            grp.attrs[RiverProjectMeta.TRANSECT_TOP_FLOW] = result.total_top_flow()
+            grp.attrs[RiverProjectMeta.TRANSECT_BOTTOM_FLOW] = result.total_bottom_flow()
+            grp.attrs[RiverProjectMeta.TRANSECT_MEASURED_FLOW] = result.total_measured_flow()
+        except Exception as e:
+            logging.error("Error writing transect " + result.name + " to the project.  " + str(e))
+
+    @staticmethod
+    def group_name(transect_grp: h5py.Group, name: str, file_path: str) -> str:
+        """
+        Get the group name for the transect file.  Transect files in different
+        folders can have the same name, so an index is added to the name
+        if the group is used by another file.
+        :param transect_grp: Transect subgroup in the project file.
+        :param name: Transect name.
+        :param file_path: Transect file path.
+        :return: Group name for the transect file.
+        """
+        file_path = os.path.abspath(file_path)
+        group_name = name
+        index = 1
+        while group_name in transect_grp:
+            grp_file_path = transect_grp[group_name].attrs.get(RiverProjectMeta.TRANSECT_FILE_PATH, "")
+            if os.path.abspath(str(grp_file_path)) == file_path:
+                break
+            group_name = name + "_" + str(index)
+            index += 1
+
+        return group_name
+
+    @event
+    def transect_progress(self, completed, total, result):
+        """
+        Event when each transect is complete.
+        :param completed: Number of transects completed.
+        :param total: Total number of transects.
+        :param result: Results of the transect completed.
+        :return:
+        """
+        logging.debug("Transect " + result.name + " " + str(completed) + "/" + str(total) +
+                      " - Decode: " + str(round(result.decode_time, 3)) + "s" +
+                      " - Calc: " + str(round(result.calc_time, 3)) + "s")
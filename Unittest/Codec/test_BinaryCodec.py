@@ -0,0 +1,51 @@
+import os
+from rti_python.Codecs.BinaryCodec import BinaryCodec
+
+
+def read_ens_bins(file_name):
+    file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), file_name)
+    with open(file_path, "rb") as f:
+        data = f.read()
+    chunks = data.split(BinaryCodec.DELIMITER)[1:]
+    return [ens_bin for ens_bin in (BinaryCodec.DELIMITER + chunk for chunk in chunks) if BinaryCodec.verify_ens_data(ens_bin)]
+
+
+def test_find_ensembles():
+    ens_bins = read_ens_bins("B0000005.ens")
+
+    # Garbage, a bad ensemble and an ensemble not complete at the end
+    bad_ens = bytearray(ens_bins[1])
+    bad_ens[40] ^= 0xFF
+    buff = b"garbage" + ens_bins[0] + bytes(bad_ens) + BinaryCodec.DELIMITER[:5] + ens_bins[2] + ens_bins[3][:100]
+
+    ensembles, pos = BinaryCodec.find_ensembles(buff)
+    assert [ens_bin for start, ens_bin in ensembles] == [ens_bins[0], ens_bins[2]]
+    assert ensembles[0][0] == 7
+    assert buff[ensembles[1][0]:].startswith(ens_bins[2])
+
+    # The incomplete ensemble is left in the buffer
+    assert pos == len(buff) - 100
+
+    # Rest of the ensemble
+    ensembles, pos = BinaryCodec.find_ensembles(buff[pos:] + ens_bins[3][100:])
+    assert [ens_bin for start, ens_bin in ensembles] == [ens_bins[3]]
+
+    # Nothing is left at the end of the data
+    ensembles, pos = BinaryCodec.find_ensembles(ens_bins[3][:100], is_end=True)
+    assert ensembles == []
+    assert pos >= 100 - len(BinaryCodec.DELIMITER)
+
+
+def test_find_ensembles_partial_delimiter():
+    ens_bins = read_ens_bins("B0000005.ens")
+
+    # A partial delimiter at the end is kept
+    buff = ens_bins[0] + BinaryCodec.DELIMITER[:10]
+    ensembles, pos = BinaryCodec.find_ensembles(buff)
+    assert len(ensembles) == 1
+    assert pos == len(ens_bins[0])
+
+    buff = b"garbage" + BinaryCodec.DELIMITER[:10]
+    ensembles, pos = BinaryCodec.find_ensembles(buff)
+    assert ensembles == []
+    assert pos == len(buff) - (len(BinaryCodec.DELIMITER) - 1)
@@ -0,0 +1,252 @@
+import os
+import time
+import random
+import socket
+import threading
+from rti_python.Codecs.BinaryCodec import BinaryCodec
+from rti_python.Codecs.BinaryCodecUdp import UdpFrame, UdpReassembler, UdpIngestThread
+
+
+def read_ens_bin(file_name):
+    """
+    Split the file into the binary ensembles.
+    """
+    file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), file_name)
+    with open(file_path, "rb") as f:
+        data = f.read()
+
+    delimiter = b'\x80' * 16
+    chunks = data.split(delimiter)[1:]
+    return [delimiter + chunk for chunk in chunks if BinaryCodec.verify_ens_data(delimiter + chunk)]
+
+
+class Collector:
+    """
+    Keep a copy of each ensemble passed to the callback.
+    """
+
+    def __init__(self):
+        self.ens_bins = []
+        self.lock = threading.Lock()
+
+    def __call__(self, view):
+        with self.lock:
+            self.ens_bins.append(bytes(view))
+
+    def wait(self, count, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self.lock:
+                if len(self.ens_bins) >= count:
+                    return True
+            time.sleep(0.01)
+        return False
+
+
+def test_fragment():
+    ens_bin = read_ens_bin("B0000005.ens")[0]
+    datagrams = UdpFrame.fragment(ens_bin, 7)
+
+    assert len(datagrams) == (len(ens_bin) + UdpFrame.MAX_PAYLOAD - 1) // UdpFrame.MAX_PAYLOAD
+    assert all(len(datagram) <= UdpFrame.HEADER.size + UdpFrame.MAX_PAYLOAD for datagram in datagrams)
+
+    magic, seq, total, offset, index, count = UdpFrame.HEADER.unpack_from(datagrams[1])
+    assert magic == UdpFrame.MAGIC
+    assert seq == 7
+    assert total == len(ens_bin)
+    assert offset == UdpFrame.MAX_PAYLOAD
+    assert index == 1
+    assert count == len(datagrams)
+
+
+def test_reassemble_out_of_order():
+    ens_bins = read_ens_bin("B0000005.ens")
+    collector = Collector()
+    reassembler = UdpReassembler(collector)
+
+    rng = random.Random(5)
+    for seq, ens_bin in enumerate(ens_bins):
+        datagrams = UdpFrame.fragment(ens_bin, seq)
+        rng.shuffle(datagrams)
+        for datagram in datagrams:
+            reassembler.feed(memoryview(datagram), "adcp")
+
+    assert collector.ens_bins == ens_bins
+    assert reassembler.pending == 0
+    assert reassembler.metrics.ensembles == len(ens_bins)
+    assert reassembler.metrics.lost == 0
+    assert reassembler.metrics.duplicates == 0
+
+    # Ensembles decode from the reassembled data
+    ens = BinaryCodec.decode_data_sets(memoryview(collector.ens_bins[0]))
+    assert ens.EnsembleData.EnsembleNumber == BinaryCodec.decode_data_sets(ens_bins[0]).EnsembleData.EnsembleNumber
+
+
+def test_single_datagram_not_copied():
+    ens_bin = read_ens_bin("B0000005.ens")[0]
+    buf = bytearray(UdpFrame.fragment(ens_bin, 1, max_payload=len(ens_bin))[0])
+
+    views = []
+    reassembler = UdpReassembler(lambda view: views.append(view))
+    reassembler.feed(memoryview(buf))
+
+    # The view is of the receive buffer
+    assert len(views) == 1
+    assert views[0].obj is buf
+    assert views[0] == ens_bin
+
+
+def test_loss_and_reorder():
+    collector = Collector()
+    reassembler = UdpReassembler(collector)
+
+    for seq in [1, 2, 5, 3, 6, 6, 9]:
+        for datagram in UdpFrame.fragment(bytes([seq]) * 3000, seq):
+            reassembler.feed(memoryview(datagram), "adcp")
+
+    # 4, 7 and 8 lost.  3 reordered.  6 is a duplicate.
+    assert [ens_bin[0] for ens_bin in collector.ens_bins] == [1, 2, 5, 3, 6, 9]
+    assert reassembler.metrics.lost == 3
+    assert reassembler.metrics.reordered == 1
+    assert reassembler.metrics.duplicates == 3
+
+    # Late ensemble is no longer lost
+    for datagram in UdpFrame.fragment(bytes([4]) * 3000, 4):
+        reassembler.feed(memoryview(datagram), "adcp")
+    assert reassembler.metrics.lost == 2
+    assert reassembler.metrics.reordered == 2
+
+    # Each sender has a sequence.  A sequence far behind is a restart.
+    for seq in [1, 2]:
+        reassembler.feed(memoryview(UdpFrame.fragment(b"other", seq)[0]), "other")
+    reassembler.feed(memoryview(UdpFrame.fragment(b"restart", 100000)[0]), "restart")
+    reassembler.feed(memoryview(UdpFrame.fragment(b"restart", 1)[0]), "restart")
+    assert reassembler.metrics.lost == 2
+    assert collector.ens_bins[-3:] == [b"other", b"restart", b"restart"]
+
+
+def test_incomplete_timeout():
+    collector = Collector()
+    reassembler = UdpReassembler(collector, timeout=1.0)
+
+    datagrams = UdpFrame.fragment(bytes(5000), 1)
+    for datagram in datagrams[:-1]:
+        reassembler.feed(memoryview(datagram), now=10.0)
+    assert reassembler.pending == 1
+
+    reassembler.expire(now=10.5)
+    assert reassembler.pending == 1
+
+    reassembler.expire(now=11.5)
+    assert reassembler.pending == 0
+    assert reassembler.metrics.incomplete == 1
+
+    # Last fragment arrives too late
+    reassembler.feed(memoryview(datagrams[-1]), now=11.6)
+    assert collector.ens_bins == []
+
+
+def test_reassembly_latency():
+    collector = Collector()
+    reassembler = UdpReassembler(collector)
+
+    datagrams = UdpFrame.fragment(bytes(3000), 1)
+    reassembler.feed(memoryview(datagrams[0]), now=1.0)
+    reassembler.feed(memoryview(datagrams[1]), now=1.002)
+    reassembler.feed(memoryview(datagrams[2]), now=1.004)
+
+    assert len(collector.ens_bins) == 1
+    assert abs(reassembler.metrics.reassembly_max_ms - 4.0) < 1e-6
+    assert abs(reassembler.metrics.reassembly_avg_ms - 4.0) < 1e-6
+
+
+def test_unframed_and_bad():
+    stream = []
+    collector = Collector()
+    reassembler = UdpReassembler(collector, stream_callback=stream.append)
+
+    reassembler.feed(memoryview(b"\x80" * 16 + b"raw data"))
+    assert stream == [b"\x80" * 16 + b"raw data"]
+    assert reassembler.metrics.unframed == 1
+
+    # Fragment past the end of the ensemble
+    reassembler.feed(memoryview(UdpFrame.HEADER.pack(UdpFrame.MAGIC, 1, 10, 8, 0, 2) + b"data"))
+
+    # Fragment index past the count
+    reassembler.feed(memoryview(UdpFrame.HEADER.pack(UdpFrame.MAGIC, 2, 10, 0, 2, 2) + b"data"))
+
+    # Single fragment shorter than the ensemble
+    reassembler.feed(memoryview(UdpFrame.HEADER.pack(UdpFrame.MAGIC, 3, 10, 0, 0, 1) + b"data"))
+
+    assert reassembler.metrics.bad == 3
+    assert collector.ens_bins == []
+
+
+def test_ingest_thread():
+    ens_bins = read_ens_bin("B0000005.ens")
+    collector = Collector()
+
+    ingest = UdpIngestThread(collector, 0, "127.0.0.1")
+    ingest.start()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        for seq, ens_bin in enumerate(ens_bins):
+            for datagram in UdpFrame.fragment(ens_bin, seq):
+                sock.sendto(datagram, ("127.0.0.1", ingest.port))
+            time.sleep(0.002)
+
+        assert collector.wait(len(ens_bins))
+    finally:
+        sock.close()
+        ingest.shutdown()
+
+    assert collector.ens_bins == ens_bins
+
+    metrics = ingest.get_metrics()
+    assert metrics["ensembles"] == len(ens_bins)
+    assert metrics["packets"] == sum(len(UdpFrame.fragment(ens_bin, 0)) for ens_bin in ens_bins)
+    assert metrics["lost"] == 0
+    assert metrics["wakeups"] > 0
+    assert metrics["max_batch"] >= 1
+    assert metrics["packets_per_sec"] > 0.0
+    assert not ingest.is_alive()
+
+
+def test_stream_data():
+    from rti_python.Codecs.BinaryCodecUdp import BinaryCodecUdp, EnsembleMetaData
+    import json
+
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.settimeout(5.0)
+
+    # Only the streaming part of the codec.  The codec threads are not started.
+    codec = BinaryCodecUdp.__new__(BinaryCodecUdp)
+    codec.Meta = EnsembleMetaData()
+    codec.udp_ip = "127.0.0.1"
+    codec.udp_port = receiver.getsockname()[1]
+    codec.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    ens = BinaryCodec.decode_data_sets(read_ens_bin("B0000005.ens")[0])
+    try:
+        codec.stream_data(ens)
+
+        datasets = []
+        for index in range(5):
+            data = receiver.recv(65536)
+            assert data.endswith(b"\n")
+            datasets.append(json.loads(data))
+    finally:
+        codec.socket.close()
+        receiver.close()
+
+    # Each dataset has the ensemble number, serial number and time
+    names = [ds["Name"] for ds in datasets]
+    assert names[:2] == ["E000008\0", "E000001\0"]
+    for ds in datasets:
+        assert ds["EnsembleNumber"] == ens.EnsembleData.EnsembleNumber
+        assert ds["SerialNumber"] == ens.EnsembleData.SerialNumber
+        assert ds["DateTime"].startswith(str(ens.EnsembleData.Year))
+        assert "Host" in ds["Meta"]
+    assert len(datasets[1]["Velocities"]) == ens.EnsembleData.NumBins
@@ -0,0 +1,180 @@
+import os
+import struct
+import binascii
+import datetime
+import pytest
+import numpy as np
+import pynmea2
+from rti_python.Codecs.NmeaParser import NmeaParser
+from rti_python.Codecs.NmeaParser import KNOTS_TO_M_S
+from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Ensemble.EnsembleData import EnsembleData
+from rti_python.Ensemble.NmeaData import NmeaData
+
+GGA = "$GPGGA,195949.00,3254.8103248,N,11655.5779629,W,2,08,1.1,222.174,M,-32.602,M,6.0,0138*75"
+VTG = "$GPVTG,306.20,T,294.73,M,0.13,N,0.24,K,D*2E"
+HDT = "$HEHDT,244.39,T*17"
+RMC = "$GPRMC,225446,A,4916.45,N,12311.12,W,000.5,054.7,191194,020.3,E*68"
+DBT = "$SDDBT,7.8,f,2.4,M,1.3,F*0D"
+GLL = "$GPGLL,4916.45,N,12311.12,W,225444,A,*1D"
+
+
+def test_parse_matches_pynmea2():
+    gga = NmeaParser.parse(GGA)
+    expected = pynmea2.parse(GGA)
+    assert "GP" == gga.talker
+    assert "GGA" == gga.sentence_type
+    assert expected.latitude == pytest.approx(gga.latitude)
+    assert expected.longitude == pytest.approx(gga.longitude)
+    assert expected.timestamp == gga.timestamp
+    assert expected.gps_qual == gga.gps_qual
+    assert 8 == gga.num_sats
+    assert 222.174 == gga.altitude
+    assert GGA == str(gga)
+
+    vtg = NmeaParser.parse(VTG)
+    assert float(pynmea2.parse(VTG).spd_over_grnd_kts) == vtg.spd_over_grnd_kts
+    assert 306.2 == vtg.true_track
+    assert 294.73 == vtg.mag_track
+
+    hdt = NmeaParser.parse(HDT)
+    assert "HE" == hdt.talker
+    assert 244.39 == hdt.heading
+
+    rmc = NmeaParser.parse(RMC)
+    expected = pynmea2.parse(RMC)
+    assert expected.latitude == pytest.approx(rmc.latitude)
+    assert expected.longitude == pytest.approx(rmc.longitude)
+    assert datetime.date(1994, 11, 19) == rmc.datestamp
+    assert 0.5 == rmc.spd_over_grnd
+
+    dbt = NmeaParser.parse(DBT)
+    assert 2.4 == dbt.depth_meters
+    assert 7.8 == dbt.depth_feet
+
+
+def test_parse_unknown_uses_pynmea2():
+    gll = NmeaParser.parse(GLL)
+
+    assert isinstance(gll, pynmea2.types.talker.GLL)
+    assert "GLL" == gll.sentence_type
+
+
+def test_parse_bad():
+    # Bad checksum
+    assert NmeaParser.parse(HDT[:-2] + "18") is None
+    assert NmeaParser.parse("not nmea") is None
+    assert NmeaParser.parse("$G*00") is None
+
+    # Empty fields
+    gga = NmeaParser.parse("$GPGGA,,,,,,0,,,,,,,,*66")
+    assert gga.latitude == 0.0
+    assert gga.altitude is None
+    assert gga.timestamp is None
+
+
+def test_parse_batch():
+    nmea_list = [GGA + "\n" + VTG + "\n" + HDT,
+                 "",
+                 HDT + "\n" + make_sentence("HEHDT,100.5,T") + "\n" + DBT + "\n" + RMC]
+
+    columns = NmeaParser.parse_batch(nmea_list)
+
+    assert 3 == columns.num_ens
+    assert pynmea2.parse(GGA).latitude == pytest.approx(columns.latitude[0])
+    assert 19 * 3600 + 59 * 60 + 49 == columns.gga_utc[0]
+    assert 0.13 * KNOTS_TO_M_S == pytest.approx(columns.speed_m_s[0])
+    assert 244.39 == columns.heading[0]
+    assert np.isnan(columns.latitude[1])
+    assert np.isnan(columns.heading[1])
+
+    # Last sentence is used
+    assert 100.5 == columns.heading[2]
+    assert 2.4 == columns.depth_m[2]
+    assert 54.7 == columns.rmc_course_true[2]
+    assert np.isnan(columns.latitude[2])
+
+
+def test_parse_file(tmpdir):
+    file_path = os.path.join(str(tmpdir), "nmea.ens")
+    with open(file_path, "wb") as f:
+        for ens_num in range(1, 4):
+            ens_data = EnsembleData()
+            ens_data.EnsembleNumber = ens_num
+            payload = ens_data.encode()
+
+            if ens_num != 2:
+                nmea = NmeaData()
+                nmea.nmea_sentences = [GGA, make_sentence("HEHDT," + str(ens_num) + ".0,T")]
+                payload += nmea.encode()
+
+            payload = bytes(payload)
+            header = bytes(Ensemble.generate_ens_header(ens_num, len(payload)))
+            f.write(header + payload + struct.pack("I", binascii.crc_hqx(payload, 0)))
+
+    columns = NmeaParser.parse_file(file_path)
+
+    assert [1, 2, 3] == list(columns.ensemble_num)
+    assert 1.0 == columns.heading[0]
+    assert np.isnan(columns.heading[1])
+    assert 3.0 == columns.heading[2]
+    assert pynmea2.parse(GGA).longitude == pytest.approx(columns.longitude[2])
+
+
+def test_nmea_data_add_nmea():
+    nmea = NmeaData()
+    nmea.add_nmea(GGA + "\n")
+    nmea.add_nmea(VTG + "\n")
+    nmea.add_nmea(HDT + "\n")
+    nmea.add_nmea(GLL + "\n")
+    nmea.add_nmea("$HEHDT,244.39,T*18\n")
+
+    assert [GGA, VTG, HDT, GLL] == nmea.nmea_sentences
+    assert GGA == str(nmea.GPGGA)
+    assert pynmea2.parse(GGA).latitude == pytest.approx(nmea.latitude)
+    assert 0.13 * KNOTS_TO_M_S == pytest.approx(nmea.speed_m_s)
+    assert 244.39 == nmea.heading
+    assert nmea.GPGLL is not None
+    assert datetime.time(19, 59, 49, tzinfo=datetime.timezone.utc) == nmea.datetime
+
+
+def make_sentence(data):
+    """
+    Add the $ and checksum to the sentence data.
+    """
+    checksum = 0
+    for c in data:
+        checksum ^= ord(c)
+    return "$" + data + "*" + format(checksum, "02X")
+
+
+def test_no_fix():
+    gga_no_fix = make_sentence("GPGGA,123519,,,,,0,00,,,M,,M,,")
+    vtg_empty = make_sentence("GPVTG,,T,,M,,N,,K,N")
+    hdt_empty = make_sentence("HEHDT,,T")
+
+    # Position is 0.0 like pynmea2
+    gga = NmeaParser.parse(gga_no_fix)
+    assert pynmea2.parse(gga_no_fix).latitude == gga.latitude == 0.0
+    assert pynmea2.parse(gga_no_fix).longitude == gga.longitude == 0.0
+    assert 0 == gga.gps_qual
+
+    # Defaults are kept
+    nmea = NmeaData()
+    nmea.add_nmea(gga_no_fix + "\n")
+    nmea.add_nmea(vtg_empty + "\n")
+    nmea.add_nmea(hdt_empty + "\n")
+    assert 0.0 == float(nmea.latitude)
+    assert 0.0 == float(nmea.longitude)
+    assert 0.0 == float(nmea.speed_knots)
+    assert 0.0 == float(nmea.speed_m_s)
+    assert 0.0 == float(nmea.heading)
+
+    # Last good values are kept
+    nmea = NmeaData()
+    nmea.add_nmea(VTG + "\n")
+    nmea.add_nmea(HDT + "\n")
+    nmea.add_nmea(vtg_empty + "\n")
+    nmea.add_nmea(hdt_empty + "\n")
+    assert 0.13 == nmea.speed_knots
+    assert 244.39 == nmea.heading
@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+from rti_python.Codecs.RtbRowe import RtbRowe, BT, RT
+from rti_python.Ensemble.BottomTrack import BottomTrack
+from rti_python.Ensemble.RangeTracking import RangeTracking
+
+
+def generate_bt():
+    """
+    Generate a 4 beam Bottom Track dataset.
+    """
+    bt = BottomTrack()
+    bt.NumBeams = 4.0
+    bt.ActualPingCount = 10.0
+    bt.Range = [10.11, 10.22, RtbRowe.BAD_VEL, 10.44]
+    bt.SNR = [20.0, 21.0, 22.0, 200.0]
+    bt.Amplitude = [30.0, 31.0, 32.0, 33.0]
+    bt.Correlation = [0.5, 0.6, 0.7, 0.8]
+    bt.BeamVelocity = [1.1, -1.2, RtbRowe.BAD_VEL, 1.4]
+    bt.BeamGood = [10.0, 9.0, 8.0, RtbRowe.BAD_VEL]
+    bt.InstrumentVelocity = [0.1, 0.2, 0.3, 0.4]
+    bt.InstrumentGood = [10.0, 9.0, 8.0, 7.0]
+    bt.EarthVelocity = [-0.5, 0.6, RtbRowe.BAD_VEL, 0.8]
+    bt.EarthGood = [6.0, 5.0, 4.0, 3.0]
+    bt.SNR_PulseCoherent = [1.0, 2.0, 3.0, 4.0]
+    bt.Amp_PulseCoherent = [5.0, 6.0, 7.0, 8.0]
+    bt.Vel_PulseCoherent = [9.0, 10.0, 11.0, 12.0]
+    bt.Noise_PulseCoherent = [13.0, 14.0, 15.0, 16.0]
+    bt.Corr_PulseCoherent = [17.0, 18.0, 19.0, 20.0]
+
+    return bytes(bt.encode())
+
+
+def test_bt_decode():
+    bt = BT()
+    bt.decode(generate_bt())
+
+    assert 4 == bt.num_beams
+    assert 1 == len(bt.depth)
+    assert [10.11, 10.22, RtbRowe.BAD_VEL, 10.44] == pytest.approx(bt.depth[0].tolist(), 0.001)
+    assert [20.0, 21.0, 22.0, 200.0] == bt.snr[0].tolist()
+    assert [0.5, 0.6, 0.7, 0.8] == pytest.approx(bt.corr[0].tolist(), 0.001)
+    assert 1.1 == pytest.approx(bt.beam_vel[0][0], 0.001)
+    assert np.isnan(bt.beam_vel[0][2])
+    assert [10, 9, 8, 88] == bt.beam_good[0].tolist()
+    assert np.isnan(bt.earth_vel[0][2])
+    assert [6, 5, 4, 3] == bt.earth_good[0].tolist()
+    assert [13.0, 14.0, 15.0, 16.0] == bt.pulse_coh_noise[0].tolist()
+    assert [17.0, 18.0, 19.0, 20.0] == bt.pulse_coh_corr[0].tolist()
+
+    # Multiple ensembles
+    bt.decode(generate_bt())
+    assert 2 == len(bt.depth)
+
+
+def test_bt_decode_pd0():
+    bt = BT(pd0_format=True)
+    bt.decode(generate_bt())
+
+    # RTB BEAM 0,1,2,3 = PD0 BEAM 3,2,0,1
+    assert [RtbRowe.PD0_BAD_VEL, 1044, 1022, 1011] == bt.depth[0].tolist()
+    assert [44, RtbRowe.PD0_BAD_AMP, 42, 40] == bt.snr[0].tolist()
+    assert [64, 66, 62, 60] == bt.amp[0].tolist()
+    assert [178, 204, 153, 128] == bt.corr[0].tolist()
+    assert np.isnan(bt.beam_vel[0][0])
+    assert [-1400, 1200, -1100] == bt.beam_vel[0][1:].tolist()
+    assert [80, RtbRowe.PD0_BAD_VEL, 90, 100] == bt.beam_good[0].tolist()
+
+    # RTB BEAM 0,1,2,3 = PD0 XYZ order 1,0,-2,3
+    assert [-200, -100, 300, -400] == bt.instr_vel[0].tolist()
+    assert [90, 100, 80, 70] == bt.instr_good[0].tolist()
+
+    # Earth is not reordered
+    assert [500, -600] == bt.earth_vel[0][0:2].tolist()
+    assert np.isnan(bt.earth_vel[0][2])
+    assert [60, 50, 40, 30] == bt.earth_good[0].tolist()
+
+
+def test_bt_decode_old_firmware():
+    # No pulse coherent values
+    ds = generate_bt()
+    ds = ds[:len(ds) - (5 * 4 * 4)]
+
+    bt = BT()
+    bt.decode(ds)
+    assert [10.11, 10.22] == pytest.approx(bt.depth[0][0:2].tolist(), 0.001)
+    assert [0.0, 0.0, 0.0, 0.0] == bt.pulse_coh_snr[0].tolist()
+
+
+def test_rt_decode():
+    rt = RangeTracking()
+    rt.NumBeams = 3.0
+    rt.SNR = [1.0, 2.0, 3.0]
+    rt.Range = [4.0, 5.0, 6.0]
+    rt.Pings = [7.0, 8.0, 9.0]
+    rt.Amplitude = [10.0, 11.0, 12.0]
+    rt.Correlation = [13.0, 14.0, 15.0]
+    rt.BeamVelocity = [16.0, 17.0, 18.0]
+    rt.InstrumentVelocity = [19.0, 20.0, 21.0]
+    rt.EarthVelocity = [22.0, 23.0, 24.0]
+
+    rt_rowe = RT()
+    rt_rowe.decode(bytes(rt.encode()))
+
+    assert 3 == rt_rowe.num_beams
+    assert [1.0, 2.0, 3.0] == rt_rowe.snr[0].tolist()
+    assert [4.0, 5.0, 6.0] == rt_rowe.depth[0].tolist()
+    assert [7.0, 8.0, 9.0] == rt_rowe.pings[0].tolist()
+    assert [13.0, 14.0, 15.0] == rt_rowe.corr[0].tolist()
+    assert [22.0, 23.0, 24.0] == rt_rowe.earth_vel[0].tolist()
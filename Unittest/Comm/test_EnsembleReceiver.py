@@ -0,0 +1,254 @@
+import os
+import json
+import time
+import socket
+import threading
+from rti_python.Comm.EnsembleReceiver import EnsembleReceiver, EnsembleFrame
+from rti_python.Comm.EnsembleJsonData import EnsembleJsonData
+from rti_python.Codecs.BinaryCodec import BinaryCodec
+
+
+def read_ens_bin(file_name):
+    """
+    Split the file into the binary ensembles.
+    """
+    file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Codec", file_name)
+    with open(file_path, "rb") as f:
+        data = f.read()
+
+    delimiter = b'\x80' * 16
+    chunks = data.split(delimiter)[1:]
+    return [delimiter + chunk for chunk in chunks if BinaryCodec.verify_ens_data(delimiter + chunk)]
+
+
+def create_datasets(serial_number, ens_num):
+    """
+    JSON datasets of an ensemble like BinaryCodecUdp streams.
+    """
+    return [{"Name": "E000008", "EnsembleNumber": ens_num, "SerialNumber": serial_number},
+            {"Name": "E000003", "EnsembleNumber": ens_num, "SerialNumber": serial_number},
+            {"Name": "E000004", "EnsembleNumber": ens_num, "SerialNumber": serial_number}]
+
+
+def free_port(kind):
+    sock = socket.socket(socket.AF_INET, kind)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class Collector:
+    """
+    Collect the batches passed to the subscribers.
+    """
+
+    def __init__(self):
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def __call__(self, sender, ens_list):
+        with self.lock:
+            self.batches.append(ens_list)
+
+    @property
+    def ensembles(self):
+        with self.lock:
+            return [ens for batch in self.batches for ens in batch]
+
+    def wait(self, count, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if len(self.ensembles) >= count:
+                return True
+            time.sleep(0.01)
+        return False
+
+
+def test_interleaved_instruments():
+    collector = Collector()
+    receiver = EnsembleReceiver(batch_size=100)
+    receiver.EnsembleEvent += collector
+
+    # Datasets of 2 instruments are interleaved
+    for ens_num in range(1, 4):
+        for ds_a, ds_b in zip(create_datasets("A", ens_num), create_datasets("B", ens_num + 100)):
+            receiver.process(ds_a)
+            receiver.process(ds_b)
+
+    # The last ensemble of each instrument is waiting for more datasets
+    receiver.flush(time.monotonic())
+    assert collector.ensembles == []
+    receiver.flush(time.monotonic() + 10.0)
+
+    ensembles = collector.ensembles
+    assert [ens.EnsembleNumber for ens in ensembles] == [1, 101, 2, 102, 3, 103]
+    assert all(isinstance(ens, EnsembleJsonData) for ens in ensembles)
+    assert all(ens.IsEnsembleData and ens.IsEarthVelocity and ens.IsAmplitude for ens in ensembles)
+    assert receiver.metrics.timeouts == 2
+    assert receiver.metrics.missing == 0
+    assert receiver.metrics.batches == 1
+
+
+def test_json_frame():
+    collector = Collector()
+    receiver = EnsembleReceiver(batch_size=2)
+    receiver.EnsembleEvent += collector
+
+    datasets = create_datasets("A", 1) + create_datasets("A", 2) + create_datasets("A", 5)
+    frame = EnsembleFrame.encode_json(datasets)
+    frame_type, count, size = EnsembleFrame.decode_header(frame)
+    assert frame_type == EnsembleFrame.FRAME_JSON
+    assert count == 9
+
+    # The ensembles are complete at the end of the frame
+    receiver.process_datagram(memoryview(frame))
+    assert [len(batch) for batch in collector.batches] == [2]
+    receiver.flush(time.monotonic() + 1.0)
+    assert [len(batch) for batch in collector.batches] == [2, 1]
+    assert [ens.EnsembleNumber for ens in collector.ensembles] == [1, 2, 5]
+    assert receiver.metrics.missing == 2
+    assert receiver.metrics.datasets == 9
+
+
+def test_binary_frame():
+    ens_bins = read_ens_bin("B0000005.ens")
+    collector = Collector()
+    receiver = EnsembleReceiver(batch_size=8)
+    receiver.EnsembleEvent += collector
+
+    receiver.process_datagram(memoryview(EnsembleFrame.encode_binary(ens_bins[:10])))
+    receiver.process_datagram(memoryview(EnsembleFrame.encode_binary([ens_bins[10][:100], ens_bins[11]])))
+    receiver.flush(time.monotonic() + 1.0)
+
+    ensembles = collector.ensembles
+    assert len(ensembles) == 11
+    assert [ens.EnsembleData.EnsembleNumber for ens in ensembles] == [BinaryCodec.decode_data_sets(ens_bin).EnsembleData.EnsembleNumber for ens_bin in ens_bins[:10] + ens_bins[11:12]]
+    assert [len(batch) for batch in collector.batches] == [8, 3]
+    assert receiver.metrics.bad_frames == 1
+    assert receiver.metrics.missing == 1
+
+
+def test_bad_datagram():
+    receiver = EnsembleReceiver()
+
+    receiver.process_datagram(memoryview(b"not json\n"))
+    receiver.process_datagram(memoryview(EnsembleFrame.HEADER.pack(EnsembleFrame.MAGIC, 9, 0, 0)))
+    receiver.process_datagram(memoryview(EnsembleFrame.encode_binary([bytes(100)])[:20]))
+    assert receiver.metrics.bad_frames == 3
+
+
+def test_udp():
+    port = free_port(socket.SOCK_DGRAM)
+    collector = Collector()
+    receiver = EnsembleReceiver()
+    receiver.EnsembleEvent += collector
+
+    thread = threading.Thread(target=receiver.connect, args=(port,))
+    thread.start()
+    time.sleep(0.2)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        # Newline separated JSON datasets, one datagram each
+        for ens_num in range(1, 4):
+            for ds in create_datasets("A", ens_num):
+                sock.sendto(json.dumps(ds).encode() + b"\n", ("127.0.0.1", port))
+
+        # Batched frames
+        sock.sendto(EnsembleFrame.encode_json(create_datasets("B", 1) + create_datasets("B", 2)), ("127.0.0.1", port))
+        sock.sendto(EnsembleFrame.encode_binary(read_ens_bin("B0000005.ens")[:3]), ("127.0.0.1", port))
+
+        assert collector.wait(7)
+    finally:
+        sock.close()
+        receiver.close()
+        thread.join(5.0)
+
+    assert not thread.is_alive()
+
+    # Last JSON ensemble is passed when closed
+    assert len(collector.ensembles) == 8
+    assert receiver.metrics.bad_frames == 0
+
+
+def test_tcp_reconnect():
+    ens_bins = read_ens_bin("B0000005.ens")
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    port = server.getsockname()[1]
+
+    def serve():
+        # Each connection sends some ensembles, then drops
+        for start in range(0, 30, 10):
+            conn, addr = server.accept()
+            for index in range(start, start + 10, 5):
+                conn.sendall(EnsembleFrame.encode_binary(ens_bins[index:index + 5]))
+            conn.close()
+
+    server_thread = threading.Thread(target=serve)
+    server_thread.start()
+
+    collector = Collector()
+    receiver = EnsembleReceiver(min_backoff=0.01, max_backoff=0.05)
+    receiver.EnsembleEvent += collector
+    thread = threading.Thread(target=receiver.connect_tcp, args=("127.0.0.1", port))
+    thread.start()
+
+    try:
+        assert collector.wait(30)
+        server_thread.join(5.0)
+        server.close()
+
+        # Server is gone.  The receiver keeps trying.
+        time.sleep(0.3)
+    finally:
+        receiver.close()
+        thread.join(5.0)
+
+    assert not thread.is_alive()
+    assert len(collector.ensembles) == 30
+    assert receiver.metrics.connects == 3
+    assert receiver.metrics.link_errors > 3
+
+
+def test_tcp_bad_frame():
+    ens_bins = read_ens_bin("B0000005.ens")
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    port = server.getsockname()[1]
+
+    def serve():
+        # Malformed frames, then a good frame on the same connection
+        conn, addr = server.accept()
+        conn.sendall(EnsembleFrame.encode_json([{"Name": "E000008", "SerialNumber": "A"}]))
+        conn.sendall(EnsembleFrame.encode_json([1, 2]))
+        conn.sendall(EnsembleFrame.encode_binary(ens_bins[0:5]))
+        time.sleep(0.5)
+        conn.close()
+
+    server_thread = threading.Thread(target=serve)
+    server_thread.start()
+
+    collector = Collector()
+    receiver = EnsembleReceiver(min_backoff=0.01, max_backoff=0.05)
+    receiver.EnsembleEvent += collector
+    thread = threading.Thread(target=receiver.connect_tcp, args=("127.0.0.1", port))
+    thread.start()
+
+    try:
+        assert collector.wait(5)
+        server_thread.join(5.0)
+        server.close()
+    finally:
+        receiver.close()
+        thread.join(5.0)
+
+    assert not thread.is_alive()
+    assert len(collector.ensembles) == 5
+    assert receiver.metrics.bad_frames == 2
+    assert receiver.metrics.connects == 1
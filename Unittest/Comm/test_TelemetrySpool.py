@@ -0,0 +1,373 @@
+import os
+import time
+import threading
+import pytest
+from rti_python.Comm.TelemetrySpool import SpoolLog, SpoolTransport, SpoolReceiver, TelemetrySpooler
+from rti_python.Ensemble.EnsembleSerializer import EnsembleSerializer
+from rti_python.Utilities.read_binary_file import ReadBinaryFile
+
+
+def read_file(file_name):
+    file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Codec", file_name)
+
+    ens_list = []
+    reader = ReadBinaryFile()
+    reader.ensemble_event += lambda sender, ens: ens_list.append(ens)
+    reader.playback(file_path)
+
+    return ens_list
+
+
+class Collector:
+    """
+    Collect the records passed to the receiver callback.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.lock = threading.Lock()
+
+    def __call__(self, seq, data):
+        with self.lock:
+            self.records.append((seq, data))
+
+    def wait(self, count, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self.lock:
+                if len(self.records) >= count:
+                    return True
+            time.sleep(0.01)
+        return False
+
+
+def test_log_append_read(tmp_path):
+    log = SpoolLog(str(tmp_path))
+    for index in range(10):
+        assert log.append(bytes([index]) * 10) == index + 1
+
+    assert log.depth == 10
+    records = log.read(1, max_records=4)
+    assert [seq for seq, data in records] == [1, 2, 3, 4]
+    assert records[2][1] == bytes([2]) * 10
+
+    # Continue from the cursor
+    assert [seq for seq, data in log.read(5, max_records=100)] == [5, 6, 7, 8, 9, 10]
+
+    # Max bytes, at least one record is returned
+    assert [seq for seq, data in log.read(3, max_bytes=25)] == [3, 4]
+    assert [seq for seq, data in log.read(3, max_bytes=1)] == [3]
+
+    log.ack(6)
+    assert log.depth == 4
+    assert [seq for seq, data in log.read(1)] == [7, 8, 9, 10]
+    assert log.read(11) == []
+    log.close()
+
+
+def test_log_segments(tmp_path):
+    log = SpoolLog(str(tmp_path), segment_size=96)
+    for index in range(20):
+        log.append(bytes(40))
+
+    # 2 records of 48 bytes per segment
+    assert log.num_segments == 10
+    assert [seq for seq, data in log.read(1, max_records=100)] == list(range(1, 21))
+    assert [seq for seq, data in log.read(8, max_records=3)] == [8, 9, 10]
+
+    # Acknowledged segments are deleted
+    log.ack(9)
+    assert log.num_segments == 6
+    assert [seq for seq, data in log.read(1, max_records=100)] == list(range(10, 21))
+
+    # Active segment is kept
+    log.ack(20)
+    assert log.num_segments == 1
+    assert log.depth == 0
+    log.close()
+
+
+def test_log_ack_rotated_segment(tmp_path):
+    log = SpoolLog(str(tmp_path), segment_size=96)
+    log.append(bytes(40))
+    log.append(bytes(40))
+
+    # Read to the end of the segment, then a new segment is started
+    assert [seq for seq, data in log.read(1)] == [1, 2]
+    log.append(bytes(40))
+    log.ack(2)
+
+    # The segment of the cursor was deleted
+    assert log.num_segments == 1
+    assert [seq for seq, data in log.read(3)] == [3]
+    log.close()
+
+
+def test_log_reopen(tmp_path):
+    log = SpoolLog(str(tmp_path), segment_size=100)
+    for index in range(5):
+        log.append(bytes([index]) * 40)
+    log.ack(2)
+    log.close()
+
+    log = SpoolLog(str(tmp_path), segment_size=100)
+    assert log.acked == 2
+    assert log.depth == 3
+    assert [seq for seq, data in log.read(1)] == [3, 4, 5]
+    assert log.append(b"next") == 6
+    log.close()
+
+
+def test_log_incomplete_record(tmp_path):
+    log = SpoolLog(str(tmp_path))
+    log.append(b"first")
+    log.append(b"second")
+    log.close()
+
+    # Application stopped while writing a record
+    segment = [name for name in os.listdir(str(tmp_path)) if name.endswith(SpoolLog.SEGMENT_EXT)][0]
+    with open(os.path.join(str(tmp_path), segment), "ab") as f:
+        f.write(SpoolLog.RECORD.pack(100, 0) + b"partial")
+
+    log = SpoolLog(str(tmp_path))
+    assert log.depth == 2
+    assert log.append(b"third") == 3
+    assert [data for seq, data in log.read(1)] == [b"first", b"second", b"third"]
+    log.close()
+
+
+def test_round_trip(tmp_path):
+    ens_list = read_file("B0000005.ens")
+    collector = Collector()
+
+    with SpoolReceiver(collector) as receiver:
+        receiver.start()
+        spooler = TelemetrySpooler(SpoolTransport("127.0.0.1", receiver.port), str(tmp_path), batch_size=8)
+        for ens in ens_list:
+            spooler.put(ens)
+
+        assert spooler.flush(10.0)
+        assert collector.wait(len(ens_list))
+
+        metrics = spooler.get_metrics()
+        spooler.close()
+
+    assert [seq for seq, data in collector.records] == list(range(1, len(ens_list) + 1))
+    for ens, (seq, data) in zip(ens_list, collector.records):
+        assert EnsembleSerializer.loads(data).EnsembleData.EnsembleNumber == ens.EnsembleData.EnsembleNumber
+
+    assert metrics["queued"] == len(ens_list)
+    assert metrics["sent"] == len(ens_list)
+    assert metrics["queue_depth"] == 0
+    assert metrics["sent_bytes"] > 0
+    assert metrics["records_per_sec"] > 0.0
+
+
+def test_flaky_link(tmp_path):
+    collector = Collector()
+
+    with SpoolReceiver(collector, drop_every=3) as receiver:
+        receiver.start()
+        spooler = TelemetrySpooler(SpoolTransport("127.0.0.1", receiver.port, timeout=2.0), str(tmp_path),
+                                   batch_size=5, min_backoff=0.01)
+        for index in range(100):
+            spooler.put_bytes(index.to_bytes(4, "little"))
+
+        assert spooler.flush(20.0)
+        assert collector.wait(100)
+        metrics = spooler.get_metrics()
+        spooler.close()
+
+        assert receiver.dropped > 0
+
+    # Each record is received once and in order
+    assert [int.from_bytes(data, "little") for seq, data in collector.records] == list(range(100))
+    assert metrics["link_errors"] > 0
+    assert metrics["resent"] > 0
+    assert metrics["connects"] > 1
+
+
+def test_receiver_down(tmp_path):
+    collector = Collector()
+
+    # Find a free port, then stop the receiver
+    receiver = SpoolReceiver(collector)
+    port = receiver.port
+    receiver.close()
+
+    spooler = TelemetrySpooler(SpoolTransport("127.0.0.1", port, timeout=1.0), str(tmp_path), min_backoff=0.01, max_backoff=0.05)
+
+    # put() does not wait for the link
+    start = time.monotonic()
+    for index in range(20):
+        spooler.put_bytes(bytes([index]))
+    assert time.monotonic() - start < 1.0
+
+    time.sleep(0.2)
+    assert spooler.depth == 20
+    assert spooler.get_metrics()["link_errors"] > 0
+
+    with SpoolReceiver(collector, port=port) as receiver:
+        receiver.start()
+        assert spooler.flush(10.0)
+        assert collector.wait(20)
+        spooler.close()
+
+    assert [data for seq, data in collector.records] == [bytes([index]) for index in range(20)]
+
+
+def test_restart(tmp_path):
+    collector = Collector()
+
+    receiver = SpoolReceiver(collector)
+    port = receiver.port
+    receiver.close()
+
+    # Records not sent are kept when the spooler is closed
+    spooler = TelemetrySpooler(SpoolTransport("127.0.0.1", port, timeout=1.0), str(tmp_path), min_backoff=0.01)
+    for index in range(10):
+        spooler.put_bytes(bytes([index]))
+    spooler.close()
+
+    with SpoolReceiver(collector, port=port) as receiver:
+        receiver.start()
+        spooler = TelemetrySpooler(SpoolTransport("127.0.0.1", port), str(tmp_path))
+        assert spooler.depth == 10
+        assert spooler.flush(10.0)
+        assert collector.wait(10)
+        spooler.close()
+
+    assert [data for seq, data in collector.records] == [bytes([index]) for index in range(10)]
+
+
+def test_receiver_restart(tmp_path):
+    first = Collector()
+    second = Collector()
+
+    with SpoolReceiver(first) as receiver:
+        receiver.start()
+        spooler = TelemetrySpooler(SpoolTransport("127.0.0.1", receiver.port, timeout=1.0), str(tmp_path),
+                                   min_backoff=0.01, max_backoff=0.05)
+        for index in range(10):
+            spooler.put_bytes(bytes([index]))
+        assert spooler.flush(10.0)
+
+    # New receiver does not know the records already received
+    with SpoolReceiver(second) as receiver:
+        receiver.start()
+        spooler.transport.port = receiver.port
+        for index in range(10, 20):
+            spooler.put_bytes(bytes([index]))
+        assert spooler.flush(10.0)
+        assert second.wait(10)
+        metrics = spooler.get_metrics()
+        spooler.close()
+
+        assert receiver.resyncs == 1
+
+    assert [seq for seq, data in first.records] == list(range(1, 11))
+    assert [data for seq, data in second.records] == [bytes([index]) for index in range(10, 20)]
+    assert metrics["stalls"] == 0
+
+
+class StalledTransport:
+    """
+    Transport to a receiver that never acknowledges the batches.
+    """
+
+    def __init__(self):
+        self.is_connected = False
+        self.batches = 0
+
+    def connect(self):
+        self.is_connected = True
+
+    def close(self):
+        self.is_connected = False
+
+    def send_batch(self, first_seq, records):
+        self.batches += 1
+        return first_seq - 1
+
+
+class SlowTransport:
+    """
+    Transport to a slow receiver that acknowledges all the batches.
+    """
+
+    def __init__(self):
+        self.is_connected = False
+        self.records = []
+        self.sending = threading.Event()
+
+    def connect(self):
+        self.is_connected = True
+
+    def close(self):
+        self.is_connected = False
+
+    def send_batch(self, first_seq, records):
+        self.sending.set()
+        time.sleep(0.05)
+        self.records.extend(records)
+        return first_seq + len(records) - 1
+
+
+def test_rotate_unacked_batch(tmp_path):
+    transport = SlowTransport()
+    spooler = TelemetrySpooler(transport, str(tmp_path), segment_size=1000, start=False)
+
+    # Fill the first segment with 10 records of 108 bytes
+    for index in range(10):
+        spooler.put_bytes(bytes(100))
+    spooler.start()
+
+    # A new segment is started while the batch is sent and the first segment is deleted by the ack
+    assert transport.sending.wait(5.0)
+    for index in range(10):
+        spooler.put_bytes(bytes(100))
+
+    assert spooler.flush(5.0)
+    assert spooler._thread.is_alive()
+    spooler.close()
+
+    assert len(transport.records) == 20
+
+
+def test_stall_backoff(tmp_path):
+    transport = StalledTransport()
+    spooler = TelemetrySpooler(transport, str(tmp_path), min_backoff=0.05, max_backoff=0.2)
+    spooler.put_bytes(bytes(10))
+
+    # The batch is sent again with a backoff, not in a tight loop
+    assert not spooler.flush(1.0)
+    metrics = spooler.get_metrics()
+    spooler.close()
+
+    assert 2 <= transport.batches <= 10
+    assert metrics["stalls"] == transport.batches
+    assert metrics["connects"] == transport.batches
+    assert metrics["queue_depth"] == 1
+
+
+def test_rate_limit(tmp_path):
+    collector = Collector()
+
+    with SpoolReceiver(collector) as receiver:
+        receiver.start()
+        spooler = TelemetrySpooler(SpoolTransport("127.0.0.1", receiver.port), str(tmp_path),
+                                   max_batch_bytes=2000, rate_limit=20000.0)
+
+        start = time.monotonic()
+        for index in range(20):
+            spooler.put_bytes(bytes(1000))
+        assert spooler.flush(10.0)
+        elapsed = time.monotonic() - start
+        metrics = spooler.get_metrics()
+        spooler.close()
+
+    # 20000 bytes at 20000 bytes per second, less the first batch
+    assert elapsed >= 0.8
+    assert metrics["throttled_time"] > 0.0
+    assert len(collector.records) == 20
+
@@ -1,6 +1,7 @@
 import pytest
 import datetime
 import re
+import numpy as np
 from rti_python.Ensemble.Ensemble import Ensemble
 from rti_python.Ensemble.Amplitude import Amplitude
 
@@ -149,7 +150,7 @@ def test_amplitude_encode_csv():
     # Check the csv data
     test_value = 1.0
     for line in result:
-        assert bool(re.search(str(test_value), line))
+        assert bool(re.search(str(float(np.float32(test_value))), line))
         assert bool(re.search('Amp', line))
         test_value += 1.1
 
@@ -0,0 +1,162 @@
+import struct
+import binascii
+
+from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Ensemble.DatasetRegistry import DatasetRegistry, DatasetSchema
+from rti_python.Ensemble.EnsembleData import EnsembleData
+from rti_python.Ensemble.AncillaryData import AncillaryData
+from rti_python.Ensemble.SystemSetup import SystemSetup
+from rti_python.Ensemble.BottomTrack import BottomTrack
+from rti_python.Ensemble.EarthVelocity import EarthVelocity
+from rti_python.Codecs.BinaryCodec import BinaryCodec
+
+
+class WavesInfoTest:
+    """
+    Dataset used to test registering a new dataset type.
+    """
+
+    SCHEMA = DatasetSchema([("Lat", "f"), ("Lon", "f")])
+
+    def __init__(self, num_elements=2, element_multiplier=1):
+        self.ds_type = 10
+        self.num_elements = num_elements
+        self.element_multiplier = element_multiplier
+        self.image = 0
+        self.name_len = 8
+        self.Name = "E000016\0"
+        self.Lat = 0.0
+        self.Lon = 0.0
+
+    def decode(self, data):
+        WavesInfoTest.SCHEMA.decode(self, data, self.num_elements)
+
+    def encode(self):
+        result = []
+        result += Ensemble.generate_header(self.ds_type, self.num_elements, self.element_multiplier, self.image, self.name_len, self.Name)
+        result += WavesInfoTest.SCHEMA.encode(self)
+        return result
+
+
+def test_registry():
+    assert ("EnsembleData", EnsembleData) == DatasetRegistry.get("E000008")
+    assert ("EarthVelocity", EarthVelocity) == DatasetRegistry.get("E000003\0")
+    assert DatasetRegistry.get("E000099") is None
+
+
+def test_ensemble_data_schema():
+    ens_data = EnsembleData()
+    ens_data.EnsembleNumber = 2668
+    ens_data.NumBins = 37
+    ens_data.NumBeams = 4
+    ens_data.HSec = 22
+    ens_data.SerialNumber = "01H00000000000000000000000999999"
+    ens_data.SysFirmwareMajor = 0
+    ens_data.SysFirmwareMinor = 2
+    ens_data.SysFirmwareRevision = 113
+    ens_data.SysFirmwareSubsystemCode = "3"
+    ens_data.SubsystemConfig = 1
+
+    encoded = bytes(ens_data.encode())
+    assert Ensemble.GetDataSetSize(20, 8, 23, 1) == len(encoded)
+
+    ens_data1 = EnsembleData()
+    ens_data1.decode(encoded)
+
+    assert 2668 == ens_data1.EnsembleNumber
+    assert 37 == ens_data1.NumBins
+    assert 22 == ens_data1.HSec
+    assert "01H00000000000000000000000999999" == ens_data1.SerialNumber
+    assert 2 == ens_data1.SysFirmwareMinor
+    assert 113 == ens_data1.SysFirmwareRevision
+    assert "3" == ens_data1.SysFirmwareSubsystemCode
+    assert 1 == ens_data1.SubsystemConfig
+
+
+def test_older_firmware_layout():
+    # Older firmware only has the first 13 Ancillary Data values
+    assert 13 == AncillaryData.SCHEMA.layout(13).num_elements
+    assert 19 == AncillaryData.SCHEMA.layout(19).num_elements
+    assert 12 == SystemSetup.SCHEMA.layout(12).num_elements
+    assert 23 == SystemSetup.SCHEMA.layout(23).num_elements
+    assert 25 == SystemSetup.SCHEMA.layout(25).num_elements
+
+    anc = AncillaryData()
+    anc.Heading = 23.5
+    anc.RawMagFieldStrength = 12.0
+    encoded = bytes(anc.encode())
+
+    anc1 = AncillaryData(13, 1)
+    anc1.decode(encoded)
+    assert 23.5 == anc1.Heading
+    assert 0.0 == anc1.RawMagFieldStrength
+
+
+def test_short_data():
+    anc = AncillaryData()
+    anc.FirstBinRange = 1.5
+    encoded = bytes(anc.encode())
+
+    # Missing values are read as 0
+    anc1 = AncillaryData()
+    anc1.decode(encoded[:40])
+    assert 1.5 == anc1.FirstBinRange
+    assert 0.0 == anc1.SpeedOfSound
+
+
+def test_bottom_track_beams():
+    bt = BottomTrack()
+    bt.NumBeams = 4.0
+    bt.Range = [1.0, 2.0, 3.0, 4.0]
+    bt.SNR = [1.0, 2.0, 3.0, 4.0]
+    bt.Amplitude = [1.0, 2.0, 3.0, 4.0]
+    bt.Correlation = [1.0, 2.0, 3.0, 4.0]
+    bt.BeamVelocity = [1.0, 2.0, 3.0, 4.0]
+    bt.BeamGood = [1.0, 2.0, 3.0, 4.0]
+    bt.InstrumentVelocity = [1.0, 2.0, 3.0, 4.0]
+    bt.InstrumentGood = [1.0, 2.0, 3.0, 4.0]
+    bt.EarthVelocity = [1.0, 2.0, 3.0, 4.0]
+    bt.EarthGood = [1.0, 2.0, 3.0, 4.0]
+    bt.SNR_PulseCoherent = [5.0, 6.0, 7.0, 8.0]
+    bt.Amp_PulseCoherent = [5.0, 6.0, 7.0, 8.0]
+    bt.Vel_PulseCoherent = [5.0, 6.0, 7.0, 8.0]
+    bt.Noise_PulseCoherent = [9.0, 10.0, 11.0, 12.0]
+    bt.Corr_PulseCoherent = [13.0, 14.0, 15.0, 16.0]
+
+    encoded = bytes(bt.encode())
+    assert Ensemble.GetDataSetSize(10, 8, 74, 1) == len(encoded)
+
+    bt1 = BottomTrack(74, 1)
+    bt1.decode(encoded)
+    assert [1.0, 2.0, 3.0, 4.0] == bt1.Range
+    assert [9.0, 10.0, 11.0, 12.0] == bt1.Noise_PulseCoherent
+    assert [13.0, 14.0, 15.0, 16.0] == bt1.Corr_PulseCoherent
+
+
+def test_register_new_dataset():
+    DatasetRegistry.register("E000016", "WavesInfo", WavesInfoTest)
+
+    try:
+        ens_data = EnsembleData()
+        ens_data.EnsembleNumber = 12
+        waves = WavesInfoTest()
+        waves.Lat = 32.5
+        waves.Lon = -117.25
+
+        payload = bytes(ens_data.encode() + waves.encode())
+        header = bytes(Ensemble.generate_ens_header(ens_data.EnsembleNumber, len(payload)))
+        ens_bin = header + payload + struct.pack("I", binascii.crc_hqx(payload, 0))
+
+        # Decoded without changing the codec
+        ens = BinaryCodec.decode_data_sets(ens_bin)
+        assert ens.IsEnsembleData
+        assert 12 == ens.EnsembleData.EnsembleNumber
+        assert ens.IsWavesInfo
+        assert 32.5 == ens.WavesInfo.Lat
+        assert -117.25 == ens.WavesInfo.Lon
+
+        lazy_ens = BinaryCodec.decode_data_sets_lazy(ens_bin)
+        assert lazy_ens.IsWavesInfo
+        assert 32.5 == lazy_ens.WavesInfo.Lat
+    finally:
+        del DatasetRegistry.DATASETS["E000016"]
@@ -1,6 +1,7 @@
 import pytest
 import datetime
 import re
+import json
 from rti_python.Ensemble.Ensemble import Ensemble
 from rti_python.Ensemble.EarthVelocity import EarthVelocity
 import numpy as np
@@ -152,7 +153,7 @@ def test_encode_csv():
     test_value = 1.0
     for line in result:
         if bool(re.search(Ensemble.CSV_EARTH_VEL, line[0])):
-            assert bool(re.search(str(test_value), line[0]))
+            assert bool(re.search(str(float(np.float32(test_value))), line[0]))
             assert bool(re.search(Ensemble.CSV_EARTH_VEL, line[0]))
             test_value += 1.1
 
@@ -398,3 +399,141 @@ def test_avg_mag_dir_nan():
 
     assert avg_mag is None
     assert avg_dir is None
+
+
+def remove_vessel_speed_bins(earth_vel, bt_east, bt_north, bt_vert):
+    """
+    Remove the vessel speed one bin at a time to compare with the array version.
+    """
+    result = [list(bin_vel) for bin_vel in earth_vel]
+    for bin_vel in result:
+        for beam, bt_vel in enumerate((bt_east, bt_north, bt_vert)):
+            if not Ensemble.is_bad_velocity(bin_vel[beam]) and not Ensemble.is_bad_velocity(bt_vel):
+                bin_vel[beam] += bt_vel
+    return result
+
+
+def random_earth_vel(rng, shape):
+    """
+    Random earth velocities with some bad values.
+    """
+    vel = rng.uniform(-2.0, 2.0, shape)
+    vel[rng.random(shape) < 0.2] = Ensemble.BadVelocity
+    vel[rng.random(shape) < 0.05] = Ensemble.BadVelocity + 1e-6     # Close to bad velocity is also bad
+    return vel
+
+
+def test_is_bad_velocity_array():
+    vel = np.array([0.0, Ensemble.BadVelocity, 88.8880001, 88.88, -88.888, np.nan])
+
+    result = Ensemble.is_bad_velocity_array(vel)
+
+    assert result.tolist() == [Ensemble.is_bad_velocity(val) for val in vel]
+    assert Ensemble.is_bad_velocity_array([1.0, None]).tolist() == [False, True]
+
+
+def test_generate_vectors_array():
+    rng = np.random.default_rng(37)
+    earth_vel = random_earth_vel(rng, (25, 4))
+
+    mag, dir = EarthVelocity.generate_vectors(earth_vel)
+
+    assert isinstance(mag, np.ndarray)
+    assert mag.shape == (25,)
+    for bin_num in range(25):
+        e, n, u = earth_vel[bin_num][0:3]
+        assert mag[bin_num] == pytest.approx(Ensemble.calculate_magnitude(e, n, u), abs=1e-12)
+        assert dir[bin_num] == pytest.approx(Ensemble.calculate_direction(e, n), abs=1e-9)
+
+
+def test_generate_vectors_ensembles():
+    rng = np.random.default_rng(38)
+    earth_vel = random_earth_vel(rng, (6, 20, 4))
+
+    mag, dir = EarthVelocity.generate_vectors(earth_vel)
+
+    assert mag.shape == (6, 20)
+    assert dir.shape == (6, 20)
+    for ens_num in range(6):
+        ens_mag, ens_dir = EarthVelocity.generate_vectors(earth_vel[ens_num])
+        assert np.array_equal(mag[ens_num], ens_mag)
+        assert np.array_equal(dir[ens_num], ens_dir)
+
+
+def test_generate_vectors_empty():
+    mag, dir = EarthVelocity.generate_vectors(np.zeros((0, 4)))
+
+    assert mag.shape == (0,)
+    assert dir.shape == (0,)
+
+
+def test_remove_vessel_speed_array():
+    rng = np.random.default_rng(39)
+    earth_vel = random_earth_vel(rng, (25, 4))
+
+    result = EarthVelocity.remove_vessel_speed_array(earth_vel, -1.1, 0.4, -0.1)
+
+    assert np.allclose(result, remove_vessel_speed_bins(earth_vel, -1.1, 0.4, -0.1))
+
+    # Bad Bottom Track does not change the velocity
+    result = EarthVelocity.remove_vessel_speed_array(earth_vel, Ensemble.BadVelocity, 0.4, Ensemble.BadVelocity)
+
+    assert np.array_equal(result[:, 0], earth_vel[:, 0])
+    assert np.array_equal(result[:, 2], earth_vel[:, 2])
+    assert np.allclose(result, remove_vessel_speed_bins(earth_vel, Ensemble.BadVelocity, 0.4, Ensemble.BadVelocity))
+
+    # Error velocity is not changed
+    assert np.array_equal(result[:, 3], earth_vel[:, 3])
+
+
+def test_remove_vessel_speed_ensembles():
+    rng = np.random.default_rng(40)
+    earth_vel = random_earth_vel(rng, (5, 20, 4))
+    bt_east = np.array([-1.1, 0.2, Ensemble.BadVelocity, 0.5, 1.0])
+    bt_north = np.array([0.3, Ensemble.BadVelocity, -0.7, 0.1, -1.0])
+    bt_vert = np.array([0.01, 0.02, 0.03, Ensemble.BadVelocity, -0.01])
+
+    result = EarthVelocity.remove_vessel_speed_array(earth_vel, bt_east, bt_north, bt_vert)
+
+    assert result.shape == earth_vel.shape
+    for ens_num in range(5):
+        expected = remove_vessel_speed_bins(earth_vel[ens_num], bt_east[ens_num], bt_north[ens_num], bt_vert[ens_num])
+        assert np.allclose(result[ens_num], expected)
+
+
+def test_remove_vessel_speed_vectors():
+    earth = EarthVelocity(3, 4)
+    earth.Velocities[:] = [1.33, 1.45, 0.3, 0.0]
+    earth.Velocities[1][1] = Ensemble.BadVelocity
+
+    earth.remove_vessel_speed(-1.1, -1.2, -0.1)
+
+    assert earth.Velocities[0][0] == pytest.approx(0.23, abs=1e-6)
+    assert Ensemble.is_bad_velocity(earth.Velocities[1][1])
+    assert earth.Magnitude[0] == pytest.approx(0.394, 0.01)
+    assert earth.Direction[0] == pytest.approx(42.614, 0.01)
+    assert earth.Magnitude[1] == Ensemble.BadVelocity
+    assert earth.Direction[1] == Ensemble.BadVelocity
+
+
+def test_list_methods():
+    earth = EarthVelocity(3, 4)
+    assert earth.Velocities
+    assert earth.Velocities.dtype == np.float32
+
+    earth.Velocities.clear()
+    assert not earth.Velocities
+    assert earth.Velocities.shape == (0, 4)
+
+    earth.Velocities.extend([[1.0, 2.0, 3.0, 4.0], [5.0, 6.0, 7.0, 8.0]])
+    earth.Velocities.append([9.0, 10.0, 11.0, 12.0])
+    assert len(earth.Velocities) == 3
+    assert earth.Velocities[2][1] == 10.0
+    assert isinstance(earth.Velocities[2][1], float)
+    assert [row[0] for row in earth.Velocities] == [1.0, 5.0, 9.0]
+
+    # Math gives plain arrays
+    assert type(earth.Velocities * 2.0) is np.ndarray
+
+    # JSON uses the attribute name
+    assert json.loads(json.dumps(earth, default=Ensemble.to_json_obj))["Velocities"][2] == [9.0, 10.0, 11.0, 12.0]
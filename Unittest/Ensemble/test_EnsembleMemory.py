@@ -0,0 +1,96 @@
+import tracemalloc
+import numpy as np
+
+from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Ensemble.BeamVelocity import BeamVelocity
+from rti_python.Ensemble.Amplitude import Amplitude
+from rti_python.Ensemble.Correlation import Correlation
+
+
+def generate_datasets(num_bins=200, num_beams=4):
+    """
+    Generate the encoded Earth Velocity, Amplitude and Correlation datasets.
+    """
+    beam_vel = BeamVelocity(num_bins, num_beams)
+    amp = Amplitude(num_bins, num_beams)
+    corr = Correlation(num_bins, num_beams)
+    val = 0.1
+    for bin_num in range(num_bins):
+        for beam in range(num_beams):
+            beam_vel.Velocities[bin_num][beam] = val
+            amp.Amplitude[bin_num][beam] = val
+            corr.Correlation[bin_num][beam] = val
+            val += 0.1
+
+    return [(BeamVelocity, bytes(beam_vel.encode())),
+            (Amplitude, bytes(amp.encode())),
+            (Correlation, bytes(corr.encode()))]
+
+
+def decode_list_of_lists(ens_bin, num_bins, num_beams):
+    """
+    Decode the dataset the way it was stored before, a list of list of Python floats.
+    """
+    packet_pointer = Ensemble().GetBaseDataSize(8)
+    result = [[None for _ in range(num_beams)] for _ in range(num_bins)]
+    for beam in range(num_beams):
+        for bin_num in range(num_bins):
+            result[bin_num][beam] = Ensemble.GetFloat(packet_pointer, Ensemble().BytesInFloat, ens_bin)
+            packet_pointer += Ensemble().BytesInFloat
+
+    return result
+
+
+def measure(func):
+    """
+    Measure the memory allocated and still held by the result of the function.
+    :return: Bytes held and the result.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = func()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return after - before, result
+
+
+def test_dataset_memory():
+    num_bins = 200
+    num_beams = 4
+    num_ens = 50
+    datasets = generate_datasets(num_bins, num_beams)
+
+    def decode_lists():
+        return [[decode_list_of_lists(ens_bin, num_bins, num_beams) for _, ens_bin in datasets] for _ in range(num_ens)]
+
+    def decode_arrays():
+        ens_list = []
+        for _ in range(num_ens):
+            ds_list = []
+            for ds_class, ens_bin in datasets:
+                ds = ds_class(num_bins, num_beams)
+                ds.decode(ens_bin)
+                ds_list.append(ds)
+            ens_list.append(ds_list)
+        return ens_list
+
+    list_bytes, list_result = measure(decode_lists)
+    array_bytes, array_result = measure(decode_arrays)
+
+    # Same values
+    assert np.allclose(np.array(list_result[0][0]), array_result[0][0].Velocities)
+    assert np.allclose(np.array(list_result[0][1]), array_result[0][1].Amplitude)
+
+    # At least 5x less memory
+    assert list_bytes >= 5 * array_bytes
+
+
+def test_dataset_slots():
+    ds = BeamVelocity(10, 4)
+
+    # No per instance dictionary
+    assert not hasattr(ds, "__dict__")
+    assert not hasattr(Ensemble(), "__dict__")
+    assert isinstance(ds.Velocities, np.ndarray)
+    assert (10, 4) == ds.Velocities.shape
@@ -0,0 +1,187 @@
+import os
+import json
+import pickle
+import pytest
+import numpy as np
+from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Ensemble.EnsembleSerializer import EnsembleSerializer
+from rti_python.Ensemble.EnsembleData import EnsembleData
+from rti_python.Ensemble.EarthVelocity import EarthVelocity
+from rti_python.Ensemble.BottomTrack import BottomTrack
+from rti_python.Ensemble.NmeaData import NmeaData
+from rti_python.Utilities.read_binary_file import ReadBinaryFile
+
+
+def read_file(file_name):
+    file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Codec", file_name)
+
+    ens_list = []
+    reader = ReadBinaryFile()
+    reader.ensemble_event += lambda sender, ens: ens_list.append(ens)
+    reader.playback(file_path)
+
+    return ens_list
+
+
+def assert_same_ds(ds, ds2):
+    fields = Ensemble.to_json_obj(ds)
+    fields2 = Ensemble.to_json_obj(ds2)
+    for name, value in fields.items():
+        if isinstance(value, np.ndarray):
+            assert np.array_equal(np.asarray(value, dtype=np.float32), fields2[name])
+        else:
+            assert value == fields2[name], name
+
+
+@pytest.mark.parametrize("file_name", ["B0000005.ens", "B0000086_SUB.ENS"])
+def test_roundtrip_file(file_name):
+    ens_list = read_file(file_name)
+    assert len(ens_list) > 0
+
+    for ens in ens_list:
+        ens2 = EnsembleSerializer.loads(EnsembleSerializer.dumps(ens))
+
+        names = EnsembleSerializer.dataset_names(ens)
+        assert names == EnsembleSerializer.dataset_names(ens2)
+        for name in names:
+            assert_same_ds(getattr(ens, name), getattr(ens2, name))
+
+
+def test_smaller_than_pickle_and_json():
+    ens = read_file("B0000005.ens")[0]
+
+    data = EnsembleSerializer.dumps(ens)
+    assert len(data) < len(pickle.dumps(ens))
+    assert len(data) < len(json.dumps(ens, default=Ensemble.to_json_obj))
+
+
+def test_zero_copy():
+    ens = Ensemble()
+    earth = EarthVelocity(30, 4)
+    earth.Velocities = np.arange(120, dtype=float).reshape(30, 4)
+    ens.AddEarthVelocity(earth)
+
+    data = EnsembleSerializer.dumps(ens)
+
+    # Views of the bytes are read only
+    ens2 = EnsembleSerializer.loads(data)
+    vel = ens2.EarthVelocity.Velocities
+    assert vel.dtype == np.float32
+    assert vel.shape == (30, 4)
+    assert np.array_equal(earth.Velocities, vel)
+    assert not vel.flags.writeable
+    assert not vel.flags.owndata
+    assert vel.ctypes.data % EnsembleSerializer.ALIGNMENT == np.frombuffer(data, dtype=np.uint8).ctypes.data % EnsembleSerializer.ALIGNMENT
+
+    # Views of a bytearray share the memory
+    buf = bytearray(data)
+    ens3 = EnsembleSerializer.loads(buf)
+    ens3.EarthVelocity.Velocities[0][0] = 5.0
+    assert EnsembleSerializer.loads(buf).EarthVelocity.Velocities[0][0] == 5.0
+
+    # Copy owns the data
+    ens4 = EnsembleSerializer.loads(data, copy=True)
+    assert ens4.EarthVelocity.Velocities.flags.writeable
+    assert not np.shares_memory(ens4.EarthVelocity.Velocities, np.frombuffer(data, dtype=np.uint8))
+
+
+def test_float64():
+    ens = Ensemble()
+    earth = EarthVelocity(2, 4)
+    earth.Magnitude[0] = 0.1
+    ens.AddEarthVelocity(earth)
+
+    mag = EnsembleSerializer.loads(EnsembleSerializer.dumps(ens, float32=False)).EarthVelocity.Magnitude
+    assert mag.dtype == np.float64
+    assert mag[0] == 0.1
+
+    mag = EnsembleSerializer.loads(EnsembleSerializer.dumps(ens)).EarthVelocity.Magnitude
+    assert mag[0] == np.float32(0.1)
+
+    # The velocities are always float32 like the RTB data
+    vel = EnsembleSerializer.loads(EnsembleSerializer.dumps(ens, float32=False)).EarthVelocity.Velocities
+    assert vel.dtype == np.float32
+
+
+def test_fields():
+    ens = Ensemble()
+    ens_ds = EnsembleData()
+    ens_ds.EnsembleNumber = 1234
+    ens_ds.SerialNumber = "01300000000000000000000000000001"
+    ens_ds.SysFirmwareSubsystemCode = "3"
+    ens_ds.Status = -5
+    ens.AddEnsembleData(ens_ds)
+
+    bt = BottomTrack()
+    bt.NumBeams = 4.0
+    bt.Range = [1.5, 2.5, 3.5, 88.888]
+    bt.Status = 12.0
+    ens.AddBottomTrack(bt)
+
+    ens.AddRawData(b"\x80" * 16)
+
+    ens2 = EnsembleSerializer.loads(EnsembleSerializer.dumps(ens, include_raw=True))
+    assert ens2.IsEnsembleData
+    assert ens2.EnsembleData.EnsembleNumber == 1234
+    assert ens2.EnsembleData.SerialNumber == ens_ds.SerialNumber
+    assert ens2.EnsembleData.SysFirmwareSubsystemCode == "3"
+    assert ens2.EnsembleData.Status == -5
+    assert ens2.IsBottomTrack
+    assert isinstance(ens2.BottomTrack.Range, list)
+    assert ens2.BottomTrack.Range == [1.5, 2.5, 3.5, pytest.approx(88.888, rel=1e-6)]
+    assert ens2.BottomTrack.Status == 12.0
+    assert ens2.RawData == b"\x80" * 16
+    assert not ens2.IsEarthVelocity
+
+    # Raw data is not included by default
+    assert EnsembleSerializer.loads(EnsembleSerializer.dumps(ens)).RawData is None
+
+
+def test_nmea_rebuilt():
+    ens = Ensemble()
+    nmea = NmeaData()
+    nmea.add_nmea("$GPGGA,155339.00,3245.44007,N,11719.83271,W,2,09,0.9,-1.1,M,-33.3,M,5.0,0138*50")
+    ens.AddNmeaData(nmea)
+
+    ens2 = EnsembleSerializer.loads(EnsembleSerializer.dumps(ens))
+    assert ens2.IsNmeaData
+    assert ens2.NmeaData.nmea_sentences == nmea.nmea_sentences
+    assert ens2.NmeaData.num_elements == nmea.num_elements
+    assert ens2.NmeaData.latitude == pytest.approx(nmea.latitude)
+    assert ens2.NmeaData.longitude == pytest.approx(nmea.longitude)
+    assert ens2.NmeaData.GPGGA is not None
+
+
+def test_unknown_dataset_and_field():
+    ens = Ensemble()
+    ens.AddEnsembleData(EnsembleData())
+
+    data = EnsembleSerializer.dumps(ens)
+    data = data.replace(b"EnsembleNumber", b"NewFieldNumber")
+
+    # Unknown field is skipped and the default is used
+    ens2 = EnsembleSerializer.loads(data)
+    assert ens2.IsEnsembleData
+    assert ens2.EnsembleData.EnsembleNumber == 0
+
+    # Unknown dataset is skipped
+    ens3 = EnsembleSerializer.loads(data.replace(b"EnsembleData", b"FutureDataSe"))
+    assert not ens3.IsEnsembleData
+
+
+def test_bad_header():
+    ens = Ensemble()
+    ens.AddEnsembleData(EnsembleData())
+    data = EnsembleSerializer.dumps(ens)
+
+    with pytest.raises(ValueError):
+        EnsembleSerializer.loads(b"XXXX" + data[4:])
+
+    with pytest.raises(ValueError):
+        EnsembleSerializer.loads(EnsembleSerializer.HEADER.pack(EnsembleSerializer.MAGIC, EnsembleSerializer.VERSION + 1) + data[6:])
+
+    with pytest.raises(ValueError):
+        EnsembleSerializer.loads(data[:len(data) // 2])
+
+    with pytest.raises(ValueError):
+        EnsembleSerializer.loads(b"RT")
@@ -0,0 +1,140 @@
+import pickle
+import struct
+import binascii
+import numpy as np
+
+from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Ensemble.LazyEnsemble import LazyEnsemble
+from rti_python.Ensemble.EnsembleData import EnsembleData
+from rti_python.Ensemble.AncillaryData import AncillaryData
+from rti_python.Ensemble.EarthVelocity import EarthVelocity
+from rti_python.Ensemble.Amplitude import Amplitude
+from rti_python.Codecs.BinaryCodec import BinaryCodec
+
+
+def generate_ens_bin(num_bins=10, num_beams=4):
+    """
+    Generate a binary ensemble with Ensemble Data, Ancillary Data,
+    Earth Velocity and Amplitude.
+    """
+    ens_ds = EnsembleData()
+    ens_ds.EnsembleNumber = 124
+    ens_ds.NumBins = num_bins
+    ens_ds.NumBeams = num_beams
+    ens_ds.SerialNumber = "01H00000000000000000000000999999"
+    ens_ds.SysFirmwareSubsystemCode = "3"
+    ens_ds.Year = 2019
+    ens_ds.Month = 3
+    ens_ds.Day = 9
+
+    anc = AncillaryData()
+    anc.FirstBinRange = 1.0
+    anc.BinSize = 3.0
+    anc.Heading = 23.5
+
+    earth_vel = EarthVelocity(num_bins, num_beams)
+    amp = Amplitude(num_bins, num_beams)
+    val = 1.0
+    for beam in range(num_beams):
+        for bin_num in range(num_bins):
+            earth_vel.Velocities[bin_num][beam] = val
+            amp.Amplitude[bin_num][beam] = val
+            val += 1.0
+
+    payload = []
+    payload += ens_ds.encode()
+    payload += anc.encode()
+    payload += earth_vel.encode()
+    payload += amp.encode()
+    payload = bytes(payload)
+
+    header = bytes(Ensemble.generate_ens_header(ens_ds.EnsembleNumber, len(payload)))
+    checksum = struct.pack("I", binascii.crc_hqx(payload, 0))
+
+    return header + payload + checksum
+
+
+def test_index_data_sets():
+    ens_bin = generate_ens_bin()
+
+    table = BinaryCodec.index_data_sets(ens_bin)
+
+    assert ["E000008", "E000009", "E000003", "E000004"] == list(table.keys())
+    assert Ensemble.HeaderSize == table["E000008"][0]
+    assert 10 == table["E000003"][2]
+    assert 4 == table["E000003"][3]
+
+
+def test_lazy_flags():
+    ens_bin = generate_ens_bin()
+    assert BinaryCodec.verify_ens_data(ens_bin)
+
+    ens = BinaryCodec.decode_data_sets_lazy(ens_bin)
+
+    assert isinstance(ens, LazyEnsemble)
+    assert ens.IsEnsembleData
+    assert ens.IsAncillaryData
+    assert ens.IsEarthVelocity
+    assert ens.IsAmplitude
+    assert not ens.IsBeamVelocity
+    assert not ens.IsBottomTrack
+    assert ens.BottomTrack is None
+
+    # Nothing decoded yet
+    assert not ens.is_decoded("EnsembleData")
+    assert not ens.is_decoded("EarthVelocity")
+
+
+def test_lazy_decode_on_access():
+    ens_bin = generate_ens_bin()
+    ens = BinaryCodec.decode_data_sets_lazy(ens_bin)
+
+    assert 124 == ens.EnsembleData.EnsembleNumber
+    assert 10 == ens.EnsembleData.NumBins
+    assert "3" == ens.EnsembleData.SysFirmwareSubsystemCode
+    assert ens.is_decoded("EnsembleData")
+    assert not ens.is_decoded("EarthVelocity")
+
+    # Cached after the first access
+    assert ens.EnsembleData is ens.EnsembleData
+
+    assert 1.0 == ens.EarthVelocity.Velocities[0][0]
+    assert 40.0 == ens.EarthVelocity.Velocities[9][3]
+    assert 23.5 == ens.AncillaryData.Heading
+    assert not ens.is_decoded("Amplitude")
+
+
+def test_lazy_matches_eager():
+    ens_bin = generate_ens_bin()
+    lazy_ens = BinaryCodec.decode_data_sets_lazy(ens_bin)
+    ens = BinaryCodec.decode_data_sets(ens_bin)
+
+    assert ens.EnsembleData.EnsembleNumber == lazy_ens.EnsembleData.EnsembleNumber
+    assert ens.EnsembleData.SerialNumber == lazy_ens.EnsembleData.SerialNumber
+    assert ens.AncillaryData.BinSize == lazy_ens.AncillaryData.BinSize
+    assert np.array_equal(ens.EarthVelocity.Velocities, lazy_ens.EarthVelocity.Velocities)
+    assert np.array_equal(ens.EarthVelocity.Magnitude, lazy_ens.EarthVelocity.Magnitude)
+    assert np.array_equal(ens.Amplitude.Amplitude, lazy_ens.Amplitude.Amplitude)
+    assert ens.is_good_bin(0) == lazy_ens.is_good_bin(0)
+
+
+def test_lazy_pickle():
+    ens_bin = generate_ens_bin()
+    ens = BinaryCodec.decode_data_sets_lazy(ens_bin)
+
+    ens1 = pickle.loads(pickle.dumps(ens))
+
+    assert ens1.IsEarthVelocity
+    assert 124 == ens1.EnsembleData.EnsembleNumber
+    assert 40.0 == ens1.EarthVelocity.Velocities[9][3]
+    assert 23.5 == ens1.AncillaryData.Heading
+
+
+def test_lazy_unknown_attribute():
+    ens = BinaryCodec.decode_data_sets_lazy(generate_ens_bin())
+
+    try:
+        ens.NotAnAttribute
+        assert False
+    except AttributeError:
+        pass
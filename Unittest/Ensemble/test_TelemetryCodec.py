@@ -0,0 +1,242 @@
+import os
+import pytest
+import numpy as np
+from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Ensemble.TelemetryCodec import TelemetryCodec
+from rti_python.Ensemble.EnsembleData import EnsembleData
+from rti_python.Ensemble.AncillaryData import AncillaryData
+from rti_python.Ensemble.EarthVelocity import EarthVelocity
+from rti_python.Ensemble.Amplitude import Amplitude
+from rti_python.Ensemble.Correlation import Correlation
+from rti_python.Ensemble.GoodEarth import GoodEarth
+from rti_python.Ensemble.BottomTrack import BottomTrack
+from rti_python.Utilities.read_binary_file import ReadBinaryFile
+
+
+def read_file(file_name):
+    file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Codec", file_name)
+
+    ens_list = []
+    reader = ReadBinaryFile()
+    reader.ensemble_event += lambda sender, ens: ens_list.append(ens)
+    reader.playback(file_path)
+
+    return ens_list
+
+
+def create_ens(ens_num, num_bins=100, num_beams=4, ss_code="3", ss_config=1, rng=None):
+    """
+    Create an ensemble with a smooth current profile.
+    """
+    if rng is None:
+        rng = np.random.default_rng(ens_num)
+
+    ens = Ensemble()
+
+    ens_ds = EnsembleData()
+    ens_ds.EnsembleNumber = ens_num
+    ens_ds.NumBins = num_bins
+    ens_ds.NumBeams = num_beams
+    ens_ds.SerialNumber = "01300000000000000000000000000001"
+    ens_ds.SysFirmwareSubsystemCode = ss_code
+    ens_ds.SubsystemConfig = ss_config
+    ens_ds.Year = 2019
+    ens_ds.Month = 3
+    ens_ds.Day = 9
+    ens_ds.Second = ens_num % 60
+    ens.AddEnsembleData(ens_ds)
+
+    anc = AncillaryData()
+    anc.FirstBinRange = 1.0
+    anc.BinSize = 1.0
+    anc.Heading = 45.0
+    anc.WaterTemp = 15.5
+    ens.AddAncillaryData(anc)
+
+    depth = np.arange(num_bins)[:, np.newaxis]
+    tide = 0.5 * np.sin(ens_num / 50.0)
+
+    earth = EarthVelocity(num_bins, num_beams)
+    earth.Velocities = (tide + 0.004 * depth) * np.array([1.0, 0.5, 0.0, 0.0]) + rng.normal(0.0, 0.001, (num_bins, num_beams))
+    earth.Velocities[num_bins - 10:] = Ensemble.BadVelocity
+    ens.AddEarthVelocity(earth)
+
+    amp = Amplitude(num_bins, num_beams)
+    amp.Amplitude = 80.0 - 0.5 * depth + rng.normal(0.0, 0.2, (num_bins, num_beams))
+    ens.AddAmplitude(amp)
+
+    corr = Correlation(num_bins, num_beams)
+    corr.Correlation = np.full((num_bins, num_beams), 0.95) - 0.002 * depth
+    ens.AddCorrelation(corr)
+
+    good = GoodEarth(num_bins, num_beams)
+    good.GoodEarth = np.full((num_bins, num_beams), 10)
+    ens.AddGoodEarth(good)
+
+    return ens
+
+
+def rtb_size(ens):
+    payload = []
+    payload += ens.EnsembleData.encode()
+    payload += ens.AncillaryData.encode()
+    payload += ens.EarthVelocity.encode()
+    payload += ens.Amplitude.encode()
+    payload += ens.Correlation.encode()
+    payload += ens.GoodEarth.encode()
+
+    return Ensemble.HeaderSize + len(payload) + Ensemble.ChecksumSize
+
+
+def assert_within_bounds(ens, ens2, codec):
+    bounds = codec.error_bounds()
+    for attr_name, value_name in [("EarthVelocity", "Velocities"), ("BeamVelocity", "Velocities"),
+                                  ("Amplitude", "Amplitude"), ("Correlation", "Correlation"),
+                                  ("GoodEarth", "GoodEarth"), ("GoodBeam", "GoodBeam")]:
+        if attr_name not in bounds or not getattr(ens, "Is" + attr_name):
+            continue
+
+        values = np.asarray(getattr(getattr(ens, attr_name), value_name), dtype=float)
+        values2 = getattr(getattr(ens2, attr_name), value_name)
+        bad = Ensemble.is_bad_velocity_array(values)
+        assert np.array_equal(bad, Ensemble.is_bad_velocity_array(values2))
+        assert np.all(np.abs(values[~bad] - values2[~bad]) <= bounds[attr_name] + 1e-9)
+        assert codec.last_error.get(attr_name, 0.0) <= bounds[attr_name] + 1e-9
+
+
+def test_compression_ratio():
+    encoder = TelemetryCodec()
+    decoder = TelemetryCodec()
+
+    raw_size = 0
+    packet_size = 0
+    for ens_num in range(1, 51):
+        ens = create_ens(ens_num)
+        packet = encoder.encode(ens)
+
+        raw_size += rtb_size(ens)
+        packet_size += len(packet)
+
+        ens2 = decoder.decode(packet)
+        assert ens2 is not None
+        assert ens2.EnsembleData.EnsembleNumber == ens_num
+        assert_within_bounds(ens, ens2, encoder)
+
+    assert raw_size / packet_size >= 10.0
+
+
+def test_error_bounds():
+    codec = TelemetryCodec(vel_resolution=0.01, amp_resolution=1.0)
+    bounds = codec.error_bounds()
+
+    assert bounds["EarthVelocity"] == pytest.approx(0.005)
+    assert bounds["Amplitude"] == pytest.approx(0.5)
+    assert bounds["Correlation"] == pytest.approx(0.5 / 255.0)
+    assert bounds["GoodEarth"] == 0.0
+    assert "BeamVelocity" not in bounds
+
+    encoder = TelemetryCodec(vel_resolution=0.01, amp_resolution=1.0)
+    ens = create_ens(1)
+    ens2 = TelemetryCodec().decode(encoder.encode(ens))
+    assert_within_bounds(ens, ens2, encoder)
+
+
+@pytest.mark.parametrize("compression", [TelemetryCodec.COMPRESS_NONE, TelemetryCodec.COMPRESS_ZLIB, TelemetryCodec.COMPRESS_LZMA])
+def test_file(compression):
+    ens_list = read_file("B0000005.ens")
+
+    encoder = TelemetryCodec(compression=compression, fields=TelemetryCodec.DEFAULT_FIELDS + ["BeamVelocity"])
+    decoder = TelemetryCodec()
+    for ens in ens_list:
+        ens2 = decoder.decode(encoder.encode(ens))
+        assert ens2 is not None
+        assert_within_bounds(ens, ens2, encoder)
+
+        # Datasets are sent with the RTB values
+        for name in ["EnsembleNumber", "SerialNumber", "SubsystemConfig", "SysFirmwareSubsystemCode", "ActualPingCount"]:
+            assert getattr(ens.EnsembleData, name) == getattr(ens2.EnsembleData, name)
+        for name in ["FirstBinRange", "BinSize", "Heading", "Pitch", "Roll", "WaterTemp", "Pressure"]:
+            assert getattr(ens.AncillaryData, name) == getattr(ens2.AncillaryData, name)
+        assert ens2.IsSystemSetup == ens.IsSystemSetup
+        assert not ens2.IsInstrumentVelocity
+
+
+def test_interleaved_subsystems():
+    ens_list = read_file("B0000086_SUB.ENS")
+
+    encoder = TelemetryCodec(fields=["BeamVelocity", "Amplitude"])
+    decoder = TelemetryCodec()
+    for ens in ens_list:
+        ens2 = decoder.decode(encoder.encode(ens))
+        assert ens2 is not None
+        assert ens2.EnsembleData.SubsystemConfig == ens.EnsembleData.SubsystemConfig
+        assert_within_bounds(ens, ens2, encoder)
+
+
+def test_bottom_track():
+    ens = create_ens(1)
+    bt = BottomTrack()
+    bt.NumBeams = 4.0
+    bt.Status = 1.0
+    for name in BottomTrack.BEAM_FIELDS:
+        setattr(bt, name, [1.5, 2.5, 3.5, 4.5])
+    ens.AddBottomTrack(bt)
+
+    ens2 = TelemetryCodec().decode(TelemetryCodec().encode(ens))
+    assert ens2.IsBottomTrack
+    assert ens2.BottomTrack.Range == [1.5, 2.5, 3.5, 4.5]
+    assert ens2.BottomTrack.EarthVelocity == [1.5, 2.5, 3.5, 4.5]
+    assert ens2.BottomTrack.Status == 1.0
+
+
+def test_lost_packet():
+    encoder = TelemetryCodec(keyframe_interval=5)
+    decoder = TelemetryCodec()
+
+    packets = [encoder.encode(create_ens(ens_num)) for ens_num in range(1, 13)]
+
+    # Packet 3 is lost.  The delta packets can not be decoded until the next keyframe.
+    results = [decoder.decode(packet) for index, packet in enumerate(packets) if index != 2]
+    decoded = [ens.EnsembleData.EnsembleNumber for ens in results if ens is not None]
+    assert decoded == [1, 2, 6, 7, 8, 9, 10, 11, 12]
+
+    # A new decoder starts at a keyframe
+    decoder = TelemetryCodec()
+    assert decoder.decode(packets[1]) is None
+    assert decoder.decode(packets[5]).EnsembleData.EnsembleNumber == 6
+
+
+def test_keyframe_only():
+    encoder = TelemetryCodec(keyframe_interval=1)
+    packets = [encoder.encode(create_ens(ens_num)) for ens_num in range(1, 5)]
+
+    # Each packet can be decoded on its own
+    for ens_num, packet in zip(range(1, 5), reversed(packets)):
+        assert TelemetryCodec().decode(packet).EnsembleData.EnsembleNumber == 5 - ens_num
+
+
+def test_clipped():
+    ens = create_ens(1)
+    ens.EarthVelocity.Velocities[0][0] = 40.0
+    ens.Amplitude.Amplitude[0][0] = 200.0
+
+    ens2 = TelemetryCodec().decode(TelemetryCodec().encode(ens))
+    assert ens2.EarthVelocity.Velocities[0][0] == pytest.approx(32.767)
+    assert ens2.Amplitude.Amplitude[0][0] == pytest.approx(127.5)
+
+
+def test_bad_packet():
+    packet = TelemetryCodec().encode(create_ens(1))
+
+    with pytest.raises(ValueError):
+        TelemetryCodec().decode(b"XXX" + packet[3:])
+
+    with pytest.raises(ValueError):
+        TelemetryCodec().decode(TelemetryCodec.HEADER.pack(TelemetryCodec.MAGIC, TelemetryCodec.VERSION + 1, 0) + packet[5:])
+
+    with pytest.raises(ValueError):
+        TelemetryCodec().decode(packet[:len(packet) // 2])
+
+    packet = TelemetryCodec(compression=TelemetryCodec.COMPRESS_NONE).encode(create_ens(1))
+    with pytest.raises(ValueError):
+        TelemetryCodec().decode(packet[:len(packet) - 10])
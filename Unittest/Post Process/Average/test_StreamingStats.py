@@ -0,0 +1,162 @@
+import os
+import pytest
+import numpy as np
+from rti_python.Post_Process.Average.StreamingStats import RunningStats
+from rti_python.Post_Process.Average.StreamingStats import QuantileSketch
+from rti_python.Post_Process.Average.StreamingStats import EnsembleStats
+from rti_python.Utilities.read_binary_file import ReadBinaryFile
+from rti_python.Ensemble.Ensemble import Ensemble
+
+
+def read_file(file_name):
+    file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Codec", file_name)
+
+    ens_list = []
+    reader = ReadBinaryFile()
+    reader.ensemble_event += lambda sender, ens: ens_list.append(ens)
+    reader.playback(file_path)
+
+    return ens_list
+
+
+def test_running_stats():
+    rng = np.random.default_rng(40)
+    values = rng.normal(0.5, 2.0, (200, 10, 4))
+    values[rng.random(values.shape) < 0.1] = np.nan
+
+    stats = RunningStats()
+    for ens_values in values:
+        stats.update(ens_values)
+
+    assert stats.shape == (10, 4)
+    assert np.array_equal(stats.count, np.count_nonzero(~np.isnan(values), axis=0))
+    assert np.allclose(stats.get_mean(), np.nanmean(values, axis=0))
+    assert np.allclose(stats.std(), np.nanstd(values, axis=0, ddof=1))
+    assert np.allclose(stats.get_min(), np.nanmin(values, axis=0))
+    assert np.allclose(stats.get_max(), np.nanmax(values, axis=0))
+
+
+def test_running_stats_merge():
+    rng = np.random.default_rng(41)
+    values = rng.normal(-1.0, 0.5, (300, 6, 4))
+
+    stats_a = RunningStats()
+    stats_b = RunningStats()
+    for ens_values in values[:100]:
+        stats_a.update(ens_values)
+    for ens_values in values[100:]:
+        stats_b.update(ens_values)
+    stats_a.merge(stats_b)
+
+    assert np.all(stats_a.count == 300)
+    assert np.allclose(stats_a.get_mean(), values.mean(axis=0))
+    assert np.allclose(stats_a.std(), values.std(axis=0, ddof=1))
+    assert np.allclose(stats_a.get_max(), values.max(axis=0))
+
+
+def test_running_stats_grow():
+    stats = RunningStats()
+    stats.update(np.ones((2, 4)))
+    stats.update(np.full((3, 4), 3.0))
+
+    assert stats.shape == (3, 4)
+    assert stats.count[0, 0] == 2
+    assert stats.count[2, 0] == 1
+    assert stats.get_mean()[0, 0] == pytest.approx(2.0)
+    assert stats.get_mean()[2, 0] == pytest.approx(3.0)
+
+    # Missing bins are not counted
+    empty = RunningStats()
+    assert np.all(np.isnan(empty.get_mean()))
+
+
+def test_quantile_sketch():
+    rng = np.random.default_rng(42)
+    values = rng.uniform(-2.0, 2.0, (2000, 5, 4))
+
+    sketch = QuantileSketch(low=-10.0, high=10.0, num_buckets=2000)
+    for ens_values in values:
+        sketch.update(ens_values)
+
+    for q in [0.1, 0.5, 0.9]:
+        assert np.allclose(sketch.quantile(q), np.quantile(values, q, axis=0), atol=0.02)
+
+
+def test_quantile_sketch_merge():
+    rng = np.random.default_rng(43)
+    values = rng.normal(0.0, 1.0, (1000, 3, 4))
+
+    sketch_a = QuantileSketch(low=-5.0, high=5.0, num_buckets=500)
+    sketch_b = QuantileSketch(low=-5.0, high=5.0, num_buckets=500)
+    sketch_all = QuantileSketch(low=-5.0, high=5.0, num_buckets=500)
+    for index, ens_values in enumerate(values):
+        (sketch_a if index % 2 else sketch_b).update(ens_values)
+        sketch_all.update(ens_values)
+    sketch_a.merge(sketch_b)
+
+    assert np.array_equal(sketch_a.counts, sketch_all.counts)
+
+    with pytest.raises(ValueError):
+        sketch_a.merge(QuantileSketch(low=-1.0, high=1.0, num_buckets=500))
+
+
+def test_ensemble_stats():
+    ens_list = read_file("B0000005.ens")
+
+    stats = EnsembleStats()
+    for ens in ens_list:
+        stats.add_ens(ens)
+
+    earth_vel = np.array([ens.EarthVelocity.Velocities for ens in ens_list])
+    earth_vel[Ensemble.is_bad_velocity_array(earth_vel)] = np.nan
+    results = stats.results()
+
+    assert stats.num_ens == len(ens_list)
+    earth = results[EnsembleStats.EARTH_VELOCITY]
+    good = earth["count"] > 1
+    assert np.allclose(earth["mean"][good], np.nanmean(earth_vel, axis=0)[good])
+    assert np.allclose(earth["std"][good], np.nanstd(earth_vel, axis=0, ddof=1)[good])
+    assert np.all(earth["p25"][good] <= earth["p50"][good])
+    assert np.all(earth["p50"][good] <= earth["p75"][good])
+    assert np.all(earth["p5"][good] >= earth["min"][good])
+    assert np.all(earth["p95"][good] <= earth["max"][good])
+
+    amp = np.array([ens.Amplitude.Amplitude for ens in ens_list])
+    assert np.allclose(results[EnsembleStats.AMPLITUDE]["mean"], amp.mean(axis=0))
+
+
+def test_ensemble_stats_merge_snapshot(tmpdir):
+    ens_list = read_file("B0000005.ens")
+
+    stats_all = EnsembleStats()
+    stats_a = EnsembleStats()
+    stats_b = EnsembleStats()
+    for index, ens in enumerate(ens_list):
+        stats_all.add_ens(ens)
+        (stats_a if index < 10 else stats_b).add_ens(ens)
+
+    # Save and load one half before merging
+    file_path = str(tmpdir.join("stats.npz"))
+    stats_b.save(file_path)
+    stats_b = EnsembleStats.load(file_path)
+    stats_a.merge(stats_b)
+
+    assert stats_a.num_ens == stats_all.num_ens
+    assert stats_a.first_ens_num == stats_all.first_ens_num
+    assert stats_a.last_ens_num == stats_all.last_ens_num
+
+    merged = stats_a.results()
+    expected = stats_all.results()
+    for name in expected:
+        for key in expected[name]:
+            assert np.allclose(merged[name][key], expected[name][key], equal_nan=True)
+
+
+def test_ensemble_stats_subsystem():
+    ens_list = read_file("B0000005.ens")
+
+    stats = EnsembleStats(ss_config=ens_list[0].EnsembleData.SubsystemConfig + 1)
+    for ens in ens_list:
+        stats.add_ens(ens)
+
+    assert stats.num_ens == 0
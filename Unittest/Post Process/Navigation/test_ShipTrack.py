@@ -0,0 +1,126 @@
+import math
+import pytest
+import numpy as np
+from pygeodesy import ellipsoidalVincenty
+from rti_python.Post_Process.Navigation.ShipTrack import ShipTrack
+from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Ensemble.EnsembleData import EnsembleData
+from rti_python.Ensemble.BottomTrack import BottomTrack
+
+
+def test_bt_track():
+    times = np.arange(0.0, 10.0)
+    bt_east = np.full(10, 1.0)
+    bt_north = np.full(10, -1.0)
+    bt_east[4] = Ensemble.BadVelocity
+
+    result = ShipTrack.calculate(bt_east, bt_north, times)
+
+    # Bad velocity is interpolated
+    assert 9.0 == pytest.approx(result.bt_east[-1])
+    assert -9.0 == pytest.approx(result.bt_north[-1])
+    assert math.hypot(9.0, 9.0) == pytest.approx(result.bt_dmg[-1])
+    assert 135.0 == pytest.approx(result.bt_cmg[-1])
+    assert math.hypot(9.0, 9.0) == pytest.approx(result.bt_path_length[-1])
+
+    # Bad velocity does not move the ship
+    result = ShipTrack.calculate(bt_east, bt_north, times, interpolate_bad=False)
+    assert 8.0 == pytest.approx(result.bt_east[-1])
+
+
+def test_bt_loop_path_length():
+    # Go out and come back
+    times = np.arange(0.0, 20.0)
+    bt_east = np.where(times <= 10.0, 2.0, -2.0)
+    bt_north = np.zeros(20)
+
+    result = ShipTrack.calculate(bt_east, bt_north, times)
+
+    assert 2.0 == pytest.approx(result.bt_dmg[-1])
+    assert 38.0 == pytest.approx(result.bt_path_length[-1])
+
+
+def test_gps_track_matches_vincenty():
+    start = ellipsoidalVincenty.LatLon(45.123, -93.456)
+    points = [start.destination(distance=dist, bearing=30.0) for dist in range(0, 1000, 100)]
+    latitude = np.array([p.lat for p in points])
+    longitude = np.array([p.lon for p in points])
+    latitude[3] = 0.0
+    longitude[3] = 0.0
+
+    east, north = ShipTrack.gps_track(latitude, longitude)
+
+    assert np.isnan(east[3])
+    for index, point in enumerate(points):
+        if index == 3:
+            continue
+        dist = start.distanceTo(point)
+        assert dist == pytest.approx(math.hypot(east[index], north[index]), abs=0.05)
+
+    dmg, cmg, path_length = ShipTrack.made_good(east, north)
+    assert 900.0 == pytest.approx(dmg[-1], abs=0.05)
+    assert 30.0 == pytest.approx(cmg[-1], abs=0.01)
+    assert 900.0 == pytest.approx(path_length[-1], abs=0.05)
+
+
+def test_enu_round_trip():
+    east = np.array([0.0, 100.0, -250.0])
+    north = np.array([0.0, 50.0, 300.0])
+    latitude, longitude = ShipTrack.enu_to_latlon(east, north, -33.5, 151.2)
+    result_east, result_north = ShipTrack.latlon_to_enu(latitude, longitude, -33.5, 151.2)
+
+    assert np.allclose(east, result_east)
+    assert np.allclose(north, result_north)
+
+
+def test_moving_bed_velocity():
+    times = np.arange(0.0, 101.0)
+    ref_lat = 40.0
+    ref_lon = -105.0
+
+    # Boat moving East at 1 m/s over a bed moving North at 0.1 m/s
+    gps_east = times * 1.0
+    gps_north = np.zeros(len(times))
+    latitude, longitude = ShipTrack.enu_to_latlon(gps_east, gps_north, ref_lat, ref_lon)
+    bt_east = np.full(len(times), 1.0)
+    bt_north = np.full(len(times), -0.1)
+
+    result = ShipTrack.calculate(bt_east, bt_north, times, latitude, longitude)
+    speed, direction = result.moving_bed_velocity()
+
+    assert 0.1 == pytest.approx(speed, abs=1e-4)
+    assert 0.0 == pytest.approx((direction + 180.0) % 360.0 - 180.0, abs=0.1)
+
+    diff_east, diff_north, diff = result.track_diff()
+    assert 10.0 == pytest.approx(diff[-1], abs=0.01)
+
+
+def test_align_gps():
+    lat, lon = ShipTrack.align_gps([0.5, 1.5, 5.0], [0.0, 1.0, 2.0], [10.0, 11.0, 12.0], [20.0, 22.0, 24.0])
+
+    assert np.allclose([10.5, 11.5], lat[0:2])
+    assert np.allclose([21.0, 23.0], lon[0:2])
+    assert np.isnan(lat[2])
+
+
+def test_from_ensembles():
+    ens_list = []
+    for index in range(5):
+        ens = Ensemble()
+        ens_data = EnsembleData()
+        ens_data.Year = 2020
+        ens_data.Month = 1
+        ens_data.Day = 1
+        ens_data.Second = index * 2
+        ens.AddEnsembleData(ens_data)
+
+        bt = BottomTrack()
+        bt.EarthVelocity = [0.5, 0.0, 0.0, 0.0]
+        ens.AddBottomTrack(bt)
+        ens_list.append(ens)
+
+    result = ShipTrack.from_ensembles(ens_list)
+
+    assert 4.0 == pytest.approx(result.bt_east[-1])
+    assert 8.0 == pytest.approx(result.elapsed_time[-1])
+    assert np.all(np.isnan(result.gps_east))
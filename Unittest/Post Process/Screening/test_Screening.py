@@ -0,0 +1,133 @@
+import os
+import pytest
+import numpy as np
+from rti_python.Post_Process.Screening.Screening import Screening
+from rti_python.Post_Process.Screening.Screening import ScreeningData
+from rti_python.Post_Process.Screening.Screening import ScreeningThresholds
+from rti_python.Utilities.read_binary_file import ReadBinaryFile
+from rti_python.Ensemble.Ensemble import Ensemble
+
+
+def read_file(file_name):
+    file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Codec", file_name)
+
+    ens_list = []
+    reader = ReadBinaryFile()
+    reader.ensemble_event += lambda sender, ens: ens_list.append(ens)
+    reader.playback(file_path)
+
+    return ens_list
+
+
+def create_data(num_ens=2, num_bins=10, num_beams=4):
+    data = ScreeningData(num_ens, num_bins, num_beams)
+    data.velocity[:] = 0.5
+    data.amplitude[:] = 30.0
+    data.correlation[:] = 0.9
+    data.first_bin_range[:] = 1.0
+    data.bin_size[:] = 1.0
+    return data
+
+
+@pytest.mark.parametrize("file_name", ["B0000005.ens", "B0000086_SUB.ENS"])
+@pytest.mark.parametrize("min_amp, min_corr", [(0.25, 0.10), (10.0, 0.5), (30.0, 0.9)])
+def test_matches_is_good_bin(file_name, min_amp, min_corr):
+    ens_list = [ens for ens in read_file(file_name) if ens.IsEarthVelocity]
+
+    mask = Screening.screen_ensembles(ens_list, ScreeningThresholds(min_amp=min_amp, min_corr=min_corr))
+
+    for index, ens in enumerate(ens_list):
+        for bin_num in range(ens.EarthVelocity.num_elements):
+            assert mask.good_bin(index, bin_num) == ens.is_good_bin(bin_num, min_amp, min_corr)
+
+
+def test_beam_masks():
+    data = create_data()
+    data.amplitude[0, 1, 0] = 1.0
+    data.correlation[0, 2, 1] = 0.1
+    data.correlation[0, 2, 2] = 0.1
+    data.velocity[1, 3, 3] = Ensemble.BadVelocity
+
+    mask = Screening.screen(data, ScreeningThresholds(min_amp=5.0, min_corr=0.5))
+
+    assert mask.shape == (2, 10, 4)
+    assert not mask.amplitude[0, 1, 0]
+    assert not mask.correlation[0, 2, 1]
+    assert not mask.velocity[1, 3, 3]
+
+    # One bad beam is allowed in a good bin
+    assert mask.bin[0, 1]
+    assert not mask.beam[0, 1, 0]
+    assert mask.beam[0, 1, 1]
+
+    # Two bad beams make the bin bad
+    assert not mask.bin[0, 2]
+    assert not np.any(mask.beam[0, 2])
+
+    assert np.count_nonzero(~mask.bin) == 1
+
+
+def test_missing_data_not_screened():
+    data = create_data()
+    data.amplitude[:] = np.nan
+    data.correlation[:] = np.nan
+
+    mask = Screening.screen(data, ScreeningThresholds(min_amp=5.0, min_corr=0.5, min_percent_good=50.0))
+
+    assert np.all(mask.beam)
+
+
+def test_error_velocity():
+    data = create_data()
+    data.velocity[0, 4, 3] = 0.3
+    data.velocity[0, 5, 3] = -0.3
+    data.velocity[1, 6, 3] = Ensemble.BadVelocity
+
+    mask = Screening.screen(data, ScreeningThresholds(max_error_vel=0.2, max_bad_beams=1))
+
+    assert not mask.error_velocity[0, 4]
+    assert not mask.error_velocity[0, 5]
+    assert mask.error_velocity[1, 6]
+    assert not mask.bin[0, 0]
+    assert mask.bin[1, 6]
+
+
+def test_percent_good():
+    data = create_data()
+    data.percent_good[:] = 100.0
+    data.percent_good[0, 0, 0:2] = 20.0
+
+    mask = Screening.screen(data, ScreeningThresholds(min_percent_good=50.0))
+
+    assert not mask.percent_good[0, 0, 0]
+    assert not mask.bin[0, 0]
+    assert mask.bin[0, 1]
+
+
+def test_side_lobe():
+    data = create_data()
+    data.bt_range[0] = [10.0, 10.5, 11.0, Ensemble.BadVelocity]
+
+    mask = Screening.screen(data, ScreeningThresholds(side_lobe=True, beam_angle=20.0))
+
+    # Cutoff is 10 * cos(20) - 0.5 = 8.897
+    assert mask.side_lobe[0].tolist() == [True] * 8 + [False] * 2
+
+    # No Bottom Track is not screened
+    assert np.all(mask.side_lobe[1])
+
+
+def test_apply():
+    data = create_data(1, 3, 4)
+    data.correlation[0, 1, 0:2] = 0.0
+    data.correlation[0, 2, 0] = 0.0
+
+    mask = Screening.screen(data, ScreeningThresholds(min_corr=0.5))
+    vel = mask.apply(data.velocity)
+    beam_vel = mask.apply(data.velocity, bad_value=np.nan, per_beam=True)
+
+    assert np.all(vel[0, 1] == Ensemble.BadVelocity)
+    assert np.all(vel[0, 2] == 0.5)
+    assert np.isnan(beam_vel[0, 2, 0])
+    assert beam_vel[0, 2, 1] == 0.5
+    assert mask.percent_good_bins() == pytest.approx(100.0 * 2 / 3)
@@ -0,0 +1,152 @@
+import os
+import copy
+import pytest
+import numpy as np
+from rti_python.Post_Process.Transform.BinMapping import BinMapping
+from rti_python.Post_Process.Transform.CoordinateTransform import CoordinateTransform
+from rti_python.Utilities.read_binary_file import ReadBinaryFile
+from rti_python.Ensemble.Ensemble import Ensemble
+
+
+def read_file(file_name):
+    file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Codec", file_name)
+
+    ens_list = []
+    reader = ReadBinaryFile()
+    reader.ensemble_event += lambda sender, ens: ens_list.append(ens)
+    reader.playback(file_path)
+
+    return ens_list
+
+
+def test_speed_of_sound():
+    # Mackenzie check value
+    assert BinMapping.speed_of_sound(25.0, 35.0, 1000.0) == pytest.approx(1550.744, abs=0.01)
+
+    sos = BinMapping.speed_of_sound([0.0, 10.0, 20.0], 0.0, 0.0)
+    assert sos.shape == (3,)
+    assert np.all(np.diff(sos) > 0.0)
+
+
+def test_sound_speed_ratio():
+    ratio = BinMapping.sound_speed_ratio([1500.0, 0.0, np.nan], 1485.0)
+
+    assert ratio[0] == pytest.approx(0.99)
+    assert ratio[1] == 1.0
+    assert ratio[2] == 1.0
+
+
+def test_scale_velocity():
+    vel = np.array([[[1.0, -2.0, Ensemble.BadVelocity, 0.5]],
+                    [[1.0, -2.0, 3.0, np.nan]]])
+
+    result = BinMapping.scale_velocity(vel, [0.5, 2.0])
+
+    assert result[0, 0].tolist() == [0.5, -1.0, Ensemble.BadVelocity, 0.25]
+    assert result[1, 0, 0:3].tolist() == [2.0, -4.0, 6.0]
+    assert np.isnan(result[1, 0, 3])
+
+
+def test_bin_depths():
+    depths = BinMapping.bin_depths([1.0, 2.0], 0.5, 4, ratio=[1.0, 2.0])
+
+    assert depths.shape == (2, 4)
+    assert depths[0].tolist() == Ensemble.get_bin_depth_list(1.0, 0.5, 4)
+    assert depths[1].tolist() == [4.0, 5.0, 6.0, 7.0]
+
+
+def test_beam_depth_factor():
+    factor = BinMapping.beam_depth_factor([0.0, 10.0, 0.0, 180.0], [0.0, 0.0, 10.0, 0.0])
+
+    assert factor.shape == (4, 4)
+    assert np.allclose(factor[0], 1.0)
+
+    # Pitch moves one beam of the pair deeper and the other shallower
+    assert factor[1, 0] != pytest.approx(factor[1, 1])
+    assert factor[1, 2] == pytest.approx(factor[1, 3])
+    assert factor[2, 0] == pytest.approx(factor[2, 1])
+    assert factor[2, 2] != pytest.approx(factor[2, 3])
+
+    # Upward looking
+    assert np.allclose(factor[3], 1.0)
+
+
+def test_map_to_layers_level():
+    rng = np.random.default_rng(38)
+    beam_vel = rng.uniform(-1.0, 1.0, (3, 10, 4))
+    beam_vel[1, 4, 2] = Ensemble.BadVelocity
+
+    result = BinMapping.map_to_layers(beam_vel, 1.0, 0.5, [0.0, 0.0, 0.0], [0.0, 0.0, 0.0])
+
+    assert result.shape == (3, 10, 4)
+    assert np.allclose(result, beam_vel)
+
+
+def test_map_to_layers_tilted():
+    # Velocity that changes linearly with depth
+    pitch = np.array([5.0, -8.0])
+    roll = np.array([3.0, 2.0])
+    blank, bin_size, num_bins = 1.0, 0.5, 30
+    cell_depths = BinMapping.beam_cell_depths(blank, bin_size, num_bins, pitch, roll)
+    beam_vel = 0.1 * cell_depths
+
+    result = BinMapping.map_to_layers(beam_vel, blank, bin_size, pitch, roll)
+    layers = BinMapping.bin_depths(blank, bin_size, num_bins)
+
+    good = result != Ensemble.BadVelocity
+    assert np.count_nonzero(good) > 0.8 * good.size
+    assert np.allclose(result[good], np.broadcast_to(0.1 * layers[0][np.newaxis, :, np.newaxis], result.shape)[good])
+
+    # Deeper layers than the beams measure are bad
+    deep = BinMapping.map_to_layers(beam_vel, blank, bin_size, pitch, roll, layer_depths=[100.0])
+    assert np.all(deep == Ensemble.BadVelocity)
+
+
+def test_map_to_layers_bad_bin():
+    beam_vel = np.ones((1, 10, 4))
+    beam_vel[0, 5, 0] = Ensemble.BadVelocity
+
+    # Layer halfway between bin 4 and 5 uses the bad bin
+    result = BinMapping.map_to_layers(beam_vel, 1.0, 1.0, 0.0, 0.0, layer_depths=[5.5, 5.0, 7.0])
+    assert result[0, 0, 0] == Ensemble.BadVelocity
+    assert result[0, 1, 0] == 1.0
+    assert result[0, 2, 0] == 1.0
+    assert np.all(result[0, :, 1:] == 1.0)
+
+    # Nearest bin
+    result = BinMapping.map_to_layers(beam_vel, 1.0, 1.0, 0.0, 0.0, layer_depths=[5.4, 5.6], nearest=True)
+    assert result[0, 0, 0] == 1.0
+    assert result[0, 1, 0] == Ensemble.BadVelocity
+
+
+def test_correct_ensembles_scale():
+    ens_list = read_file("B0000005.ens")
+    orig_list = copy.deepcopy(ens_list)
+
+    ratio = BinMapping.correct_ensembles(ens_list, sos=1500.0, map_bins=False)
+
+    assert ratio.shape == (len(ens_list),)
+    for index, (ens, orig) in enumerate(zip(ens_list, orig_list)):
+        assert ratio[index] == pytest.approx(1500.0 / orig.AncillaryData.SpeedOfSound)
+        assert ens.AncillaryData.SpeedOfSound == 1500.0
+        assert ens.AncillaryData.BinSize == pytest.approx(orig.AncillaryData.BinSize * ratio[index])
+        assert ens.AncillaryData.FirstBinRange == pytest.approx(orig.AncillaryData.FirstBinRange * ratio[index])
+
+        orig_vel = np.asarray(orig.EarthVelocity.Velocities)
+        good = ~CoordinateTransform.is_bad(orig_vel)
+        assert np.allclose(np.asarray(ens.EarthVelocity.Velocities)[good], orig_vel[good] * ratio[index])
+        assert np.all(np.asarray(ens.EarthVelocity.Velocities)[~good] == orig_vel[~good])
+
+
+def test_correct_ensembles_salinity():
+    ens_list = read_file("B0000005.ens")
+
+    ratio = BinMapping.correct_ensembles(ens_list, salinity=0.0)
+
+    # Fresh water is slower
+    assert np.all(ratio < 1.0)
+    assert np.all(ratio > 0.95)
+    for ens in ens_list:
+        assert ens.AncillaryData.Salinity == 0.0
+        assert np.asarray(ens.BeamVelocity.Velocities).shape == (ens.BeamVelocity.num_elements, 4)
+        assert len(ens.EarthVelocity.Magnitude) == ens.EarthVelocity.num_elements
@@ -0,0 +1,105 @@
+import os
+import math
+import pytest
+import numpy as np
+from rti_python.Post_Process.Transform.CoordinateTransform import CoordinateTransform
+from rti_python.Utilities.read_binary_file import ReadBinaryFile
+from rti_python.Ensemble.Ensemble import Ensemble
+
+
+def read_file(file_name):
+    file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Codec", file_name)
+
+    ens_list = []
+    reader = ReadBinaryFile()
+    reader.ensemble_event += lambda sender, ens: ens_list.append(ens)
+    reader.playback(file_path)
+
+    return ens_list
+
+
+def good_bins(vel):
+    vel = np.asarray(vel)
+    return np.all(np.abs(vel) < 80.0, axis=-1)
+
+
+@pytest.mark.parametrize("file_name", ["B0000005.ens", "B0000086_SUB.ENS"])
+def test_matches_adcp(file_name):
+    ens_list = [ens for ens in read_file(file_name) if ens.IsBeamVelocity and ens.IsEarthVelocity]
+
+    beam_vel, heading, pitch, roll = CoordinateTransform.stack_ensembles(ens_list)
+    inst_vel, earth_vel = CoordinateTransform.beam_to_earth(beam_vel, heading, pitch, roll, allow_3_beam=False)
+
+    for index, ens in enumerate(ens_list):
+        num_bins = ens.BeamVelocity.num_elements
+        adcp_inst = np.asarray(ens.InstrumentVelocity.Velocities)
+        adcp_earth = np.asarray(ens.EarthVelocity.Velocities)
+
+        good = good_bins(ens.BeamVelocity.Velocities) & good_bins(adcp_inst) & good_bins(adcp_earth)
+        assert np.allclose(adcp_inst[good], inst_vel[index, :num_bins][good], atol=1e-4)
+
+        # Skip the bins where the ADCP did not calculate the Earth velocity from the Instrument velocity
+        good &= adcp_inst[:, 3] == adcp_earth[:, 3]
+        assert np.allclose(adcp_earth[good], earth_vel[index, :num_bins][good], atol=1e-3)
+
+
+def test_beam_to_instrument():
+    beam_angle = 20.0
+    beam_vel = np.array([[1.0, 0.5, -0.2, 0.3],
+                         [1.0, Ensemble.BadVelocity, -0.2, 0.3],
+                         [1.0, Ensemble.BadVelocity, np.nan, 0.3]])
+
+    inst_vel = CoordinateTransform.beam_to_instrument(beam_vel, beam_angle)
+
+    a = 1.0 / (2.0 * math.sin(math.radians(beam_angle)))
+    b = 1.0 / (4.0 * math.cos(math.radians(beam_angle)))
+    assert (0.5 - 1.0) * a == pytest.approx(inst_vel[0, 0])
+    assert (0.3 + 0.2) * a == pytest.approx(inst_vel[0, 1])
+    assert -(1.0 + 0.5 - 0.2 + 0.3) * b == pytest.approx(inst_vel[0, 2])
+    assert (1.0 + 0.5 + 0.2 - 0.3) / 4.0 == pytest.approx(inst_vel[0, 3])
+
+    # 3 Beam solution, beam 1 = beam 2 + beam 3 - beam 0
+    assert (-0.9 - 1.0) * a == pytest.approx(inst_vel[1, 0])
+    assert 0.0 == inst_vel[1, 3]
+
+    # 2 bad beams
+    assert np.all(inst_vel[2] == Ensemble.BadVelocity)
+
+    # No 3 beam solution
+    inst_vel = CoordinateTransform.beam_to_instrument(beam_vel, beam_angle, allow_3_beam=False)
+    assert np.all(inst_vel[1] == Ensemble.BadVelocity)
+
+
+def test_instrument_to_earth_heading():
+    # Level and forward is X
+    inst_vel = np.array([[[1.0, 0.0, 0.0, 0.1]]])
+
+    earth_vel = CoordinateTransform.instrument_to_earth(inst_vel, [90.0], [0.0], [0.0])
+    assert np.allclose([1.0, 0.0, 0.0, 0.1], earth_vel[0, 0])
+
+    # Heading offset and magnetic declination are added
+    earth_vel = CoordinateTransform.instrument_to_earth(inst_vel, [80.0], [0.0], [0.0], heading_offset=5.0, mag_decl=-85.0)
+    assert np.allclose([0.0, 1.0, 0.0, 0.1], earth_vel[0, 0])
+
+    # Single ensemble
+    earth_vel = CoordinateTransform.instrument_to_earth(inst_vel[0], 90.0, 0.0, 0.0)
+    assert (1, 4) == earth_vel.shape
+
+    # Bad orientation
+    earth_vel = CoordinateTransform.instrument_to_earth(inst_vel, [np.nan], [0.0], [0.0])
+    assert np.all(earth_vel == Ensemble.BadVelocity)
+
+
+def test_retransform_ensembles():
+    ens_list = read_file("B0000005.ens")[0:5]
+    adcp_earth = [np.array(ens.EarthVelocity.Velocities) for ens in ens_list]
+    heading = ens_list[0].AncillaryData.Heading
+
+    assert 5 == CoordinateTransform.retransform_ensembles(ens_list, heading_offset=10.0)
+
+    # Rotating by the heading offset gives the same speed with a new direction
+    earth = np.asarray(ens_list[0].EarthVelocity.Velocities)
+    good = good_bins(adcp_earth[0]) & good_bins(earth)
+    assert np.allclose(np.hypot(adcp_earth[0][good, 0], adcp_earth[0][good, 1]), np.hypot(earth[good, 0], earth[good, 1]), atol=1e-3)
+    assert not np.allclose(adcp_earth[0][good, 0], earth[good, 0], atol=1e-3)
+    assert heading == ens_list[0].AncillaryData.Heading
@@ -1,7 +1,9 @@
 import pytest
 import os
+import numpy as np
 from rti_python.River.CalcDischarge import CalcDischarge
 from rti_python.River.CalcDischarge import FlowMode
+from rti_python.River.CalcDischarge import TransectData
 from rti_python.Ensemble.Ensemble import Ensemble
 from rti_python.Ensemble.EnsembleData import EnsembleData
 from rti_python.Ensemble.AncillaryData import AncillaryData
@@ -160,4 +162,104 @@ def test_discharge_file():
         #assert -146.742 == pytest.approx(top_q, 0.001)
         assert 12 == bad_ens
         #assert 14.238 == pytest.approx(total_q, 0.001)
-        #assert 4.405 == pytest.approx(bottom_q, 0.001)
\ No newline at end of file
+        #assert 4.405 == pytest.approx(bottom_q, 0.001)
+
+def generate_transect(num_ens=50, num_bins=30, seed=3):
+    """
+    Generate ensembles with random velocities, amplitude, correlation and bottom depth.
+    """
+    from rti_python.Ensemble.Amplitude import Amplitude
+    from rti_python.Ensemble.Correlation import Correlation
+    rng = np.random.default_rng(seed)
+
+    ens_list = []
+    for ens_num in range(num_ens):
+        ens = Ensemble()
+
+        ens_data = EnsembleData()
+        ens_data.NumBeams = 4
+        ens_data.NumBins = num_bins
+        ens.AddEnsembleData(ens_data)
+
+        anc = AncillaryData()
+        anc.BinSize = 0.25
+        anc.FirstBinRange = 0.5
+        ens.AddAncillaryData(anc)
+
+        vel = EarthVelocity(num_bins, 4)
+        vel.Velocities[:] = rng.uniform(-1.0, 1.0, (num_bins, 4))
+        vel.Velocities[rng.uniform(size=(num_bins, 4)) < 0.1] = Ensemble.BadVelocity
+        ens.AddEarthVelocity(vel)
+
+        amp = Amplitude(num_bins, 4)
+        amp.Amplitude[:] = rng.uniform(0.0, 3.0, (num_bins, 4))
+        ens.AddAmplitude(amp)
+
+        corr = Correlation(num_bins, 4)
+        corr.Correlation[:] = rng.uniform(0.0, 1.0, (num_bins, 4))
+        ens.AddCorrelation(corr)
+
+        bt = BottomTrack()
+        bt.NumBeams = 4
+        bt.Range = list(rng.uniform(1.0, 6.0, 4))
+        if ens_num % 10 == 0:
+            bt.Range = [0.0, 0.0, 0.0, 0.0]
+        bt.EarthVelocity = list(rng.uniform(-1.0, 1.0, 4))
+        ens.AddBottomTrack(bt)
+
+        ens_list.append(ens)
+
+    return ens_list
+
+
+@pytest.mark.parametrize("top_flow_mode,bottom_flow_mode", [(FlowMode.Constants, FlowMode.PowerFunction),
+                                                            (FlowMode.PowerFunction, FlowMode.PowerFunction),
+                                                            (FlowMode.PowerFunction, FlowMode.Constants)])
+def test_transect_flow_matches_ensemble(top_flow_mode, bottom_flow_mode):
+    ens_list = generate_transect()
+    discharge = CalcDischarge()
+
+    data = TransectData.from_ensembles(ens_list)
+    result = discharge.calculate_transect_flow(data, 0.1, 20, 0.2, 0.1, 0.5,
+                                               top_flow_mode=top_flow_mode,
+                                               bottom_flow_mode=bottom_flow_mode)
+
+    for index, ens in enumerate(ens_list):
+        ens_result = discharge.calculate_ensemble_flow(ens, 0.1, 20, 0.2, 0.1,
+                                                       ens.BottomTrack.EarthVelocity[0],
+                                                       ens.BottomTrack.EarthVelocity[1],
+                                                       ens.BottomTrack.EarthVelocity[2],
+                                                       0.5,
+                                                       top_flow_mode,
+                                                       CalcDischarge.ONE_SIXTH_POWER_LAW,
+                                                       bottom_flow_mode)
+        assert ens_result.valid == result.valid[index]
+        if ens_result.valid:
+            assert ens_result.measured_flow == pytest.approx(result.measured_flow[index])
+            assert ens_result.top_flow == pytest.approx(result.top_flow[index])
+            assert ens_result.bottom_flow == pytest.approx(result.bottom_flow[index])
+
+            ens_info = result.ensemble_flow_info(index)
+            assert len(ens_result.measured_bin_info) == len(ens_info.measured_bin_info)
+            assert [b.valid for b in ens_result.measured_bin_info] == [b.valid for b in ens_info.measured_bin_info]
+
+    assert 45 == np.count_nonzero(result.valid)
+    assert result.total_flow() == pytest.approx(result.total_top_flow() + result.total_measured_flow() + result.total_bottom_flow())
+
+
+def test_transect_avg_vel_matches_ensemble():
+    ens_list = generate_transect()
+    discharge = CalcDischarge()
+
+    data = TransectData.from_ensembles(ens_list)
+    top_vx, top_vy, bottom_vx, bottom_vy = discharge.calculate_transect_avg_vel(data, 0.1, 20, 0.2, 0.1)
+
+    for index, ens in enumerate(ens_list):
+        ens_result = discharge.calculate_avg_vel(ens, 0.1, 20, 0.2, 0.1)
+        if ens_result is None:
+            assert np.isnan(top_vx[index])
+        else:
+            assert ens_result[0] == pytest.approx(top_vx[index])
+            assert ens_result[1] == pytest.approx(top_vy[index])
+            assert ens_result[2] == pytest.approx(bottom_vx[index])
+            assert ens_result[3] == pytest.approx(bottom_vy[index])
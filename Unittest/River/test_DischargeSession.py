@@ -0,0 +1,111 @@
+import pytest
+import numpy as np
+from rti_python.River.CalcDischarge import CalcDischarge
+from rti_python.River.CalcDischarge import FlowMode
+from rti_python.River.CalcDischarge import TransectData
+from rti_python.River.DischargeSession import DischargeSession
+from rti_python.River.DischargeSession import LruCache
+
+
+def generate_data(num_ens=40, num_bins=25, seed=7):
+    """
+    Generate transect data with random velocities, amplitude, correlation and bottom depth.
+    """
+    rng = np.random.default_rng(seed)
+
+    data = TransectData(num_ens, num_bins, 4)
+    data.num_bins[:] = num_bins
+    data.num_beams[:] = 4
+    data.first_bin_range[:] = 0.5
+    data.bin_size[:] = 0.25
+    data.earth_vel[:] = rng.uniform(-1.0, 1.0, (num_ens, num_bins, 4))
+    data.amplitude[:] = rng.uniform(0.0, 3.0, (num_ens, num_bins, 4))
+    data.correlation[:] = rng.uniform(0.0, 1.0, (num_ens, num_bins, 4))
+    data.bt_range[:] = rng.uniform(1.0, 6.0, (num_ens, 4))
+    data.bt_earth_vel[:] = rng.uniform(-1.0, 1.0, (num_ens, 4))
+
+    return data
+
+
+def assert_same_flow(expected, result):
+    assert np.array_equal(expected.valid, result.valid)
+    assert np.allclose(expected.measured_flow, result.measured_flow)
+    assert np.allclose(expected.top_flow, result.top_flow)
+    assert np.allclose(expected.bottom_flow, result.bottom_flow)
+    assert np.array_equal(expected.bin_valid, result.bin_valid)
+
+
+def test_lru_cache():
+    cache = LruCache(2)
+
+    assert 1 == cache.get("a", lambda: 1)
+    assert 2 == cache.get("b", lambda: 2)
+    assert 1 == cache.get("a", lambda: 10)
+    assert 3 == cache.get("c", lambda: 3)
+
+    # b was used the longest time ago
+    assert 2 == len(cache)
+    assert "a" in cache
+    assert "b" not in cache
+    assert 1 == cache.hits
+    assert 3 == cache.misses
+
+
+@pytest.mark.parametrize("top_flow_mode", [FlowMode.Constants, FlowMode.PowerFunction, FlowMode.Slope])
+def test_session_matches_transect_flow(top_flow_mode):
+    data = generate_data()
+    session = DischargeSession(data)
+
+    expected = CalcDischarge().calculate_transect_flow(data, 0.1, 20, 0.2, 0.1, 0.5, top_flow_mode=top_flow_mode)
+    result = session.calculate(0.1, 20, 0.2, 0.1, 0.5, top_flow_mode=top_flow_mode)
+
+    assert_same_flow(expected, result)
+
+
+def test_session_recalculates_changed_stage():
+    data = generate_data()
+    session = DischargeSession(data)
+
+    session.calculate(0.1, 20, 0.2, 0.1, 0.5)
+    result = session.calculate(0.1, 20, 0.2, 0.1, 0.5, top_flow_mode=FlowMode.PowerFunction)
+
+    # Only the flow is recalculated
+    stats = session.stats()
+    assert (1, 1) == stats[DischargeSession.STAGE_SCREENING]
+    assert (1, 1) == stats[DischargeSession.STAGE_GEOMETRY]
+    assert (1, 1) == stats[DischargeSession.STAGE_CROSS_PRODUCTS]
+    assert (0, 2) == stats[DischargeSession.STAGE_FLOW]
+    expected = CalcDischarge().calculate_transect_flow(data, 0.1, 20, 0.2, 0.1, 0.5, top_flow_mode=FlowMode.PowerFunction)
+    assert_same_flow(expected, result)
+
+    # Boat draft only changes the geometry
+    session.calculate(0.2, 20, 0.2, 0.1, 0.5)
+    stats = session.stats()
+    assert (2, 1) == stats[DischargeSession.STAGE_SCREENING]
+    assert (1, 2) == stats[DischargeSession.STAGE_GEOMETRY]
+
+    # New boat velocity changes the cross products
+    bt_east = data.bt_earth_vel[:, 0] * 2.0
+    result = session.calculate(0.1, 20, 0.2, 0.1, 0.5, bt_east=bt_east)
+    assert (2, 2) == session.stats()[DischargeSession.STAGE_CROSS_PRODUCTS]
+    expected = CalcDischarge().calculate_transect_flow(data, 0.1, 20, 0.2, 0.1, 0.5, bt_east=bt_east)
+    assert_same_flow(expected, result)
+
+    # Same parameters again are all cached
+    session.calculate(0.1, 20, 0.2, 0.1, 0.5)
+    assert 1 == session.stats()[DischargeSession.STAGE_FLOW][0]
+
+    session.clear()
+    assert (0, 0) == session.stats()[DischargeSession.STAGE_FLOW]
+
+
+def test_session_cache_limit():
+    data = generate_data()
+    session = DischargeSession(data, max_cache=2)
+
+    for boat_draft in [0.1, 0.2, 0.3]:
+        session.calculate(boat_draft, 20, 0.2, 0.1, 0.5)
+
+    assert 2 == len(session.caches[DischargeSession.STAGE_GEOMETRY])
+    assert 2 == len(session.caches[DischargeSession.STAGE_FLOW])
+    assert 1 == len(session.caches[DischargeSession.STAGE_SCREENING])
@@ -0,0 +1,156 @@
+import os
+import struct
+import binascii
+import h5py
+import pytest
+import numpy as np
+from rti_python.River.CalcDischarge import CalcDischarge
+from rti_python.River.CalcDischarge import TransectData
+from rti_python.River.RiverProject import RiverProject
+from rti_python.River.RiverProjectMeta import RiverProjectMeta
+from rti_python.River.TransectProcessor import TransectProcessor
+from rti_python.River.TransectProcessor import TransectSettings
+from rti_python.River.TransectProcessor import ensemble_delta_time
+from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Ensemble.EnsembleData import EnsembleData
+from rti_python.Ensemble.AncillaryData import AncillaryData
+from rti_python.Ensemble.EarthVelocity import EarthVelocity
+from rti_python.Ensemble.BottomTrack import BottomTrack
+from rti_python.Utilities.config import RtiConfig
+
+
+def generate_transect_file(file_path, num_ens=20, num_bins=15, seed=1):
+    """
+    Write a transect file with random velocities and bottom depth.
+    """
+    rng = np.random.default_rng(seed)
+
+    ens_list = []
+    with open(file_path, "wb") as f:
+        for ens_num in range(num_ens):
+            ens = Ensemble()
+
+            ens_data = EnsembleData()
+            ens_data.EnsembleNumber = ens_num + 1
+            ens_data.NumBeams = 4
+            ens_data.NumBins = num_bins
+            ens_data.Year = 2020
+            ens_data.Month = 5
+            ens_data.Day = 4
+            ens_data.Hour = 10
+            ens_data.Minute = ens_num // 60
+            ens_data.Second = ens_num % 60
+            ens.AddEnsembleData(ens_data)
+
+            anc = AncillaryData()
+            anc.BinSize = 0.25
+            anc.FirstBinRange = 0.5
+            ens.AddAncillaryData(anc)
+
+            vel = EarthVelocity(num_bins, 4)
+            vel.Velocities[:] = rng.uniform(-1.0, 1.0, (num_bins, 4))
+            ens.AddEarthVelocity(vel)
+
+            bt = BottomTrack()
+            bt.NumBeams = 4
+            for field in BottomTrack.BEAM_FIELDS:
+                setattr(bt, field, [0.0] * 4)
+            bt.Range = list(rng.uniform(2.0, 4.0, 4))
+            bt.EarthVelocity = list(rng.uniform(-1.0, 1.0, 4))
+            ens.AddBottomTrack(bt)
+
+            payload = bytes(ens_data.encode() + anc.encode() + vel.encode() + bt.encode())
+            header = bytes(Ensemble.generate_ens_header(ens_data.EnsembleNumber, len(payload)))
+            f.write(header + payload + struct.pack("I", binascii.crc_hqx(payload, 0)))
+            ens_list.append(ens)
+
+    return ens_list
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_process_transects(tmpdir, max_workers):
+    file_list = []
+    ens_lists = []
+    for index in range(3):
+        file_path = os.path.join(str(tmpdir), "Transect_" + str(index) + ".ens")
+        ens_lists.append(generate_transect_file(file_path, num_ens=20 + index, seed=index))
+        file_list.append(file_path)
+
+    # Include a file that does not exist
+    file_list.append(os.path.join(str(tmpdir), "missing.ens"))
+
+    project = RiverProject(RtiConfig(), "Project1", os.path.join(str(tmpdir), "Project1.hdf5"))
+    processor = TransectProcessor(project, max_workers=max_workers)
+
+    progress = []
+    processor.transect_progress += lambda sender, completed, total, result: progress.append((completed, total))
+
+    settings = TransectSettings(boat_draft=0.1, pulse_length=0.2, pulse_lag=0.1)
+    results = processor.process(file_list, settings)
+
+    assert [(i, 4) for i in range(1, 5)] == progress
+    assert results[3].error is not None
+
+    with h5py.File(project.file_path, "r") as prj_file:
+        transect_grp = prj_file[RiverProjectMeta.SUBGROUP_TRANSECT]
+        assert "missing" not in transect_grp
+
+        for index in range(3):
+            result = results[index]
+            assert result.error is None
+            assert "Transect_" + str(index) == result.name
+            assert 20 + index == result.num_ens
+
+            # Same as calculating the discharge in this process
+            data = TransectData.from_ensembles(ens_lists[index])
+            expected = CalcDischarge().calculate_transect_flow(data, 0.1, 20.0, 0.2, 0.1, 1.0)
+            assert np.allclose(expected.top_flow, result.top_flow)
+            assert np.allclose(expected.measured_flow, result.measured_flow)
+
+            grp = transect_grp[result.name]
+            assert np.array_equal(np.arange(1, 21 + index), grp[TransectProcessor.DS_ENSEMBLE_NUM][()])
+            assert np.allclose(result.bottom_flow, grp[TransectProcessor.DS_BOTTOM_FLOW][()])
+            assert result.total_flow() == pytest.approx(grp.attrs[RiverProjectMeta.TRANSECT_TOTAL_FLOW])
+
+    # Reprocessing replaces the results
+    results = processor.process(file_list[0:1], settings)
+    with h5py.File(project.file_path, "r") as prj_file:
+        assert 3 == len(prj_file[RiverProjectMeta.SUBGROUP_TRANSECT])
+
+
+def test_same_transect_name(tmpdir):
+    # Same file name in different folders
+    file_list = []
+    for index in range(2):
+        folder = os.path.join(str(tmpdir), "Day" + str(index))
+        os.makedirs(folder)
+        file_path = os.path.join(folder, "Transect.ens")
+        generate_transect_file(file_path, num_ens=10 + index, seed=index)
+        file_list.append(file_path)
+
+    project = RiverProject(RtiConfig(), "Project1", os.path.join(str(tmpdir), "Project1.hdf5"))
+    processor = TransectProcessor(project, max_workers=1)
+    results = processor.process(file_list)
+
+    assert ["Transect", "Transect_1"] == [result.name for result in results]
+    with h5py.File(project.file_path, "r") as prj_file:
+        transect_grp = prj_file[RiverProjectMeta.SUBGROUP_TRANSECT]
+        assert 2 == len(transect_grp)
+        for index in range(2):
+            grp = transect_grp[results[index].name]
+            assert file_list[index] == grp.attrs[RiverProjectMeta.TRANSECT_FILE_PATH]
+            assert 10 + index == len(grp[TransectProcessor.DS_ENSEMBLE_NUM])
+
+    # Reprocessing the second file replaces its own results
+    results = processor.process(file_list[1:2])
+    assert "Transect_1" == results[0].name
+    with h5py.File(project.file_path, "r") as prj_file:
+        assert 2 == len(prj_file[RiverProjectMeta.SUBGROUP_TRANSECT])
+
+
+def test_ensemble_delta_time(tmpdir):
+    ens_list = generate_transect_file(os.path.join(str(tmpdir), "dt.ens"), num_ens=5)
+    ens_list[3].EnsembleData.Second = 5
+
+    assert np.allclose([1.0, 1.0, 1.0, 3.0, -1.0], ensemble_delta_time(ens_list))
+    assert 0 == len(ensemble_delta_time([]))
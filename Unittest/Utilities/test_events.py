@@ -0,0 +1,172 @@
+import time
+import threading
+import pytest
+from obsub import event
+from rti_python.Utilities.events import EventHandler
+from rti_python.Utilities.events import AsyncEventHandler
+from rti_python.Utilities.events import OverflowPolicy
+
+
+class Publisher:
+    @event
+    def ensemble_event(self, ens):
+        pass
+
+
+def test_event_handler():
+    results = []
+    handler = EventHandler("sender")
+    handler += lambda sender, value: results.append((sender, value))
+
+    handler(1)
+
+    assert results == [("sender", 1)]
+
+
+def test_ordered_delivery():
+    results = []
+    with AsyncEventHandler("sender", maxsize=10) as handler:
+        handler += lambda sender, value: results.append((sender, value))
+        for value in range(200):
+            handler(value)
+        assert handler.flush(5.0)
+
+    assert results == [("sender", value) for value in range(200)]
+
+
+def test_slow_subscriber_does_not_block_fast():
+    gate = threading.Event()
+    fast = []
+    slow = []
+
+    def slow_callback(sender, value):
+        gate.wait(5.0)
+        slow.append(value)
+
+    handler = AsyncEventHandler(None)
+    handler.add(lambda sender, value: fast.append(value), maxsize=100)
+    handler.add(slow_callback, maxsize=5, policy=OverflowPolicy.DROP_OLDEST)
+
+    for value in range(50):
+        handler(value)
+
+    # Fast subscriber gets everything while the slow one is stuck
+    assert handler.subscribers[0].flush(5.0)
+    assert fast == list(range(50))
+    assert slow == []
+
+    gate.set()
+    assert handler.flush(5.0)
+    handler.close()
+
+    # Oldest events were dropped, the newest are kept in order
+    assert slow[-5:] == list(range(45, 50))
+    assert slow == sorted(slow)
+
+
+def test_drop_oldest_metrics():
+    gate = threading.Event()
+    handler = AsyncEventHandler(None, maxsize=3, policy=OverflowPolicy.DROP_OLDEST)
+    received = []
+    handler += lambda sender, value: (gate.wait(5.0), received.append(value))
+
+    for value in range(20):
+        handler(value)
+    metrics = handler.metrics()[0]
+    gate.set()
+    handler.flush(5.0)
+    metrics_done = handler.metrics()[0]
+    handler.close()
+
+    assert metrics["published"] == 20
+    assert metrics["max_queue_depth"] == 3
+    assert metrics["dropped"] > 0
+    assert metrics_done["delivered"] + metrics_done["dropped"] == 20
+    assert metrics_done["queue_depth"] == 0
+    assert received[-3:] == [17, 18, 19]
+
+
+def test_coalesce():
+    gate = threading.Event()
+    received = []
+    handler = AsyncEventHandler(None, maxsize=1, policy=OverflowPolicy.COALESCE)
+    handler += lambda sender, value: (gate.wait(5.0), received.append(value))
+
+    for value in range(10):
+        handler(value)
+    gate.set()
+    handler.flush(5.0)
+    metrics = handler.metrics()[0]
+    handler.close()
+
+    # The first event was being delivered, the rest were coalesced into the last one
+    assert received[-1] == 9
+    assert len(received) <= 2
+    assert metrics["coalesced"] == 10 - len(received)
+
+
+def test_block():
+    received = []
+
+    def slow_callback(sender, value):
+        time.sleep(0.001)
+        received.append(value)
+
+    handler = AsyncEventHandler(None, maxsize=2, policy=OverflowPolicy.BLOCK)
+    handler += slow_callback
+    for value in range(30):
+        handler(value)
+    handler.close()
+
+    # Nothing is dropped
+    assert received == list(range(30))
+    assert handler.subscribers == []
+
+
+def test_latency_and_errors():
+    def bad_callback(sender, value):
+        raise ValueError("Bad")
+
+    handler = AsyncEventHandler(None)
+    handler += bad_callback
+    handler.add(lambda sender, value: time.sleep(0.01))
+    handler(1)
+    handler(2)
+    handler.flush(5.0)
+    metrics = handler.metrics()
+    handler.close()
+
+    assert metrics[0]["errors"] == 2
+    assert metrics[0]["delivered"] == 2
+    assert metrics[1]["avg_latency"] >= 0.01
+    assert metrics[1]["max_latency"] >= metrics[1]["avg_latency"]
+
+
+def test_remove():
+    received = []
+    handler = AsyncEventHandler(None)
+    callback = lambda sender, value: received.append(value)
+    handler += callback
+    handler(1)
+    handler.flush(5.0)
+    handler -= callback
+    assert len(handler) == 0
+    assert handler(2) == 0
+    handler.close()
+
+    assert received == [1]
+
+
+def test_forward_obsub_event():
+    publisher = Publisher()
+    received = []
+    handler = AsyncEventHandler(publisher)
+    handler += lambda sender, ens: received.append((sender, ens))
+    publisher.ensemble_event += handler.forward
+
+    publisher.ensemble_event("ens1")
+    publisher.ensemble_event("ens2")
+    handler.flush(5.0)
+    handler.close()
+
+    assert received == [(publisher, "ens1"), (publisher, "ens2")]
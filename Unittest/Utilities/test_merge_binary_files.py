@@ -0,0 +1,83 @@
+import os
+from rti_python.Utilities.merge_binary_files import MergeBinaryFiles
+from rti_python.Codecs.BinaryCodec import BinaryCodec
+
+
+DELIMITER = b'\x80' * 16
+
+
+def read_ens_bins(file_name):
+    file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Codec", file_name)
+    with open(file_path, "rb") as f:
+        data = f.read()
+    return [ens_bin for ens_bin in (DELIMITER + chunk for chunk in data.split(DELIMITER)[1:]) if BinaryCodec.verify_ens_data(ens_bin)]
+
+
+def write_file(file_path, ens_bins):
+    with open(file_path, "wb") as f:
+        f.write(b"".join(ens_bins))
+    return file_path
+
+
+def ens_key(ens):
+    return ens.EnsembleData.SerialNumber, ens.EnsembleData.SubsystemConfig, ens.EnsembleData.EnsembleNumber
+
+
+def test_merge_overlapping(tmp_path):
+    ens_bins = read_ens_bins("B0000005.ens")
+
+    # Overlapping copies, given out of order.  One file is not in time order.
+    file_paths = [write_file(str(tmp_path / "c.ens"), ens_bins[20:]),
+                  write_file(str(tmp_path / "a.ens"), ens_bins[:15]),
+                  write_file(str(tmp_path / "b.ens"), list(reversed(ens_bins[10:25])))]
+
+    merger = MergeBinaryFiles(file_paths)
+    merged = []
+    merger.ensemble_event += lambda sender, ens: merged.append(ens)
+    merger.playback()
+
+    expected = [BinaryCodec.decode_data_sets(ens_bin) for ens_bin in ens_bins]
+    assert [ens_key(ens) for ens in merged] == [ens_key(ens) for ens in expected]
+    assert merger.total_ensembles == 40
+    assert merger.duplicates == 10
+
+
+def test_merge_subsystems(tmp_path):
+    ens_bins = read_ens_bins("B0000086_SUB.ENS")
+    half = len(ens_bins) // 2
+
+    file_paths = [write_file(str(tmp_path / "2.ens"), ens_bins[half:]),
+                  write_file(str(tmp_path / "1.ens"), ens_bins[:half])]
+
+    merger = MergeBinaryFiles(file_paths, is_lazy=True)
+    merged = list(merger.merge())
+
+    # Subsystems at the same time are not duplicates
+    assert len(merged) == len(ens_bins)
+    assert merger.duplicates == 0
+
+    # In time order
+    times = [(ens.EnsembleData.Year, ens.EnsembleData.Month, ens.EnsembleData.Day, ens.EnsembleData.Hour,
+              ens.EnsembleData.Minute, ens.EnsembleData.Second, ens.EnsembleData.HSec) for ens in merged]
+    assert times == sorted(times)
+    assert sorted(ens_key(ens) for ens in merged) == sorted(ens_key(BinaryCodec.decode_data_sets(ens_bin)) for ens_bin in ens_bins)
+
+
+def test_iter_ensembles(tmp_path):
+    ens_bins = read_ens_bins("B0000005.ens")[:5]
+
+    bad = bytearray(ens_bins[2])
+    bad[200] ^= 0xFF
+    data = b"junk" + ens_bins[0] + DELIMITER + b"short" + ens_bins[1] + bytes(bad) + ens_bins[3] + ens_bins[4][:500]
+    file_path = write_file(str(tmp_path / "a.ens"), [data])
+
+    # Small blocks split the ensembles
+    found = list(MergeBinaryFiles.iter_ensembles(file_path, block_size=1000))
+    assert [ens_bin for offset, ens_bin in found] == [ens_bins[0], ens_bins[1], ens_bins[3]]
+    for offset, ens_bin in found:
+        assert data[offset:offset + len(ens_bin)] == ens_bin
+
+
+def test_merge_empty(tmp_path):
+    file_paths = [write_file(str(tmp_path / "a.ens"), [b""]), write_file(str(tmp_path / "b.ens"), [b"no ensembles"])]
+    assert list(MergeBinaryFiles(file_paths).merge()) == []
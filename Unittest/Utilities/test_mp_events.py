@@ -0,0 +1,70 @@
+import time
+import numpy as np
+from rti_python.Utilities.events import MPEventHandler
+from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Ensemble.EarthVelocity import EarthVelocity
+
+
+def sum_callback(sender, values):
+    return sender, float(np.sum(values))
+
+
+def ens_callback(sender, ens):
+    return float(np.sum(ens.EarthVelocity.Velocities))
+
+
+def keep_callback(sender, values):
+    # Keep a reference to the array after the callback
+    keep_callback.kept = values
+    return values.shape
+
+
+def test_persistent_pool():
+    handler = MPEventHandler("sender", maxprocs=2)
+    handler += sum_callback
+    handler += sum_callback
+
+    results = [handler(np.full(10, float(index))) for index in range(20)]
+    pool = handler._pool
+    assert handler.wait(30.0)
+
+    for index, result in enumerate(results):
+        assert result.get(10.0) == [("sender", index * 10.0)] * 2
+
+    # Same pool for all the events
+    assert handler._pool is pool
+    assert handler.pending == 0
+    handler.close()
+    assert handler._pool is None
+
+
+def test_shared_memory_arrays():
+    values = np.arange(100000, dtype=np.float64)
+
+    with MPEventHandler(None, maxprocs=2, min_shared_bytes=1024) as handler:
+        handler += sum_callback
+        handler += keep_callback
+        result = handler(values)
+        assert result.get(30.0) == [(None, float(np.sum(values))), (100000,)]
+
+
+def test_ensemble_arguments():
+    ens = Ensemble()
+    earth = EarthVelocity(200, 4)
+    earth.Velocities = np.full((200, 4), 0.5)
+    ens.AddEarthVelocity(earth)
+
+    results = []
+    with MPEventHandler(None, maxprocs=2, min_shared_bytes=1024, result_callback=results.append) as handler:
+        handler += ens_callback
+        for _ in range(5):
+            handler(ens)
+        assert handler.wait(30.0)
+
+    assert results == [[400.0]] * 5
+
+
+def test_no_callbacks():
+    handler = MPEventHandler(None)
+    assert handler(1) is None
+    handler.close()
@@ -0,0 +1,41 @@
+import os
+from rti_python.Utilities.qa_qc import EnsembleQC
+from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Ensemble.EarthVelocity import EarthVelocity
+from rti_python.Codecs.BinaryCodec import BinaryCodec
+
+
+def test_scan_bad_velocity():
+    earth = EarthVelocity(3, 4)
+    earth.Velocities[0] = [1.0, 2.0, 3.0, 4.0]
+    earth.Velocities[2] = [3.0, 4.0, 5.0, 6.0]
+
+    # Middle bin is the average of the bins around it
+    EnsembleQC.scan_bad_velocity(earth.Velocities)
+    assert earth.Velocities[1].tolist() == [2.0, 3.0, 4.0, 5.0]
+
+
+def test_scan_mag_dir():
+    earth = EarthVelocity(3, 4)
+    earth.Magnitude[1] = 1.5
+    earth.Magnitude[2] = 2.5
+
+    # First bin uses the second bin
+    EnsembleQC.scan_mag_dir(earth.Magnitude)
+    assert earth.Magnitude[0] == 1.5
+
+    # Nothing to scan
+    EnsembleQC.scan_mag_dir(EarthVelocity(0, 4).Magnitude)
+
+
+def test_scan_ensemble():
+    file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Codec", "B0000005.ens")
+    with open(file_path, "rb") as f:
+        data = f.read()
+
+    delimiter = b'\x80' * 16
+    ens = BinaryCodec.decode_data_sets(delimiter + data.split(delimiter)[1])
+    assert ens.IsBeamVelocity and ens.IsEarthVelocity
+
+    EnsembleQC.scan_ensemble(ens)
+    assert len(ens.EarthVelocity.Velocities) == ens.EnsembleData.NumBins
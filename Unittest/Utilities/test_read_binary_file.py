@@ -0,0 +1,196 @@
+import os
+import time
+import threading
+from rti_python.Utilities.read_binary_file import ReadBinaryFile
+from rti_python.Writer.rti_recorder import RtiRawRecorder
+
+
+DELIMITER = b'\x80' * 16
+
+
+def read_ens_bins(file_name):
+    file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Codec", file_name)
+    with open(file_path, "rb") as f:
+        data = f.read()
+    return [DELIMITER + chunk for chunk in data.split(DELIMITER)[1:]]
+
+
+class Follower:
+    """
+    Follow a file in a thread and collect the ensemble numbers.
+    """
+
+    def __init__(self, file_path, offset=0, use_inotify=True):
+        self.ens_nums = []
+        self.times = []
+        self.lock = threading.Lock()
+        self.reader = ReadBinaryFile()
+        self.reader.ensemble_event += self.receive
+        self.stop_event = threading.Event()
+        self.result = None
+        self.thread = threading.Thread(target=self.run, args=(file_path, offset, use_inotify))
+        self.thread.start()
+
+    def run(self, file_path, offset, use_inotify):
+        self.result = self.reader.follow(file_path, offset, poll_interval=0.05, stop_event=self.stop_event, use_inotify=use_inotify)
+
+    def receive(self, sender, ens):
+        with self.lock:
+            self.ens_nums.append(ens.EnsembleData.EnsembleNumber)
+            self.times.append(time.monotonic())
+
+    def wait(self, count, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self.lock:
+                if len(self.ens_nums) >= count:
+                    return True
+            time.sleep(0.01)
+        return False
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join(5.0)
+        assert not self.thread.is_alive()
+        return self.result
+
+
+def ens_num(ens_bin):
+    return int.from_bytes(ens_bin[16:20], "little")
+
+
+def test_follow_growing_file(tmp_path):
+    ens_bins = read_ens_bins("B0000005.ens")
+    file_path = str(tmp_path / "Adcp0.ens")
+
+    with open(file_path, "wb") as f:
+        f.write(b"".join(ens_bins[:5]))
+        f.flush()
+
+        follower = Follower(file_path)
+        assert follower.wait(5)
+
+        # Write the ensembles in pieces.  Incomplete ensembles wait for the rest.
+        data = b"".join(ens_bins[5:])
+        for pos in range(0, len(data), 3000):
+            f.write(data[pos:pos + 3000])
+            f.flush()
+            time.sleep(0.01)
+
+        assert follower.wait(len(ens_bins))
+
+    path, offset = follower.stop()
+    assert follower.ens_nums == [ens_num(ens_bin) for ens_bin in ens_bins]
+    assert path == file_path
+    assert offset == os.path.getsize(file_path)
+
+
+def test_follow_resume(tmp_path):
+    ens_bins = read_ens_bins("B0000005.ens")
+    file_path = str(tmp_path / "Adcp0.ens")
+
+    # Stop in the middle of an ensemble
+    with open(file_path, "wb") as f:
+        f.write(b"".join(ens_bins[:10]) + ens_bins[10][:100])
+
+    follower = Follower(file_path)
+    assert follower.wait(10)
+    path, offset = follower.stop()
+    assert offset == len(b"".join(ens_bins[:10]))
+
+    with open(file_path, "ab") as f:
+        f.write(ens_bins[10][100:] + b"".join(ens_bins[11:15]))
+
+    # Only the new ensembles are read
+    follower = Follower(file_path, offset)
+    assert follower.wait(5)
+    follower.stop()
+    assert follower.ens_nums == [ens_num(ens_bin) for ens_bin in ens_bins[10:15]]
+
+
+def test_follow_bad_data(tmp_path):
+    ens_bins = read_ens_bins("B0000005.ens")
+    file_path = str(tmp_path / "Adcp0.ens")
+
+    bad = bytearray(ens_bins[1])
+    bad[100] ^= 0xFF
+    with open(file_path, "wb") as f:
+        f.write(b"garbage" + ens_bins[0] + DELIMITER + b"short" + bytes(bad) + ens_bins[2])
+
+    # Polling
+    follower = Follower(file_path, use_inotify=False)
+    assert follower.wait(2)
+    time.sleep(0.1)
+    follower.stop()
+    assert follower.ens_nums == [ens_num(ens_bins[0]), ens_num(ens_bins[2])]
+
+
+def test_follow_rotation(tmp_path):
+    ens_bins = read_ens_bins("B0000005.ens")
+
+    with open(str(tmp_path / "Adcp0.ens"), "wb") as f:
+        f.write(b"".join(ens_bins[:3]))
+
+    follower = Follower(str(tmp_path / "Adcp0.ens"))
+    assert follower.wait(3)
+
+    # Files 1 to 10.  Adcp10 is after Adcp9.
+    for index in range(1, 11):
+        with open(str(tmp_path / ("Adcp" + str(index) + ".ens")), "wb") as f:
+            f.write(b"".join(ens_bins[index * 2 + 1:index * 2 + 3]))
+        time.sleep(0.02)
+
+    assert follower.wait(23)
+    path, offset = follower.stop()
+    assert follower.ens_nums == [ens_num(ens_bin) for ens_bin in ens_bins[:23]]
+    assert path == str(tmp_path / "Adcp10.ens")
+
+
+def test_follow_recorder(tmp_path):
+    ens_bins = read_ens_bins("B0000005.ens")
+    recorder = RtiRawRecorder(str(tmp_path), max_file_size=40000)
+    follower = Follower(recorder.file_path)
+
+    for ens_bin in ens_bins:
+        recorder.write(ens_bin)
+        recorder.flush(5.0)
+        time.sleep(0.01)
+    recorder.close()
+
+    assert follower.wait(len(ens_bins))
+    follower.stop()
+    assert follower.ens_nums == [ens_num(ens_bin) for ens_bin in ens_bins]
+    assert recorder.metrics.files > 1
+
+
+def test_follow_latency(tmp_path):
+    ens_bins = read_ens_bins("B0000005.ens")
+    file_path = str(tmp_path / "Adcp0.ens")
+    open(file_path, "wb").close()
+
+    follower = Follower(file_path)
+    time.sleep(0.1)
+
+    write_times = []
+    with open(file_path, "ab") as f:
+        for ens_bin in ens_bins[:5]:
+            f.write(ens_bin)
+            f.flush()
+            write_times.append(time.monotonic())
+            time.sleep(0.1)
+
+    assert follower.wait(5)
+    follower.stop()
+    assert max(read - write for read, write in zip(follower.times, write_times)) < 0.5
+
+
+def test_next_file(tmp_path):
+    for name in ["Adcp0.ens", "Adcp1.ens", "Adcp2.ens", "Adcp10.ens", "Other3.ens", "Adcp5.txt",
+                 "RTI_20191101_112241.ens", "RTI_20191101_112241_1.ens", "RTI_20191101_112242.ens"]:
+        open(str(tmp_path / name), "wb").close()
+
+    assert ReadBinaryFile.next_file(str(tmp_path / "Adcp1.ens")) == str(tmp_path / "Adcp2.ens")
+    assert ReadBinaryFile.next_file(str(tmp_path / "Adcp2.ens")) == str(tmp_path / "Adcp10.ens")
+    assert ReadBinaryFile.next_file(str(tmp_path / "Adcp10.ens")) is None
+    assert ReadBinaryFile.next_file(str(tmp_path / "RTI_20191101_112241.ens")) == str(tmp_path / "RTI_20191101_112241_1.ens")
+    assert ReadBinaryFile.next_file(str(tmp_path / "RTI_20191101_112241_1.ens")) == str(tmp_path / "RTI_20191101_112242.ens")
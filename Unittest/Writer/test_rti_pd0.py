@@ -0,0 +1,221 @@
+import os
+import numpy as np
+from rti_python.Writer.rti_pd0 import RtiPd0Writer
+from rti_python.Codecs.Pd0Encoder import Pd0Encoder
+from rti_python.Codecs.Pd0Codec import Pd0Codec
+from rti_python.Ensemble.Ensemble import Ensemble
+from rti_python.Ensemble.EnsembleData import EnsembleData
+from rti_python.Ensemble.AncillaryData import AncillaryData
+from rti_python.Ensemble.BeamVelocity import BeamVelocity
+from rti_python.Ensemble.EarthVelocity import EarthVelocity
+from rti_python.Ensemble.Amplitude import Amplitude
+from rti_python.Ensemble.Correlation import Correlation
+from rti_python.Ensemble.GoodBeam import GoodBeam
+from rti_python.Ensemble.GoodEarth import GoodEarth
+from rti_python.Ensemble.BottomTrack import BottomTrack
+
+
+def generate_ens(ens_num=12, num_bins=30, num_beams=4, is_earth=True):
+    ens = Ensemble()
+
+    ens_ds = EnsembleData()
+    ens_ds.EnsembleNumber = ens_num
+    ens_ds.NumBins = num_bins
+    ens_ds.NumBeams = num_beams
+    ens_ds.ActualPingCount = 10
+    ens_ds.SysFirmwareMajor = 2
+    ens_ds.SysFirmwareMinor = 11
+    ens_ds.Year = 2019
+    ens_ds.Month = 3
+    ens_ds.Day = 9
+    ens_ds.Hour = 12
+    ens_ds.Minute = 23
+    ens_ds.Second = 24
+    ens_ds.HSec = 33
+    ens.AddEnsembleData(ens_ds)
+
+    anc = AncillaryData()
+    anc.FirstBinRange = 1.0
+    anc.BinSize = 0.5
+    anc.Heading = 123.45
+    anc.Pitch = -1.5
+    anc.Roll = 179.0
+    anc.WaterTemp = 15.25
+    anc.SpeedOfSound = 1500.0
+    anc.TransducerDepth = 0.5
+    ens.AddAncillaryData(anc)
+
+    beam_vel = BeamVelocity(num_bins, num_beams)
+    earth_vel = EarthVelocity(num_bins, num_beams)
+    amp = Amplitude(num_bins, num_beams)
+    corr = Correlation(num_bins, num_beams)
+    good_beam = GoodBeam(num_bins, num_beams)
+    good_earth = GoodEarth(num_bins, num_beams)
+    for bin_num in range(num_bins):
+        for beam in range(num_beams):
+            beam_vel.Velocities[bin_num][beam] = 0.001 * (bin_num + 1) + beam
+            earth_vel.Velocities[bin_num][beam] = -0.002 * (bin_num + 1) - beam
+            amp.Amplitude[bin_num][beam] = 20.0 + beam
+            corr.Correlation[bin_num][beam] = 0.1 * (beam + 1)
+            good_beam.GoodBeam[bin_num][beam] = beam + 1
+            good_earth.GoodEarth[bin_num][beam] = 10
+    beam_vel.Velocities[3][0] = Ensemble.BadVelocity
+    if num_beams > 2:
+        earth_vel.Velocities[4][2] = Ensemble.BadVelocity
+
+    ens.AddBeamVelocity(beam_vel)
+    if is_earth:
+        ens.AddEarthVelocity(earth_vel)
+        ens.AddGoodEarth(good_earth)
+    ens.AddAmplitude(amp)
+    ens.AddCorrelation(corr)
+    ens.AddGoodBeam(good_beam)
+
+    bt = BottomTrack()
+    bt.NumBeams = 4
+    bt.ActualPingCount = 4
+    bt.Range = [10.1, 10.2, 10.3, Ensemble.BadVelocity]
+    bt.BeamVelocity = [0.1, 0.2, 0.3, 0.4]
+    bt.EarthVelocity = [1.1, 1.2, 1.3, 1.4]
+    bt.EarthGood = [4, 4, 2, 0]
+    bt.BeamGood = [1, 2, 3, 4]
+    bt.Correlation = [1.0, 0.5, 0.5, 0.5]
+    bt.Amplitude = [10.0, 11.0, 12.0, 13.0]
+    ens.AddBottomTrack(bt)
+
+    return ens
+
+
+def test_encode_earth():
+    ens = generate_ens()
+    pd0 = Pd0Encoder().encode(ens)
+
+    ens_data, ens_error = Pd0Codec().parse_ensemble(pd0, False)
+
+    assert ens_error is None
+    assert 6 + 2 * 7 + 59 + 65 + (2 + 30 * 8) + 3 * (2 + 30 * 4) + 85 == ens_data['Header']['nbytesperens']
+    assert 'EARTH' == ens_data['FLeader']['Coord_Transform']
+    assert 30 == ens_data['FLeader']['Number_of_Cells']
+    assert 50 == ens_data['FLeader']['Depth_Cell_Length_cm']
+    assert 100 == ens_data['FLeader']['Bin_1_distance_cm']
+    assert 12 == ens_data['VLeader']['Ensemble_Number']
+    assert 2019 == ens_data['VLeader']['Year']
+    assert 33 == ens_data['VLeader']['Hundredths']
+    assert 12345 == ens_data['VLeader']['Heading']
+    assert -150 == ens_data['VLeader']['Pitch']
+    assert 17900 == ens_data['VLeader']['Roll']
+    assert 1500 == ens_data['VLeader']['Speed_of_Sound']
+
+    # Earth velocity is not reordered
+    assert -2 == ens_data['VData'][0, 0]
+    assert -1002 == ens_data['VData'][1, 0]
+    assert -60 == ens_data['VData'][0, 29]
+    assert -32768 == ens_data['VData'][2, 4]
+
+    # Amplitude and correlation are reordered to PD0 beams
+    assert 44 == ens_data['IData'][0, 0]
+    assert 42 == ens_data['IData'][2, 0]
+    assert round(0.1 * 3 * 255) == ens_data['CData'][0, 0]
+    assert 100 == ens_data['GData'][0, 0]
+
+    # Bottom Track
+    assert 1030 == ens_data['BTData']['BT_Range'][0]
+    assert -32768 == ens_data['BTData']['BT_Range'][1]
+    assert 1020 == ens_data['BTData']['BT_Range'][2]
+    assert 1010 == ens_data['BTData']['BT_Range'][3]
+    assert -1100 == ens_data['BTData']['BT_Vel'][0]
+    assert 50 == ens_data['BTData']['BT_PGd'][2]
+
+
+def test_encode_beam():
+    ens = generate_ens(is_earth=False)
+    pd0 = Pd0Encoder().encode(ens)
+
+    ens_data, ens_error = Pd0Codec().parse_ensemble(pd0, False)
+
+    assert ens_error is None
+    assert 'BEAM' == ens_data['FLeader']['Coord_Transform']
+
+    # RTB BEAM 0,1,2,3 = PD0 BEAM 3,2,0,1
+    assert 2001 == ens_data['VData'][0, 0]
+    assert 3001 == ens_data['VData'][1, 0]
+    assert 1001 == ens_data['VData'][2, 0]
+    assert 1 == ens_data['VData'][3, 0]
+    assert -32768 == ens_data['VData'][3, 3]
+
+    # Matches the per value helpers
+    for pd0_beam in range(4):
+        assert np.array_equal(ens.BeamVelocity.pd0_mm_per_sec(pd0_beam), ens_data['VData'][pd0_beam, :])
+        assert np.array_equal(ens.Amplitude.pd0_counts(pd0_beam), ens_data['IData'][pd0_beam, :])
+        assert np.array_equal(ens.GoodBeam.pd0_percent(10, pd0_beam), ens_data['GData'][pd0_beam, :])
+        assert ens.BottomTrack.pd0_beam_vel_mm_per_sec(pd0_beam) == ens_data['BTData']['BT_Vel'][pd0_beam]
+        assert ens.BottomTrack.pd0_range_cm(pd0_beam) == ens_data['BTData']['BT_Range'][pd0_beam]
+
+
+def test_encode_vertical():
+    ens = generate_ens(num_beams=1, is_earth=False)
+    pd0 = Pd0Encoder().encode(ens)
+
+    ens_data, ens_error = Pd0Codec().parse_ensemble(pd0, False)
+
+    assert ens_error is None
+    assert 'BEAM' == ens_data['FLeader']['Coord_Transform']
+
+    # Vertical beam is PD0 beam 0 and the remaining beams are bad
+    assert 1 == ens_data['VData'][0, 0]
+    assert -32768 == ens_data['VData'][0, 3]
+    assert 30 == ens_data['VData'][0, 29]
+    for pd0_beam in range(1, 4):
+        assert np.all(-32768 == ens_data['VData'][pd0_beam, :])
+        assert np.all(0 == ens_data['IData'][pd0_beam, :])
+        assert np.all(0 == ens_data['CData'][pd0_beam, :])
+
+    # Matches the per value helpers
+    assert np.array_equal(ens.BeamVelocity.pd0_mm_per_sec(0), ens_data['VData'][0, :])
+    assert np.array_equal(ens.Amplitude.pd0_counts(0), ens_data['IData'][0, :])
+    assert np.array_equal(ens.GoodBeam.pd0_percent(10, 0), ens_data['GData'][0, :])
+
+    # Vertical correlation is scaled to 255 with code repeats
+    for num_repeats in (0, 4):
+        corr = Pd0Encoder.correlation_counts(np.asarray(ens.Correlation.Correlation), num_repeats, is_vertical=True)
+        assert np.array_equal(ens.Correlation.pd0_counts(num_repeats, 0), corr[:, 0])
+    assert np.array_equal(ens.Correlation.pd0_counts(0, 0), ens_data['CData'][0, :])
+
+
+def test_encode_batch():
+    ens_list = [generate_ens(ens_num=i, num_bins=10 + (i % 2)) for i in range(1, 6)]
+    ens_list.append(Ensemble())
+
+    pd0_list = Pd0Encoder().encode_batch(ens_list)
+
+    assert 6 == len(pd0_list)
+    assert pd0_list[5] is None
+    for i in range(5):
+        ens_data, ens_error = Pd0Codec().parse_ensemble(bytes(pd0_list[i]), False)
+        assert ens_error is None
+        assert i + 1 == ens_data['VLeader']['Ensemble_Number']
+        assert 10 + ((i + 1) % 2) == ens_data['FLeader']['Number_of_Cells']
+        assert bytes(pd0_list[i]) == Pd0Encoder().encode(ens_list[i])
+
+
+def test_write_pd0(tmpdir):
+    file_path = os.path.join(str(tmpdir), "test.pd0")
+
+    with RtiPd0Writer(file_path, batch_size=3) as writer:
+        for i in range(1, 11):
+            writer.write(generate_ens(ens_num=i))
+
+    assert 10 == writer.ens_count
+    assert os.path.getsize(file_path) == writer.bytes_written
+
+    ens_nums = []
+    pd0 = Pd0Codec()
+    with open(file_path, "rb") as f:
+        data = f.read()
+    ens_len = len(data) // 10
+    for i in range(10):
+        ens_data, ens_error = pd0.parse_ensemble(data[i * ens_len:(i + 1) * ens_len], False)
+        assert ens_error is None
+        ens_nums.append(ens_data['VLeader']['Ensemble_Number'])
+
+    assert list(range(1, 11)) == ens_nums
@@ -0,0 +1,233 @@
+import os
+import time
+import socket
+import threading
+from rti_python.Writer import rti_recorder
+from rti_python.Writer.rti_recorder import RtiRawRecorder
+from rti_python.Writer.rti_binary import RtiBinaryWriter
+from rti_python.Codecs.BinaryCodec import BinaryCodec
+
+
+def read_raw(file_name):
+    file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Codec", file_name)
+    with open(file_path, "rb") as f:
+        return f.read()
+
+
+def read_files(folder):
+    """
+    Read the recorded files in the order they were created.
+    RTI_YYYYMMDD_HHMMSS.ens, then RTI_YYYYMMDD_HHMMSS_1.ens ...
+    """
+    names = sorted(os.listdir(folder), key=lambda name: (name[:19], len(name), name))
+    data = []
+    for name in names:
+        with open(os.path.join(folder, name), "rb") as f:
+            data.append(f.read())
+    return data
+
+
+def test_write(tmp_path):
+    data = read_raw("B0000005.ens")
+
+    recorder = RtiRawRecorder(str(tmp_path), buffer_size=4096)
+    for pos in range(0, len(data), 1000):
+        recorder.write(data[pos:pos + 1000])
+    recorder.close()
+
+    assert read_files(str(tmp_path)) == [data]
+    metrics = recorder.get_metrics()
+    assert metrics["received_bytes"] == len(data)
+    assert metrics["written_bytes"] == len(data)
+    assert metrics["queued_bytes"] == 0
+    assert metrics["dropped_bytes"] == 0
+    assert metrics["files"] == 1
+    assert metrics["fsyncs"] == 1
+
+
+def test_recv_into(tmp_path):
+    data = read_raw("B0000005.ens")
+    sender, receiver = socket.socketpair()
+
+    def send():
+        for pos in range(0, len(data), 500):
+            sender.sendall(data[pos:pos + 500])
+        sender.close()
+
+    thread = threading.Thread(target=send)
+    thread.start()
+
+    recorder = RtiRawRecorder(str(tmp_path))
+    reads = 0
+    while recorder.recv_into(receiver) > 0:
+        reads += 1
+    thread.join()
+    receiver.close()
+
+    assert recorder.flush(5.0)
+    metrics = recorder.get_metrics()
+    recorder.close()
+
+    assert read_files(str(tmp_path)) == [data]
+
+    # Small reads are coalesced into large writes
+    assert metrics["writes"] < reads
+
+
+def test_rotate_at_ensemble(tmp_path):
+    data = read_raw("B0000005.ens")
+
+    recorder = RtiRawRecorder(str(tmp_path), max_file_size=50000)
+    for pos in range(0, len(data), 777):
+        recorder.write(data[pos:pos + 777])
+        if pos % 7770 == 0:
+            recorder.flush(5.0)
+    recorder.close()
+
+    files = read_files(str(tmp_path))
+    assert len(files) > 2
+    assert b"".join(files) == data
+
+    # Each file begins with an ensemble
+    for file_data in files:
+        assert file_data.startswith(RtiRawRecorder.DELIMITER)
+    for file_data in files[:-1]:
+        assert len(file_data) >= 50000
+
+
+def test_flush_while_rotating(tmp_path):
+    data = read_raw("B0000005.ens")
+    next_ens = data.index(RtiRawRecorder.DELIMITER, 60000)
+    end = next_ens - 100
+
+    recorder = RtiRawRecorder(str(tmp_path), max_file_size=50000)
+    recorder.write(data[:60000])
+    assert recorder.flush(5.0)
+
+    # Looking for the next ensemble to start a new file.  Flush still writes all the data.
+    recorder.write(data[60000:end])
+    assert recorder.flush(5.0)
+    assert recorder.get_metrics()["queued_bytes"] == 0
+    assert b"".join(read_files(str(tmp_path))) == data[:end]
+
+    # New file begins at the next ensemble
+    recorder.write(data[end:])
+    recorder.close()
+
+    files = read_files(str(tmp_path))
+    assert b"".join(files) == data
+    assert len(files[0]) == next_ens
+    assert files[1].startswith(RtiRawRecorder.DELIMITER)
+
+
+def test_rotate_no_ensemble(tmp_path):
+    data = bytes(range(256)) * 100
+
+    recorder = RtiRawRecorder(str(tmp_path), max_file_size=5000, max_boundary_search=3000)
+    for pos in range(0, len(data), 1000):
+        recorder.write(data[pos:pos + 1000])
+        recorder.flush(5.0)
+    recorder.close()
+
+    # Split anyway if there are no ensembles
+    files = read_files(str(tmp_path))
+    assert len(files) > 1
+    assert b"".join(files) == data
+
+
+def test_rotate_age(tmp_path):
+    data = read_raw("B0000005.ens")
+    half = data.index(RtiRawRecorder.DELIMITER, len(data) // 2)
+
+    recorder = RtiRawRecorder(str(tmp_path), max_file_age=0.2)
+    recorder.write(data[:half])
+    recorder.flush(5.0)
+    time.sleep(0.3)
+    recorder.write(data[half:])
+    recorder.close()
+
+    assert read_files(str(tmp_path)) == [data[:half], data[half:]]
+
+
+def test_preallocate(tmp_path):
+    recorder = RtiRawRecorder(str(tmp_path), max_file_size=1024 * 1024, preallocate=True, fsync_policy=RtiRawRecorder.FSYNC_ALWAYS)
+    recorder.write(b"\x80" * 16 + bytes(1000))
+    recorder.flush(5.0)
+    file_path = recorder.file_path
+    recorder.close()
+
+    # File is trimmed to the data
+    assert os.path.getsize(file_path) == 1016
+    assert recorder.metrics.fsyncs >= 1
+
+
+def test_disk_error(tmp_path, monkeypatch):
+    data = read_raw("B0000005.ens")
+    writev = os.writev
+    failures = [3]
+
+    def failing_writev(fd, buffers):
+        if failures[0] > 0:
+            failures[0] -= 1
+            raise OSError("Disk error")
+        return writev(fd, buffers)
+
+    monkeypatch.setattr(rti_recorder.os, "writev", failing_writev)
+
+    recorder = RtiRawRecorder(str(tmp_path), retry_interval=0.01)
+    for pos in range(0, len(data), 1000):
+        recorder.write(data[pos:pos + 1000])
+    assert recorder.flush(5.0)
+    recorder.close()
+
+    # Data is written after the error
+    assert read_files(str(tmp_path)) == [data]
+    assert recorder.metrics.write_errors == 3
+
+
+def test_memory_budget(tmp_path, monkeypatch):
+    writev = os.writev
+    disk_ready = threading.Event()
+
+    def slow_writev(fd, buffers):
+        disk_ready.wait(5.0)
+        return writev(fd, buffers)
+
+    monkeypatch.setattr(rti_recorder.os, "writev", slow_writev)
+
+    recorder = RtiRawRecorder(str(tmp_path), buffer_size=1024, max_memory=8 * 1024)
+
+    # The disk is stalled.  The writes do not wait.
+    start = time.monotonic()
+    queued = sum(recorder.write(bytes([index]) * 512) for index in range(40))
+    assert time.monotonic() - start < 1.0
+
+    disk_ready.set()
+    recorder.close()
+
+    metrics = recorder.get_metrics()
+    assert metrics["dropped_bytes"] > 0
+    assert metrics["dropped_bytes"] + queued == 40 * 512
+    assert metrics["written_bytes"] == queued
+    assert metrics["max_queued_bytes"] <= 8 * 1024
+
+
+def test_binary_writer_rotate(tmp_path):
+    data = read_raw("B0000005.ens")
+    ens_bins = [RtiRawRecorder.DELIMITER + chunk for chunk in data.split(RtiRawRecorder.DELIMITER)[1:]]
+
+    # Each ensemble is larger than the max size, so every ensemble starts a new file in the same second
+    writer = RtiBinaryWriter(str(tmp_path), max_file_size=0.001)
+    first_path = writer.get_file_path()
+    for ens_bin in ens_bins:
+        writer.write(ens_bin)
+        writer.flush(5.0)
+    writer.close()
+
+    files = read_files(str(tmp_path))
+    assert len(files) == len(ens_bins)
+    assert b"".join(files) == data
+    assert os.path.exists(first_path)
+    assert writer.total_bytes == len(data)
+    for file_data in files:
+        assert BinaryCodec.verify_ens_data(file_data)
@@ -6,6 +6,7 @@ import socket
 import threading
 
 from Comm.AdcpSerialPortServer import AdcpSerialPortServer
+from Writer.rti_recorder import RtiRawRecorder
 
 logger = logging.getLogger("Ensemble File Report")
 logger.setLevel(logging.DEBUG)
@@ -38,8 +39,7 @@ class SerialDataRecorder:
 
         self.raw_serial_socket = None
         self.isAlive = True
-        self.file = None
-        self.file_size = 0
+        self.recorder = None
         self.file_name = self.RECORDER_FILE_NAME
 
     def connect(self, comm_port, baud, folder_path, file_name, tcp_port=55056):
@@ -90,34 +90,21 @@ class SerialDataRecorder:
         """
         Read the data from the TCP port.  This is the raw data from the serial port.
         Then write this data to the file.
+
+        The data is received into the recorder buffers and written to the
+        file by the recorder thread, so a slow disk does not stop the reading.
+        The recorder starts a new file when the file is too large.
         """
         while self.isAlive:
             try:
-                # Read data from socket
-                data = self.raw_serial_socket.recv(4096)
-
-                # If data exist process
-                if len(data) > 0:
-                    # Write the data to the file
-                    self.file.write(data)
-
-                    # Keep track of the file size
-                    self.file_size += len(data)
-
-                    # Limit the output prompt
-                    #if self.file_size % 5 == 0:
-                    #    print('.', end="", flush=True)
-
-                    # Check the file size to see if a new file needs to be created
-                    if self.file_size > self.MAX_FILE_SIZE:
-                        self.close_file_write()                 # Close this file
-                        self.create_file_writer()               # Open a new file
+                # Read data from socket into the recorder
+                self.recorder.recv_into(self.raw_serial_socket)
 
             except socket.timeout:
                 # Just a socket timeout, continue on
                 pass
             except Exception as e:
-                logger.error("Exception in reading data.", e)
+                logger.error("Exception in reading data. " + str(e))
                 self.stop_adcp_server()
 
         print("Read Thread turned off")
@@ -127,18 +114,17 @@ class SerialDataRecorder:
         Create a file writer.  This will open the file and have it ready
         to write data to the file.
         """
-        file_path = self.get_new_file()
-        logger.debug("Open File name: " + file_path)
-
-        self.file_size = 0
-        self.file = open(file_path, 'wb')
+        self.recorder = RtiRawRecorder(self.folder_path, self.file_name, ".ens", self.MAX_FILE_SIZE,
+                                       file_name_func=lambda folder, header, extension: self.get_new_file())
+        logger.debug("Open File name: " + self.recorder.file_path)
 
     def close_file_write(self):
         """
-        Close the file.
+        Write the remaining data and close the file.
         """
         logger.debug("Close the file")
-        self.file.close()
+        if self.recorder is not None:
+            self.recorder.close()
 
     def get_new_file(self):
         """
@@ -108,7 +108,7 @@ class RtiCheckFile:
 
         if self.file_paths:
             for file in self.file_paths:
-                reader = ReadBinaryFile()
+                reader = ReadBinaryFile(is_lazy=True)                   # Only decode the datasets checked
                 reader.ensemble_event += self.ens_handler               # Wait for ensembles
                 reader.file_progress += self.file_progress_handler      # Monitor file progress
                 self.init()                                             # Reinitialize values for next file
@@ -1,7 +1,13 @@
 """General purpose event handling routines"""
+import time
+import pickle
+import logging
+import threading
+from collections import deque
+from enum import Enum
 from .compat import *
 
-__all__ = ["EventHandler", "MPEventHandler"]
+__all__ = ["EventHandler", "MPEventHandler", "AsyncEventHandler", "OverflowPolicy"]
 
 _HASMP = True
 try:
@@ -9,6 +15,13 @@ try:
 except ImportError:
     _HASMP = False
 
+_HASSHM = True
+try:
+    from multiprocessing import resource_tracker
+    from multiprocessing.shared_memory import SharedMemory
+except ImportError:
+    _HASSHM = False
+
 
 class EventHandler(object):
     """A simple event handling class, which manages callbacks to be
@@ -67,31 +80,476 @@ def _mp_callback(args):
     return args[0](args[1], *fargs)
 
 
+# Shared memory blocks that could not be closed yet in the worker,
+# because the callback kept a reference to an array in the block.
+_held_shm = []
+
+
+def _mp_dumps(obj, min_shared_bytes):
+    """Pickles the object for the workers.
+
+    Large buffers like numpy arrays are pickled out-of-band and copied
+    once into a shared memory block.  The workers map the arrays
+    directly from the block instead of unpickling a copy.
+    Returns the payload and the shared memory block, or None.
+    """
+    buffers = []
+    data = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    raw_buffers = [buffer.raw() for buffer in buffers]
+    total_size = sum(raw.nbytes for raw in raw_buffers)
+
+    if not _HASSHM or total_size < min_shared_bytes:
+        # Small event, pass the buffers with the pickle
+        return (None, [bytes(raw) for raw in raw_buffers], data), None
+
+    shm = SharedMemory(create=True, size=total_size)
+    sizes = []
+    offset = 0
+    for raw in raw_buffers:
+        shm.buf[offset:offset + raw.nbytes] = raw
+        sizes.append(raw.nbytes)
+        offset += raw.nbytes
+
+    return (shm.name, sizes, data), shm
+
+
+def _mp_loads(payload):
+    """Unpickles the payload created by _mp_dumps().
+
+    Returns the object and the shared memory block, or None.
+    """
+    shm_name, buffers, data = payload
+    if shm_name is None:
+        return pickle.loads(data, buffers=buffers), None
+
+    shm = _mp_attach_shm(shm_name)
+    sizes = buffers
+    buffers = []
+    offset = 0
+    for size in sizes:
+        buffers.append(shm.buf[offset:offset + size])
+        offset += size
+
+    return pickle.loads(data, buffers=buffers), shm
+
+
+def _mp_attach_shm(shm_name):
+    """Attaches to the shared memory block created by the event.
+
+    The event removes the block, so the worker does not need to track it.
+    """
+    try:
+        return SharedMemory(name=shm_name, track=False)
+    except TypeError:
+        # Python before 3.13 always tracks the block.  The workers share
+        # the resource tracker with the event, so it is only tracked once.
+        return SharedMemory(name=shm_name)
+
+
+def _mp_release_shm(shm):
+    """Closes the shared memory blocks that are no longer used."""
+    if shm is not None:
+        _held_shm.append(shm)
+    for held in list(_held_shm):
+        try:
+            held.close()
+            _held_shm.remove(held)
+        except BufferError:
+            # An array still uses the block
+            pass
+
+
+def _mp_shared_callback(args):
+    # args = (function, payload)
+    obj, shm = _mp_loads(args[1])
+    try:
+        return args[0](obj[0], *obj[1])
+    finally:
+        # Remove the references to the arrays before closing the block
+        obj = None
+        _mp_release_shm(shm)
+
+
 class MPEventHandler(EventHandler):
     """An asynchronous event handling class in which callbacks are
     executed in parallel.
 
+    The process pool is created on the first event and is used for all
+    the events, so the process startup is only done once.  Large arrays
+    in the arguments, like the ensemble datasets, are passed to the
+    workers through shared memory instead of pickling a copy for each
+    callback.
+
+    Each event returns an AsyncResult with a result for each callback.
+    Call wait() to wait for all the events and close() to stop the
+    pool.  The callbacks, sender and arguments must be picklable.
+
     It is the responsibility of the caller code to ensure that every
     object used maintains a consistent state. The MPEventHandler class
     will not apply any locks, synchronous state changes or anything else
     to the arguments being used. Consider it a "fire-and-forget" event
     handling strategy
     """
-    def __init__(self, sender, maxprocs=None):
+    def __init__(self, sender, maxprocs=None, min_shared_bytes=16384, result_callback=None):
         if not _HASMP:
             raise UnsupportedError(MPEventHandler,
                                    "no multiprocessing support found")
         super(MPEventHandler, self).__init__(sender)
         self.maxprocs = maxprocs
+        self.min_shared_bytes = min_shared_bytes    # Smallest arguments in bytes to pass with shared memory
+        self.result_callback = result_callback      # Called with the list of results of each event
+        self._pool = None
+        self._pending = 0
+        self._cond = threading.Condition()
 
     def __call__(self, *args):
-        if self.maxprocs is not None:
-            pool = Pool(processes=self.maxprocs)
+        if not self.callbacks:
+            return None
+
+        pool = self._get_pool()
+        payload, shm = _mp_dumps((self.sender, args[:]), self.min_shared_bytes)
+
+        with self._cond:
+            self._pending += 1
+
+        def done(results):
+            self._event_done(shm)
+            if self.result_callback is not None and not isinstance(results, BaseException):
+                try:
+                    self.result_callback(results)
+                except Exception as e:
+                    logging.error("Error in event result callback.  " + str(e))
+
+        pv = [(callback, payload) for callback in self.callbacks]
+        try:
+            return pool.map_async(_mp_shared_callback, pv, chunksize=1, callback=done, error_callback=done)
+        except Exception:
+            self._event_done(shm)
+            raise
+
+    def _get_pool(self):
+        if self._pool is None:
+            if _HASSHM:
+                # Start the tracker before the workers so they share it
+                resource_tracker.ensure_running()
+            if self.maxprocs is not None:
+                self._pool = Pool(processes=self.maxprocs)
+            else:
+                self._pool = Pool()
+        return self._pool
+
+    def _event_done(self, shm):
+        # All the workers have the arrays mapped, so the block can be removed
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+        with self._cond:
+            self._pending -= 1
+            self._cond.notify_all()
+
+    @property
+    def pending(self):
+        """Number of events that are not complete."""
+        with self._cond:
+            return self._pending
+
+    def wait(self, timeout=None):
+        """Waits for all the events to complete.
+
+        Returns True if all the events are complete.
+        """
+        end_time = None if timeout is None else time.perf_counter() + timeout
+        with self._cond:
+            while self._pending > 0:
+                remaining = None if end_time is None else end_time - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, wait=True):
+        """Stops the process pool.
+
+        If wait is set, the pending events are completed first.
+        Otherwise the workers are terminated.
+        """
+        if self._pool is None:
+            return
+        if wait:
+            self.wait()
+            self._pool.close()
         else:
-            pool = Pool()
-        psize = len(self.callbacks)
-        pv = zip(self.callbacks, [self.sender] * psize, [args[:]] * psize)
-        results = pool.map_async(_mp_callback, pv)
-        pool.close()
-        pool.join()
-        return results
\ No newline at end of file
+            self._pool.terminate()
+        self._pool.join()
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class OverflowPolicy(Enum):
+    """
+    What to do when a subscriber queue is full.
+    """
+    BLOCK = 0               # Wait for the subscriber to make room
+    DROP_OLDEST = 1         # Remove the oldest queued event
+    COALESCE = 2            # Replace the newest queued event with the new event
+
+
+class SubscriberMetrics(object):
+    """Delivery metrics for a subscriber."""
+    def __init__(self):
+        self.published = 0          # Events given to the subscriber
+        self.delivered = 0          # Events passed to the callback
+        self.dropped = 0            # Events removed with DROP_OLDEST
+        self.coalesced = 0          # Events replaced with COALESCE
+        self.errors = 0             # Callbacks that raised an exception
+        self.queue_depth = 0        # Events waiting in the queue
+        self.max_queue_depth = 0    # Most events waiting in the queue
+        self.last_latency = 0.0     # Seconds from publish to callback complete
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+
+    @property
+    def avg_latency(self):
+        if self.delivered == 0:
+            return 0.0
+        return self.total_latency / self.delivered
+
+    def to_dict(self):
+        return {"published": self.published,
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+                "errors": self.errors,
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+                "last_latency": self.last_latency,
+                "avg_latency": self.avg_latency,
+                "max_latency": self.max_latency}
+
+
+class Subscriber(object):
+    """A callback with its own bounded queue and worker thread.
+
+    The events are passed to the callback in the order they were
+    published.  The worker thread is a daemon thread, so it will not
+    keep the application running.
+    """
+    def __init__(self, callback, sender, maxsize=100, policy=OverflowPolicy.BLOCK):
+        self.callback = callback
+        self.sender = sender
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.metrics = SubscriberMetrics()
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._busy = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run,
+                                        name="EventSubscriber-" + getattr(callback, "__name__", "callback"),
+                                        daemon=True)
+        self._thread.start()
+
+    def put(self, args):
+        """Queue the event for the callback.
+
+        Returns False if the subscriber is closed.
+        """
+        with self._cond:
+            if self._closed:
+                return False
+
+            self.metrics.published += 1
+            item = (time.perf_counter(), args)
+
+            if len(self._queue) >= self.maxsize:
+                if self.policy == OverflowPolicy.BLOCK:
+                    while len(self._queue) >= self.maxsize and not self._closed:
+                        self._cond.wait()
+                    if self._closed:
+                        return False
+                elif self.policy == OverflowPolicy.DROP_OLDEST:
+                    self._queue.popleft()
+                    self.metrics.dropped += 1
+                elif self.policy == OverflowPolicy.COALESCE:
+                    # Keep the publish time of the replaced event for the latency
+                    item = (self._queue.pop()[0], args)
+                    self.metrics.coalesced += 1
+
+            self._queue.append(item)
+            self.metrics.queue_depth = len(self._queue)
+            self.metrics.max_queue_depth = max(self.metrics.max_queue_depth, len(self._queue))
+            self._cond.notify_all()
+
+        return True
+
+    def _run(self):
+        """Pass the queued events to the callback."""
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+
+                publish_time, args = self._queue.popleft()
+                self._busy = True
+                self.metrics.queue_depth = len(self._queue)
+                self._cond.notify_all()
+
+            try:
+                self.callback(self.sender, *args)
+            except Exception as e:
+                logging.error("Error in event callback.  " + str(e))
+                with self._cond:
+                    self.metrics.errors += 1
+
+            with self._cond:
+                latency = time.perf_counter() - publish_time
+                self.metrics.delivered += 1
+                self.metrics.last_latency = latency
+                self.metrics.total_latency += latency
+                self.metrics.max_latency = max(self.metrics.max_latency, latency)
+                self._busy = False
+                self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Wait until all the queued events are delivered.
+
+        Returns True if the queue is empty.
+        """
+        end_time = None if timeout is None else time.perf_counter() + timeout
+        with self._cond:
+            while self._queue or self._busy:
+                if not self._thread.is_alive():
+                    return False
+                remaining = None if end_time is None else end_time - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, drain=True, timeout=None):
+        """Stop the worker thread.
+
+        If drain is set, the queued events are delivered first.
+        Otherwise they are discarded.
+        """
+        with self._cond:
+            if not drain:
+                self._queue.clear()
+                self.metrics.queue_depth = 0
+            self._closed = True
+            self._cond.notify_all()
+        if threading.current_thread() is not self._thread:
+            self._thread.join(timeout)
+
+
+class AsyncEventHandler(EventHandler):
+    """An event handling class in which each callback has its own
+    bounded queue and worker thread.
+
+    Publishing an event only queues it, so a slow callback like a
+    database writer does not stall the caller or the other callbacks.
+    Each callback receives the events in the order they were published.
+    When a queue is full, the overflow policy decides if the caller
+    waits, the oldest event is dropped or the newest queued event is
+    replaced.
+
+    To fan out an @event, forward it to the handler:
+    handler = AsyncEventHandler(None)
+    handler.add(display_ens, policy=OverflowPolicy.COALESCE, maxsize=1)
+    handler.add(db_writer_ens, policy=OverflowPolicy.BLOCK, maxsize=500)
+    codec.ensemble_event += handler.forward
+    """
+    def __init__(self, sender, maxsize=100, policy=OverflowPolicy.BLOCK):
+        super(AsyncEventHandler, self).__init__(sender)
+        self.maxsize = maxsize
+        self.policy = policy
+        self.subscribers = []
+        self._lock = threading.Lock()
+
+    def __call__(self, *args):
+        """Queues the event for all callbacks.
+
+        Returns the number of callbacks the event was queued for.
+        """
+        return self._publish(args)
+
+    def forward(self, sender, *args):
+        """Queues an event received from another event.
+
+        The sender of the other event is replaced by the sender of
+        this handler.
+        """
+        return self._publish(args)
+
+    def _publish(self, args):
+        with self._lock:
+            subscribers = list(self.subscribers)
+        return sum(1 for subscriber in subscribers if subscriber.put(args))
+
+    def add(self, callback, maxsize=None, policy=None):
+        """Adds a callback with its own queue and worker.
+
+        Returns the subscriber for the callback.
+        """
+        if not callable(callback):
+            raise TypeError("callback mus be callable")
+        subscriber = Subscriber(callback,
+                                self.sender,
+                                self.maxsize if maxsize is None else maxsize,
+                                self.policy if policy is None else policy)
+        with self._lock:
+            self.callbacks.append(callback)
+            self.subscribers.append(subscriber)
+        return subscriber
+
+    def remove(self, callback):
+        """Removes a callback and stops its worker."""
+        with self._lock:
+            index = self.callbacks.index(callback)
+            del self.callbacks[index]
+            subscriber = self.subscribers.pop(index)
+        subscriber.close(drain=False)
+
+    def __setitem__(self, index, value):
+        raise TypeError("AsyncEventHandler callbacks can not be replaced")
+
+    def __delitem__(self, index):
+        self.remove(self.callbacks[index])
+
+    def metrics(self):
+        """Gets the metrics for each callback.
+
+        Returns a list of dictionaries in the order of the callbacks.
+        """
+        with self._lock:
+            subscribers = list(self.subscribers)
+        return [subscriber.metrics.to_dict() for subscriber in subscribers]
+
+    def flush(self, timeout=None):
+        """Waits until all the queued events are delivered."""
+        with self._lock:
+            subscribers = list(self.subscribers)
+        return all([subscriber.flush(timeout) for subscriber in subscribers])
+
+    def close(self, drain=True, timeout=None):
+        """Stops all the workers."""
+        with self._lock:
+            subscribers = list(self.subscribers)
+            self.subscribers = []
+            self.callbacks = []
+        for subscriber in subscribers:
+            subscriber.close(drain, timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
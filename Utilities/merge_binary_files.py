@@ -0,0 +1,188 @@
+from rti_python.Codecs.BinaryCodec import BinaryCodec
+from rti_python.Ensemble.EnsembleData import EnsembleData
+from obsub import event
+import logging
+import heapq
+
+
+class MergeBinaryFiles:
+    """
+    Merge ensemble files into one stream in time order.
+
+    Deployments produce many rotated files plus downloaded copies of the
+    same data, so the files can overlap.  Each file is first indexed: the
+    offset, size, time and identity of each ensemble.  Only the EnsembleData
+    dataset is decoded to build the index.  The files are then merged with a
+    heap, reading one ensemble at a time from each file.  So the memory used
+    is the index plus one ensemble for each file, not all the ensembles.
+
+    An ensemble with the same time, serial number, subsystem code, subsystem
+    configuration and ensemble number as an ensemble already passed is a
+    duplicate and is dropped.  The duplicates are next to each other in the
+    heap, so only the ensembles of the current time are remembered.
+
+    merger = MergeBinaryFiles(file_paths)
+    merger.ensemble_event += process_ens
+    merger.playback()
+    """
+
+    BLOCK_SIZE = 1024 * 1024
+
+    def __init__(self, file_paths, is_lazy=False):
+        """
+        :param file_paths: List of ensemble file paths.
+        :param is_lazy: TRUE = Pass LazyEnsemble objects.  The datasets are decoded on first access.
+        """
+        self.file_paths = list(file_paths)
+        self.is_lazy = is_lazy
+        self.indexes = None
+        self.total_ensembles = 0        # Ensembles in all the files
+        self.duplicates = 0             # Ensembles dropped as duplicates
+        self.skipped = 0                # Ensembles without EnsembleData
+
+    def index(self):
+        """
+        Index all the files.  The index of each file is sorted by time.
+        :return: List of the index of each file.
+        """
+        if self.indexes is None:
+            self.indexes = []
+            for file_path in self.file_paths:
+                file_index = self.index_file(file_path)
+                file_index.sort()
+                self.indexes.append(file_index)
+                self.total_ensembles += len(file_index)
+
+        return self.indexes
+
+    def index_file(self, file_path):
+        """
+        Find the ensembles in the file.
+        :param file_path: Ensemble file path.
+        :return: List of (time, serial number, subsystem code, subsystem config, ensemble number, offset, size) in file order.
+        """
+        file_index = []
+        for offset, ens_bin in MergeBinaryFiles.iter_ensembles(file_path):
+            key = MergeBinaryFiles.ensemble_key(ens_bin)
+            if key is None:
+                self.skipped += 1
+                continue
+            file_index.append(key + (offset, len(ens_bin)))
+
+        logging.debug("Indexed " + str(len(file_index)) + " ensembles: " + file_path)
+        return file_index
+
+    def merge(self):
+        """
+        Merge the files in time order and drop the duplicates.
+        :return: Generator of the ensembles.
+        """
+        indexes = self.index()
+        files = [open(file_path, "rb") for file_path in self.file_paths]
+
+        try:
+            # Heap of the next ensemble in each file
+            heap = [(file_index[0][:5], file_num, 0) for file_num, file_index in enumerate(indexes) if file_index]
+            heapq.heapify(heap)
+
+            # Identities passed with the last time.  A duplicate has the same time, so it is next in the heap.
+            last_time = None
+            passed = set()
+
+            while heap:
+                key, file_num, pos = heapq.heappop(heap)
+                if pos + 1 < len(indexes[file_num]):
+                    heapq.heappush(heap, (indexes[file_num][pos + 1][:5], file_num, pos + 1))
+
+                if key[0] != last_time:
+                    last_time = key[0]
+                    passed.clear()
+                if key[1:] in passed:
+                    self.duplicates += 1
+                    continue
+                passed.add(key[1:])
+
+                offset, size = indexes[file_num][pos][5:]
+                f = files[file_num]
+                f.seek(offset)
+                ens_bin = f.read(size)
+
+                if self.is_lazy:
+                    ens = BinaryCodec.decode_data_sets_lazy(ens_bin)
+                else:
+                    ens = BinaryCodec.decode_data_sets(ens_bin)
+
+                if ens:
+                    yield ens
+        finally:
+            for f in files:
+                f.close()
+
+    def playback(self):
+        """
+        Merge the files and pass each ensemble to the ensemble_event.
+        :return:
+        """
+        for ens in self.merge():
+            self.ensemble_event(ens)
+
+    @event
+    def ensemble_event(self, ens):
+        """
+        Event to subscribe to receive the merged ensembles.
+        :param ens: Ensemble object.
+        :return:
+        """
+        if ens.IsEnsembleData:
+            logging.debug(str(ens.EnsembleData.EnsembleNumber))
+
+    @staticmethod
+    def ensemble_key(ens_bin):
+        """
+        Decode the EnsembleData dataset to get the time and identity of the ensemble.
+        :param ens_bin: Verified ensemble binary data.
+        :return: (time, serial number, subsystem code, subsystem config, ensemble number) or None if there is no EnsembleData.
+        """
+        table = BinaryCodec.index_data_sets(ens_bin)
+        if "E000008" not in table:
+            return None
+
+        start, size, num_elements, element_multiplier = table["E000008"]
+        ens_ds = EnsembleData(num_elements, element_multiplier)
+        ens_ds.decode(ens_bin[start:start + size])
+
+        # YYYYMMDDhhmmssHH as a number to sort by time
+        time_key = ens_ds.Year
+        for value in (ens_ds.Month, ens_ds.Day, ens_ds.Hour, ens_ds.Minute, ens_ds.Second, ens_ds.HSec):
+            time_key = time_key * 100 + value
+
+        return time_key, ens_ds.SerialNumber, ens_ds.SysFirmwareSubsystemCode, ens_ds.SubsystemConfig, ens_ds.EnsembleNumber
+
+    @staticmethod
+    def iter_ensembles(file_path, block_size=BLOCK_SIZE):
+        """
+        Read the good ensembles in the file.  The ensemble size in the header
+        is used to find the end of each ensemble.  Bad data is skipped.
+        :param file_path: Ensemble file path.
+        :param block_size: Bytes to read at a time.
+        :return: Generator of the file offset and the binary data of each ensemble.
+        """
+        buff = bytearray()
+        buff_offset = 0                 # File offset of the start of the buffer
+
+        with open(file_path, "rb") as f:
+            data = f.read(block_size)
+            while data or buff:
+                is_end = not data
+                buff += data
+
+                ensembles, pos = BinaryCodec.find_ensembles(buff, is_end)
+                for start, ens_bin in ensembles:
+                    yield buff_offset + start, ens_bin
+
+                if is_end:
+                    break
+
+                del buff[:pos]
+                buff_offset += pos
+                data = f.read(block_size)
@@ -13,7 +13,7 @@ class EnsembleQC:
         :return:
         """
         if ens.IsBeamVelocity:
-            EnsembleQC.scan_bad_velocity(ens.Wt.Velocities)
+            EnsembleQC.scan_bad_velocity(ens.BeamVelocity.Velocities)
         if ens.IsInstrumentVelocity:
             EnsembleQC.scan_bad_velocity(ens.InstrumentVelocity.Velocities)
         if ens.IsEarthVelocity:
@@ -39,7 +39,7 @@ class EnsembleQC:
         :return: 
         """""
         # Verify we have data
-        if vel_list and len(vel_list) > 0:
+        if vel_list is not None and len(vel_list) > 0:
 
             num_bins = len(vel_list)
             num_beams = len(vel_list[0])
@@ -106,7 +106,7 @@ class EnsembleQC:
         :return: 
         """""
         # Verify we have data
-        if vel_list and len(vel_list) > 0:
+        if vel_list is not None and len(vel_list) > 0:
 
             num_bins = len(vel_list)
             last_bin_num = num_bins - 1
@@ -2,11 +2,91 @@ from rti_python.Codecs.BinaryCodec import BinaryCodec
 from obsub import event
 import logging
 import os
+import re
 import copy
+import time
+import ctypes
+import ctypes.util
+import select
+import threading
+
+
+class _DirectoryWatcher:
+    """
+    Wait for changes to the files in a folder.
+
+    Uses inotify on Linux.  Otherwise the wait is a sleep, so the
+    caller polls the files.
+    """
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+
+    def __init__(self, folder, use_inotify=True):
+        """
+        :param folder: Folder to watch.
+        :param use_inotify: False to always poll.
+        """
+        self.fd = None
+        if use_inotify and hasattr(os, "O_NONBLOCK") and os.path.exists("/proc/sys/fs/inotify"):
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+                fd = libc.inotify_init1(os.O_NONBLOCK | getattr(os, "O_CLOEXEC", 0))
+                if fd < 0:
+                    raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+                mask = self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+                if libc.inotify_add_watch(fd, os.fsencode(folder), mask) < 0:
+                    os.close(fd)
+                    raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+
+                self.fd = fd
+            except (OSError, AttributeError) as err:
+                logging.debug("inotify not available.  Polling the file. " + str(err))
+
+    def wait(self, timeout):
+        """
+        Wait for a change in the folder or the timeout.
+        :param timeout: Maximum seconds to wait.
+        """
+        if self.fd is None:
+            time.sleep(timeout)
+            return
+
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if readable:
+            # Clear the events.  The file is checked for new data.
+            try:
+                while os.read(self.fd, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
 
 
 class ReadBinaryFile:
 
+    # Bytes read at a time when following a file
+    FOLLOW_BLOCK_SIZE = 256 * 1024
+
+    def __init__(self, is_lazy=False):
+        """
+        Initialize the reader.
+        :param is_lazy: TRUE = Pass LazyEnsemble objects.  The datasets are decoded on first access.
+        """
+        self.is_lazy = is_lazy
+
+        # Follow mode
+        self.follow_path = None
+        self.follow_offset = 0
+        self.follow_stop_event = None
+
     def playback(self, ens_file_path):
         """
         Playback the given file.  This will read the file
@@ -71,18 +151,163 @@ class ReadBinaryFile:
         # Verify the ENS data is good
         # This will check that all the data is there and the checksum is good
         if BinaryCodec.verify_ens_data(ens_bin):
-            # Decode the ens binary data
-            logging.debug("Decoding binary data to ensemble: " + str(len(ens_bin)))
+            self.decode_playback_ens(ens_bin)
+
+    def decode_playback_ens(self, ens_bin):
+        """
+        Decode the verified ensemble and pass it to the event handler.
+        :param ens_bin: Binary Ensemble data to decode
+        :return:
+        """
+        # Decode the ens binary data
+        logging.debug("Decoding binary data to ensemble: " + str(len(ens_bin)))
+        if self.is_lazy:
+            ens = BinaryCodec.decode_data_sets_lazy(ens_bin)
+        else:
             ens = BinaryCodec.decode_data_sets(ens_bin)
 
+        if ens:
             if ens.IsEnsembleData:
                 logging.debug("Ensemble Found: " + str(ens.EnsembleData.EnsembleNumber))
             else:
                 logging.debug("Ensemble Found")
 
-            if ens:
-                # Pass the ensemble to the event handler
-                self.ensemble_event(ens)
+            # Pass the ensemble to the event handler
+            self.ensemble_event(ens)
+
+    def follow(self, ens_file_path, offset=0, poll_interval=0.2, stop_event=None, next_file_func=None, use_inotify=True):
+        """
+        Follow a file while it is being written.  Each new complete ensemble
+        is passed to the ensemble_event.  Only the new data is read.
+
+        The offset after the last complete ensemble is kept in follow_offset,
+        so following can be stopped and started again without reading the
+        file again.  When the file has no new data and the next file in the
+        sequence exists, the rest of this file is read and the next file is
+        followed.
+
+        Waits for new data with inotify on Linux, or polls the file.
+
+        :param ens_file_path: Ensemble file path.
+        :param offset: File offset to start reading.  Use the follow_offset returned to continue.
+        :param poll_interval: Maximum seconds to wait before checking the file.
+        :param stop_event: threading.Event to stop following.  stop_follow() can also be used.
+        :param next_file_func: Function(file_path) to get the next file path or None.  Default is next_file.
+        :param use_inotify: False to always poll.
+        :return: File path and offset after the last complete ensemble.
+        """
+        if next_file_func is None:
+            next_file_func = ReadBinaryFile.next_file
+        if stop_event is None:
+            stop_event = threading.Event()
+        self.follow_stop_event = stop_event
+
+        self.follow_path = ens_file_path
+        self.follow_offset = offset
+        buff = bytearray()
+
+        watcher = _DirectoryWatcher(os.path.dirname(os.path.abspath(ens_file_path)), use_inotify)
+        f = open(ens_file_path, "rb")
+        f.seek(offset)
+
+        try:
+            while not stop_event.is_set():
+                data = f.read(self.FOLLOW_BLOCK_SIZE)
+                if data:
+                    buff += data
+                    consumed = self.process_follow_buffer(buff)
+                    if consumed:
+                        del buff[:consumed]
+                        self.follow_offset += consumed
+                    continue
+
+                # File was replaced with a smaller file
+                if os.path.getsize(self.follow_path) < self.follow_offset + len(buff):
+                    logging.warning("File truncated.  Reading from the beginning: " + self.follow_path)
+                    f.seek(0)
+                    self.follow_offset = 0
+                    buff = bytearray()
+                    continue
+
+                # The writer moved to the next file.  Read the rest of this file first.
+                next_path = next_file_func(self.follow_path)
+                if next_path is not None:
+                    data = f.read()
+                    if data:
+                        buff += data
+                        continue
+
+                    if buff:
+                        logging.warning("Incomplete data at the end of the file: " + self.follow_path)
+
+                    f.close()
+                    f = open(next_path, "rb")
+                    self.follow_path = next_path
+                    self.follow_offset = 0
+                    buff = bytearray()
+                    logging.debug("Follow the next file: " + next_path)
+
+                    if os.path.dirname(os.path.abspath(next_path)) != os.path.dirname(os.path.abspath(ens_file_path)):
+                        watcher.close()
+                        watcher = _DirectoryWatcher(os.path.dirname(os.path.abspath(next_path)), use_inotify)
+                    continue
+
+                watcher.wait(poll_interval)
+        finally:
+            f.close()
+            watcher.close()
+
+        return self.follow_path, self.follow_offset
+
+    def stop_follow(self):
+        """
+        Stop following the file.  follow() returns within the poll interval.
+        :return:
+        """
+        if self.follow_stop_event is not None:
+            self.follow_stop_event.set()
+
+    def process_follow_buffer(self, buff):
+        """
+        Find the complete ensembles in the buffer and process them.
+        The ensemble size in the header is used to find the end of the
+        ensemble, so an ensemble still being written is left in the buffer.
+        :param buff: Data read from the file.
+        :return: Number of bytes processed.  The bytes after it are the start of an ensemble not complete.
+        """
+        ensembles, pos = BinaryCodec.find_ensembles(buff)
+        for start, ens_bin in ensembles:
+            self.decode_playback_ens(ens_bin)
+
+        return pos
+
+    @staticmethod
+    def next_file(ens_file_path):
+        """
+        Find the next file in the sequence.  The files in the folder with the
+        same name prefix and extension are sorted with the numbers in the name
+        compared as numbers.  Adcp9.ens is before Adcp10.ens and
+        RTI_20191101_112241.ens is before RTI_20191101_112241_1.ens.
+        :param ens_file_path: Current file path.
+        :return: Next file path or None.
+        """
+        folder = os.path.dirname(os.path.abspath(ens_file_path))
+        name = os.path.basename(ens_file_path)
+        prefix = re.match(r"\D*", name).group(0)
+        extension = os.path.splitext(name)[1].lower()
+
+        def natural_key(file_name):
+            return [(0, int(text), "") if text.isdigit() else (1, 0, text) for text in re.split(r"(\d+)", file_name)]
+
+        current_key = natural_key(name)
+        candidates = [file_name for file_name in os.listdir(folder)
+                      if file_name.startswith(prefix) and os.path.splitext(file_name)[1].lower() == extension
+                      and natural_key(file_name) > current_key]
+
+        if not candidates:
+            return None
+
+        return os.path.join(folder, min(candidates, key=natural_key))
 
     @event
     def ensemble_event(self, ens):
@@ -2,19 +2,27 @@ import datetime
 import humanize
 import os
 import logging
+from rti_python.Writer.rti_recorder import RtiRawRecorder
 
 class RtiBinaryWriter:
     """
     Create a writer to write data to a file.
+
+    The data is written to the disk by a background thread, so write() does
+    not wait for a slow disk.  A new file is started at the beginning of an
+    ensemble when the file is larger than the max file size.
     """
 
-    def __init__(self, folder_path=None, header="RTI_", extension=".ens", max_file_size=16):
+    def __init__(self, folder_path=None, header="RTI_", extension=".ens", max_file_size=16,
+                 fsync_policy=RtiRawRecorder.FSYNC_ROTATE, max_memory=32):
         """
         Create an object to write binary data to a file.
         :param folder_path: Folder path to store the data.  Default: User Folder depending on OS
         :param header: What to put in the beginning of the file name.  Default: RTI_
         :param extension: File extension.  Default: .ens
         :param max_file_size: Maximum file size.  Default: 16mb
+        :param fsync_policy: When to flush the file to the disk.  Default: When the file is closed
+        :param max_memory: Maximum data waiting to be written.  Default: 32mb
         """
 
         BYTES_PER_MB = 1048576
@@ -27,40 +35,52 @@ class RtiBinaryWriter:
         if not self.folder_path:
             self.folder_path = os.path.expanduser('~')
 
-        # If the folder does not exist, create it
-        if not os.path.exists(self.folder_path):
-            os.chdir(self.folder_path)
+        # Create the folder and the first file
+        # The recorder creates the new files
+        self.recorder = RtiRawRecorder(self.folder_path, header, extension, self.max_file_size,
+                                       fsync_policy=fsync_policy,
+                                       max_memory=max_memory * BYTES_PER_MB,
+                                       file_name_func=self.create_file_name)
+
+    @property
+    def file_path(self):
+        """
+        File path of the current file.
+        """
+        return self.recorder.file_path
 
-        # Create a file name
-        self.file_path = self.create_file_name(self.folder_path, header=header, extension=extension)
-        self.file = open(self.file_path, "wb")
+    @property
+    def bytes_written(self):
+        """
+        Bytes written for current file.
+        """
+        return self.recorder.file_bytes
 
-        self.bytes_written = 0          # Bytes written for current file
-        self.total_bytes = 0            # All bytes written since start
+    @property
+    def total_bytes(self):
+        """
+        All bytes written since start.
+        """
+        return self.recorder.metrics.written_bytes
 
     def write(self, data):
         """
-        Write the data to the file.
+        Write the data to the file.  The data is copied and written in the background.
         :param data: Binary data to write to the file.
         :return:
         """
         try:
-            # Write data
-            self.file.write(data)
-
-            # Monitor bytes written
-            self.bytes_written += len(data)
-            self.total_bytes += len(data)
-
-            # Check if the file exceeds the max file size
-            # If it does, create a new file
-            if self.bytes_written > self.max_file_size:
-                self.file_path = self.create_file_name(self.folder_path, self.header, self.extension)
-                self.close()
-                self.file = open(self.file_path, "wb")
-                self.bytes_written = 0
+            self.recorder.write(data)
         except Exception as e:
-            logging.error("Error writing the file.  ", e)
+            logging.error("Error writing the file.  " + str(e))
+
+    def flush(self, timeout=None):
+        """
+        Wait until all the data is written to the file.
+        :param timeout: Maximum seconds to wait.
+        :return: True if all the data is written.
+        """
+        return self.recorder.flush(timeout)
 
     def get_current_file_bytes_written(self):
         """
@@ -81,14 +101,21 @@ class RtiBinaryWriter:
         Get the file path of the current file.
         :return:
         """
-        return self.file.name
+        return self.recorder.file_path
+
+    def get_metrics(self):
+        """
+        Get the metrics of the recorder.
+        :return: Dictionary of the RecorderMetrics.
+        """
+        return self.recorder.get_metrics()
 
     def close(self):
         """
-        Close the file.
+        Write the remaining data and close the file.
         :return:
         """
-        self.file.close()
+        self.recorder.close()
 
     def create_file_name(self, folder, header="RTI_", extension=".ens"):
         """
@@ -101,5 +128,12 @@ class RtiBinaryWriter:
         """
         now = datetime.datetime.now()
         file_name_date = now.strftime("%Y%m%d_%H%M%S")
+        file_path = folder + os.sep + header + file_name_date + extension
+
+        # A new file within the same second would overwrite the last file
+        index = 1
+        while os.path.exists(file_path):
+            file_path = folder + os.sep + header + file_name_date + "_" + str(index) + extension
+            index += 1
 
-        return folder + os.sep + header + file_name_date + extension
+        return file_path
@@ -0,0 +1,108 @@
+import logging
+from rti_python.Codecs.Pd0Encoder import Pd0Encoder
+from rti_python.Utilities.read_binary_file import ReadBinaryFile
+
+
+class RtiPd0Writer:
+    """
+    Write RTB ensembles to a PD0 file.
+
+    The ensembles are buffered and converted to PD0 in batches,
+    then each batch is written to the file with a single write.
+
+    writer = RtiPd0Writer("/path/to/file.pd0")
+    writer.write(ens)
+    writer.close()
+
+    Convert an entire RTB file:
+    RtiPd0Writer.convert_file("/path/to/file.ens", "/path/to/file.pd0")
+    """
+
+    def __init__(self, file_path, coord_transform=None, batch_size=200):
+        """
+        Create the writer and open the file.
+        :param file_path: PD0 file path.
+        :param coord_transform: Coordinate transform of the PD0 velocity data.  BEAM, INST, EARTH or None for the best available.
+        :param batch_size: Number of ensembles to convert at once.
+        """
+        self.file_path = file_path
+        self.batch_size = batch_size
+        self.encoder = Pd0Encoder(coord_transform)
+        self.batch = []
+
+        self.ens_count = 0              # Ensembles written
+        self.error_count = 0            # Ensembles that could not be converted
+        self.bytes_written = 0          # Bytes written to the file
+
+        self.file = open(file_path, "wb")
+
+    def write(self, ens):
+        """
+        Add the ensemble to the batch.  The batch is written
+        to the file when it is full.
+        :param ens: RTB Ensemble.
+        """
+        self.batch.append(ens)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def write_batch(self, ens_list):
+        """
+        Write a list of ensembles.
+        :param ens_list: List of RTB Ensembles.
+        """
+        for ens in ens_list:
+            self.write(ens)
+
+    def flush(self):
+        """
+        Convert the batch to PD0 and write it to the file.
+        """
+        if not self.batch:
+            return
+
+        try:
+            pd0_list = self.encoder.encode_batch(self.batch)
+            data = b"".join(pd0_ens for pd0_ens in pd0_list if pd0_ens is not None)
+            self.file.write(data)
+
+            self.bytes_written += len(data)
+            self.ens_count += sum(1 for pd0_ens in pd0_list if pd0_ens is not None)
+            self.error_count += sum(1 for pd0_ens in pd0_list if pd0_ens is None)
+        except Exception as e:
+            logging.error("Error writing the PD0 file.  " + str(e))
+
+        self.batch = []
+
+    def close(self):
+        """
+        Write the remaining ensembles and close the file.
+        """
+        self.flush()
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @staticmethod
+    def convert_file(ens_file_path, pd0_file_path, coord_transform=None, batch_size=200):
+        """
+        Convert an RTB file to a PD0 file.
+        The ensembles are decoded lazily, so only the datasets needed for PD0 are decoded.
+        :param ens_file_path: RTB file path.
+        :param pd0_file_path: PD0 file path.
+        :param coord_transform: Coordinate transform of the PD0 velocity data.  BEAM, INST, EARTH or None for the best available.
+        :param batch_size: Number of ensembles to convert at once.
+        :return: Number of ensembles written.
+        """
+        with RtiPd0Writer(pd0_file_path, coord_transform, batch_size) as writer:
+            reader = ReadBinaryFile(is_lazy=True)
+            reader.ensemble_event += lambda sender, ens: writer.write(ens)
+            reader.playback(ens_file_path)
+
+        return writer.ens_count
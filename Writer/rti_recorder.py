@@ -0,0 +1,545 @@
+import os
+import time
+import logging
+import datetime
+import threading
+from collections import deque
+from rti_python.Codecs.BinaryCodec import BinaryCodec
+
+
+class RecorderMetrics:
+    """
+    Metrics of the RtiRawRecorder.
+    """
+
+    def __init__(self):
+        self.received_bytes = 0         # Bytes given to the recorder
+        self.written_bytes = 0          # Bytes written to the files
+        self.writes = 0                 # Write calls to the disk
+        self.files = 0                  # Files opened
+        self.dropped_bytes = 0          # Bytes lost because the memory budget was full
+        self.queued_bytes = 0           # Bytes waiting to be written, including the bytes held back for a new file
+        self.max_queued_bytes = 0       # Most bytes waiting to be written
+        self.fsyncs = 0                 # Times the file was flushed to the disk
+        self.write_errors = 0           # Failed writes.  The data is written again.
+        self.max_write_ms = 0.0         # Longest write call
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+class RtiRawRecorder:
+    """
+    Record raw ADCP data to files without blocking the reader.
+
+    The data is received into a pool of reusable buffers.  A writer thread
+    takes the filled buffers and writes many of them with a single os.writev()
+    call, so the data is not copied again.  If the disk is slow or fails for a
+    moment, the data waits in the buffers.  When all the buffers of the memory
+    budget are used, the new data is dropped and counted, so the socket is
+    still read and the instrument is never stalled.
+
+    A new file is started when the file is larger than max_file_size or older
+    than max_file_age.  The file is split at the start of an ensemble, so each
+    file only has complete ensembles.
+
+    recorder = RtiRawRecorder("/data/adcp")
+    while recording:
+        recorder.recv_into(sock)
+    recorder.close()
+    """
+
+    FSYNC_NEVER = 0                     # Let the OS flush the file
+    FSYNC_ROTATE = 1                    # Flush when the file is closed
+    FSYNC_INTERVAL = 2                  # Flush every fsync_interval seconds
+    FSYNC_ALWAYS = 3                    # Flush after every write
+
+    DELIMITER = BinaryCodec.DELIMITER   # Start of an ensemble
+    MAX_IOV = 512                       # Buffers in a single writev call
+
+    def __init__(self,
+                 folder_path: str,
+                 header: str = "RTI_",
+                 extension: str = ".ens",
+                 max_file_size: int = 16 * 1024 * 1024,
+                 max_file_age: float = None,
+                 fsync_policy: int = FSYNC_ROTATE,
+                 fsync_interval: float = 5.0,
+                 preallocate: bool = False,
+                 buffer_size: int = 64 * 1024,
+                 max_memory: int = 32 * 1024 * 1024,
+                 coalesce_size: int = 1024 * 1024,
+                 max_boundary_search: int = 1024 * 1024,
+                 retry_interval: float = 0.5,
+                 file_name_func=None):
+        """
+        :param folder_path: Folder to store the files.  It is created if it does not exist.
+        :param header: Beginning of the file name.
+        :param extension: File extension.
+        :param max_file_size: Size in bytes to start a new file.
+        :param max_file_age: Seconds to start a new file.  None for no time limit.
+        :param fsync_policy: When to flush the file to the disk.  FSYNC_NEVER, FSYNC_ROTATE, FSYNC_INTERVAL or FSYNC_ALWAYS.
+        :param fsync_interval: Seconds between flushes for FSYNC_INTERVAL.
+        :param preallocate: Reserve max_file_size on the disk when the file is created.  The file is trimmed when closed.
+        :param buffer_size: Size of each receive buffer.
+        :param max_memory: Memory budget in bytes for all the buffers.
+        :param coalesce_size: Bytes to collect for a single write.
+        :param max_boundary_search: Bytes to search for an ensemble start before splitting the file anyway.
+        :param retry_interval: Seconds to wait before writing again after a write error.
+        :param file_name_func: Function(folder_path, header, extension) to create a file path.  Default is create_file_name.
+        """
+        self.folder_path = folder_path
+        self.header = header
+        self.extension = extension
+        self.max_file_size = max_file_size
+        self.max_file_age = max_file_age
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self.preallocate = preallocate
+        self.buffer_size = buffer_size
+        self.max_buffers = max(max_memory // buffer_size, 2)
+        self.coalesce_size = coalesce_size
+        self.max_boundary_search = max_boundary_search
+        self.retry_interval = retry_interval
+        self.file_name_func = file_name_func if file_name_func is not None else RtiRawRecorder.create_file_name
+        self.metrics = RecorderMetrics()
+
+        # Buffer pool and the queue of [buffer, start, end, pooled] to write
+        self._free = []
+        self._num_buffers = 0
+        self._queue = deque()
+        self._recv_buf = None
+        self._scratch = bytearray(buffer_size)
+        self._cond = threading.Condition()
+        self._closing = False
+        self._flush_carry = False
+
+        # Current file.  Only used by the writer thread after it starts.
+        self.file_path = None
+        self._fd = None
+        self.file_bytes = 0
+        self._file_time = 0.0
+        self._last_fsync = 0.0
+        self._dirty = False
+        self._carry = b""
+        self._search_bytes = 0
+
+        if not os.path.isdir(self.folder_path):
+            os.makedirs(self.folder_path)
+        self._open_file()
+
+        self._thread = threading.Thread(target=self._run, name="RtiRawRecorder", daemon=True)
+        self._thread.start()
+
+    def recv_into(self, sock):
+        """
+        Receive from the socket into a buffer and queue it to write.
+        Socket timeouts and errors are raised to the caller.
+        :param sock: Socket to receive from.
+        :return: Number of bytes received.  0 if the socket is closed.
+        """
+        if self._recv_buf is None:
+            self._recv_buf = self._acquire()
+
+        if self._recv_buf is None:
+            # Memory budget is full.  Keep reading so the sender is not stalled.
+            nbytes = sock.recv_into(self._scratch)
+            self.metrics.received_bytes += nbytes
+            self.metrics.dropped_bytes += nbytes
+            return nbytes
+
+        nbytes = sock.recv_into(self._recv_buf)
+        if nbytes == 0:
+            return 0
+
+        with self._cond:
+            self.metrics.received_bytes += nbytes
+            last = self._queue[-1] if self._queue else None
+            if last is not None and last[3] and len(last[0]) - last[2] >= nbytes:
+                # Small read.  Add it to the last buffer and keep the receive buffer.
+                last[0][last[2]:last[2] + nbytes] = memoryview(self._recv_buf)[:nbytes]
+                last[2] += nbytes
+                self._queued(nbytes)
+            else:
+                self._queue.append([self._recv_buf, 0, nbytes, True])
+                self._recv_buf = None
+                self._queued(nbytes)
+                self._cond.notify()
+
+        return nbytes
+
+    def write(self, data):
+        """
+        Copy the data into the buffers and queue it to write.
+        :param data: Binary data to write.
+        :return: Number of bytes queued.  Less than len(data) if the memory budget is full.
+        """
+        view = memoryview(data).cast("B")
+        pos = 0
+
+        with self._cond:
+            self.metrics.received_bytes += len(view)
+
+            # Fill the last buffer first
+            last = self._queue[-1] if self._queue else None
+            if last is not None and last[3]:
+                count = min(len(last[0]) - last[2], len(view))
+                last[0][last[2]:last[2] + count] = view[:count]
+                last[2] += count
+                pos = count
+
+            while pos < len(view):
+                buf = self._acquire_locked()
+                if buf is None:
+                    self.metrics.dropped_bytes += len(view) - pos
+                    break
+                count = min(len(buf), len(view) - pos)
+                buf[:count] = view[pos:pos + count]
+                self._queue.append([buf, 0, count, True])
+                pos += count
+
+            self._queued(pos)
+            self._cond.notify()
+
+        return pos
+
+    def flush(self, timeout=None):
+        """
+        Wait until all the queued data is written.  The bytes held back while
+        looking for an ensemble start for a new file are also written.
+        :param timeout: Maximum seconds to wait.  None to wait forever.
+        :return: True if all the data is written.
+        """
+        with self._cond:
+            self._flush_carry = True
+            self._cond.notify()
+            return self._cond.wait_for(lambda: self.metrics.queued_bytes == 0 or not self._thread.is_alive(), timeout)
+
+    def close(self, timeout=None):
+        """
+        Write the queued data and close the file.
+        :param timeout: Maximum seconds to wait for the data to be written.
+        """
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    def get_metrics(self):
+        """
+        :return: Dictionary of the RecorderMetrics.
+        """
+        return self.metrics.to_dict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @staticmethod
+    def create_file_name(folder, header="RTI_", extension=".ens"):
+        """
+        Create a file name based off the time and date.  If the file
+        exists, an index is added to make the name unique.
+        :param folder: Folder to store the file.
+        :param header: Header for the file.
+        :param extension: Extension for the file.
+        :return: File path.
+        """
+        file_name = header + datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        file_path = os.path.join(folder, file_name + extension)
+
+        index = 1
+        while os.path.exists(file_path):
+            file_path = os.path.join(folder, file_name + "_" + str(index) + extension)
+            index += 1
+
+        return file_path
+
+    def _acquire(self):
+        """
+        Get a free buffer.
+        :return: Buffer or None if the memory budget is full.
+        """
+        with self._cond:
+            return self._acquire_locked()
+
+    def _acquire_locked(self):
+        if self._free:
+            return self._free.pop()
+        if self._num_buffers < self.max_buffers:
+            self._num_buffers += 1
+            return bytearray(self.buffer_size)
+        return None
+
+    def _queued(self, nbytes):
+        self.metrics.queued_bytes += nbytes
+        self.metrics.max_queued_bytes = max(self.metrics.max_queued_bytes, self.metrics.queued_bytes)
+
+    def _run(self):
+        """
+        Writer thread.  Take the queued buffers and write them to the file.
+        """
+        while True:
+            with self._cond:
+                if not self._queue and not self._closing and not self._flush_carry:
+                    self._cond.wait(self._wait_time())
+
+                items = []
+                size = 0
+                while self._queue and size < self.coalesce_size:
+                    item = self._queue.popleft()
+                    items.append(item)
+                    size += item[2] - item[1]
+
+                # Write the held back bytes after the last queued data
+                flush_carry = self._flush_carry and not self._queue
+                if flush_carry:
+                    self._flush_carry = False
+
+                if not items and self._closing:
+                    break
+
+            if items:
+                sizes = [item[2] - item[1] for item in items]
+                carry_size = len(self._carry)
+                is_written = self._write_items(items)
+                with self._cond:
+                    # The bytes held back are still queued
+                    self.metrics.queued_bytes += len(self._carry) - carry_size
+
+                    # Put the data not written back in the queue
+                    for item, size in reversed(list(zip(items, sizes))):
+                        self.metrics.queued_bytes -= size - (item[2] - item[1])
+                        if item[1] < item[2]:
+                            self._queue.appendleft(item)
+                        elif item[3]:
+                            self._free.append(item[0])
+                    self._cond.notify_all()
+
+                if not is_written:
+                    # Disk error.  Wait and try again.  The buffers hold the new data.
+                    if self._closing and self.metrics.write_errors > 10:
+                        logging.error("Recorder closed with data not written.")
+                        break
+                    time.sleep(self.retry_interval)
+                    continue
+
+            if flush_carry and self._carry:
+                self._write_carry()
+
+            self._check_file(time.monotonic())
+
+        self._close_file()
+        with self._cond:
+            self._cond.notify_all()
+
+    def _wait_time(self):
+        """
+        :return: Seconds to wait for data before checking the file age and fsync.
+        """
+        wait = 1.0
+        if self.max_file_age is not None:
+            wait = min(wait, self.max_file_age / 4.0)
+        if self.fsync_policy == self.FSYNC_INTERVAL:
+            wait = min(wait, self.fsync_interval)
+        return wait
+
+    def _rotate_due(self, now):
+        if self.file_bytes >= self.max_file_size:
+            return True
+        return self.max_file_age is not None and self.file_bytes > 0 and now - self._file_time >= self.max_file_age
+
+    def _write_items(self, items):
+        """
+        Write the items to the file.  Start a new file at an ensemble start if it is time.
+        :param items: List of [buffer, start, end, pooled].  The start of each item is moved as it is written.
+        :return: False if the write failed.  The items with data left are written again later.
+        """
+        try:
+            rotate = self._rotate_due(time.monotonic())
+            if not self._carry and not rotate:
+                views = [memoryview(item[0])[item[1]:item[2]] for item in items]
+                self._write_views(views, items)
+            else:
+                self._write_split(items, rotate)
+        except OSError as err:
+            self.metrics.write_errors += 1
+            logging.error("Error writing the file. " + str(err))
+            return False
+
+        return True
+
+    def _write_views(self, views, items=None):
+        """
+        Write the views with writev.  The items are updated as the data is written.
+        :param views: List of memoryviews.
+        :param items: Items of the views.  Each start is moved as it is written.
+        """
+        index = 0
+        while index < len(views):
+            if len(views[index]) == 0:
+                index += 1
+                continue
+
+            batch = views[index:index + self.MAX_IOV]
+            start = time.perf_counter()
+            if hasattr(os, "writev"):
+                nbytes = os.writev(self._fd, batch)
+            else:
+                nbytes = os.write(self._fd, batch[0])
+            self.metrics.max_write_ms = max(self.metrics.max_write_ms, (time.perf_counter() - start) * 1000.0)
+            self.metrics.writes += 1
+            self.metrics.written_bytes += nbytes
+            self.file_bytes += nbytes
+            self._dirty = True
+
+            # Move past the written data.  A partial write continues in the next call.
+            while nbytes > 0:
+                count = min(nbytes, len(views[index]))
+                nbytes -= count
+                if items is not None:
+                    items[index][1] += count
+                if count < len(views[index]):
+                    views[index] = views[index][count:]
+                else:
+                    index += 1
+
+        if self.fsync_policy == self.FSYNC_ALWAYS:
+            self._fsync()
+
+    def _write_split(self, items, rotate):
+        """
+        Write the carry and the items.  If it is time for a new file, look for
+        the start of an ensemble to begin the new file.  The last bytes are held
+        back in the carry in case the ensemble start is split between items.
+        The data is copied, but only while looking for the ensemble start.
+        If the write fails, the data not written is kept in the carry.
+        :param items: List of [buffer, start, end, pooled].
+        :param rotate: True if it is time for a new file.
+        """
+        data = self._carry + b"".join(memoryview(item[0])[item[1]:item[2]] for item in items)
+        self._carry = b""
+        for item in items:
+            item[1] = item[2]
+
+        # Data before the ensemble start, then data for the new file
+        pos = len(data)
+        split = False
+        if rotate:
+            pos = data.find(self.DELIMITER, 1 if self.file_bytes == 0 else 0)
+            if pos >= 0:
+                split = True
+            elif self._search_bytes + len(data) >= self.max_boundary_search:
+                logging.warning("No ensemble start found.  File split in the data.")
+                pos = len(data)
+                split = True
+            else:
+                # Keep looking.  Hold back a partial ensemble start.
+                pos = max(len(data) - (len(self.DELIMITER) - 1), 0)
+                self._search_bytes += pos
+
+        written = [data, 0, pos, False]
+        try:
+            self._write_views([memoryview(data)[:pos]], [written])
+            if split:
+                self._search_bytes = 0
+                self._close_file()
+                self._open_file()
+                written[2] = len(data)
+                self._write_views([memoryview(data)[pos:]], [written])
+        except OSError:
+            self._carry = data[written[1]:]
+            raise
+
+        self._carry = data[written[2]:]
+
+    def _write_carry(self):
+        """
+        Write the bytes held back to the current file.  The new file will begin
+        at the next ensemble start.
+        """
+        carry = self._carry
+        written = [carry, 0, len(carry), False]
+        try:
+            self._write_views([memoryview(carry)], [written])
+        except OSError as err:
+            self.metrics.write_errors += 1
+            logging.error("Error writing the file. " + str(err))
+            time.sleep(self.retry_interval)
+
+        self._carry = carry[written[1]:]
+        with self._cond:
+            self.metrics.queued_bytes -= written[1]
+            if self._carry:
+                # Try again
+                self._flush_carry = True
+            self._cond.notify_all()
+
+    def _check_file(self, now):
+        """
+        Flush the file if the interval passed.
+        :param now: Current time.
+        """
+        if self.fsync_policy == self.FSYNC_INTERVAL and self._dirty and now - self._last_fsync >= self.fsync_interval:
+            try:
+                self._fsync()
+            except OSError as err:
+                logging.error("Error flushing the file. " + str(err))
+
+        # Time to start a new file, but no new data to find the ensemble start
+        if self.max_file_age is not None and not self._carry and self._rotate_due(now) and \
+                now - self._file_time >= self.max_file_age * 2:
+            self._close_file()
+            self._open_file()
+
+    def _fsync(self):
+        os.fsync(self._fd)
+        self.metrics.fsyncs += 1
+        self._dirty = False
+        self._last_fsync = time.monotonic()
+
+    def _open_file(self):
+        """
+        Create a new file.
+        """
+        self.file_path = self.file_name_func(self.folder_path, self.header, self.extension)
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+        self._fd = os.open(self.file_path, flags, 0o644)
+        self.file_bytes = 0
+        self._file_time = time.monotonic()
+        self._last_fsync = self._file_time
+        self.metrics.files += 1
+
+        if self.preallocate and hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(self._fd, 0, self.max_file_size)
+            except OSError as err:
+                logging.warning("File not preallocated. " + str(err))
+
+        logging.debug("Open File name: " + self.file_path)
+
+    def _close_file(self):
+        """
+        Write the held back bytes, trim the preallocated space and close the file.
+        """
+        if self._fd is None:
+            return
+
+        try:
+            if self._carry:
+                carry_size = len(self._carry)
+                self._write_views([memoryview(self._carry)])
+                self._carry = b""
+                with self._cond:
+                    self.metrics.queued_bytes -= carry_size
+            if self.preallocate:
+                os.ftruncate(self._fd, self.file_bytes)
+            if self.fsync_policy != self.FSYNC_NEVER and self._dirty:
+                self._fsync()
+        except OSError as err:
+            logging.error("Error closing the file. " + str(err))
+        finally:
+            os.close(self._fd)
+            self._fd = None
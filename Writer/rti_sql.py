@@ -12,6 +12,14 @@ ALTER TABLE ensembles ADD COLUMN created timestamp;
 ALTER TABLE ensembles ADD COLUMN modified timestamp;
 """
 
+# Datasets are stored in NumPy arrays, so allow the NumPy values to be written to the database
+sqlite3.register_adapter(np.int32, int)
+sqlite3.register_adapter(np.int64, int)
+sqlite3.register_adapter(np.float32, float)
+psycopg2.extensions.register_adapter(np.int32, psycopg2.extensions.AsIs)
+psycopg2.extensions.register_adapter(np.int64, psycopg2.extensions.AsIs)
+psycopg2.extensions.register_adapter(np.float32, psycopg2.extensions.AsIs)
+
 
 class RtiSQL:
 
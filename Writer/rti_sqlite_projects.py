@@ -1,10 +1,12 @@
 from rti_python.Writer.rti_sql import RtiSQL
 from rti_python.Ensemble import Ensemble
 import logging
+import numpy as np
 from datetime import datetime, date, time
 from tqdm import tqdm
 from pathlib import Path, PurePath
 from rti_python.Utilities.read_binary_file import ReadBinaryFile
+from rti_python.Utilities.merge_binary_files import MergeBinaryFiles
 from rti_python.River.Transect import Transect
 
 
@@ -44,18 +46,33 @@ class RtiSqliteProjects:
 
         self.pbar = None
 
-    def load_files(self, file_paths):
+    def load_files(self, file_paths, merge=False):
         """
         Load the files given.  This will go through the list of files
         and add all the data to the sqlite database file.
 
         :param file_paths: List of file paths to load.
+        :param merge: TRUE = Merge the files in time order into one project named after the first file.  Duplicate ensembles are dropped.
         """
         if file_paths:
 
             # Create the tables in the database if they do not exist
             self.create_tables()
 
+            if merge:
+                merger = MergeBinaryFiles(file_paths)
+                merger.ensemble_event += self.ens_handler               # Wait for ensembles
+
+                # Create the project from the first file name
+                prj_name = Path(file_paths[0]).stem
+                self.add_prj_sql(str(prj_name), file_paths[0])
+
+                # Merge the files and write the ensembles in a batch
+                self.begin_batch(str(prj_name))
+                merger.playback()
+                self.end_batch()
+                return
+
             for file in file_paths:
                 reader = ReadBinaryFile()
                 reader.ensemble_event += self.ens_handler               # Wait for ensembles
@@ -1113,26 +1130,31 @@ class RtiSqliteProjects:
                 # This will also regenerate the velocity vectors
                 ens.EarthVelocity.remove_vessel_speed(bt_east=bt_east, bt_north=bt_north, bt_vert=bt_vert)
 
-            for bin_num in range(ens.EarthVelocity.num_elements):
-                # If values are given, calculate bin depth
-                bin_depth = bin_num
-                if blank and bin_size:
-                    bin_depth = blank + (bin_size * bin_num)
-
-                raw_mag = raw_mags[bin_num]
-                raw_dir = raw_dirs[bin_num]
-                removed_mag = ens.EarthVelocity.Magnitude[bin_num]
-                removed_dir = ens.EarthVelocity.Direction[bin_num]
-                query = "INSERT INTO {0} (" \
-                        "ensIndex, " \
-                        "bin, " \
-                        "binDepth, " \
-                        "rawMag, " \
-                        "rawDir, " \
-                        "mag, " \
-                        "dir) " \
-                        "VALUES ( ?, ?, ?, ?, ?, ?, ?);".format("earthMagDir")
-                self.batch_sql.cursor.execute(query, (ens_idx, bin_num, bin_depth, raw_mag, raw_dir, removed_mag, removed_dir))
+            # If values are given, calculate bin depth
+            num_bins = ens.EarthVelocity.num_elements
+            bin_nums = np.arange(num_bins)
+            bin_depths = bin_nums
+            if blank and bin_size:
+                bin_depths = blank + (bin_size * bin_nums)
+
+            # Insert all the bins at once
+            rows = zip([ens_idx] * num_bins,
+                       bin_nums.tolist(),
+                       np.asarray(bin_depths).tolist(),
+                       np.asarray(raw_mags, dtype=np.float64)[:num_bins].tolist(),
+                       np.asarray(raw_dirs, dtype=np.float64)[:num_bins].tolist(),
+                       np.asarray(ens.EarthVelocity.Magnitude, dtype=np.float64)[:num_bins].tolist(),
+                       np.asarray(ens.EarthVelocity.Direction, dtype=np.float64)[:num_bins].tolist())
+            query = "INSERT INTO {0} (" \
+                    "ensIndex, " \
+                    "bin, " \
+                    "binDepth, " \
+                    "rawMag, " \
+                    "rawDir, " \
+                    "mag, " \
+                    "dir) " \
+                    "VALUES ( ?, ?, ?, ?, ?, ?, ?);".format("earthMagDir")
+            self.batch_sql.cursor.executemany(query, list(rows))
 
     def add_transect(self, transect: Transect):
         """